@@ -19,7 +19,7 @@ from pulp.agent.lib.report import ContentReport
 from pulp_node import constants
 from pulp_node.handlers.strategies import find_strategy, SyncRequest
 from pulp_node.handlers.reports import HandlerProgress, SummaryReport
-from pulp_node.handlers.model import BindingsOnParent
+from pulp_node.handlers.model import BindingsOnParent, close_bindings
 
 
 log = getLogger(__name__)
@@ -63,18 +63,21 @@ class NodeHandler(ContentHandler):
         """
         summary_report = SummaryReport()
         progress_report = HandlerProgress(conduit)
-        bindings = BindingsOnParent.fetch_all()
-
-        strategy_name = options.setdefault(constants.STRATEGY_KEYWORD, constants.MIRROR_STRATEGY)
-        request = SyncRequest(
-            conduit=conduit,
-            progress=progress_report,
-            summary=summary_report,
-            bindings=bindings,
-            scope=constants.NODE_SCOPE,
-            options=options)
-        strategy = find_strategy(strategy_name)()
-        strategy.synchronize(request)
+        try:
+            bindings = BindingsOnParent.fetch_all()
+
+            strategy_name = options.setdefault(constants.STRATEGY_KEYWORD, constants.MIRROR_STRATEGY)
+            request = SyncRequest(
+                conduit=conduit,
+                progress=progress_report,
+                summary=summary_report,
+                bindings=bindings,
+                scope=constants.NODE_SCOPE,
+                options=options)
+            strategy = find_strategy(strategy_name)()
+            strategy.synchronize(request)
+        finally:
+            close_bindings()
 
         for ne in summary_report.errors:
             log.error(ne)
@@ -127,18 +130,21 @@ class RepositoryHandler(ContentHandler):
         summary_report = SummaryReport()
         progress_report = HandlerProgress(conduit)
         repo_ids = [key['repo_id'] for key in units if key]
-        bindings = BindingsOnParent.fetch(repo_ids)
-
-        strategy_name = options.setdefault(constants.STRATEGY_KEYWORD, constants.MIRROR_STRATEGY)
-        request = SyncRequest(
-            conduit=conduit,
-            progress=progress_report,
-            summary=summary_report,
-            bindings=bindings,
-            scope=constants.REPOSITORY_SCOPE,
-            options=options)
-        strategy = find_strategy(strategy_name)()
-        strategy.synchronize(request)
+        try:
+            bindings = BindingsOnParent.fetch(repo_ids)
+
+            strategy_name = options.setdefault(constants.STRATEGY_KEYWORD, constants.MIRROR_STRATEGY)
+            request = SyncRequest(
+                conduit=conduit,
+                progress=progress_report,
+                summary=summary_report,
+                bindings=bindings,
+                scope=constants.REPOSITORY_SCOPE,
+                options=options)
+            strategy = find_strategy(strategy_name)()
+            strategy.synchronize(request)
+        finally:
+            close_bindings()
 
         for ne in summary_report.errors:
             log.error(ne)
@@ -74,7 +74,7 @@ class ChildPulpBindings(PulpBindings):
         host = socket.gethostname()
         port = 443
         cert = '/etc/pki/pulp/nodes/local.crt'
-        connection = PulpConnection(host, port, cert_filename=cert)
+        connection = PulpConnection(host, port, cert_filename=cert, persistent=True)
         PulpBindings.__init__(self, connection)
 
 
@@ -90,7 +90,7 @@ class ParentPulpBindings(PulpBindings):
         port = int(server['port'])
         files = cfg['filesystem']
         cert = os.path.join(files['id_cert_dir'], files['id_cert_filename'])
-        connection = PulpConnection(host, port, cert_filename=cert)
+        connection = PulpConnection(host, port, cert_filename=cert, persistent=True)
         PulpBindings.__init__(self, connection)
 
 
@@ -133,6 +133,15 @@ class ParentEntity(object):
     binding = ParentPulpBindings()
 
 
+def close_bindings():
+    """
+    Close the connections kept open by the child and parent bindings.
+    The bindings are shared by the process and reconnect when next used.
+    """
+    ChildEntity.binding.close()
+    ParentEntity.binding.close()
+
+
 class Repository(object):
     """
     Represents a repository database object.
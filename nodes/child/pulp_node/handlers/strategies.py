@@ -10,6 +10,8 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 
+from Queue import Queue, Empty
+from threading import Thread
 from gettext import gettext as _
 from logging import getLogger
 from operator import itemgetter
@@ -49,6 +51,8 @@ class SyncRequest(object):
     :type scope: str
     :ivar options: synchronization options.
     :type options: dict
+    :ivar max_concurrency: The maximum number of repositories synchronized concurrently.
+    :type max_concurrency: int
     """
 
     def __init__(self, conduit, progress, summary, bindings, scope, options):
@@ -72,6 +76,8 @@ class SyncRequest(object):
         self.bindings = sorted(bindings, key=itemgetter('repo_id'))
         self.scope = scope
         self.options = options
+        self.max_concurrency = max(1, int(
+            options.get(constants.MAX_CONCURRENCY_KEYWORD, constants.DEFAULT_MAX_CONCURRENCY)))
         summary.setup(self.bindings)
 
     def cancelled(self):
@@ -147,34 +153,75 @@ class HandlerStrategy(object):
         Add or update repositories based on bindings.
           - Merge repositories found in BOTH parent and child.
           - Add repositories found in the parent but NOT in the child.
+        Up to request.max_concurrency repositories are merged and
+        synchronized concurrently.
         :param request: A synchronization request.
         :type request: SyncRequest
         """
+        concurrency = min(request.max_concurrency, len(request.bindings))
+        if concurrency < 2:
+            for bind in request.bindings:
+                self._merge_repository(request, bind)
+            return
+        queue = Queue()
         for bind in request.bindings:
+            queue.put(bind)
+        workers = []
+        for n in range(concurrency):
+            worker = Thread(target=self._merge_worker, args=(request, queue))
+            worker.setDaemon(True)
+            worker.start()
+            workers.append(worker)
+        for worker in workers:
+            worker.join()
+
+    def _merge_worker(self, request, queue):
+        """
+        Merge repositories taken from the queue until it is empty.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param queue: A queue of bindings.
+        :type queue: Queue
+        """
+        while True:
             try:
-                repo_id = bind['repo_id']
-                details = bind['details']
-                if request.cancelled():
-                    request.summary[repo_id].action = RepositoryReport.CANCELLED
-                    continue
-                parent = Repository(repo_id, details)
-                child = RepositoryOnChild.fetch(repo_id)
-                progress = request.progress.find_report(repo_id)
-                progress.begin_merging()
-                if child:
-                    request.summary[repo_id].action = RepositoryReport.MERGED
-                    child.merge(parent)
-                else:
-                    child = RepositoryOnChild(repo_id, parent.details)
-                    request.summary[repo_id].action = RepositoryReport.ADDED
-                    child.add()
-                self._synchronize_repository(request, repo_id)
-            except NodeError, ne:
-                request.summary.errors.append(ne)
-            except Exception, e:
-                log.exception(repo_id)
-                error = CaughtException(e, repo_id)
-                request.summary.errors.append(error)
+                bind = queue.get_nowait()
+            except Empty:
+                break
+            self._merge_repository(request, bind)
+
+    def _merge_repository(self, request, bind):
+        """
+        Add or update the repository based on the binding and synchronize it.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param bind: A consumer binding payload.
+        :type bind: dict
+        """
+        try:
+            repo_id = bind['repo_id']
+            details = bind['details']
+            if request.cancelled():
+                request.summary[repo_id].action = RepositoryReport.CANCELLED
+                return
+            parent = Repository(repo_id, details)
+            child = RepositoryOnChild.fetch(repo_id)
+            progress = request.progress.find_report(repo_id)
+            progress.begin_merging()
+            if child:
+                request.summary[repo_id].action = RepositoryReport.MERGED
+                child.merge(parent)
+            else:
+                child = RepositoryOnChild(repo_id, parent.details)
+                request.summary[repo_id].action = RepositoryReport.ADDED
+                child.add()
+            self._synchronize_repository(request, repo_id)
+        except NodeError, ne:
+            request.summary.errors.append(ne)
+        except Exception, e:
+            log.exception(repo_id)
+            error = CaughtException(e, repo_id)
+            request.summary.errors.append(error)
 
     def _synchronize_repository(self, request, repo_id):
         """
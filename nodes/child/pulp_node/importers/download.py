@@ -20,6 +20,7 @@ from nectar.request import DownloadRequest
 
 from pulp_node import constants
 from pulp_node import pathlib
+from pulp_node.checksum import ChecksumIndex, file_checksum
 from pulp_node.error import UnitDownloadError
 
 
@@ -88,7 +89,8 @@ class UnitDownloadManager(AggregatingEventListener):
           1. Fetch the content unit using the reference.
           2. Update the storage_path on the unit.
           3. Add the unit.
-          4. Check to see if the node sync request has been cancelled and cancel
+          4. Index the downloaded file by checksum when published with a checksum.
+          5. Check to see if the node sync request has been cancelled and cancel
              the downloader as needed.
         :param report: A nectar download report.
         :type report: nectar.report.DownloadReport.
@@ -100,6 +102,8 @@ class UnitDownloadManager(AggregatingEventListener):
         self._strategy.add_unit(self.request, unit)
         if unit.get(constants.PUBLISHED_AS_TARBALL):
             self.untar_dir(report.destination)
+        if unit.get(constants.FILE_CHECKSUM):
+            self.index_file(report.destination, unit[constants.FILE_CHECKSUM])
         if self.request.cancelled():
             self.request.downloader.cancel()
 
@@ -136,6 +140,24 @@ class UnitDownloadManager(AggregatingEventListener):
             if os.path.exists(tar_path):
                 os.unlink(tar_path)
 
+    def index_file(self, path, checksum):
+        """
+        Add the downloaded file to the local checksum index.
+        The checksum is calculated locally so the index only contains verified bits.
+        :param path: The absolute path to the downloaded file.
+        :type path: str
+        :param checksum: The checksum published by the parent.
+        :type checksum: str
+        """
+        try:
+            actual = file_checksum(path)
+            if actual != checksum:
+                log.warn('Checksum mismatch: %s', path)
+            index = ChecksumIndex()
+            index.add(path, actual)
+        except Exception:
+            log.exception(path)
+
     def error_list(self):
         """
         Return the aggregated list of errors.
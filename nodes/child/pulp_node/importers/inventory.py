@@ -9,6 +9,8 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+from pulp_node.conduit import NodesConduit
+
 
 class UniqueKey(object):
     """
@@ -89,4 +91,46 @@ class UnitInventory(object):
         :return: List of units that need to be purged.
         :rtype: list
         """
-        return [u for k, u in self.child_units.items() if k not in self.parent_units]
\ No newline at end of file
+        return [u for k, u in self.child_units.items() if k not in self.parent_units]
+
+class DeltaInventory(object):
+    """
+    The delta inventory contains the content units added to the parent
+    since the manifest last applied by the child and the child units that have
+    since been removed from the parent.  Provides the same interface as
+    the UnitInventory so it can be used by the strategies interchangeably.
+    """
+
+    def __init__(self, manifest, delta, repo_id):
+        """
+        :param manifest: The manifest.
+        :type manifest: pulp_node.manifest.Manifest
+        :param delta: The delta between the last applied manifest and the manifest.
+        :type delta: pulp_node.manifest.Delta
+        :param repo_id: The ID of the repository being synchronized.
+        :type repo_id: str
+        """
+        self.manifest = manifest
+        self.delta = delta
+        self.repo_id = repo_id
+        self.parent_units = UnitInventory._import_parent_units(delta.get_added_units())
+
+    def units_on_parent_only(self):
+        """
+        Listing of units added to the parent inventory.
+        :return: List of (unit address).
+        :rtype: list
+        """
+        return self.parent_units.values()
+
+    def units_on_child_only(self):
+        """
+        Listing of units contained in the child inventory that have been
+        removed from the parent inventory.  The child units are queried by unit key
+        only when needed so the additive strategy never pays for it.
+        :return: List of units that need to be purged.
+        :rtype: list
+        """
+        conduit = NodesConduit()
+        units = conduit.get_units_by_keys(self.repo_id, self.delta.get_removed_keys())
+        return UnitInventory._import_child_units(units).values()
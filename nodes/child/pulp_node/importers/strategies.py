@@ -16,6 +16,7 @@ the strategies provided here.
 """
 
 import os
+import shutil
 
 from gettext import gettext as _
 from logging import getLogger
@@ -26,8 +27,9 @@ from pulp.server.config import config as pulp_conf
 from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.conduit import NodesConduit
-from pulp_node.manifest import Manifest
-from pulp_node.importers.inventory import UnitInventory
+from pulp_node.checksum import ChecksumIndex
+from pulp_node.manifest import Manifest, Delta
+from pulp_node.importers.inventory import UnitInventory, DeltaInventory
 from pulp_node.importers.download import UnitDownloadManager
 from pulp_node.error import (NodeError, GetChildUnitsError, GetParentUnitsError, AddUnitError,
     DeleteUnitError, CaughtException)
@@ -41,6 +43,12 @@ log = getLogger(__name__)
 STRATEGY_UNSUPPORTED = _('Importer strategy "%(s)s" not supported')
 
 
+# --- constants -------------------------------------------------------------------------
+
+# The importer scratchpad key used to store the last applied manifest.
+APPLIED_MANIFEST = 'applied_manifest'
+
+
 # --- request ---------------------------------------------------------------------------
 
 
@@ -63,6 +71,8 @@ class SyncRequest(object):
     :type repo_id: str
     :ivar working_dir: The absolute path to a directory to be used as temporary storage.
     :type working_dir: str
+    :ivar manifest_id: The ID of the manifest being applied.
+    :type manifest_id: str
     """
 
     def __init__(self, importer, conduit, config, downloader, progress, summary, repo):
@@ -88,6 +98,7 @@ class SyncRequest(object):
         self.summary = summary
         self.repo_id = repo.id
         self.working_dir = repo.working_dir
+        self.manifest_id = None
 
     def started(self):
         """
@@ -123,6 +134,8 @@ class ImporterStrategy(object):
 
         try:
             self._synchronize(request)
+            if not request.summary.errors and not request.cancelled():
+                self._set_applied_manifest(request)
         except NodeError, ne:
             request.summary.errors.append(ne)
         except Exception, e:
@@ -164,11 +177,24 @@ class ImporterStrategy(object):
     def _unit_inventory(self, request):
         """
         Build the unit inventory.
+        When the parent has published a delta based on the manifest last applied
+        by this strategy, a delta inventory is built.  Otherwise, the full inventory
+        of both parent and child units is built.
         :param request: A synchronization request.
         :type request: SyncRequest
         :return: The built inventory.
-        :rtype: UnitInventory
+        :rtype: UnitInventory|DeltaInventory
         """
+        manifest = None
+        applied_id = self._applied_manifest_id(request)
+        if applied_id:
+            manifest = self._fetch_manifest(request)
+            request.manifest_id = manifest.id
+            if manifest.id == applied_id or manifest.has_delta(applied_id):
+                inventory = self._delta_inventory(request, manifest, applied_id)
+                if inventory is not None:
+                    return inventory
+
         # fetch child units
         try:
             conduit = NodesConduit()
@@ -180,19 +206,108 @@ class ImporterStrategy(object):
             raise GetChildUnitsError(request.repo_id)
 
         # fetch parent units
+        if manifest is None:
+            manifest = self._fetch_manifest(request)
+            request.manifest_id = manifest.id
+        try:
+            url = request.config.get(constants.MANIFEST_URL_KEYWORD)
+            manifest.fetch_units(url, request.downloader)
+        except NodeError:
+            raise
+        except Exception:
+            log.exception(request.repo_id)
+            raise GetParentUnitsError(request.repo_id)
+
+        return UnitInventory(manifest, child_units)
+
+    def _fetch_manifest(self, request):
+        """
+        Fetch the (parent) manifest.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :return: The fetched manifest.
+        :rtype: Manifest
+        """
         try:
             request.progress.begin_manifest_download()
             url = request.config.get(constants.MANIFEST_URL_KEYWORD)
             manifest = Manifest()
             manifest.fetch(url, request.working_dir, request.downloader)
-            manifest.fetch_units(url, request.downloader)
+            return manifest
         except NodeError:
             raise
         except Exception:
             log.exception(request.repo_id)
             raise GetParentUnitsError(request.repo_id)
 
-        return UnitInventory(manifest, child_units)
+    def _delta_inventory(self, request, manifest, applied_id):
+        """
+        Build the inventory using the delta between the last applied manifest
+        and the specified manifest.  When the manifest has already been applied,
+        the delta is empty.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :param manifest: The fetched (parent) manifest.
+        :type manifest: Manifest
+        :param applied_id: The ID of the manifest last applied.
+        :type applied_id: str
+        :return: The built inventory or None when the delta cannot be fetched.
+        :rtype: DeltaInventory
+        """
+        if manifest.id == applied_id:
+            delta = Delta(None, 0, None, 0)
+        else:
+            try:
+                url = request.config.get(constants.MANIFEST_URL_KEYWORD)
+                delta = manifest.fetch_delta(url, applied_id, request.downloader)
+            except Exception:
+                # fall back to a full synchronization
+                log.exception(request.repo_id)
+                return None
+        return DeltaInventory(manifest, delta, request.repo_id)
+
+    def _applied_manifest_id(self, request):
+        """
+        Get the ID of the manifest last successfully applied by this strategy.
+        The ID is stored in the importer scratchpad.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        :return: The manifest ID or None when not found.
+        :rtype: str
+        """
+        try:
+            scratchpad = request.conduit.get_scratchpad()
+        except Exception:
+            log.exception(request.repo_id)
+            return None
+        if not isinstance(scratchpad, dict):
+            return None
+        applied = scratchpad.get(APPLIED_MANIFEST) or {}
+        if applied.get('strategy') != self.__class__.__name__:
+            # units may have been added by another strategy
+            return None
+        return applied.get('id')
+
+    def _set_applied_manifest(self, request):
+        """
+        Store the ID of the manifest that has been successfully applied
+        in the importer scratchpad.
+        :param request: A synchronization request.
+        :type request: SyncRequest
+        """
+        if not request.manifest_id:
+            return
+        try:
+            scratchpad = request.conduit.get_scratchpad()
+            if not isinstance(scratchpad, dict):
+                scratchpad = {}
+            scratchpad[APPLIED_MANIFEST] = dict(
+                id=request.manifest_id,
+                strategy=self.__class__.__name__)
+            request.conduit.set_scratchpad(scratchpad)
+        except Exception:
+            # the next synchronization will not use a delta
+            log.exception(request.repo_id)
 
     def _update_storage_path(self, unit):
         """
@@ -219,9 +334,10 @@ class ImporterStrategy(object):
           3. Associate the unit to the repository.
         The unit is added only:
           1. If no file is associated with unit.
-          2. The file associated with the unit is successfully downloaded.
-        For units with files, the unit is added to the inventory as part of the
-        unit download manager callback.
+          2. The file associated with the unit is already stored locally (by checksum).
+          3. The file associated with the unit is successfully downloaded.
+        For units with downloaded files, the unit is added to the inventory as part
+        of the unit download manager callback.
         :param request: A synchronization request.
         :type request: SyncRequest
         :param unit_inventory: The inventory of both parent and child content units.
@@ -231,6 +347,7 @@ class ImporterStrategy(object):
         units = unit_inventory.units_on_parent_only()
         request.progress.begin_adding_units(len(units))
         manager = UnitDownloadManager(self, request)
+        checksum_index = ChecksumIndex()
         publishing_details = unit_inventory.manifest.publishing_details
         for unit, unit_ref in units:
             if request.cancelled():
@@ -240,6 +357,12 @@ class ImporterStrategy(object):
                 # unit has no file associated
                 self.add_unit(request, unit_ref.fetch())
                 continue
+            if self._reuse_file(checksum_index, unit):
+                # the file has been satisfied using local bits
+                _unit = unit_ref.fetch()
+                _unit[constants.STORAGE_PATH] = unit[constants.STORAGE_PATH]
+                self.add_unit(request, _unit)
+                continue
             url = pathlib.url_join(
                 publishing_details[constants.BASE_URL],
                 pathlib.quote(unit[constants.RELATIVE_PATH]))
@@ -266,6 +389,40 @@ class ImporterStrategy(object):
                 return True
         return False
 
+    def _reuse_file(self, checksum_index, unit):
+        """
+        Satisfy the file associated with the unit using a file already stored
+        locally with the same checksum.  The file is hard linked when possible
+        and copied otherwise.
+        :param checksum_index: The local checksum index.
+        :type checksum_index: pulp_node.checksum.ChecksumIndex
+        :param unit: A published unit.
+        :type unit: dict
+        :return: True if the file has been satisfied and does not need to be downloaded.
+        :rtype: bool
+        """
+        checksum = unit.get(constants.FILE_CHECKSUM)
+        if not checksum:
+            # not published by the parent
+            return False
+        storage_path = unit[constants.STORAGE_PATH]
+        try:
+            path = checksum_index.find(checksum, unit.get(constants.FILE_SIZE))
+            if not path:
+                return False
+            pathlib.mkdir(os.path.dirname(storage_path))
+            try:
+                os.link(path, storage_path)
+            except OSError:
+                shutil.copyfile(path, storage_path)
+            checksum_index.add(storage_path, checksum)
+            return True
+        except Exception:
+            log.exception(storage_path)
+            if os.path.exists(storage_path):
+                os.unlink(storage_path)
+            return False
+
     def _delete_units(self, request, unit_inventory):
         """
         Determine the list of units contained in the child inventory
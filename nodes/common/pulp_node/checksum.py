@@ -0,0 +1,183 @@
+# Copyright (c) 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Provides a content addressed index of files in local content storage.
+The parent uses the index to publish the checksum of each unit file without
+reading unchanged files on each publish.  The child uses the index to satisfy
+units using bits already stored locally instead of downloading them.
+"""
+
+import os
+import hashlib
+
+from pulp.server.db.model.base import Model
+
+
+# --- constants -------------------------------------------------------------------------
+
+
+ALGORITHM = 'sha256'
+
+
+# --- utils -----------------------------------------------------------------------------
+
+
+def file_checksum(path, bufsize=65535):
+    """
+    Calculate the checksum of the file at the specified path.
+    :param path: The absolute path to a file.
+    :type path: str
+    :param bufsize: The size of each read.
+    :type bufsize: int
+    :return: The hex digest.
+    :rtype: str
+    :raise IOError: on I/O errors.
+    """
+    h = hashlib.new(ALGORITHM)
+    with open(path, 'rb') as fp:
+        while True:
+            buf = fp.read(bufsize)
+            if buf:
+                h.update(buf)
+            else:
+                break
+    return h.hexdigest()
+
+
+# --- model -----------------------------------------------------------------------------
+
+
+class ContentChecksum(Model):
+    """
+    An indexed file.
+    :ivar path: The absolute path to the file.
+    :type path: str
+    :ivar size: The size of the file when the checksum was calculated.
+    :type size: int
+    :ivar mtime: The modification time of the file when the checksum was calculated.
+    :type mtime: float
+    :ivar checksum: The file checksum.
+    :type checksum: str
+    """
+
+    collection_name = 'nodes_content_checksums'
+    unique_indices = ('path',)
+    search_indices = ('checksum',)
+
+    def __init__(self, path, size, mtime, checksum):
+        super(ContentChecksum, self).__init__()
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.checksum = checksum
+
+
+# --- index -----------------------------------------------------------------------------
+
+
+class ChecksumIndex(object):
+    """
+    An index of local files by checksum.
+    An entry is only trusted while the size and modification time of the
+    file match those recorded when the checksum was calculated.  Stale
+    entries are dropped as they are found.
+    """
+
+    @staticmethod
+    def _stat(path):
+        """
+        Get the size and modification time of a regular file.
+        :param path: The absolute path to a file.
+        :type path: str
+        :return: A tuple of: (size, mtime) or None when not a regular file.
+        :rtype: tuple
+        """
+        try:
+            if not os.path.isfile(path):
+                return None
+            stat = os.stat(path)
+            return stat.st_size, stat.st_mtime
+        except OSError:
+            return None
+
+    def checksum(self, path):
+        """
+        Get the checksum of the file at the specified path.
+        The checksum is only calculated when the file is not indexed or
+        has changed since it was indexed.
+        :param path: The absolute path to a file.
+        :type path: str
+        :return: The checksum or None when not a regular file.
+        :rtype: str
+        :raise IOError: on I/O errors.
+        """
+        stat = self._stat(path)
+        if stat is None:
+            return None
+        collection = ContentChecksum.get_collection()
+        entry = collection.find_one({'path': path})
+        if entry and (entry['size'], entry['mtime']) == stat:
+            return entry['checksum']
+        checksum = file_checksum(path)
+        self._update(path, stat, checksum)
+        return checksum
+
+    def add(self, path, checksum=None):
+        """
+        Index the file at the specified path.
+        :param path: The absolute path to a file.
+        :type path: str
+        :param checksum: The known checksum of the file.  Calculated when not specified.
+        :type checksum: str
+        :raise IOError: on I/O errors.
+        """
+        stat = self._stat(path)
+        if stat is None:
+            return
+        if not checksum:
+            checksum = file_checksum(path)
+        self._update(path, stat, checksum)
+
+    def find(self, checksum, size=None):
+        """
+        Find an indexed local file by checksum.
+        :param checksum: A file checksum.
+        :type checksum: str
+        :param size: The expected file size.
+        :type size: int
+        :return: The absolute path to a matching file or None when not found.
+        :rtype: str
+        """
+        collection = ContentChecksum.get_collection()
+        for entry in collection.find({'checksum': checksum}):
+            path = entry['path']
+            stat = self._stat(path)
+            if stat != (entry['size'], entry['mtime']):
+                collection.remove({'path': path}, safe=True)
+                continue
+            if size is not None and stat[0] != size:
+                continue
+            return path
+
+    def _update(self, path, stat, checksum):
+        """
+        Insert or update the index entry for the specified path.
+        :param path: The absolute path to a file.
+        :type path: str
+        :param stat: A tuple of: (size, mtime).
+        :type stat: tuple
+        :param checksum: The file checksum.
+        :type checksum: str
+        """
+        collection = ContentChecksum.get_collection()
+        entry = dict(size=stat[0], mtime=stat[1], checksum=checksum)
+        collection.update({'path': path}, {'$set': entry}, upsert=True, safe=True)
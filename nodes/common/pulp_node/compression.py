@@ -11,16 +11,26 @@
 
 """
 File compression utilities.
+Block compressed files are written as a sequence of independent GZIP
+members.  The result is a valid GZIP file that can be read by any GZIP
+reader, but each block can also be decompressed on its own given its
+offset and length within the file.
 """
 
 import os
 import gzip
+import zlib
 
 from tempfile import mktemp
 
 
 FILE_SUFFIX = '.gz'
 
+# zlib window bits used to write and read GZIP members.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+COMPRESSION_LEVEL = 6
+
 
 # --- API --------------------------------------------------------------------
 
@@ -92,6 +102,71 @@ def compressed(path):
     return os.path.isfile(path) and path.endswith(FILE_SUFFIX)
 
 
+def compress_block(data, level=COMPRESSION_LEVEL):
+    """
+    Compress the specified data as a single GZIP member.
+    :param data: The data to be compressed.
+    :type data: str
+    :param level: The compression level.
+    :type level: int
+    :return: The compressed block.
+    :rtype: str
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress_block(data):
+    """
+    Decompress the specified GZIP member.
+    :param data: A compressed block.
+    :type data: str
+    :return: The decompressed data.
+    :rtype: str
+    :raise zlib.error: on decompression errors.
+    """
+    return zlib.decompress(data, GZIP_WBITS)
+
+
+def read_blocks(fp, bufsize=65535):
+    """
+    Read the block compressed file as a stream.
+    The file is decompressed incrementally and never written to disk.
+    :param fp: An open file.
+    :type fp: file
+    :param bufsize: The size of each read.
+    :type bufsize: int
+    :return: A generator of: (offset, length, data) for each block where the
+        offset and length are those of the compressed block within the file
+        and the data is the decompressed content.
+    :rtype: generator
+    :raise zlib.error: on decompression errors.
+    """
+    offset = 0
+    position = 0
+    block = []
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    while True:
+        data = fp.read(bufsize)
+        if not data:
+            block.append(decompressor.flush())
+            if position > offset:
+                yield offset, position - offset, ''.join(block)
+            break
+        while data:
+            block.append(decompressor.decompress(data))
+            unused = decompressor.unused_data
+            position += len(data) - len(unused)
+            if unused:
+                # the end of the member has been reached
+                block.append(decompressor.flush())
+                yield offset, position - offset, ''.join(block)
+                offset = position
+                block = []
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+            data = unused
+
+
 # --- utils ------------------------------------------------------------------
 
 
@@ -12,6 +12,14 @@
 from pulp.plugins.types import database as types_db
 from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.config import config as pulp_conf
+from pulp.server.util import paginate
+
+
+# --- constants ---------------------------------------------------------------
+
+
+# The maximum number of unit keys included in a single query.
+KEY_QUERY_BATCH_SIZE = 500
 
 
 # --- nodes conduit  ----------------------------------------------------------
@@ -38,6 +46,42 @@ class NodesConduit(object):
             unit_list.append(unit['unit_id'])
         return UnitsIterator(units, types)
 
+    def get_units_by_keys(self, repo_id, unit_keys):
+        """
+        Get the units associated with a repository matching the specified unit keys.
+        Used to resolve units removed in the parent without fetching the
+        entire inventory of units associated with the repository.
+        :param repo_id: The repository ID used to query the units.
+        :type repo_id: str
+        :param unit_keys: An iterable of dict containing: type_id, unit_key.
+        :type unit_keys: iterable
+        :return: unit iterator
+        :rtype: UnitsIterator
+        """
+        units = {}
+        types = {}
+        keys_by_type = {}
+        for key in unit_keys:
+            if not key['unit_key']:
+                continue
+            key_list = keys_by_type.setdefault(key['type_id'], [])
+            key_list.append(key['unit_key'])
+        collection = RepoContentUnit.get_collection()
+        for type_id, key_list in keys_by_type.items():
+            units_collection = types_db.type_units_collection(type_id)
+            for page in paginate(key_list, KEY_QUERY_BATCH_SIZE):
+                cursor = units_collection.find({'$or': page}, fields=['_id'])
+                unit_ids = [u['_id'] for u in cursor]
+                if not unit_ids:
+                    continue
+                query = {'repo_id': repo_id, 'unit_type_id': type_id, 'unit_id': {'$in': unit_ids}}
+                for unit in collection.find(query):
+                    unit_id = unit['unit_id']
+                    units[unit_id] = unit
+                    unit_list = types.setdefault(type_id, [])
+                    unit_list.append(unit_id)
+        return UnitsIterator(units, types)
+
 
 # --- typedef -----------------------------------------------------------------
 
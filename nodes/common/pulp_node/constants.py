@@ -27,6 +27,9 @@ MIRROR_STRATEGY = 'mirror'
 STRATEGIES = [ADDITIVE_STRATEGY, MIRROR_STRATEGY]
 DEFAULT_STRATEGY = ADDITIVE_STRATEGY
 
+# The number of repositories synchronized concurrently by the handler.
+DEFAULT_MAX_CONCURRENCY = 1
+
 NODE_SCOPE = 'node'
 REPOSITORY_SCOPE = 'repository'
 SCOPES = [NODE_SCOPE, REPOSITORY_SCOPE]
@@ -38,6 +41,7 @@ STRATEGY_KEYWORD = 'strategy'
 PROTOCOL_KEYWORD = 'protocol'
 MANIFEST_URL_KEYWORD = 'manifest_url'
 PURGE_ORPHANS_KEYWORD = 'purge_orphans'
+MAX_CONCURRENCY_KEYWORD = 'max_concurrency'
 
 SSL_KEYWORD = 'ssl'
 CA_CERT_KEYWORD = 'ca_cert'
@@ -50,6 +54,9 @@ BASE_URL = 'base_url'
 STORAGE_PATH = 'storage_path'
 RELATIVE_PATH = 'relative_path'
 
+FILE_SIZE = 'file_size'
+FILE_CHECKSUM = 'file_checksum'
+
 PUBLISHED_AS_FILE = 'published_as_file'
 PUBLISHED_AS_TARBALL = 'published_as_tarball'
 PUBLISHING_METHODS = [PUBLISHED_AS_FILE, PUBLISHED_AS_TARBALL]
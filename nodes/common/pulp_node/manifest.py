@@ -14,17 +14,23 @@ Provides classes for managing the content unit manifest.
 The manifest is a json encoded file that defines content units
 associated with repository.  The units themselves are stored in a separate
 json encoded file.  For performance reasons, the unit files are compressed.
+Starting with version 2, the manifest also references deltas against previously
+published manifests so that children can apply only what changed.
+Starting with version 3, unit files are block compressed as they are written
+and are read directly from the compressed stream.
 """
 
 import os
 import json
 
+from threading import RLock
 from logging import getLogger
 
 from nectar.request import DownloadRequest
 
 from pulp_node import pathlib
-from pulp_node.compression import compress, decompress, compressed
+from pulp_node.compression import (decompress, compressed, compress_block, decompress_block,
+    read_blocks, FILE_SUFFIX)
 
 
 log = getLogger(__name__)
@@ -33,8 +39,28 @@ log = getLogger(__name__)
 # --- constants -------------------------------------------------------------------------
 
 
+MANIFEST_VERSION = 3
+
+# The first manifest version to publish deltas.
+DELTA_MANIFEST_VERSION = 2
+
+# The first manifest version to publish block compressed unit files.
+BLOCK_MANIFEST_VERSION = 3
+
 MANIFEST_FILE_NAME = 'manifest.json'
 UNITS_FILE_NAME = 'units.json.gz'
+KEYS_FILE_NAME = 'keys-%s.json.gz'
+ADDED_FILE_NAME = 'delta-%s-added.json.gz'
+REMOVED_FILE_NAME = 'delta-%s-removed.json.gz'
+
+# The number of previously published manifests for which deltas are published.
+DELTA_HISTORY = 3
+
+# The (uncompressed) size in bytes at which a block of units is compressed and written.
+BLOCK_SIZE = 65536
+
+# The number of decompressed blocks cached for unit reference lookups.
+BLOCK_CACHE_SIZE = 8
 
 
 # --- manifest --------------------------------------------------------------------------
@@ -53,13 +79,28 @@ class Manifest(object):
     :type unit_path: str
     :param publishing_details: Details of how units have been published.
     :type publishing_details: dict
+    :ivar version: The manifest format version.  Manifests published before
+        versioning was introduced are read as version 1.
+    :type version: int
+    :ivar keys_path: The path to the unit keys snapshot file.
+    :type keys_path: str
+    :ivar history: The IDs of previously published manifests (most recent first)
+        for which unit key snapshots have been retained.
+    :type history: list
+    :ivar deltas: Deltas keyed by the ID of the manifest they are based on.
+        Each is a dict containing: added_path, total_added, removed_path, total_removed.
+    :type deltas: dict
     """
 
     def __init__(self, manifest_id=None):
         self.id = manifest_id
+        self.version = 1
         self.total_units = 0
         self.units_path = None
         self.publishing_details = {}
+        self.keys_path = None
+        self.history = []
+        self.deltas = {}
 
     def fetch(self, url, dir_path, downloader):
         """
@@ -100,9 +141,50 @@ class Manifest(object):
         request = DownloadRequest(str(url), self.units_path)
         request_list = [request]
         downloader.download(request_list)
-        if compressed(self.units_path):
+        if self.version < BLOCK_MANIFEST_VERSION and compressed(self.units_path):
             self.units_path = decompress(self.units_path)
 
+    def fetch_delta(self, url, base_id, downloader):
+        """
+        Fetch the delta between the manifest identified by base_id and this manifest.
+        The delta files are written to the directory containing units_path.
+        :param url: The URL to the manifest.  Used as the base URL.
+        :type url: str
+        :param base_id: The ID of the manifest on which the delta is based.
+        :type base_id: str
+        :param downloader: The nectar downloader to be used.
+        :type downloader: nectar.downloaders.base.Downloader
+        :return: The fetched delta.
+        :rtype: Delta
+        :raise KeyError: when no delta based on base_id has been published.
+        :raise HTTPError: on URL errors.
+        :raise IOError: on I/O errors.
+        """
+        delta = self.deltas[base_id]
+        base_url = url.rsplit('/', 1)[0]
+        dir_path = os.path.dirname(self.units_path)
+        paths = []
+        request_list = []
+        for file_name in (delta['added_path'], delta['removed_path']):
+            path = pathlib.join(dir_path, file_name)
+            request = DownloadRequest(str('/'.join((base_url, file_name))), path)
+            request_list.append(request)
+            paths.append(path)
+        downloader.download(request_list)
+        if self.version < BLOCK_MANIFEST_VERSION:
+            paths = [decompress(p) for p in paths]
+        return Delta(paths[0], delta['total_added'], paths[1], delta['total_removed'])
+
+    def has_delta(self, base_id):
+        """
+        Get whether a delta based on the specified manifest has been published.
+        :param base_id: The ID of a previously published manifest.
+        :type base_id: str
+        :return: True if a delta can be fetched.
+        :rtype: bool
+        """
+        return self.version >= DELTA_MANIFEST_VERSION and base_id in self.deltas
+
     def read(self, path):
         """
         Read the manifest file at the specified path.
@@ -155,27 +237,81 @@ class Manifest(object):
             return []
 
 
+class Delta(object):
+    """
+    The difference between a previously published manifest and the current one.
+    :ivar added_path: The path to the file of units added since the base manifest.
+        Uses the same format as the units file.
+    :type added_path: str
+    :ivar total_added: The number of added units.
+    :type total_added: int
+    :ivar removed_path: The path to the file of unit keys removed since the base
+        manifest.  Each is a dict containing: type_id, unit_key.
+    :type removed_path: str
+    :ivar total_removed: The number of removed unit keys.
+    :type total_removed: int
+    """
+
+    def __init__(self, added_path, total_added, removed_path, total_removed):
+        self.added_path = added_path
+        self.total_added = total_added
+        self.removed_path = removed_path
+        self.total_removed = total_removed
+
+    def get_added_units(self):
+        """
+        Get the content units added since the base manifest.
+        :return: An iterator of: (unit, UnitRef).
+        :rtype: iterable
+        """
+        if self.total_added:
+            return UnitIterator(self.added_path, self.total_added)
+        else:
+            return []
+
+    def get_removed_keys(self):
+        """
+        Get the keys of content units removed since the base manifest.
+        :return: A generator of dict containing: type_id, unit_key.
+        :rtype: generator
+        """
+        if not self.total_removed:
+            return
+        for key, ref in UnitIterator(self.removed_path, self.total_removed):
+            yield key
+
+
 class UnitWriter(object):
     """
-    Writes json encoded content units to a file.
-    This approach is 30x faster than opening, appending, and closing for each unit.
+    Writes json encoded content units to a block compressed file.
+    Units are buffered and compressed as a block each time BLOCK_SIZE is reached
+    so the file is never written (or read back) uncompressed.
     :ivar path: The absolute path to the file to be written.
     :type path: str
     :ivar fp: The file pointer used to write units to the file.
     :type fp: A python file object.
     :ivar total_units: Tracks the total number of units written.
     :type total_units: int
+    :ivar block: The buffered json encoded units not yet written.
+    :type block: list
+    :ivar block_size: The size of the buffered units.
+    :type block_size: int
     """
 
     def __init__(self, path):
         """
         :param path: The absolute path to the file to be written.
+            The compressed file suffix is appended as needed.
         :type path: str
         :raise IOError: on I/O errors
         """
+        if not path.endswith(FILE_SUFFIX):
+            path += FILE_SUFFIX
         self.path = path
-        self.fp = open(path, 'w+')
+        self.fp = open(path, 'wb')
         self.total_units = 0
+        self.block = []
+        self.block_size = 0
 
     def add(self, unit):
         """
@@ -187,18 +323,34 @@ class UnitWriter(object):
         """
         self.total_units += 1
         json_unit = json.dumps(unit)
-        self.fp.write(json_unit)
-        self.fp.write('\n')
+        self.block.append(json_unit)
+        self.block.append('\n')
+        self.block_size += len(json_unit) + 1
+        if self.block_size >= BLOCK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Compress and write the buffered units as a block.
+        :raise IOError: on I/O errors.
+        """
+        if not self.block:
+            return
+        self.fp.write(compress_block(''.join(self.block)))
+        self.block = []
+        self.block_size = 0
 
     def close(self):
         """
-        Close and compress the associated file.  This method is idempotent.
+        Flush and close the associated file.  This method is idempotent.
         :return: The number of units written.
         :rtype: int
         """
         if not self.fp.closed:
-            self.fp.close()
-            self.path = compress(self.path)
+            try:
+                self.flush()
+            finally:
+                self.fp.close()
         return self.total_units
 
     def __enter__(self):
@@ -218,10 +370,36 @@ class UnitIterator:
     Used to iterate content units inventory file associated with a manifest.
     The file contains (1) json encoded unit per line.  The total number
     of units in the file is reported by __len__().
+    Block compressed files are iterated directly from the compressed stream.
     """
 
     @staticmethod
     def get_units(path):
+        if compressed(path):
+            return UnitIterator._get_block_units(path)
+        else:
+            return UnitIterator._get_plain_units(path)
+
+    @staticmethod
+    def _get_block_units(path):
+        cache = BlockCache()
+        with open(path, 'rb') as fp:
+            for offset, length, data in read_blocks(fp):
+                block = Block(path, offset, length, cache)
+                begin = 0
+                while begin < len(data):
+                    end = data.find('\n', begin)
+                    if end < 0:
+                        end = len(data)
+                    else:
+                        end += 1
+                    unit = json.loads(data[begin:end])
+                    ref = UnitRef(path, begin, end - begin, block)
+                    yield (unit, ref)
+                    begin = end
+
+    @staticmethod
+    def _get_plain_units(path):
         with open(path) as fp:
             while True:
                 begin = fp.tell()
@@ -258,26 +436,33 @@ class UnitIterator:
 class UnitRef(object):
     """
     Reference to a unit within the downloaded units file.
+    For block compressed files, the offset and length of the unit are
+    within the decompressed block.
     :ivar path: The absolute path to the units file.
     :type path: str
-    :ivar offset: The offset for a specific unit with the file.
+    :ivar offset: The offset for a specific unit with the file (or block).
     :type offset: int
-    :ivar length: The length of a specific unit within the file.
+    :ivar length: The length of a specific unit within the file (or block).
     :type length: int
+    :ivar block: The block containing the unit.  None when the file is not compressed.
+    :type block: Block
     """
 
-    def __init__(self, path, offset, length):
+    def __init__(self, path, offset, length, block=None):
         """
         :param path: The absolute path to the units file.
         :type path: str
-        :param offset: The offset for a specific unit with the file.
+        :param offset: The offset for a specific unit with the file (or block).
         :type offset: int
-        :param length: The length of a specific unit within the file.
+        :param length: The length of a specific unit within the file (or block).
         :type length: int
+        :param block: The block containing the unit.
+        :type block: Block
         """
         self.path = path
         self.offset = offset
         self.length = length
+        self.block = block
 
     def fetch(self):
         """
@@ -287,7 +472,161 @@ class UnitRef(object):
         :raise IOError: on I/O errors.
 -       :raise ValueError: json decoding errors
         """
+        if self.block is not None:
+            data = self.block.read()
+            json_unit = data[self.offset:self.offset + self.length]
+            return json.loads(json_unit)
         with open(self.path) as fp:
             fp.seek(self.offset)
             json_unit = fp.read(self.length)
             return json.loads(json_unit)
+
+
+class Block(object):
+    """
+    A compressed block within a block compressed units file.
+    Shared by the references to all of the units contained in the block.
+    :ivar path: The absolute path to the units file.
+    :type path: str
+    :ivar offset: The offset of the compressed block within the file.
+    :type offset: int
+    :ivar length: The length of the compressed block within the file.
+    :type length: int
+    :ivar cache: The cache of decompressed blocks.
+    :type cache: BlockCache
+    """
+
+    def __init__(self, path, offset, length, cache):
+        """
+        :param path: The absolute path to the units file.
+        :type path: str
+        :param offset: The offset of the compressed block within the file.
+        :type offset: int
+        :param length: The length of the compressed block within the file.
+        :type length: int
+        :param cache: The cache of decompressed blocks.
+        :type cache: BlockCache
+        """
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.cache = cache
+
+    def read(self):
+        """
+        Read and decompress the block.
+        :return: The decompressed block.
+        :rtype: str
+        :raise IOError: on I/O errors.
+        """
+        data = self.cache.get(self.offset)
+        if data is None:
+            with open(self.path, 'rb') as fp:
+                fp.seek(self.offset)
+                data = decompress_block(fp.read(self.length))
+            self.cache.put(self.offset, data)
+        return data
+
+
+class BlockCache(object):
+    """
+    A small cache of decompressed blocks used for unit reference lookups.
+    Units are usually fetched in the order they were read so most lookups
+    are satisfied by a recently decompressed block.
+    :ivar size: The maximum number of cached blocks.
+    :type size: int
+    :ivar blocks: Cached blocks keyed by offset.
+    :type blocks: dict
+    :ivar keys: The cached block offsets in least recently used order.
+    :type keys: list
+    :ivar lock: Protects the cache.  Units may be fetched by download threads.
+    :type lock: RLock
+    """
+
+    def __init__(self, size=BLOCK_CACHE_SIZE):
+        """
+        :param size: The maximum number of cached blocks.
+        :type size: int
+        """
+        self.size = size
+        self.blocks = {}
+        self.keys = []
+        self.lock = RLock()
+
+    def get(self, offset):
+        """
+        Get a cached block.
+        :param offset: The offset of the compressed block within the file.
+        :type offset: int
+        :return: The decompressed block or None when not cached.
+        :rtype: str
+        """
+        self.lock.acquire()
+        try:
+            data = self.blocks.get(offset)
+            if data is not None:
+                self.keys.remove(offset)
+                self.keys.append(offset)
+            return data
+        finally:
+            self.lock.release()
+
+    def put(self, offset, data):
+        """
+        Cache a block.  The least recently used block is evicted as needed.
+        :param offset: The offset of the compressed block within the file.
+        :type offset: int
+        :param data: The decompressed block.
+        :type data: str
+        """
+        self.lock.acquire()
+        try:
+            if offset not in self.blocks:
+                self.keys.append(offset)
+            self.blocks[offset] = data
+            while len(self.keys) > self.size:
+                self.blocks.pop(self.keys.pop(0))
+        finally:
+            self.lock.release()
+
+
+# --- unit keys -------------------------------------------------------------------------
+
+
+def unit_key_id(unit):
+    """
+    Get a hashable identifier for the specified unit based on its type and unit key.
+    The unit key is sorted to ensure consistency.
+    :param unit: A content unit (or unit key record) containing: type_id, unit_key.
+    :type unit: dict
+    :return: A tuple of: (type_id, unit_key)
+    :rtype: tuple
+    """
+    return unit['type_id'], tuple(sorted(unit['unit_key'].items()))
+
+
+def unit_key_record(key_id):
+    """
+    Get the json serializable unit key record for the specified identifier.
+    :param key_id: A unit key identifier created by unit_key_id().
+    :type key_id: tuple
+    :return: A dict containing: type_id, unit_key.
+    :rtype: dict
+    """
+    return dict(type_id=key_id[0], unit_key=dict(key_id[1]))
+
+
+def read_keys(path):
+    """
+    Read the unit keys snapshot file at the specified path.
+    :param path: The absolute path to a (compressed) keys file.
+    :type path: str
+    :return: The set of unit key identifiers.
+    :rtype: set
+    :raise IOError: on I/O errors.
+    :raise ValueError: json decoding errors
+    """
+    keys = set()
+    for key, ref in UnitIterator.get_units(path):
+        keys.add(unit_key_id(key))
+    return keys
@@ -39,23 +39,38 @@ class PollingFailed(Exception):
 class TaskPoller(object):
     """
     The task poller is used to poll a running task by ID.
+    The delay between each poll starts at the (initial) delay and is increased by
+    the backoff factor each time the task has not progressed, up to max_delay.  The
+    delay is reset each time progress is reported by the task.
     :ivar binding: A pulp API binding.
     :type binding: pulp_node.handlers.model.PulpBinding
-    :ivar delay: The delay in seconds between each poll.
-    :type delay: int
+    :ivar delay: The initial delay in seconds between each poll.
+    :type delay: float
+    :ivar max_delay: The maximum delay in seconds between each poll.
+    :type max_delay: float
+    :ivar backoff: The factor by which the delay is increased.
+    :type backoff: float
     """
 
-    DELAY = 1
+    DELAY = 0.5
+    MAX_DELAY = 5
+    BACKOFF = 1.5
 
-    def __init__(self, binding, delay=DELAY):
+    def __init__(self, binding, delay=DELAY, max_delay=MAX_DELAY, backoff=BACKOFF):
         """
         :param binding: A pulp API binding.
         :type binding: pulp_node.handlers.model.PulpBinding
-        :param delay: The delay in seconds between each poll.
-        :type delay: int
+        :param delay: The initial delay in seconds between each poll.
+        :type delay: float
+        :param max_delay: The maximum delay in seconds between each poll.
+        :type max_delay: float
+        :param backoff: The factor by which the delay is increased.
+        :type backoff: float
         """
         self.binding = binding
         self.delay = delay
+        self.max_delay = max(delay, max_delay)
+        self.backoff = backoff
 
     def join(self, task_id, progress, cancelled):
         """
@@ -74,13 +89,15 @@ class TaskPoller(object):
         poll = True
         task_result = None
         last_hash = 0
+        delay = self.delay
 
         while poll:
             if cancelled():
                 poll = False
                 continue
 
-            sleep(self.delay)
+            if not self._sleep(delay, cancelled):
+                continue
 
             http = self.binding.tasks.get_task(task_id)
             if http.response_code != httplib.OK:
@@ -93,7 +110,12 @@ class TaskPoller(object):
                 msg = TASK_FAILED % {'t': task_id, 's': task.state}
                 raise TaskFailed(msg, task.exception, task.traceback)
 
-            last_hash = self._report_progress(progress, task, last_hash)
+            _hash = self._report_progress(progress, task, last_hash)
+            if _hash == last_hash:
+                delay = min(delay * self.backoff, self.max_delay)
+            else:
+                delay = self.delay
+            last_hash = _hash
 
             if task.state in CALL_COMPLETE_STATES:
                 task_result = task.result
@@ -101,6 +123,26 @@ class TaskPoller(object):
 
         return task_result
 
+    def _sleep(self, delay, cancelled):
+        """
+        Sleep for the specified delay.
+        The delay is divided so that cancellation is detected within the
+        initial delay regardless of how far polling has backed off.
+        :param delay: The delay in seconds.
+        :type delay: float
+        :param cancelled: A function used to get whether polling has been cancelled.
+        :type cancelled: callable
+        :return: False when cancelled while sleeping.
+        :rtype: bool
+        """
+        while delay > 0:
+            interval = min(delay, self.delay) or delay
+            sleep(interval)
+            delay -= interval
+            if delay > 0 and cancelled():
+                return False
+        return True
+
     def _report_progress(self, progress, task, last_hash):
         """
         Update the progress report only if the progress in the task has changed.
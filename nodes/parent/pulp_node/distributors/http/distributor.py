@@ -23,6 +23,7 @@ from pulp.server.config import config as pulp_conf
 from pulp_node import link
 from pulp_node import constants
 from pulp_node.conduit import NodesConduit
+from pulp_node.checksum import ChecksumIndex
 from pulp_node.distributors.http.publisher import HttpPublisher
 
 
@@ -143,7 +144,7 @@ class NodesHttpDistributor(Distributor):
         section = config.get(protocol)
         alias = section.get('alias')
         base_url = '://'.join((protocol, host))
-        return HttpPublisher(base_url, alias, repo.id)
+        return HttpPublisher(base_url, alias, repo.id, ChecksumIndex())
 
     def cancel_publish_repo(self, call_report, call_request):
         pass
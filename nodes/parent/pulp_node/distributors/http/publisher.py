@@ -24,7 +24,7 @@ class HttpPublisher(FilePublisher):
     :type alias: tuple(2)
     """
 
-    def __init__(self, base_url, alias, repo_id):
+    def __init__(self, base_url, alias, repo_id, checksum_index=None):
         """
         :param base_url: The base URL.
         :type base_url: str
@@ -32,10 +32,12 @@ class HttpPublisher(FilePublisher):
         :type alias: tuple(2)
         :param repo_id: A repository ID.
         :type repo_id: str
+        :param checksum_index: An (optional) checksum index.
+        :type checksum_index: pulp_node.checksum.ChecksumIndex
         """
         self.base_url = base_url
         self.alias = alias
-        FilePublisher.__init__(self, alias[1], repo_id)
+        FilePublisher.__init__(self, alias[1], repo_id, checksum_index)
 
     def publish(self, units):
         """
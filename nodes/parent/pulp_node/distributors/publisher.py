@@ -13,13 +13,15 @@ import os
 import tarfile
 
 from uuid import uuid4
-from shutil import rmtree
+from shutil import rmtree, copyfile
 from tempfile import mkdtemp
 from logging import getLogger
 
 from pulp_node import constants
 from pulp_node import pathlib
-from pulp_node.manifest import Manifest, UnitWriter, MANIFEST_FILE_NAME, UNITS_FILE_NAME
+from pulp_node.manifest import (Manifest, UnitWriter, UnitIterator, MANIFEST_FILE_NAME,
+    UNITS_FILE_NAME, KEYS_FILE_NAME, ADDED_FILE_NAME, REMOVED_FILE_NAME, MANIFEST_VERSION,
+    DELTA_MANIFEST_VERSION, DELTA_HISTORY, unit_key_id, unit_key_record, read_keys)
 
 
 log = getLogger(__name__)
@@ -61,19 +63,25 @@ class FilePublisher(Publisher):
     :type tmp_dir: str
     :ivar staged: A flag indicating that publishing has been staged and needs commit.
     :type staged: bool
+    :ivar checksum_index: An (optional) index used to include the checksum of each
+        published file so that children can reuse bits already stored locally.
+    :type checksum_index: pulp_node.checksum.ChecksumIndex
     """
 
-    def __init__(self, publish_dir, repo_id):
+    def __init__(self, publish_dir, repo_id, checksum_index=None):
         """
         :param publish_dir: The publishing root directory.
         :type publish_dir: str
         :param repo_id: A repository ID.
         :type repo_id: str
+        :param checksum_index: An (optional) checksum index.
+        :type checksum_index: pulp_node.checksum.ChecksumIndex
         """
         self.publish_dir = publish_dir
         self.repo_id = repo_id
         self.tmp_dir = None
         self.staged = False
+        self.checksum_index = checksum_index
 
     def publish(self, units):
         """
@@ -88,19 +96,100 @@ class FilePublisher(Publisher):
         """
         pathlib.mkdir(self.publish_dir)
         self.tmp_dir = mkdtemp(dir=self.publish_dir)
+        manifest_id = str(uuid4())
         units_path = pathlib.join(self.tmp_dir, UNITS_FILE_NAME)
+        keys_path = pathlib.join(self.tmp_dir, KEYS_FILE_NAME % manifest_id)
         manifest_path = pathlib.join(self.tmp_dir, MANIFEST_FILE_NAME)
+        keys = set()
         with UnitWriter(units_path) as writer:
-            for unit in units:
-                self.publish_unit(unit)
-                writer.add(unit)
-        manifest_id = str(uuid4())
+            with UnitWriter(keys_path) as key_writer:
+                for unit in units:
+                    self.publish_unit(unit)
+                    writer.add(unit)
+                    key_id = unit_key_id(unit)
+                    keys.add(key_id)
+                    key_writer.add(unit_key_record(key_id))
         manifest = Manifest(manifest_id)
+        manifest.version = MANIFEST_VERSION
         manifest.set_units(writer)
+        manifest.keys_path = os.path.basename(key_writer.path)
+        self.publish_deltas(manifest, keys)
         manifest_path = manifest.write(manifest_path)
         self.staged = True
         return manifest_path
 
+    def publish_deltas(self, manifest, keys):
+        """
+        Publish deltas between the previously published manifests and the specified manifest.
+        The unit keys snapshots of the most recently published manifests are carried
+        forward into the tmp_dir so that deltas can be computed on subsequent publishing.
+        A delta is not published when it's not smaller than the units file itself.
+        :param manifest: The manifest being published.
+        :type manifest: Manifest
+        :param keys: The set of unit key identifiers for the units being published.
+        :type keys: set
+        """
+        dir_path = pathlib.join(self.publish_dir, self.repo_id)
+        previous = Manifest()
+        try:
+            previous.read(pathlib.join(dir_path, MANIFEST_FILE_NAME))
+        except (IOError, ValueError):
+            # never published or not readable
+            return
+        if previous.version < DELTA_MANIFEST_VERSION:
+            return
+        added = {}
+        base_ids = [previous.id] + previous.history
+        for base_id in base_ids[:DELTA_HISTORY]:
+            file_name = KEYS_FILE_NAME % base_id
+            path = pathlib.join(dir_path, file_name)
+            if not os.path.exists(path):
+                continue
+            base_keys = read_keys(path)
+            copyfile(path, pathlib.join(self.tmp_dir, file_name))
+            manifest.history.append(base_id)
+            removed = base_keys - keys
+            added[base_id] = keys - base_keys
+            if len(added[base_id]) + len(removed) >= len(keys):
+                del added[base_id]
+                continue
+            file_name = REMOVED_FILE_NAME % base_id
+            with UnitWriter(pathlib.join(self.tmp_dir, file_name)) as writer:
+                for key_id in removed:
+                    writer.add(unit_key_record(key_id))
+            manifest.deltas[base_id] = dict(
+                added_path=ADDED_FILE_NAME % base_id,
+                total_added=len(added[base_id]),
+                removed_path=file_name,
+                total_removed=writer.total_units)
+        self._write_added(manifest.units_path, added)
+
+    def _write_added(self, units_path, added):
+        """
+        Write the added units file for each delta.
+        The units file is read once and each unit is written to every delta in which
+        it has been added.
+        :param units_path: The absolute path to the (compressed) units file.
+        :type units_path: str
+        :param added: The set of added unit key identifiers keyed by base manifest ID.
+        :type added: dict
+        """
+        if not added:
+            return
+        writers = {}
+        try:
+            for base_id in added:
+                path = pathlib.join(self.tmp_dir, ADDED_FILE_NAME % base_id)
+                writers[base_id] = UnitWriter(path)
+            for unit, ref in UnitIterator.get_units(units_path):
+                key_id = unit_key_id(unit)
+                for base_id, key_ids in added.items():
+                    if key_id in key_ids:
+                        writers[base_id].add(unit)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
     def publish_unit(self, unit):
         """
         Publish the file associated with the unit into the publish directory.
@@ -120,6 +209,11 @@ class FilePublisher(Publisher):
         else:
             os.symlink(storage_path, published_path)
             unit[constants.PUBLISHED_AS_FILE] = True
+            if self.checksum_index is not None:
+                checksum = self.checksum_index.checksum(storage_path)
+                if checksum:
+                    unit[constants.FILE_SIZE] = os.path.getsize(storage_path)
+                    unit[constants.FILE_CHECKSUM] = checksum
 
     def tar_dir(self, path, tar_path, bufsize=65535):
         """
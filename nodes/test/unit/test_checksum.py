@@ -0,0 +1,98 @@
+# Copyright (c) 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import os
+import shutil
+import hashlib
+
+from tempfile import mkdtemp
+from mock import patch
+
+from base import ServerTests
+
+from pulp_node.checksum import ChecksumIndex, ContentChecksum, file_checksum
+
+
+class TestChecksumIndex(ServerTests):
+
+    def setUp(self):
+        super(TestChecksumIndex, self).setUp()
+        ContentChecksum.get_collection().remove()
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        super(TestChecksumIndex, self).tearDown()
+        ContentChecksum.get_collection().remove()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w+') as fp:
+            fp.write(content)
+        return path
+
+    def test_file_checksum(self):
+        path = self.write('a', 'hello')
+        self.assertEqual(file_checksum(path), hashlib.sha256('hello').hexdigest())
+
+    def test_checksum_cached(self):
+        # Setup
+        path = self.write('a', 'hello')
+        index = ChecksumIndex()
+        checksum = index.checksum(path)
+        # Test
+        with patch('pulp_node.checksum.file_checksum') as mock_checksum:
+            cached = index.checksum(path)
+        # Verify
+        self.assertEqual(cached, checksum)
+        self.assertFalse(mock_checksum.called)
+        self.assertEqual(ContentChecksum.get_collection().find({'path': path}).count(), 1)
+
+    def test_checksum_changed(self):
+        # Setup
+        path = self.write('a', 'hello')
+        index = ChecksumIndex()
+        index.checksum(path)
+        self.write('a', 'goodbye!')
+        # Test
+        checksum = index.checksum(path)
+        # Verify
+        self.assertEqual(checksum, hashlib.sha256('goodbye!').hexdigest())
+
+    def test_checksum_not_file(self):
+        index = ChecksumIndex()
+        self.assertEqual(index.checksum(self.tmp_dir), None)
+        self.assertEqual(index.checksum(os.path.join(self.tmp_dir, 'none')), None)
+
+    def test_find(self):
+        # Setup
+        path = self.write('a', 'hello')
+        index = ChecksumIndex()
+        index.add(path)
+        checksum = file_checksum(path)
+        # Test & Verify
+        self.assertEqual(index.find(checksum), path)
+        self.assertEqual(index.find(checksum, 5), path)
+        self.assertEqual(index.find(checksum, 6), None)
+        self.assertEqual(index.find('xxx'), None)
+
+    def test_find_stale(self):
+        # Setup
+        path = self.write('a', 'hello')
+        index = ChecksumIndex()
+        index.add(path)
+        checksum = file_checksum(path)
+        os.unlink(path)
+        # Test
+        found = index.find(checksum)
+        # Verify
+        self.assertEqual(found, None)
+        self.assertEqual(ContentChecksum.get_collection().find().count(), 0)
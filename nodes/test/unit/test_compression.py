@@ -9,6 +9,7 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import os
 import shutil
 import gzip
 
@@ -76,4 +77,26 @@ class TestCompression(TestCase):
         self.assertEqual(path, decompressed_path)
         with open(decompressed_path) as fp:
             block_in = fp.read()
-        self.assertEqual(block, block_in)
\ No newline at end of file
+        self.assertEqual(block, block_in)
+    def test_blocks(self):
+        # Setup
+        blocks = ['A' * 1024, 'B' * 10, 'C' * 70000]
+        path = mktemp(dir=self.tmp_dir) + FILE_SUFFIX
+        with open(path, 'wb') as fp:
+            for block in blocks:
+                fp.write(compress_block(block))
+        # Test
+        with open(path, 'rb') as fp:
+            blocks_in = list(read_blocks(fp, bufsize=100))
+        # Verify
+        self.assertEqual([b[2] for b in blocks_in], blocks)
+        with open(path, 'rb') as fp:
+            for offset, length, block in blocks_in:
+                fp.seek(offset)
+                self.assertEqual(decompress_block(fp.read(length)), block)
+        self.assertEqual(sum([b[1] for b in blocks_in]), os.path.getsize(path))
+        fp = gzip.open(path)
+        try:
+            self.assertEqual(fp.read(), ''.join(blocks))
+        finally:
+            fp.close()
@@ -118,4 +118,19 @@ class QueryTests(ServerTests):
             unit_key = u['unit_key']
             self.assertEqual(unit_key['N'], n)
             self.assertEqual(u['storage_path'], create_storage_path(unit_id))
-            n += 1
\ No newline at end of file
+            n += 1
+    def test_query_by_keys(self):
+        num_units = 5
+        populate(num_units)
+        conduit = NodesConduit()
+        unit_keys = []
+        for type_id, n in ((TYPE_A, 1), (TYPE_B, 7), (TYPE_A, 100)):
+            unit_key = dict(UNIT_METADATA)
+            unit_key['N'] = n
+            unit_keys.append(dict(type_id=type_id, unit_key=unit_key))
+        units = conduit.get_units_by_keys(REPO_ID, unit_keys)
+        self.assertEqual(len(units), 2)
+        unit_list = sorted(units, key=itemgetter('unit_id'))
+        self.assertEqual(unit_list[0]['unit_id'], create_unit_id(TYPE_A, 1))
+        self.assertEqual(unit_list[1]['unit_id'], create_unit_id(TYPE_B, 7))
+        self.assertEqual(unit_list[1]['unit_key']['N'], 7)
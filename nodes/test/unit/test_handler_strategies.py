@@ -10,6 +10,8 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 
+import threading
+
 from unittest import TestCase
 from mock import Mock, patch
 
@@ -17,6 +19,7 @@ from pulp_node.handlers.strategies import *
 from pulp_node.error import *
 from pulp_node.handlers.model import RepositoryOnChild
 from pulp_node.handlers.reports import SummaryReport, HandlerProgress
+from pulp_node.poller import TaskPoller
 
 
 class TestConduit:
@@ -59,7 +62,7 @@ TASK_ID = 'test_task'
 
 class TestBase(TestCase):
 
-    def request(self, cancel_on=0):
+    def request(self, cancel_on=0, repo_ids=(REPO_ID,), options=None):
         conduit = TestConduit(cancel_on)
         progress = HandlerProgress(conduit)
         summary = SummaryReport()
@@ -67,9 +70,9 @@ class TestBase(TestCase):
             conduit=conduit,
             progress=progress,
             summary=summary,
-            bindings=[dict(repo_id=REPO_ID, details={})],
+            bindings=[dict(repo_id=repo_id, details={}) for repo_id in repo_ids],
             scope=constants.NODE_SCOPE,
-            options={}
+            options=options or {}
         )
         return request
 
@@ -208,7 +211,98 @@ class TestBase(TestCase):
         # Verify
         mock_cancel.assert_called_with(TASK_ID)
 
+    @patch('pulp_node.handlers.model.RepositoryOnChild.fetch', return_value=None)
+    @patch('pulp_node.handlers.model.RepositoryOnChild.add')
+    def test_merge_repositories_concurrent(self, *unused):
+        # Setup
+        repo_ids = ['repo_%d' % n for n in range(10)]
+        options = {constants.MAX_CONCURRENCY_KEYWORD: 3}
+        request = self.request(repo_ids=repo_ids, options=options)
+        request.started()
+        threads = set()
+        def synchronize(request, repo_id):
+            threads.add(threading.current_thread().name)
+            request.progress.find_report(repo_id).finished()
+            request.summary[repo_id].units.added = 1
+        # Test
+        strategy = HandlerStrategy()
+        with patch.object(strategy, '_synchronize_repository', side_effect=synchronize) as sync:
+            strategy._merge_repositories(request)
+        # Verify
+        self.assertEqual(request.max_concurrency, 3)
+        self.assertEqual(sync.call_count, len(repo_ids))
+        self.assertTrue(threading.current_thread().name not in threads)
+        self.assertEqual(len(request.summary.errors), 0)
+        for repo_id in repo_ids:
+            report = request.summary[repo_id]
+            self.assertEqual(report.action, RepositoryReport.ADDED)
+            self.assertEqual(report.units.added, 1)
+            progress = request.progress.find_report(repo_id)
+            self.assertEqual(progress.state, progress.FINISHED)
+
+    @patch('pulp_node.handlers.model.RepositoryOnChild.fetch')
+    def test_merge_repositories_concurrent_cancelled(self, mock_fetch):
+        # Setup
+        repo_ids = ['repo_%d' % n for n in range(5)]
+        options = {constants.MAX_CONCURRENCY_KEYWORD: 3}
+        request = self.request(cancel_on=1, repo_ids=repo_ids, options=options)
+        # Test
+        strategy = HandlerStrategy()
+        strategy._merge_repositories(request)
+        # Verify
+        self.assertFalse(mock_fetch.called)
+        self.assertEqual(len(request.summary.errors), 0)
+        for repo_id in repo_ids:
+            self.assertEqual(request.summary[repo_id].action, RepositoryReport.CANCELLED)
+
     def test_strategy_factory(self):
         for name, strategy in STRATEGIES.items():
             self.assertEqual(find_strategy(name), strategy)
-        self.assertRaises(StrategyUnsupported, find_strategy, '---')
\ No newline at end of file
+        self.assertRaises(StrategyUnsupported, find_strategy, '---')
+
+
+class TestTaskPoller(TestCase):
+
+    def task(self, state, progress):
+        task = Mock()
+        task.state = state
+        task.progress = progress
+        task.result = 'done'
+        return task
+
+    @patch('pulp_node.poller.sleep')
+    def test_backoff(self, mock_sleep):
+        # Setup
+        tasks = [
+            self.task('running', None),
+            self.task('running', None),
+            self.task('running', None),
+            self.task('running', {'A': {'state': 'adding_units'}}),
+            self.task('finished', {'A': {'state': 'adding_units'}}),
+        ]
+        binding = Mock()
+        binding.tasks.get_task.side_effect = [TestResponse(200, t) for t in tasks]
+        progress = Mock()
+        # Test
+        poller = TaskPoller(binding, delay=1, max_delay=2, backoff=2)
+        result = poller.join(TASK_ID, progress, Mock(return_value=False))
+        # Verify
+        self.assertEqual(result, 'done')
+        self.assertEqual(progress.updated.call_count, 1)
+        delays = [c[0][0] for c in mock_sleep.call_args_list]
+        # 1, 1, 2 (1+1), 2 (1+1), progress reported so reset to: 1
+        self.assertEqual(delays, [1, 1, 1, 1, 1, 1, 1])
+
+    @patch('pulp_node.poller.sleep')
+    def test_cancelled_while_sleeping(self, mock_sleep):
+        # Setup
+        binding = Mock()
+        binding.tasks.get_task.return_value = TestResponse(200, self.task('running', None))
+        cancelled = Mock(side_effect=[False, False, False, True, True])
+        # Test
+        poller = TaskPoller(binding, delay=1, max_delay=4, backoff=4)
+        result = poller.join(TASK_ID, Mock(), cancelled)
+        # Verify
+        self.assertEqual(result, None)
+        self.assertEqual(binding.tasks.get_task.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 3)
@@ -24,7 +24,8 @@ from pulp.plugins.model import Unit
 from pulp.server.config import config as pulp_conf
 
 from pulp_node.importers.strategies import *
-from pulp_node.importers.inventory import UnitInventory
+from pulp_node.importers.inventory import UnitInventory, DeltaInventory
+from pulp_node.manifest import Manifest, Delta, MANIFEST_VERSION
 from pulp_node.importers.reports import SummaryReport, ProgressListener
 from pulp_node.reports import RepositoryProgress
 from pulp_node.error import *
@@ -42,6 +43,8 @@ class TestConduit:
     save_unit = Mock()
     remove_unit = Mock()
     set_progress = Mock()
+    get_scratchpad = Mock(return_value=None)
+    set_scratchpad = Mock()
 
 
 class TestImporter:
@@ -218,6 +221,150 @@ class TestBase(TestCase):
         strategy = ImporterStrategy()
         self.assertRaises(ManifestDownloadError, strategy._unit_inventory, request)
 
+    def applied(self, request, manifest_id, strategy):
+        applied = dict(id=manifest_id, strategy=strategy.__name__)
+        request.conduit.get_scratchpad = Mock(return_value={APPLIED_MANIFEST: applied})
+        manifest = Manifest('2')
+        manifest.version = MANIFEST_VERSION
+        manifest.units_path = os.path.join(self.tmp_dir, 'units.json')
+        manifest.deltas['1'] = {}
+        return manifest
+
+    @patch('pulp_node.conduit.NodesConduit.get_units')
+    @patch('pulp_node.manifest.Manifest.fetch_delta', return_value=Delta(None, 0, None, 0))
+    def test_delta_inventory(self, fetch_delta, get_units):
+        # Setup
+        request = self.request()
+        manifest = self.applied(request, '1', Mirror)
+        # Test
+        strategy = Mirror()
+        with patch.object(strategy, '_fetch_manifest', return_value=manifest):
+            inventory = strategy._unit_inventory(request)
+        # Verify
+        self.assertTrue(isinstance(inventory, DeltaInventory))
+        self.assertEqual(request.manifest_id, manifest.id)
+        self.assertEqual(fetch_delta.call_args[0][1], '1')
+        self.assertFalse(get_units.called)
+
+    @patch('pulp_node.conduit.NodesConduit.get_units', return_value=[])
+    @patch('pulp_node.manifest.Manifest.fetch_units')
+    @patch('pulp_node.manifest.Manifest.fetch_delta')
+    def test_delta_inventory_other_strategy(self, fetch_delta, *unused):
+        # Setup
+        request = self.request()
+        manifest = self.applied(request, '1', Additive)
+        # Test
+        strategy = Mirror()
+        with patch.object(strategy, '_fetch_manifest', return_value=manifest):
+            inventory = strategy._unit_inventory(request)
+        # Verify
+        self.assertTrue(isinstance(inventory, UnitInventory))
+        self.assertFalse(fetch_delta.called)
+
+    @patch('pulp_node.conduit.NodesConduit.get_units', return_value=[])
+    @patch('pulp_node.manifest.Manifest.fetch_units')
+    @patch('pulp_node.manifest.Manifest.fetch_delta', side_effect=IOError())
+    def test_delta_inventory_fallback(self, fetch_delta, fetch_units, get_units):
+        # Setup
+        request = self.request()
+        manifest = self.applied(request, '1', Mirror)
+        # Test
+        strategy = Mirror()
+        with patch.object(strategy, '_fetch_manifest', return_value=manifest) as fetch:
+            inventory = strategy._unit_inventory(request)
+        # Verify
+        self.assertTrue(isinstance(inventory, UnitInventory))
+        self.assertEqual(fetch.call_count, 1)
+        self.assertTrue(fetch_units.called)
+        self.assertTrue(get_units.called)
+
+    @patch('pulp_node.importers.strategies.Mirror._synchronize')
+    def test_synchronize_applied_manifest(self, *unused):
+        # Setup
+        request = self.request()
+        request.manifest_id = '2'
+        request.conduit.set_scratchpad = Mock()
+        # Test
+        strategy = Mirror()
+        strategy.synchronize(request)
+        # Verify
+        applied = dict(id='2', strategy=Mirror.__name__)
+        request.conduit.set_scratchpad.assert_called_once_with({APPLIED_MANIFEST: applied})
+
+    @patch('pulp_node.importers.strategies.Mirror._synchronize', side_effect=UNIT_ERROR)
+    def test_synchronize_failed_not_applied(self, *unused):
+        # Setup
+        request = self.request()
+        request.manifest_id = '2'
+        request.conduit.set_scratchpad = Mock()
+        # Test
+        strategy = Mirror()
+        strategy.synchronize(request)
+        # Verify
+        self.assertFalse(request.conduit.set_scratchpad.called)
+
+    @patch('pulp_node.checksum.ChecksumIndex.add')
+    @patch('pulp_node.checksum.ChecksumIndex.find')
+    def test_add_units_reuse_file(self, mock_find, mock_add):
+        # Setup
+        request = self.request()
+        request.conduit.save_unit = Mock()
+        request.downloader.download = Mock()
+        existing = os.path.join(self.tmp_dir, 'existing')
+        with open(existing, 'w+') as fp:
+            fp.write('123')
+        mock_find.return_value = existing
+        storage_path = os.path.join(self.tmp_dir, 'content', 'unit_1')
+        unit = dict(
+            unit_id='abc',
+            type_id='T',
+            unit_key={},
+            metadata={},
+            storage_path=storage_path,
+            relative_path='content/unit_1',
+            file_checksum='xyz',
+            file_size=3)
+        manifest = TestManifest([])
+        manifest.units = [(unit, TestUnitRef(dict(unit)))]
+        inventory = UnitInventory(manifest, [])
+        # Test
+        strategy = ImporterStrategy()
+        with patch.object(strategy, '_update_storage_path'):
+            strategy._add_units(request, inventory)
+        # Verify
+        mock_find.assert_called_once_with('xyz', 3)
+        mock_add.assert_called_once_with(storage_path, 'xyz')
+        self.assertTrue(os.path.samefile(existing, storage_path))
+        self.assertEqual(request.conduit.save_unit.call_count, 1)
+        self.assertEqual(request.conduit.save_unit.call_args[0][0].storage_path, storage_path)
+        request.downloader.download.assert_called_once_with([])
+
+    @patch('pulp_node.checksum.ChecksumIndex.find', return_value=None)
+    def test_add_units_reuse_file_not_found(self, *unused):
+        # Setup
+        request = self.request()
+        request.downloader.download = Mock()
+        storage_path = os.path.join(self.tmp_dir, 'content', 'unit_1')
+        unit = dict(
+            unit_id='abc',
+            type_id='T',
+            unit_key={},
+            metadata={},
+            storage_path=storage_path,
+            relative_path='content/unit_1',
+            file_checksum='xyz',
+            file_size=3)
+        inventory = UnitInventory(TestManifest([unit]), [])
+        # Test
+        strategy = ImporterStrategy()
+        with patch.object(strategy, '_update_storage_path'):
+            strategy._add_units(request, inventory)
+        # Verify
+        self.assertFalse(os.path.exists(storage_path))
+        download_list = request.downloader.download.call_args[0][0]
+        self.assertEqual(len(download_list), 1)
+        self.assertEqual(download_list[0].destination, storage_path)
+
     def test_cancel_at_add_units(self):
         # Setup
         request = self.request(1)
@@ -16,11 +16,13 @@ import gzip
 import json
 
 from unittest import TestCase
+from mock import patch
 
 from nectar.downloaders.curl import HTTPSCurlDownloader
 from nectar.config import DownloaderConfig
 
 from pulp_node.manifest import *
+from pulp_node.compression import compressed
 
 
 class TestManifest(TestCase):
@@ -114,3 +116,41 @@ class TestManifest(TestCase):
             _unit = ref.fetch()
             self.assertEqual(unit, _unit)
         self.verify(units, units_in)
+
+    @patch('pulp_node.manifest.BLOCK_SIZE', 100)
+    def test_round_trip_blocks(self):
+        # Setup
+        units = []
+        manifest_path = os.path.join(self.tmp_dir, MANIFEST_FILE_NAME)
+        for i in range(0, self.NUM_UNITS):
+            unit = dict(unit_id=i, type_id='T', unit_key={})
+            units.append(unit)
+        units_path = os.path.join(self.tmp_dir, UNITS_FILE_NAME)
+        writer = UnitWriter(units_path)
+        for u in units:
+            writer.add(u)
+        writer.close()
+        manifest = Manifest(self.MANIFEST_ID)
+        manifest.version = MANIFEST_VERSION
+        manifest.set_units(writer)
+        manifest.write(manifest_path)
+        # Test
+        cfg = DownloaderConfig()
+        downloader = HTTPSCurlDownloader(cfg)
+        working_dir = os.path.join(self.tmp_dir, 'working_dir')
+        os.makedirs(working_dir)
+        url = 'file://%s' % manifest_path
+        manifest = Manifest()
+        manifest.fetch(url, working_dir, downloader)
+        manifest.fetch_units(url, downloader)
+        # Verify
+        self.assertTrue(compressed(manifest.units_path))
+        units_in = []
+        blocks = set()
+        for unit, ref in manifest.get_units():
+            units_in.append(unit)
+            blocks.add(ref.block.offset)
+        self.assertTrue(len(blocks) > 1)
+        for unit, ref in reversed(zip(units_in, [r for u, r in manifest.get_units()])):
+            self.assertEqual(unit, ref.fetch())
+        self.verify(units, units_in)
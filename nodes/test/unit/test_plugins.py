@@ -276,6 +276,18 @@ class AgentHandlerTest(PluginTestBase):
         # Test & Verify
         self.assertRaises(error.GetBindingsError, handler.update, Conduit(), [], {})
 
+    @patch('pulp_node.handlers.model.ParentEntity.binding')
+    @patch('pulp_node.handlers.model.ChildEntity.binding')
+    @patch('pulp_node.handlers.model.BindingsOnParent.fetch_all', side_effect=error.GetBindingsError(500))
+    def test_handler_closes_bindings(self, unused, child_binding, parent_binding):
+        # Setup
+        handler = NodeHandler({})
+        # Test
+        self.assertRaises(error.GetBindingsError, handler.update, Conduit(), [], {})
+        # Verify
+        child_binding.close.assert_called_once_with()
+        parent_binding.close.assert_called_once_with()
+
 
 # --- pulp plugin tests --------------------------------------------
 
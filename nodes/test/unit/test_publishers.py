@@ -15,13 +15,15 @@ import tempfile
 import tarfile
 
 from unittest import TestCase
+from mock import Mock
 from nectar.downloaders.curl import HTTPSCurlDownloader
 from nectar.config import DownloaderConfig
 
 from pulp_node import constants
 from pulp_node import pathlib
 from pulp_node.distributors.http.publisher import HttpPublisher
-from pulp_node.manifest import Manifest
+from pulp_node.manifest import (Manifest, MANIFEST_FILE_NAME, UNITS_FILE_NAME, MANIFEST_VERSION,
+    KEYS_FILE_NAME)
 
 
 class TestHttp(TestCase):
@@ -153,3 +155,91 @@ class TestHttp(TestCase):
             p.publish(units)
         # verify
         self.assertFalse(os.path.exists(p.tmp_dir))
+
+    def test_publish_delta(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        conf = DownloaderConfig()
+        downloader = HTTPSCurlDownloader(conf)
+        # test
+        # publish all of the units, then publish with (1) unit removed and (1) added
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish(units)
+            p.commit()
+        base = Manifest()
+        base.read(pathlib.join(publish_dir, repo_id, MANIFEST_FILE_NAME))
+        added = dict(type_id='unit', unit_key={'n': 3})
+        units = [dict(u) for u in units[1:]] + [added]
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish(units)
+            p.commit()
+        # verify
+        working_dir = os.path.join(self.tmpdir, 'working_dir')
+        os.makedirs(working_dir)
+        manifest = Manifest()
+        url = pathlib.url_join(base_url, p.manifest_path())
+        manifest.fetch(url, working_dir, downloader)
+        self.assertEqual(manifest.version, MANIFEST_VERSION)
+        self.assertEqual(manifest.history, [base.id])
+        self.assertTrue(manifest.has_delta(base.id))
+        self.assertFalse(manifest.has_delta(manifest.id))
+        delta = manifest.fetch_delta(url, base.id, downloader)
+        added_units = [unit for unit, ref in delta.get_added_units()]
+        self.assertEqual(added_units, [added])
+        self.assertEqual(list(delta.get_removed_keys()), [dict(type_id='unit', unit_key={'n': 0})])
+        self.assertTrue(os.path.exists(
+            pathlib.join(publish_dir, repo_id, KEYS_FILE_NAME % base.id)))
+
+    def test_publish_delta_not_smaller(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        # test
+        # publish all of the units, then publish entirely different units
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish(units)
+            p.commit()
+        base = Manifest()
+        base.read(pathlib.join(publish_dir, repo_id, MANIFEST_FILE_NAME))
+        units = [dict(type_id='unit', unit_key={'n': n}) for n in range(10, 13)]
+        with HttpPublisher(base_url, virtual_host, repo_id) as p:
+            p.publish(units)
+            p.commit()
+        # verify
+        manifest = Manifest()
+        manifest.read(pathlib.join(publish_dir, repo_id, MANIFEST_FILE_NAME))
+        self.assertEqual(manifest.history, [base.id])
+        self.assertFalse(manifest.has_delta(base.id))
+
+    def test_publish_checksums(self):
+        # setup
+        units = self.populate()
+        repo_id = 'test_repo'
+        base_url = 'file://'
+        publish_dir = os.path.join(self.tmpdir, 'nodes/repos')
+        virtual_host = (publish_dir, publish_dir)
+        checksum_index = Mock()
+        checksum_index.checksum.side_effect = lambda path: 'sha256:%s' % os.path.basename(path)
+        # test
+        with HttpPublisher(base_url, virtual_host, repo_id, checksum_index) as p:
+            p.publish(units)
+            p.commit()
+        # verify
+        manifest = Manifest()
+        manifest.read(pathlib.join(publish_dir, repo_id, MANIFEST_FILE_NAME))
+        manifest.units_path = pathlib.join(publish_dir, repo_id, UNITS_FILE_NAME)
+        units = [unit for unit, ref in manifest.get_units()]
+        # directories are published as tarballs without a checksum
+        self.assertFalse(constants.FILE_CHECKSUM in units[0])
+        for unit in units[1:]:
+            path = unit[constants.STORAGE_PATH]
+            self.assertEqual(unit[constants.FILE_CHECKSUM], 'sha256:%s' % os.path.basename(path))
+            self.assertEqual(unit[constants.FILE_SIZE], os.path.getsize(path))
+        self.assertEqual(checksum_index.checksum.call_count, 2)
@@ -32,10 +32,12 @@ from gofer.agent.rmi import Context
 
 from pulp.common.bundle import Bundle
 from pulp.common.config import Config
+from pulp.common import profile as profile_utils
 from pulp.agent.lib.dispatcher import Dispatcher
 from pulp.agent.lib.conduit import Conduit as HandlerConduit
 from pulp.bindings.server import PulpConnection
 from pulp.bindings.bindings import Bindings
+from pulp.bindings.exceptions import NotFoundException
 
 log = getLogger(__name__)
 plugin = Plugin.find(__name__)
@@ -371,8 +373,13 @@ class Content:
 class Profile:
     """
     Profile Management
+    @cvar __reported: The profiles last reported, keyed by (consumer_id, type_id).
+        Used to report the changes to a profile rather than the entire profile.
+    :type __reported: dict
     """
 
+    __reported = {}
+
     @remote(secret=secret)
     def send(self):
         """
@@ -391,6 +398,43 @@ class Profile:
             if not profile_report['succeeded']:
                 continue
             details = profile_report['details']
-            http = bindings.profile.send(consumer_id, type_id, details)
-            log.debug('profile (%s), reported: %d', type_id, http.response_code)
+            self.report(bindings, consumer_id, type_id, details)
         return report.dict()
+
+    def report(self, bindings, consumer_id, type_id, profile):
+        """
+        Report a unit profile.
+        The hash of the profile is sent first, along with the changes to the
+        profile last reported when they are small. The full profile is only
+        uploaded when the server does not already have it, or when the server
+        does not support reporting the hash.
+        :param bindings: The pulp bindings.
+        :type bindings: PulpBindings
+        :param consumer_id: The consumer ID.
+        :type consumer_id: str
+        :param type_id: The profile (content) type ID.
+        :type type_id: str
+        :param profile: The unit profile.
+        :type profile: object
+        """
+        key = (consumer_id, type_id)
+        profile_hash = profile_utils.calculate_hash(profile)
+        delta = None
+        previous = self.__reported.get(key)
+        if previous is not None:
+            delta = profile_utils.delta(previous, profile)
+            if delta and len(delta['removed']) + len(delta['added']) > len(profile) / 2:
+                delta = None
+        try:
+            http = bindings.profile.send_digest(consumer_id, type_id, profile_hash, delta=delta)
+            required = http.response_body['profile_required']
+        except NotFoundException:
+            # servers without the digest API only accept the full profile
+            log.debug('profile (%s), digest not supported', type_id)
+            required = True
+        if required:
+            http = bindings.profile.send(consumer_id, type_id, profile)
+            log.debug('profile (%s), reported: %d', type_id, http.response_code)
+        else:
+            log.debug('profile (%s), unchanged or delta applied', type_id)
+        self.__reported[key] = profile
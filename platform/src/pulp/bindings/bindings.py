@@ -31,6 +31,8 @@ class Bindings(object):
         @type:   pulp_connection: pulp.bindings.server.PulpConnection
         """
 
+        self.server = pulp_connection
+
         # Please keep the following in alphabetical order to ease reading
         self.actions = ActionsAPI(pulp_connection)
         self.bind = BindingsAPI(pulp_connection)
@@ -69,3 +71,10 @@ class Bindings(object):
         self.uploads = UploadAPI(pulp_connection)
         self.user = UserAPI(pulp_connection)
         self.user_search = UserSearchAPI(pulp_connection)
+
+    def close(self):
+        """
+        Closes any connections to the server kept open by the bindings. The
+        bindings may still be used afterwards.
+        """
+        self.server.close()
@@ -182,6 +182,21 @@ class ProfilesAPI(PulpAPI):
         data = { 'content_type':content_type, 'profile':profile }
         return self.server.POST(path, data)
 
+    def send_digest(self, id, content_type, profile_hash, profile=None, delta=None):
+        """
+        Conditionally update a profile. The server only stores the profile,
+        or applies the delta to the profile it has stored, when the hash of
+        the stored profile differs from profile_hash. The response body
+        reports whether the full profile must still be sent.
+        """
+        path = self.BASE_PATH % id + '%s/digest/' % content_type
+        data = {'profile_hash': profile_hash}
+        if profile is not None:
+            data['profile'] = profile
+        if delta is not None:
+            data['delta'] = delta
+        return self.server.POST(path, data)
+
 
 class ConsumerHistoryAPI(PulpAPI):
     """
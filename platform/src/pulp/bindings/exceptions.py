@@ -26,6 +26,9 @@ class RequestException(Exception):
     """
     def __init__(self, response_body):
         Exception.__init__(self)
+        if not isinstance(response_body, dict):
+            # not a Pulp formatted error, such as a path the server does not serve
+            response_body = {'error_message' : response_body}
         self.href = response_body.pop('_href', None)
         self.http_request_method = response_body.pop('http_request_method', None)
         self.http_status = response_body.pop('http_status', None)
@@ -12,8 +12,11 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import base64
+import httplib
 import locale
 import logging
+import socket
+import threading
 import urllib
 from types import NoneType
 
@@ -28,6 +31,11 @@ import pulp.bindings.exceptions as exceptions
 from pulp.bindings.responses import Response, Task
 from pulp.common.util import ensure_utf_8
 
+# -- constants ----------------------------------------------------------------
+
+# Number of idle connections kept open by a persistent PulpConnection
+DEFAULT_POOL_SIZE = 4
+
 # -- server connection --------------------------------------------------------
 
 class PulpConnection(object):
@@ -38,11 +46,17 @@ class PulpConnection(object):
     parameter can be used to pass in another mechanism to make the actual
     call to the server. The likely use of this is a duck-typed mock object
     for unit testing purposes.
+
+    By default, a new connection is opened for each request. If persistent
+    is set, connections are kept open and reused by later requests; see
+    PooledHTTPSServerWrapper. A persistent connection should be closed with
+    close() when it is no longer needed.
     """
 
     def __init__(self, host, port=443, path_prefix='/pulp/api', timeout=120,
                  logger=None, api_responses_logger=None,
-                 username=None, password=None, cert_filename=None, server_wrapper=None):
+                 username=None, password=None, cert_filename=None, server_wrapper=None,
+                 persistent=False, pool_size=DEFAULT_POOL_SIZE):
 
         self.host = host
         self.port = port
@@ -72,6 +86,8 @@ class PulpConnection(object):
         # Server Wrapper
         if server_wrapper:
             self.server_wrapper = server_wrapper
+        elif persistent:
+            self.server_wrapper = PooledHTTPSServerWrapper(self, pool_size)
         else:
             self.server_wrapper = HTTPSServerWrapper(self)
 
@@ -89,8 +105,16 @@ class PulpConnection(object):
     def POST(self, path, body=None, ensure_encoding=True):
         return self._request('POST', path, body=body, ensure_encoding=ensure_encoding)
 
-    def PUT(self, path, body, ensure_encoding=True):
-        return self._request('PUT', path, body=body, ensure_encoding=ensure_encoding)
+    def PUT(self, path, body, ensure_encoding=True, queries=()):
+        return self._request('PUT', path, queries, body=body, ensure_encoding=ensure_encoding)
+
+    def close(self):
+        """
+        Closes any connections to the server kept open by the server wrapper.
+        """
+        close = getattr(self.server_wrapper, 'close', None)
+        if close is not None:
+            close()
 
     # protected request utilities ---------------------------------------------
 
@@ -235,38 +259,99 @@ class HTTPSServerWrapper(object):
 
     def request(self, method, url, body):
 
-        headers = dict(self.pulp_connection.headers) # copy so we don't affect the calling method
+        headers = self._headers()
 
         # Create a new connection each time since HTTPSConnection has problems
-        # reusing a connection for multiple calls (lame).
+        # reusing a connection for multiple calls (lame). See
+        # PooledHTTPSServerWrapper for a wrapper that reuses connections.
         ssl_context = None
+        if self._uses_cert():
+            ssl_context = self._create_ssl_context()
+        connection = self._create_connection(ssl_context)
+
+        # Request against the server
+        connection.request(method, url, body=body, headers=headers)
+
+        try:
+            response = connection.getresponse()
+        except SSL.SSLError, err:
+            self._raise_ssl_error(err)
+
+        return self._read_response(response)
+
+    def close(self):
+        """
+        Release any connections held by the wrapper. This implementation
+        doesn't hold any.
+        """
+        pass
+
+    # -- protected utilities --------------------------------------------------
+
+    def _uses_cert(self):
+        """
+        :return: true if requests are authenticated with the client certificate
+                 rather than a username and password
+        :rtype:  bool
+        """
+        if self.pulp_connection.username and self.pulp_connection.password:
+            return False
+        return bool(self.pulp_connection.cert_filename)
+
+    def _headers(self):
+        """
+        :return: headers for a request, including basic authentication if a
+                 username and password are configured
+        :rtype:  dict
+        """
+        headers = dict(self.pulp_connection.headers) # copy so we don't affect the calling method
         if self.pulp_connection.username and self.pulp_connection.password:
             raw = ':'.join((self.pulp_connection.username, self.pulp_connection.password))
             encoded = base64.encodestring(raw)[:-1]
             headers['Authorization'] = 'Basic ' + encoded
-        elif self.pulp_connection.cert_filename:
-            ssl_context = SSL.Context('sslv3')
-            ssl_context.set_session_timeout(self.pulp_connection.timeout)
-            ssl_context.load_cert(self.pulp_connection.cert_filename)
+        return headers
 
+    def _create_ssl_context(self):
+        """
+        :return: SSL context loaded with the client certificate
+        :rtype:  M2Crypto.SSL.Context
+        """
+        ssl_context = SSL.Context('sslv3')
+        ssl_context.set_session_timeout(self.pulp_connection.timeout)
+        ssl_context.load_cert(self.pulp_connection.cert_filename)
+        return ssl_context
+
+    def _create_connection(self, ssl_context):
+        """
+        :param ssl_context: context for the connection; None if the client
+                            certificate isn't used
+        :type  ssl_context: M2Crypto.SSL.Context
+
+        :return: new, unconnected connection to the server
+        :rtype:  M2Crypto.httpslib.HTTPSConnection
+        """
         # Can't pass in None, so need to decide between two signatures (also lame)
         if ssl_context is not None:
-            connection = httpslib.HTTPSConnection(self.pulp_connection.host, self.pulp_connection.port, ssl_context=ssl_context)
+            return httpslib.HTTPSConnection(self.pulp_connection.host, self.pulp_connection.port, ssl_context=ssl_context)
         else:
-            connection = httpslib.HTTPSConnection(self.pulp_connection.host, self.pulp_connection.port)
+            return httpslib.HTTPSConnection(self.pulp_connection.host, self.pulp_connection.port)
 
-        # Request against the server
-        connection.request(method, url, body=body, headers=headers)
-
-        try:
-            response = connection.getresponse()
-        except SSL.SSLError, err:
-            # Translate stale login certificate to an auth exception
-            if 'sslv3 alert certificate expired' == str(err):
-                raise exceptions.ClientSSLException(self.pulp_connection.cert_filename)
-            else:
-                raise exceptions.ConnectionException(None, str(err), None)
+    def _raise_ssl_error(self, err):
+        """
+        Translates an SSL error raised by a request into a bindings exception.
+        """
+        # Translate stale login certificate to an auth exception
+        if 'sslv3 alert certificate expired' == str(err):
+            raise exceptions.ClientSSLException(self.pulp_connection.cert_filename)
+        else:
+            raise exceptions.ConnectionException(None, str(err), None)
 
+    def _read_response(self, response):
+        """
+        :return: tuple of the response status and body; the body is
+                 deserialized if it is JSON
+        :rtype:  tuple
+        """
         # Attempt to deserialize the body (should pass unless the server is busted)
         response_body = response.read()
 
@@ -275,3 +360,146 @@ class HTTPSServerWrapper(object):
         except:
             pass
         return response.status, response_body
+
+
+class PooledHTTPSServerWrapper(HTTPSServerWrapper):
+    """
+    Server wrapper that keeps connections to the server open so they can be
+    reused by later requests. The SSL context is created once and the SSL
+    session of the last connection established is resumed by new connections,
+    so most requests require neither a new connection nor a full handshake.
+
+    Connections are checked out of the pool for the duration of a request, so
+    the wrapper may be shared by multiple threads. When all of the pooled
+    connections are in use, a new connection is opened; at most pool_size
+    connections are kept open once they are returned.
+
+    The server may close an idle connection at any time. A request that fails
+    on a reused connection before it is sent is retried once on a new
+    connection. A request that fails after it is sent, but before a response
+    is received, is only retried if its method is in RETRY_METHODS, as the
+    server may already have acted on it.
+    """
+
+    RETRY_METHODS = ('GET', 'HEAD')
+
+    def __init__(self, pulp_connection, pool_size=DEFAULT_POOL_SIZE):
+        super(PooledHTTPSServerWrapper, self).__init__(pulp_connection)
+        self.pool_size = pool_size
+        self._idle = []
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._ssl_context = None
+        self._session = None
+
+    def request(self, method, url, body):
+        headers = self._headers()
+        generation = self._generation
+        connection, reused = self._checkout()
+        try:
+            sent = False
+            try:
+                connection.request(method, url, body=body, headers=headers)
+                sent = True
+                response = self._receive(connection)
+            except (socket.error, httplib.HTTPException, SSL.SSLError), err:
+                connection.close()
+                # once sent, the server may have acted on the request
+                if not reused or (sent and method not in self.RETRY_METHODS):
+                    raise
+                self.pulp_connection.log.debug('reconnecting after failure on reused connection: %s' % err)
+                connection = self._connect()
+                connection.request(method, url, body=body, headers=headers)
+                response = self._receive(connection)
+            result = self._read_response(response)
+        except SSL.SSLError, err:
+            connection.close()
+            self._raise_ssl_error(err)
+        except (socket.error, httplib.HTTPException), err:
+            connection.close()
+            raise exceptions.ConnectionException(None, str(err), None)
+        except:
+            connection.close()
+            raise
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._checkin(connection, generation)
+        return result
+
+    def close(self):
+        """
+        Closes the idle connections. Connections in use by a request are
+        closed once the request completes. The wrapper may still be used
+        afterwards; later requests open and pool new connections.
+        """
+        self._lock.acquire()
+        try:
+            idle = self._idle
+            self._idle = []
+            self._generation += 1
+        finally:
+            self._lock.release()
+        for connection in idle:
+            connection.close()
+
+    # -- private --------------------------------------------------------------
+
+    def _checkout(self):
+        """
+        :return: tuple of a connection and whether it has been used before
+        :rtype:  tuple
+        """
+        self._lock.acquire()
+        try:
+            if self._idle:
+                return self._idle.pop(), True
+        finally:
+            self._lock.release()
+        return self._connect(), False
+
+    def _checkin(self, connection, generation):
+        """
+        Returns a connection to the pool, or closes it if the pool is full
+        or the wrapper was closed since the connection was checked out.
+        """
+        self._lock.acquire()
+        try:
+            if generation == self._generation and len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        finally:
+            self._lock.release()
+        connection.close()
+
+    def _connect(self):
+        """
+        :return: new connection, resuming the last SSL session if there is one
+        :rtype:  M2Crypto.httpslib.HTTPSConnection
+        """
+        self._lock.acquire()
+        try:
+            if self._ssl_context is None:
+                if self._uses_cert():
+                    self._ssl_context = self._create_ssl_context()
+                else:
+                    self._ssl_context = SSL.Context()
+            ssl_context = self._ssl_context
+        finally:
+            self._lock.release()
+        connection = self._create_connection(ssl_context)
+        session = self._session
+        if session is not None:
+            connection.set_session(session)
+        return connection
+
+    def _receive(self, connection):
+        """
+        :return: response to the request sent over the connection
+        :rtype:  httplib.HTTPResponse
+        """
+        response = connection.getresponse()
+        if connection.sock is not None:
+            self._session = connection.get_session()
+        return response
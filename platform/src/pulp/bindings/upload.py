@@ -25,9 +25,12 @@ class UploadAPI(PulpAPI):
         url = '/v2/content/uploads/'
         return self.server.POST(url)
 
-    def upload_segment(self, upload_id, offset, data):
+    def upload_segment(self, upload_id, offset, data, checksum=None):
         url = '/v2/content/uploads/%s/%s/' % (upload_id, offset)
-        return self.server.PUT(url, data, ensure_encoding=False)
+        queries = ()
+        if checksum is not None:
+            queries = (('checksum', checksum),)
+        return self.server.PUT(url, data, ensure_encoding=False, queries=queries)
 
     def list_all_uploads(self):
         url = '/v2/content/uploads/'
@@ -37,7 +40,8 @@ class UploadAPI(PulpAPI):
         url = '/v2/content/uploads/%s/' % upload_id
         return self.server.DELETE(url)
 
-    def import_upload(self, upload_id, repo_id, unit_type_id, unit_key, unit_metadata):
+    def import_upload(self, upload_id, repo_id, unit_type_id, unit_key, unit_metadata,
+                      upload_checksum=None):
         url = '/v2/repositories/%s/actions/import_upload/' % repo_id
         body = {
             'upload_id' : upload_id,
@@ -45,4 +49,6 @@ class UploadAPI(PulpAPI):
             'unit_key' : unit_key,
             'unit_metadata' : unit_metadata,
         }
+        if upload_checksum is not None:
+            body['upload_checksum'] = upload_checksum
         return self.server.POST(url, body)
@@ -82,7 +82,11 @@ class UploadCommand(PulpCliCommand):
 
         :param context: Pulp client context
         :type  context: pulp.client.extensions.core.ClientContext
-        :param upload_manager: created and configured upload manager instance
+        :param upload_manager: created and configured upload manager instance;
+               segments of each file are uploaded concurrently when the manager
+               is created with a concurrency argument greater than 1, or when
+               upload_concurrency in the server section of the client
+               configuration is greater than 1
         :type  upload_manager: pulp.client.upload.manager.UploadManager
         :param upload_files: if false, the user will not be prompted for files
                to upload and the create will be purely metadata based
@@ -563,6 +567,11 @@ def perform_upload(context, upload_manager, upload_ids):
     :type  upload_ids: list
     """
 
+    # The concurrency configured by the user overrides the manager's own
+    if context.config.has_option('server', 'upload_concurrency'):
+        concurrency = int(context.config['server']['upload_concurrency'])
+        upload_manager.concurrency = max(concurrency, 1)
+
     d = _('Starting upload of selected units. If this process is stopped through '
          'ctrl+c, the uploads will be paused and may be resumed later using the '
          'resume command or cancelled entirely using the cancel command.')
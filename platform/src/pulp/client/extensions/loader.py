@@ -19,9 +19,16 @@ then uses it to instantiate the extension components.
 
 import copy
 from gettext import gettext as _
+import hashlib
 import logging
 import os
 import sys
+import tempfile
+
+try:
+    import json
+except ImportError:
+    import simplejson as json
 
 import pkg_resources
 
@@ -41,6 +48,18 @@ _ENTRY_POINTS = 'entry points'
 # name of the entry point
 ENTRY_POINT_EXTENSIONS = 'pulp.extensions.%s'
 
+# Identifies extensions in the command index
+_PACK_KIND_MODULE = 'module'
+_PACK_KIND_ENTRY_POINT = 'entry point'
+_PACK_ID_MODULE = _PACK_KIND_MODULE + ':%s'
+_PACK_ID_ENTRY_POINT = _PACK_KIND_ENTRY_POINT + ':%s'
+
+# Incremented whenever the format of the command index changes
+INDEX_VERSION = 1
+
+# Files in an extension pack that don't affect the pack's contents
+_COMPILED_SUFFIXES = ('.pyc', '.pyo')
+
 # -- exceptions ---------------------------------------------------------------
 
 class ExtensionLoaderException(Exception):
@@ -81,7 +100,7 @@ class InvalidExtensionConfig(ExtensionLoaderException): pass
 
 # -- loading ------------------------------------------------------------------
 
-def load_extensions(extensions_dir, context, role):
+def load_extensions(extensions_dir, context, role, args=None, index_filename=None):
     """
     @param extensions_dir: directory in which to find extension packs
     @type  extensions_dir: str
@@ -99,12 +118,51 @@ def load_extensions(extensions_dir, context, role):
     @param role:    name of a role, either "admin" or "consumer", so we know
                     which extensions to load
     @type  role:    str
+
+    @param args:    command line arguments the CLI will be run with; if
+                    specified along with index_filename, only the extensions
+                    that contribute to the section or command named by the
+                    first argument are loaded
+    @type  args:    list
+
+    @param index_filename: file in which the index of the sections and
+                    commands contributed by each extension is stored; the
+                    index is (re)built by loading all extensions whenever it
+                    is missing or the installed extensions have changed
+    @type  index_filename: str
     """
 
     # Validation
     if not os.access(extensions_dir, os.F_OK | os.R_OK):
         raise InvalidExtensionsDirectory(extensions_dir)
 
+    if not index_filename or not args or args[0].startswith('-') or context.cli is None:
+        _load_all(extensions_dir, context, role)
+        return
+
+    fingerprint = _fingerprint(extensions_dir, role)
+    index = _read_index(index_filename, fingerprint)
+    if index is None:
+        recorder = IndexRecorder(context.cli)
+        _load_all(extensions_dir, context, role, recorder)
+        _write_index(index_filename, fingerprint, recorder.packs)
+        return
+
+    pack_ids = _required_packs(index, args[0])
+    if pack_ids is None:
+        _load_all(extensions_dir, context, role)
+    else:
+        _load_indexed(extensions_dir, context, role, pack_ids)
+
+def _load_all(extensions_dir, context, role, recorder=None):
+    """
+    Loads every extension, in order of priority.
+
+    @param recorder: if specified, notified of the sections and commands
+                     contributed by each extension
+    @type  recorder: IndexRecorder
+    """
+
     # identify modules and sort them
     try:
         unsorted_modules = _load_pack_modules(extensions_dir)
@@ -127,8 +185,47 @@ def load_extensions(extensions_dir, context, role):
                 # the cause will be logged by _load_pack. This method should
                 # continue to load extensions so all of the errors are logged.
                 error_packs.append(module.__name__)
+                continue
+            if recorder is not None:
+                recorder.record(_PACK_ID_MODULE % module.__name__)
         for entry_point in sorted_extensions[priority].get(_ENTRY_POINTS, []):
             entry_point.load()(context)
+            if recorder is not None:
+                recorder.record(_PACK_ID_ENTRY_POINT % entry_point)
+
+    if len(error_packs) > 0:
+        raise LoadFailed(error_packs)
+
+def _load_indexed(extensions_dir, context, role, pack_ids):
+    """
+    Loads the given extensions, in the order they appear in the index.
+
+    @param pack_ids: IDs of the extensions to load, as recorded in the index
+    @type  pack_ids: list
+    """
+    if extensions_dir not in sys.path:
+        sys.path.append(extensions_dir)
+
+    entry_points = None
+    error_packs = []
+    for pack_id in pack_ids:
+        kind, name = pack_id.split(':', 1)
+        if kind == _PACK_KIND_ENTRY_POINT:
+            if entry_points is None:
+                entry_points = dict((str(e), e) for e in
+                                    pkg_resources.iter_entry_points(ENTRY_POINT_EXTENSIONS % role))
+            entry_points[name].load()(context)
+            continue
+        try:
+            module = __import__(name)
+        except Exception, e:
+            _LOG.exception(_('Could not load extension pack [%(p)s]' % {'p' : name}))
+            error_packs.append(name)
+            continue
+        try:
+            _load_pack(extensions_dir, module, context)
+        except ExtensionLoaderException, e:
+            error_packs.append(name)
 
     if len(error_packs) > 0:
         raise LoadFailed(error_packs)
@@ -245,3 +342,155 @@ def _load_pack(extensions_dir, pack_module, context):
     except Exception, e:
         _LOG.exception(_('Module [%(m)s] could not be initialized' % {'m' : init_mod_name}))
         raise InitError(), None, sys.exc_info()[2]
+
+# -- command index ------------------------------------------------------------
+
+class IndexRecorder(object):
+    """
+    Records the root level sections and commands each extension contributes
+    to as the extensions are loaded. An extension contributes to a section if
+    it creates the section or adds anything, at any depth, beneath it.
+    """
+
+    def __init__(self, cli):
+        self.cli = cli
+        self.packs = [] # list of [pack ID, list of names], in load order
+        self._paths = _cli_paths(cli)
+
+    def record(self, pack_id):
+        """
+        Called after each extension is loaded.
+
+        @param pack_id: identifies the extension
+        @type  pack_id: str
+        """
+        paths = _cli_paths(self.cli)
+        names = sorted([n for n in paths if paths[n] != self._paths.get(n)])
+        self.packs.append([pack_id, names])
+        self._paths = paths
+
+def _cli_paths(cli):
+    """
+    @return: dict of the name of each root level section or command to the
+             set of paths of the sections and commands beneath it
+    @rtype:  dict
+    """
+    def section_paths(section, prefix):
+        paths = set()
+        for name in section.commands:
+            paths.add(prefix + name)
+        for name, subsection in section.subsections.items():
+            paths.add(prefix + name + '/')
+            paths.update(section_paths(subsection, prefix + name + '/'))
+        return paths
+
+    root = cli.root_section
+    paths = dict((name, frozenset()) for name in root.commands)
+    for name, section in root.subsections.items():
+        paths[name] = frozenset(section_paths(section, ''))
+    return paths
+
+def _required_packs(index, name):
+    """
+    Determines the extensions that must be loaded to run a root level section
+    or command: those contributing to it and, since their initialization may
+    depend on them, to any other section they contribute to. Extensions that
+    contribute to no section are always loaded, as it isn't known what they
+    depend on.
+
+    @return: list of pack IDs in load order; None if no extension contributes
+             to the name
+    @rtype:  list
+    """
+    packs = index['packs']
+    names = set([name])
+    required = set()
+    added = True
+    while added:
+        added = False
+        for pack_id, pack_names in packs:
+            if pack_id not in required and names.intersection(pack_names):
+                required.add(pack_id)
+                names.update(pack_names)
+                added = True
+    if not required:
+        return None
+    return [pack_id for pack_id, pack_names in packs if pack_id in required or not pack_names]
+
+def _fingerprint(extensions_dir, role):
+    """
+    Identifies the installed extensions; the command index is rebuilt when
+    the fingerprint changes. The fingerprint of an extension pack in the
+    extensions directory is derived from the names and modification times of
+    its files.
+
+    @rtype: dict
+    """
+    packs = {}
+    for pack in sorted(os.listdir(extensions_dir)):
+        if pack.startswith('.') or pack.endswith(_COMPILED_SUFFIXES):
+            continue
+        path = os.path.join(extensions_dir, pack)
+        if not os.path.isdir(path):
+            packs[pack] = str(os.path.getmtime(path))
+            continue
+        # the directories themselves are skipped as their times change when
+        # their modules are compiled
+        files = []
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if file_name.endswith(_COMPILED_SUFFIXES):
+                    continue
+                file_path = os.path.join(dir_path, file_name)
+                files.append((file_path[len(path):], os.path.getmtime(file_path)))
+        packs[pack] = hashlib.sha1(repr(files)).hexdigest()
+
+    entry_points = sorted(['%s (%s)' % (e, e.dist) for e in
+                           pkg_resources.iter_entry_points(ENTRY_POINT_EXTENSIONS % role)])
+    return {'version' : INDEX_VERSION,
+            'extensions_dir' : extensions_dir,
+            'role' : role,
+            'packs' : packs,
+            'entry_points' : entry_points}
+
+def _read_index(index_filename, fingerprint):
+    """
+    @return: the stored index; None if it doesn't exist, can't be read or was
+             built for different extensions
+    @rtype:  dict
+    """
+    try:
+        f = open(index_filename)
+        try:
+            index = json.load(f)
+        finally:
+            f.close()
+    except (IOError, ValueError), e:
+        _LOG.debug(_('Extensions index [%(f)s] not read: %(e)s' % {'f' : index_filename, 'e' : e}))
+        return None
+    if not isinstance(index, dict) or index.get('fingerprint') != fingerprint:
+        return None
+    return index
+
+def _write_index(index_filename, fingerprint, packs):
+    """
+    Stores the index. Failure to store it is logged but otherwise ignored,
+    as the extensions can always be loaded without it.
+    """
+    index = {'fingerprint' : fingerprint, 'packs' : packs}
+    try:
+        index_dir = os.path.dirname(index_filename)
+        if index_dir and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        # write to a temporary file first so a concurrent reader never sees
+        # a partial index
+        fd, temp_filename = tempfile.mkstemp(dir=index_dir or None)
+        f = os.fdopen(fd, 'w')
+        try:
+            json.dump(index, f)
+        finally:
+            f.close()
+        os.rename(temp_filename, index_filename)
+    except (IOError, OSError), e:
+        _LOG.warn(_('Extensions index [%(f)s] could not be written: %(e)s' % {'f' : index_filename, 'e' : e}))
@@ -94,9 +94,16 @@ def main(config_filenames, exception_handler_class=ExceptionHandler):
     extensions_dir = config['filesystem']['extensions_dir']
     extensions_dir = os.path.expanduser(extensions_dir)
 
+    # Unless the whole CLI is needed, only load the extensions for the
+    # section or command being run, as determined by the extensions index
+    index_filename = None
+    if config.has_option('filesystem', 'extensions_index') and not options.print_map:
+        index_filename = os.path.expanduser(config['filesystem']['extensions_index'])
+
     role = config['client']['role']
     try:
-        extensions_loader.load_extensions(extensions_dir, context, role)
+        extensions_loader.load_extensions(extensions_dir, context, role, args=args,
+                                          index_filename=index_filename)
     except extensions_loader.LoadFailed, e:
         prompt.write(_('The following extensions failed to load: %(f)s' % {'f' : ', '.join(e.failed_packs)}))
         prompt.write(_('More information on the failures can be found in %(l)s' % {'l' : config['logging']['filename']}))
@@ -189,8 +196,13 @@ def _create_bindings(config, logger, username, password):
         call_log.addHandler(handler)
         call_log.setLevel(logging.INFO)
 
+    persistent = False
+    if config.has_option('server', 'persistent_connections'):
+        persistent = config.parse_bool(config['server']['persistent_connections'])
+
     # Create the connection and bindings
-    conn = PulpConnection(hostname, port, username=username, password=password, cert_filename=cert_filename, logger=logger, api_responses_logger=call_log)
+    conn = PulpConnection(hostname, port, username=username, password=password, cert_filename=cert_filename,
+                          logger=logger, api_responses_logger=call_log, persistent=persistent)
     bindings = Bindings(conn)
 
     return bindings
@@ -21,13 +21,29 @@ client-side tracking of upload requests on the server.
 import copy
 import os
 import pickle
+import Queue
 import sys
+import threading
+import time
 
 from pulp.client.lock import LockFile
+from pulp.common import upload as upload_utils
 
 # -- constants ----------------------------------------------------------------
 
 DEFAULT_CHUNKSIZE = 1048576 # 1 MB per upload call
+DEFAULT_CONCURRENCY = 1 # upload calls in flight at once
+
+# While uploading, the tracker file is saved once this many segments have been
+# uploaded since it was last saved or this many seconds have passed, whichever
+# comes first. Segments uploaded since the last save are uploaded again if the
+# upload is resumed after the process is killed.
+TRACKER_SAVE_SEGMENTS = 16
+TRACKER_SAVE_INTERVAL = 5
+
+# Seconds between checks for a completed segment, so the wait can be
+# interrupted through ctrl+c
+RESULT_POLL_INTERVAL = 0.5
 
 # -- exceptions ---------------------------------------------------------------
 
@@ -82,9 +98,14 @@ class UploadManager(object):
     In the future when we support an interactive shell interface we'll need to
     revisit and add some in memory locking and a tighter integration with the
     on disk state files.
+
+    The one exception is the upload itself, which can send several segments of
+    a file at once from worker threads. The file is only read, and the tracker
+    only updated, by the thread that called upload().
     """
 
-    def __init__(self, upload_working_dir, bindings, chunk_size=DEFAULT_CHUNKSIZE):
+    def __init__(self, upload_working_dir, bindings, chunk_size=DEFAULT_CHUNKSIZE,
+                 concurrency=DEFAULT_CONCURRENCY):
         """
         @param upload_working_dir: directory in which to store client-side files
                to track upload requests; if it doesn't exist it will be created
@@ -97,10 +118,16 @@ class UploadManager(object):
         @param chunk_size: size in bytes of data to upload on each call to the
                server
         @type  chunk_size: int
+
+        @param concurrency: maximum number of upload calls to the server in
+               progress at once; if greater than 1, segments are uploaded from
+               that many threads
+        @type  concurrency: int
         """
         self.upload_working_dir = upload_working_dir
         self.bindings = bindings
         self.chunk_size = chunk_size
+        self.concurrency = concurrency
 
         # Internal state
         self.tracker_files = {}
@@ -191,13 +218,18 @@ class UploadManager(object):
 
         The callback_func is used to get feedback on the upload process. After
         each successful upload segment call to the server, this function
-        will be invoked with the new offset in the file and the file size
-        (intended to be fed into a progress indicator). As this is called
+        will be invoked with the number of bytes uploaded so far and the file
+        size (intended to be fed into a progress indicator). As this is called
         after each upload segment call, the granularity at which it is called
         depends on the chunk_size value for this instance.
 
         The callback_func should have a signature of (int, int).
 
+        Each segment is sent with its checksum, calculated as the file is read,
+        for the server to verify. The checksum of the whole upload is derived
+        from them and sent with the import_upload call so the server can
+        verify the entire file before importing it.
+
         This call will raise an exception if an upload is already in progress
         for the given upload_id. If that isn't the case and the tracker file's
         running flag is stale, the force parameter will bypass this check and
@@ -239,23 +271,26 @@ class UploadManager(object):
 
             source_file_size = os.path.getsize(tracker_file.source_filename)
 
-            f = open(tracker_file.source_filename, 'r')
-            while True:
-                # Load the chunk to upload
-                f.seek(tracker_file.offset)
-                data = f.read(self.chunk_size)
-                if not data:
-                    break
-
-                # Server request
-                self.bindings.uploads.upload_segment(upload_id, tracker_file.offset, data)
-
-                # Status update and callback notification
-                tracker_file.offset = min(tracker_file.offset + self.chunk_size, source_file_size)
-                tracker_file.save()
-
-                callback_func(tracker_file.offset, source_file_size)
-
+            # A resumed upload continues with the segments it started with,
+            # as the checksums already recorded belong to those segments
+            if tracker_file.chunk_size is None:
+                tracker_file.chunk_size = self.chunk_size
+            if tracker_file.segment_checksums is None:
+                tracker_file.segment_checksums = {}
+
+            pending = [o for o in xrange(tracker_file.offset, source_file_size, tracker_file.chunk_size)
+                       if o not in tracker_file.segment_checksums]
+            segments = self._read_segments(tracker_file.source_filename, pending, tracker_file.chunk_size)
+            progress = _UploadProgress(tracker_file, source_file_size, callback_func)
+
+            if self.concurrency > 1:
+                self._upload_concurrently(upload_id, segments, progress)
+            else:
+                for offset, data, checksum in segments:
+                    self.bindings.uploads.upload_segment(upload_id, offset, data, checksum=checksum)
+                    progress.segment_uploaded(offset, checksum)
+
+            tracker_file.upload_checksum = self._upload_checksum(tracker_file, source_file_size)
             tracker_file.is_finished_uploading = True
         finally:
             # Regardless of how this ends, it's no longer running, so make sure
@@ -288,7 +323,8 @@ class UploadManager(object):
             raise IncompleteUploadException()
 
         response = self.bindings.uploads.import_upload(upload_id, tracker.repo_id,
-                   tracker.unit_type_id, tracker.unit_key, tracker.unit_metadata)
+                   tracker.unit_type_id, tracker.unit_key, tracker.unit_metadata,
+                   upload_checksum=tracker.upload_checksum)
 
         return response
 
@@ -358,6 +394,110 @@ class UploadManager(object):
         self._uncache_tracker_file(tracker)
         tracker.delete()
 
+    # -- upload utilities -----------------------------------------------------
+
+    def _read_segments(self, filename, offsets, chunk_size):
+        """
+        Reads the segments of the file at the given offsets, in order,
+        calculating the checksum of each as it is read. The file is only
+        repositioned where a segment that has already been uploaded is skipped.
+
+        @return: generator of (offset, data, checksum) tuples
+        """
+        f = open(filename, 'rb')
+        try:
+            position = None
+            for offset in offsets:
+                if offset != position:
+                    f.seek(offset)
+                data = f.read(chunk_size)
+                position = offset + len(data)
+                yield offset, data, upload_utils.segment_checksum(data)
+        finally:
+            f.close()
+
+    def _upload_concurrently(self, upload_id, segments, progress):
+        """
+        Uploads the segments from self.concurrency threads. The segments are
+        read as the threads are ready for them, so no more than that many
+        segments are held in memory at once. If an upload call fails, no
+        further segments are started; those in progress are allowed to finish
+        and be recorded before the failure is raised.
+
+        @param segments: iterable of (offset, data, checksum) tuples
+        @param progress: records each segment once it has been uploaded
+        @type  progress: _UploadProgress
+        """
+        pending = Queue.Queue()
+        results = Queue.Queue()
+        stopped = threading.Event()
+
+        def send():
+            while True:
+                segment = pending.get()
+                if segment is None or stopped.isSet():
+                    return
+                offset, data, checksum = segment
+                try:
+                    self.bindings.uploads.upload_segment(upload_id, offset, data, checksum=checksum)
+                    results.put((offset, checksum, None))
+                except Exception:
+                    results.put((offset, checksum, sys.exc_info()))
+
+        workers = [threading.Thread(target=send) for i in range(self.concurrency)]
+        for worker in workers:
+            worker.setDaemon(True)
+            worker.start()
+
+        error = []
+        in_flight = [0]
+
+        def complete():
+            while True:
+                try:
+                    offset, checksum, exc_info = results.get(True, RESULT_POLL_INTERVAL)
+                    break
+                except Queue.Empty:
+                    pass
+            in_flight[0] -= 1
+            if exc_info is None:
+                progress.segment_uploaded(offset, checksum)
+            elif not error:
+                error.append(exc_info)
+
+        try:
+            for segment in segments:
+                while in_flight[0] >= self.concurrency and not error:
+                    complete()
+                if error:
+                    break
+                pending.put(segment)
+                in_flight[0] += 1
+            while in_flight[0]:
+                complete()
+        finally:
+            stopped.set()
+            for worker in workers:
+                pending.put(None)
+
+        if error:
+            exc_info = error[0]
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+    def _upload_checksum(self, tracker, source_file_size):
+        """
+        @return: checksum of the whole upload, calculated from the checksums
+                 of its segments; None if the upload was started by a version
+                 of the client that didn't record them
+        @rtype:  str
+        """
+        checksums = []
+        for offset in xrange(0, source_file_size, tracker.chunk_size):
+            if offset not in tracker.segment_checksums:
+                return None
+            checksums.append(tracker.segment_checksums[offset])
+        return upload_utils.upload_checksum(checksums)
+
     # -- tracker utilities ----------------------------------------------------
 
     def _tracker_filename(self, upload_id):
@@ -381,12 +521,68 @@ class UploadManager(object):
         if not self.is_initialized:
             raise ManagerUninitializedException()
 
+class _UploadProgress(object):
+    """
+    Records the segments of an upload as they complete, saving the tracker
+    file in batches rather than after every segment, and notifies the upload
+    callback.
+    """
+
+    def __init__(self, tracker, source_file_size, callback_func):
+        self.tracker = tracker
+        self.source_file_size = source_file_size
+        self.callback_func = callback_func
+
+        self.unsaved = 0
+        self.last_save = time.time()
+
+        # Segments past the offset may already have been uploaded when an
+        # upload that ran concurrently is resumed
+        self.uploaded = tracker.offset
+        for offset in tracker.segment_checksums:
+            if offset >= tracker.offset:
+                self.uploaded += self._segment_size(offset)
+
+    def segment_uploaded(self, offset, checksum):
+        """
+        @param offset: offset of the segment in the file
+        @type  offset: int
+
+        @param checksum: checksum of the segment
+        @type  checksum: str
+        """
+        tracker = self.tracker
+        tracker.segment_checksums[offset] = checksum
+
+        # The offset only advances once every segment before it is uploaded
+        while tracker.offset < self.source_file_size and tracker.offset in tracker.segment_checksums:
+            tracker.offset += self._segment_size(tracker.offset)
+
+        self.unsaved += 1
+        if self.unsaved >= TRACKER_SAVE_SEGMENTS or time.time() - self.last_save >= TRACKER_SAVE_INTERVAL:
+            tracker.save()
+            self.unsaved = 0
+            self.last_save = time.time()
+
+        self.uploaded += self._segment_size(offset)
+        if self.callback_func:
+            self.callback_func(self.uploaded, self.source_file_size)
+
+    def _segment_size(self, offset):
+        return min(self.tracker.chunk_size, self.source_file_size - offset)
+
+
 class UploadTracker(object):
     """
     Client-side file to carry all information related to a single upload
     request on the server.
     """
 
+    # Defaults for tracker files saved before these were added
+    chunk_size = None
+    segment_checksums = None
+    upload_checksum = None
+
     def __init__(self, filename):
         self.filename = filename # filename of the tracker file itself
 
@@ -395,6 +591,9 @@ class UploadTracker(object):
         self.location = None # URL to the upload request on the server
         self.offset = None # start of next chunk to upload
         self.source_filename = None # path on disk to the file to upload
+        self.chunk_size = None # size of the segments the file is uploaded in
+        self.segment_checksums = None # checksum of each uploaded segment by offset
+        self.upload_checksum = None # checksum of the whole upload once finished
 
         # Import call information
         self.repo_id = None
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Unit profile digests and deltas, shared by the agent that reports profiles
+and the server that stores them.
+
+A delta describes the changes between two list profiles by position, so that
+applying it reproduces the new profile exactly, in the order the profiler
+reported it:
+    {'base_hash': <hash of the previous profile>,
+     'removed': [<index in the previous profile>, ...],
+     'added': [[<index in the new profile>, <entry>], ...]}
+"""
+
+import hashlib
+from difflib import SequenceMatcher
+
+from pulp.common.compat import json
+
+
+def calculate_hash(profile):
+    """
+    Return a hash of profile. This hash is useful for
+    quickly comparing profiles to determine if they are the same.
+
+    :param profile: The profile structure you wish to hash
+    :type  profile: object
+    :return:        Hash of profile
+    :rtype:         basestring
+    """
+    # Don't use any whitespace in the json separators, and sort dictionary keys to be repeatable
+    serialized_profile = json.dumps(profile, separators=(',', ':'), sort_keys=True)
+    hasher = hashlib.sha256(serialized_profile)
+    return hasher.hexdigest()
+
+
+def delta(previous, current):
+    """
+    Calculate the delta between two profiles. Only list profiles support
+    deltas.
+
+    :param previous: The profile previously reported.
+    :type  previous: list
+    :param current:  The profile being reported.
+    :type  current:  list
+    :return: The delta, or None when the profiles are not lists.
+    :rtype:  dict
+    """
+    if not (isinstance(previous, list) and isinstance(current, list)):
+        return None
+    removed = []
+    added = []
+    matcher = SequenceMatcher(None, [_key(e) for e in previous], [_key(e) for e in current], False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag in ('delete', 'replace'):
+            removed.extend(range(i1, i2))
+        if tag in ('insert', 'replace'):
+            added.extend([[j, current[j]] for j in range(j1, j2)])
+    return dict(base_hash=calculate_hash(previous), removed=removed, added=added)
+
+
+def apply_delta(profile, delta):
+    """
+    Apply a delta to the profile it was calculated from.
+
+    :param profile: The profile the delta was calculated from.
+    :type  profile: list
+    :param delta:   A delta returned by delta().
+    :type  delta:   dict
+    :return: The new profile.
+    :rtype:  list
+    :raise ValueError: when the delta is malformed or does not apply to the profile.
+    """
+    if not isinstance(profile, list):
+        raise ValueError('only list profiles support deltas')
+    try:
+        removed = set(delta['removed'])
+        added = [(int(index), entry) for index, entry in delta['added']]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('malformed delta')
+    if [i for i in removed if not isinstance(i, (int, long)) or i < 0 or i >= len(profile)]:
+        raise ValueError('removed index out of range')
+    added.sort(key=lambda a: a[0])
+    result = [e for i, e in enumerate(profile) if i not in removed]
+    for index, entry in added:
+        if index < 0 or index > len(result):
+            raise ValueError('added index out of range')
+        result.insert(index, entry)
+    return result
+
+
+def _key(entry):
+    """
+    Key used to compare profile entries.
+    """
+    return json.dumps(entry, separators=(',', ':'), sort_keys=True)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Checksums of uploaded content, shared by the client that uploads a file and
+the server that stores it.
+
+Each segment of an upload is sent with the SHA-256 checksum of its data. The
+checksum of the whole upload is the SHA-256 checksum of the segment checksums,
+in the order of the segments in the file. Both can be calculated in a single
+pass as the file is read and, as the server records the checksum of each
+segment it verifies, it can verify the whole upload without reading it again.
+"""
+
+import hashlib
+
+
+def segment_checksum(data):
+    """
+    :param data: data of a single upload segment
+    :type  data: str
+    :return: hex digest of the segment
+    :rtype:  str
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def upload_checksum(segment_checksums):
+    """
+    :param segment_checksums: checksums of every segment in the upload, in
+                              the order of the segments in the file
+    :type  segment_checksums: list of str
+    :return: hex digest of the whole upload
+    :rtype:  str
+    """
+    hasher = hashlib.sha256()
+    for checksum in segment_checksums:
+        hasher.update(checksum)
+    return hasher.hexdigest()
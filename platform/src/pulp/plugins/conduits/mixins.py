@@ -21,6 +21,8 @@ from   pulp.plugins.types import database as types_db
 import pulp.server.dispatch.factory as dispatch_factory
 from   pulp.server.exceptions import MissingResource
 import pulp.server.managers.factory as manager_factory
+from   pulp.server.managers.repo.unit_association_query import UNIT_BATCH_SIZE
+from   pulp.server.util import paginate
 
 # Unused in this class but imported here so plugins don't have to reach
 # into server packages directly
@@ -30,6 +32,10 @@ from   pulp.server.db.model.criteria import UnitAssociationCriteria, Criteria
 
 _LOG = logging.getLogger(__name__)
 
+# Maximum number of units of a single type written to the database at once
+# by the save_units call
+SAVE_UNITS_BATCH_SIZE = 1000
+
 # -- exceptions ---------------------------------------------------------------
 
 class ImporterConduitException(Exception):
@@ -159,6 +165,28 @@ class SingleRepoUnitsMixin(object):
         """
         return do_get_repo_units(self.repo_id, criteria, self.exception_class)
 
+    def iter_units(self, criteria=None, batch_size=UNIT_BATCH_SIZE):
+        """
+        Generator variant of get_units. Units are retrieved from the server in
+        batches of at most batch_size and yielded one at a time, so the memory
+        used while processing a repository does not grow with its size.
+
+        Units yielded from this call will have the id field populated and are
+        useable in any calls in this conduit that require the id field.
+
+        @param criteria: used to scope the returned results or the data within;
+               the Criteria class can be imported from this module
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: maximum number of units retrieved from the server
+               in a single query
+        @type  batch_size: int
+
+        @return: generator of unit instances
+        @rtype:  generator of L{AssociatedUnit}
+        """
+        return do_iter_repo_units(self.repo_id, criteria, self.exception_class, batch_size)
+
 
 class MultipleRepoUnitsMixin(object):
 
@@ -182,6 +210,28 @@ class MultipleRepoUnitsMixin(object):
         """
         return do_get_repo_units(repo_id, criteria, self.exception_class)
 
+    def iter_units(self, repo_id, criteria=None, batch_size=UNIT_BATCH_SIZE):
+        """
+        Generator variant of get_units. Units are retrieved from the server in
+        batches of at most batch_size and yielded one at a time, so the memory
+        used while processing a repository does not grow with its size.
+
+        Units yielded from this call will have the id field populated and are
+        useable in any calls in this conduit that require the id field.
+
+        @param criteria: used to scope the returned results or the data within;
+               the Criteria class can be imported from this module
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: maximum number of units retrieved from the server
+               in a single query
+        @type  batch_size: int
+
+        @return: generator of unit instances
+        @rtype:  generator of L{AssociatedUnit}
+        """
+        return do_iter_repo_units(repo_id, criteria, self.exception_class, batch_size)
+
 
 class SearchUnitsMixin(object):
 
@@ -493,6 +543,98 @@ class AddUnitMixin(object):
             _LOG.exception(_('Content unit association failed [%s]' % str(unit)))
             raise ImporterConduitException(e), None, sys.exc_info()[2]
 
+    def save_units(self, units):
+        """
+        Batch variant of save_unit. Performs the same two steps for each of
+        the given units, but with far fewer calls into the database:
+        - Existing units are looked up with a single query per batch of units
+          of the same type; units that do not yet exist are created with a
+          single multi-document insert.
+        - The associations to the repository being synchronized are made in
+          bulk.
+
+        This call is idempotent, in the same manner as save_unit. If the same
+        unit (by unit key) is present more than once in the given list, it is
+        only created once and each unit instance will have the same id.
+
+        The id field of each unit will be populated with the UUID for the unit.
+
+        @param units: unit objects returned from the init_unit call
+        @type  units: list of L{Unit}
+
+        @return: object references to the provided units, their state updated from the call
+        @rtype:  list of L{Unit}
+        """
+        try:
+            units_by_type = {}
+            for unit in units:
+                units_by_type.setdefault(unit.type_id, []).append(unit)
+
+            for type_id, type_units in units_by_type.items():
+                for unit_batch in paginate(type_units, SAVE_UNITS_BATCH_SIZE):
+                    self._save_units_of_type(type_id, unit_batch)
+
+            return units
+        except Exception, e:
+            _LOG.exception(_('Content unit association failed for [%(n)d] units') % {'n' : len(units)})
+            raise ImporterConduitException(e), None, sys.exc_info()[2]
+
+    def _save_units_of_type(self, type_id, units):
+        """
+        Creates or updates and associates the given units, all of which must
+        be of the given type.
+        """
+        content_query_manager = manager_factory.content_query_manager()
+        content_manager = manager_factory.content_manager()
+        association_manager = manager_factory.repo_unit_association_manager()
+
+        key_fields = units[0].unit_key.keys()
+
+        def _key(unit_key):
+            return tuple(unit_key.get(f) for f in key_fields)
+
+        # Resolve the units that already exist with a single query; the query
+        # may return units that were not asked for, which are simply ignored
+        unit_keys = [u.unit_key for u in units]
+        fields = ['_id'] + key_fields
+        existing_units = content_query_manager.get_multiple_units_by_keys_dicts(type_id, unit_keys, fields)
+        existing_ids = dict((_key(u), u['_id']) for u in existing_units)
+
+        new_units = []
+        new_units_by_key = {}
+        duplicate_units = []
+
+        for unit in units:
+            key = _key(unit.unit_key)
+            pulp_unit = common_utils.to_pulp_unit(unit)
+
+            if key in existing_ids:
+                unit.id = existing_ids[key]
+                content_manager.update_content_unit(type_id, unit.id, pulp_unit)
+                self._updated_count += 1
+            elif key in new_units_by_key:
+                duplicate_units.append((key, unit, pulp_unit))
+            else:
+                new_units_by_key[key] = unit
+                new_units.append((unit, pulp_unit))
+
+        if new_units:
+            unit_ids = content_manager.add_content_units(type_id, [p for u, p in new_units])
+            for (unit, pulp_unit), unit_id in zip(new_units, unit_ids):
+                unit.id = unit_id
+            self._added_count += len(new_units)
+
+        # Units repeated in the batch are saved as updates to the unit created
+        # for their first occurrence, the same as calling save_unit twice would
+        for key, unit, pulp_unit in duplicate_units:
+            unit.id = new_units_by_key[key].id
+            content_manager.update_content_unit(type_id, unit.id, pulp_unit)
+            self._updated_count += 1
+
+        # Associate them all with the repo
+        association_manager.associate_all_by_ids(self.repo_id, type_id, [u.id for u in units],
+                                                 self.association_owner_type, self.association_owner_id)
+
     def link_unit(self, from_unit, to_unit, bidirectional=False):
         """
         Creates a reference between two content units. The semantics of what
@@ -636,3 +778,28 @@ def do_get_repo_units(repo_id, criteria, exception_class):
         _LOG.exception('Exception from server requesting all content units for repository [%s]' % repo_id)
         raise exception_class(e), None, sys.exc_info()[2]
 
+def do_iter_repo_units(repo_id, criteria, exception_class, batch_size=UNIT_BATCH_SIZE):
+    """
+    Performs a repo unit association query, yielding the units as plugin
+    transfer objects as they are retrieved from the database instead of
+    assembling them into a list. This is split apart so we can have custom
+    mixins with different signatures.
+    """
+    try:
+        association_query_manager = manager_factory.repo_unit_association_query_manager()
+        units = association_query_manager.iter_units(repo_id, criteria=criteria, batch_size=batch_size)
+
+        # Type definitions are loaded as each type is first encountered so we
+        # don't hammer the database
+        type_defs = {}
+
+        # Convert to transfer object
+        for unit in units:
+            type_id = unit['unit_type_id']
+            if type_id not in type_defs:
+                type_defs[type_id] = types_db.type_definition(type_id)
+            yield common_utils.to_plugin_associated_unit(unit, type_defs[type_id])
+
+    except Exception, e:
+        _LOG.exception('Exception from server requesting all content units for repository [%s]' % repo_id)
+        raise exception_class(e), None, sys.exc_info()[2]
@@ -42,11 +42,12 @@ to users.
 from gettext import gettext as _
 import logging
 import sys
+import threading
 
 from   pulp.plugins.conduits.mixins import (\
     ImporterConduitException, AddUnitMixin, RepoScratchPadMixin,
     ImporterScratchPadMixin, SingleRepoUnitsMixin, StatusMixin,
-    SearchUnitsMixin)
+    SearchUnitsMixin, UNIT_BATCH_SIZE)
 from   pulp.plugins.model import SyncReport
 import pulp.server.managers.factory as manager_factory
 from   pulp.server.managers.repo.unit_association import OWNER_TYPE_IMPORTER
@@ -55,6 +56,9 @@ from   pulp.server.managers.repo.unit_association import OWNER_TYPE_IMPORTER
 
 _LOG = logging.getLogger(__name__)
 
+# Default number of units held by the save buffer before they are written
+SAVE_BUFFER_SIZE = 500
+
 # -- classes -----------------------------------------------------------------
 
 class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin,
@@ -83,9 +87,90 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
 
         self._removed_count = 0
 
+        self._save_buffer = None
+        self._save_buffer_size = 0
+        self._save_buffer_lock = threading.RLock()
+
     def __str__(self):
         return _('RepoSyncConduit for repository [%(r)s]') % {'r' : self.repo_id}
 
+    def enable_save_buffer(self, buffer_size=SAVE_BUFFER_SIZE):
+        """
+        Turns on write-behind buffering of save_unit calls. Once enabled, units
+        passed to save_unit are held by the conduit and written to the database
+        in batches (see save_units) when the buffer reaches buffer_size units,
+        when flush is called, when a report is built, and at the end of the
+        sync.
+
+        Because the write is deferred, the id field of a unit passed to
+        save_unit is not populated until the buffer is flushed. Calls on this
+        conduit that depend on unit ids or on the repository contents (such
+        as link_unit, remove_unit and get_units) flush the buffer first.
+
+        @param buffer_size: number of units to hold before writing them
+        @type  buffer_size: int
+        """
+        with self._save_buffer_lock:
+            self._save_buffer_size = buffer_size
+            if self._save_buffer is None:
+                self._save_buffer = []
+
+    def save_unit(self, unit):
+        """
+        See AddUnitMixin.save_unit. If the save buffer has been enabled through
+        enable_save_buffer, the unit is queued instead of being written
+        immediately and its id field will not be populated until the buffer
+        is flushed.
+
+        @param unit: unit object returned from the init_unit call
+        @type  unit: L{Unit}
+
+        @return: object reference to the provided unit
+        @rtype:  L{Unit}
+        """
+        if self._save_buffer is None:
+            return AddUnitMixin.save_unit(self, unit)
+
+        with self._save_buffer_lock:
+            self._save_buffer.append(unit)
+            if len(self._save_buffer) >= self._save_buffer_size:
+                self.flush()
+
+        return unit
+
+    def flush(self):
+        """
+        Writes any units held by the save buffer to the database. This call
+        has no effect if the save buffer is not enabled or is empty.
+
+        @raise ImporterConduitException: wraps any exception that may occur
+               in the Pulp server
+        """
+        with self._save_buffer_lock:
+            if not self._save_buffer:
+                return
+            units = self._save_buffer
+            self._save_buffer = []
+            self.save_units(units)
+
+    def link_unit(self, from_unit, to_unit, bidirectional=False):
+        self.flush()
+        return AddUnitMixin.link_unit(self, from_unit, to_unit, bidirectional=bidirectional)
+
+    link_unit.__doc__ = AddUnitMixin.link_unit.__doc__
+
+    def get_units(self, criteria=None):
+        self.flush()
+        return SingleRepoUnitsMixin.get_units(self, criteria=criteria)
+
+    get_units.__doc__ = SingleRepoUnitsMixin.get_units.__doc__
+
+    def iter_units(self, criteria=None, batch_size=UNIT_BATCH_SIZE):
+        self.flush()
+        return SingleRepoUnitsMixin.iter_units(self, criteria=criteria, batch_size=batch_size)
+
+    iter_units.__doc__ = SingleRepoUnitsMixin.iter_units.__doc__
+
     def remove_unit(self, unit):
         """
         Removes the association between the given content unit and the repository
@@ -109,6 +194,8 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @type  unit: L{Unit}
         """
 
+        self.flush()
+
         try:
             self._association_manager.unassociate_unit_by_id(self.repo_id, unit.type_id, unit.id, OWNER_TYPE_IMPORTER, self.association_owner_id)
             self._removed_count += 1
@@ -132,6 +219,7 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @param details: potentially longer log of the sync; may be None
         @type  details: any serializable
         """
+        self.flush()
         r = SyncReport(True, self._added_count, self._updated_count,
                        self._removed_count, summary, details)
         return r
@@ -157,6 +245,7 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @param details: potentially longer log of the sync; may be None
         @type  details: any serializable
         """
+        self.flush()
         r = SyncReport(False, self._added_count, self._updated_count,
                        self._removed_count, summary, details)
         return r
@@ -181,6 +270,7 @@ class RepoSyncConduit(RepoScratchPadMixin, ImporterScratchPadMixin, AddUnitMixin
         @param details: potentially longer log of the sync; may be None
         @type  details: any serializable
         """
+        self.flush()
         r = SyncReport(False, self._added_count, self._updated_count,
                        self._removed_count, summary, details)
         r.canceled_flag = True
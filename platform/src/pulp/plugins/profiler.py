@@ -117,6 +117,15 @@ class Profiler(object):
         * types - List of all content type IDs that may be processed using this
                   profiler.
 
+        The following key is optional:
+
+        * cache_applicability - If true, the applicability reports returned by
+               find_applicable_units as a dictionary keyed by consumer id are
+               cached and shared by every consumer with identical profiles bound
+               to the same repositories, so the profiler is only called for one
+               of them. Only set this if the reports for a consumer depend on
+               nothing but its profiles and repo ids. Defaults to false.
+
         This method call may be made multiple times during the course of a
         running Pulp server and thus should not be used for initialization
         purposes.
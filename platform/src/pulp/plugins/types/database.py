@@ -17,7 +17,9 @@ This module covers both the ContentType collection itself as well as any
 type-specific collections that exist to suit the type needs.
 """
 
+import copy
 import logging
+import threading
 
 from pymongo import ASCENDING
 
@@ -30,6 +32,169 @@ TYPE_COLLECTION_PREFIX = 'units_'
 
 LOG = logging.getLogger('db')
 
+# -- type definition cache ----------------------------------------------------
+
+class TypeDefinitionCache(object):
+    """
+    In-process cache of the content type definitions along with the unit key
+    and units collection for each type. Type definitions only change when
+    plugins are installed, so rather than querying the content types collection
+    on every lookup, all definitions are loaded with a single query and served
+    from memory until the cache is invalidated.
+
+    The cache is versioned: each invalidation increments the version and a
+    load that started before an invalidation is discarded rather than
+    installed, so a concurrent update is never masked by a stale load.
+
+    Lookups for a type that is not cached query the database for that type
+    alone, so types added by another process are still found without
+    reloading every definition.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = 0
+        self.database = None
+        self.definitions = None
+        self.unit_keys = {}
+        self.collections = {}
+
+    def invalidate(self):
+        """
+        Discard all cached definitions, unit keys and collections.
+        """
+        self.lock.acquire()
+        try:
+            self.version += 1
+            self.definitions = None
+            self.unit_keys = {}
+            self.collections = {}
+        finally:
+            self.lock.release()
+
+    def all_definitions(self):
+        """
+        @return: all cached type definitions keyed by type ID; these must not be
+                 modified by the caller
+        @rtype:  dict
+        """
+        definitions = self.definitions
+        if definitions is None or self.database is not pulp_db.get_database():
+            definitions = self._load()
+        return definitions
+
+    def definition(self, type_id):
+        """
+        @param type_id: unique type id
+        @type  type_id: str
+
+        @return: the cached type definition, None if not found; this must not be
+                 modified by the caller
+        @rtype:  SON or None
+        """
+        definitions = self.definitions
+        if definitions is None or self.database is not pulp_db.get_database():
+            return self._load().get(type_id)
+        definition = definitions.get(type_id)
+        if definition is None:
+            # the type may have been added by another process
+            version = self.version
+            definition = ContentType.get_collection().find_one({'id': type_id})
+            if definition is not None:
+                self._add(definition, version, definitions)
+        return definition
+
+    def unit_key(self, type_id):
+        """
+        @param type_id: unique type id
+        @type  type_id: str
+
+        @return: the unit key of the type, None if the type is not found
+        @rtype:  tuple or None
+        """
+        unit_key = self.unit_keys.get(type_id)
+        if unit_key is None or self.database is not pulp_db.get_database():
+            version = self.version
+            definition = self.definition(type_id)
+            if definition is None:
+                return None
+            unit_key = tuple(definition['unit_key'])
+            self.lock.acquire()
+            try:
+                if version == self.version:
+                    self.unit_keys[type_id] = unit_key
+            finally:
+                self.lock.release()
+        return unit_key
+
+    def collection(self, type_id):
+        """
+        @param type_id: unique type id
+        @type  type_id: str
+
+        @return: database collection holding units of the given type
+        @rtype:  L{pymongo.collection.Collection}
+        """
+        database = pulp_db.get_database()
+        collection = self.collections.get(type_id)
+        if collection is None or collection.database is not database:
+            collection = pulp_db.get_collection(unit_collection_name(type_id), create=False)
+            self.collections[type_id] = collection
+        return collection
+
+    def _load(self):
+        """
+        Load all of the type definitions from the database.
+        The result is only installed if the cache has not been invalidated
+        while loading.
+
+        @return: all type definitions keyed by type ID
+        @rtype:  dict
+        """
+        version = self.version
+        database = pulp_db.get_database()
+        collection = ContentType.get_collection()
+        definitions = dict((d['id'], d) for d in collection.find())
+        self.lock.acquire()
+        try:
+            if version == self.version:
+                if database is not self.database:
+                    self.unit_keys = {}
+                    self.collections = {}
+                    self.database = database
+                self.definitions = definitions
+        finally:
+            self.lock.release()
+        return definitions
+
+    def _add(self, definition, version, definitions):
+        """
+        Add a type definition loaded on its own to the cached definitions.
+        It is only added if the cache has not been invalidated or reloaded
+        since the given definitions were read.
+
+        @param definition: type definition loaded from the database
+        @type  definition: SON
+
+        @param version: value of self.version before the definition was loaded
+        @type  version: int
+
+        @param definitions: cached definitions the definition was missing from
+        @type  definitions: dict
+        """
+        self.lock.acquire()
+        try:
+            if version == self.version and definitions is self.definitions:
+                # replaced rather than modified, as callers may be iterating it
+                definitions = dict(definitions)
+                definitions[definition['id']] = definition
+                self.definitions = definitions
+        finally:
+            self.lock.release()
+
+
+_CACHE = TypeDefinitionCache()
+
 # -- database exceptions ------------------------------------------------------
 
 class UpdateFailed(Exception):
@@ -127,6 +292,8 @@ def update_database(definitions, error_on_missing_definitions=False):
             error_defs.append(type_def)
             continue
 
+    _CACHE.invalidate()
+
     if len(error_defs) > 0:
         raise UpdateFailed(error_defs)
 
@@ -152,6 +319,8 @@ def clean():
     type_collection = ContentType.get_collection()
     type_collection.remove(safe=True)
 
+    _CACHE.invalidate()
+
 
 def type_units_collection(type_id):
     """
@@ -163,9 +332,7 @@ def type_units_collection(type_id):
     @return: database collection holding units of the given type
     @rtype:  L{pymongo.collection.Collection}
     """
-    collection_name = unit_collection_name(type_id)
-    collection = pulp_db.get_collection(collection_name, create=False)
-    return collection
+    return _CACHE.collection(type_id)
 
 
 def all_type_ids():
@@ -175,11 +342,7 @@ def all_type_ids():
     @rtype:  list of str
     """
 
-    collection = ContentType.get_collection()
-    type_id_son = list(collection.find(fields={'id' : 1}))
-    type_ids = [t['id'] for t in type_id_son]
-
-    return type_ids
+    return _CACHE.all_definitions().keys()
 
 
 def all_type_collection_names():
@@ -188,14 +351,7 @@ def all_type_collection_names():
     @rtype:  list of str
     """
 
-    collection = ContentType.get_collection()
-    type_ids = list(collection.find(fields={'id' : 1}))
-
-    type_collection_names = []
-    for id in type_ids:
-        type_collection_names.append(unit_collection_name(id['id']))
-
-    return type_collection_names
+    return [unit_collection_name(type_id) for type_id in all_type_ids()]
 
 
 def all_type_definitions():
@@ -204,9 +360,7 @@ def all_type_definitions():
     @rtype:  list of dict
     """
 
-    coll = ContentType.get_collection()
-    types = list(coll.find())
-    return types
+    return copy.deepcopy(_CACHE.all_definitions().values())
 
 
 def type_definition(type_id):
@@ -217,9 +371,7 @@ def type_definition(type_id):
     @return: corresponding type definition, None if not found
     @rtype: SON or None
     """
-    collection = ContentType.get_collection()
-    type_ = collection.find_one({'id': type_id})
-    return type_
+    return copy.deepcopy(_CACHE.definition(type_id))
 
 
 def unit_collection_name(type_id):
@@ -246,11 +398,10 @@ def type_units_unit_key(type_id):
              content type collection
     @rtype: list of str or None
     """
-    collection = ContentType.get_collection()
-    type_def = collection.find_one({'id': type_id})
-    if type_def is None:
+    unit_key = _CACHE.unit_key(type_id)
+    if unit_key is None:
         return None
-    return type_def['unit_key']
+    return list(unit_key)
 
 # -- private -----------------------------------------------------------------
 
@@ -273,6 +424,7 @@ def _create_or_update_type(type_def):
         content_type._id = existing_type['_id']
     # XXX this still causes a potential race condition when 2 users are updating the same type
     content_type_collection.save(content_type, safe=True)
+    _CACHE.invalidate()
 
 def _update_indexes(type_def, unique):
 
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Cache of credential verification results, so that a client repeating the same
+credentials on every request doesn't pay for hashing its password or verifying
+its certificate each time.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+from pulp.server.config import config
+
+
+class CredentialCache(object):
+    """
+    Caches the identities that successfully verified credentials, such as a
+    username and password or a certificate, belong to. Failed verifications
+    are never cached.
+
+    Entries are keyed by an HMAC-SHA256 digest of the credential under a key
+    generated for this process, so the credentials themselves are not kept in
+    memory. An entry expires after the auth_cache_lifetime configured in the
+    security section and the cache holds at most auth_cache_size entries;
+    when full, expired entries are discarded first and then those closest to
+    expiring. A lifetime or size of 0 disables the cache.
+
+    Each entry records the owner of the identity, such as ('user', login), so
+    that updating or deleting the user invalidates its entries. Changes made
+    by other processes take effect once the entries expire.
+
+    The cache is versioned: a credential whose verification started before an
+    invalidation is not cached, so a concurrent update is never masked.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.secret = os.urandom(32)
+        self.version = 0
+        self.entries = {} # digest -> (identity, owner, expiration)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def digest(self, *credential):
+        """
+        @param credential: parts of the credential, such as the kind of
+                           credential, username and password; each is a
+                           string or None
+        @return: key of the credential in the cache
+        @rtype:  str
+        """
+        # Length prefix each part so no two credentials share a message
+        message = []
+        for part in credential:
+            if part is None:
+                message.append('-')
+                continue
+            if isinstance(part, unicode):
+                part = part.encode('utf-8')
+            message.append('%d:%s' % (len(part), part))
+        return hmac.new(self.secret, ''.join(message), hashlib.sha256).hexdigest()
+
+    def get(self, key):
+        """
+        @param key: key returned by digest()
+        @type  key: str
+
+        @return: the identity the credential was verified for; None if it is
+                 not cached or has expired
+        """
+        if not self._enabled():
+            return None
+
+        self.lock.acquire()
+        try:
+            entry = self.entries.get(key)
+            if entry is None or entry[2] <= time.time():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+        finally:
+            self.lock.release()
+
+    def put(self, key, identity, owner, version):
+        """
+        Cache the identity a credential was successfully verified for.
+
+        @param key: key returned by digest()
+        @type  key: str
+
+        @param identity: result of the verification; may not be None
+
+        @param owner: identifies whose credential this is, for invalidation
+        @type  owner: tuple
+
+        @param version: value of self.version read before the credential was
+                        verified; the identity is not cached if the cache has
+                        been invalidated since
+        @type  version: int
+        """
+        if not self._enabled():
+            return
+
+        lifetime = config.getfloat('security', 'auth_cache_lifetime')
+        size = config.getint('security', 'auth_cache_size')
+
+        self.lock.acquire()
+        try:
+            if version != self.version:
+                return
+            now = time.time()
+            self.entries[key] = (identity, owner, now + lifetime)
+            if len(self.entries) > size:
+                self._evict(size, now)
+        finally:
+            self.lock.release()
+
+    def invalidate(self, owner=None):
+        """
+        Discards cached entries.
+
+        @param owner: owner whose entries are discarded; None to discard all
+        @type  owner: tuple
+        """
+        self.lock.acquire()
+        try:
+            self.version += 1
+            self.invalidations += 1
+            if owner is None:
+                self.entries.clear()
+                return
+            for key, entry in self.entries.items():
+                if entry[1] == owner:
+                    del self.entries[key]
+        finally:
+            self.lock.release()
+
+    def statistics(self):
+        """
+        @return: number of cached entries, the configured size and lifetime,
+                 counts of hits, misses, evictions and invalidations, and the
+                 fraction of lookups that were hits
+        @rtype:  dict
+        """
+        self.lock.acquire()
+        try:
+            lookups = self.hits + self.misses
+            return {
+                'size' : len(self.entries),
+                'max_size' : config.getint('security', 'auth_cache_size'),
+                'lifetime' : config.getfloat('security', 'auth_cache_lifetime'),
+                'hits' : self.hits,
+                'misses' : self.misses,
+                'hit_rate' : lookups and float(self.hits) / lookups or 0.0,
+                'evictions' : self.evictions,
+                'invalidations' : self.invalidations,
+            }
+        finally:
+            self.lock.release()
+
+    def _evict(self, size, now):
+        expired = [k for k, entry in self.entries.items() if entry[2] <= now]
+        for key in expired:
+            del self.entries[key]
+        excess = len(self.entries) - size
+        if excess > 0:
+            by_expiration = sorted(self.entries.items(), key=lambda item: item[1][2])
+            for key, entry in by_expiration[:excess]:
+                del self.entries[key]
+            self.evictions += excess
+
+    def _enabled(self):
+        return (config.getfloat('security', 'auth_cache_lifetime') > 0 and
+                config.getint('security', 'auth_cache_size') > 0)
+
+
+CREDENTIAL_CACHE = CredentialCache()
@@ -45,6 +45,14 @@ _default_values = {
         'port': '25',
         'enabled' : 'false'
     },
+    'notifications': {
+        'delivery_threads': '4',
+        'queue_size': '1000',
+        'retries': '3',
+        'retry_delay': '1',
+        'listener_cache_lifetime': '30',
+        'endpoint_idle_timeout': '300',
+    },
     'oauth': {
         'enabled': 'false',
     },
@@ -79,6 +87,8 @@ _default_values = {
         'user_cert_expiration': '7',
         'consumer_cert_expiration': '3650',
         'serial_number_path': '/var/lib/pulp/sn.dat',
+        'auth_cache_size': '1000',
+        'auth_cache_lifetime': '60',
     },
     'server': {
         'server_name': socket.gethostname(),
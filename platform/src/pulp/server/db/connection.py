@@ -164,9 +164,10 @@ class PulpCollection(Collection):
         """
         cursor = self.find(criteria.spec, fields=criteria.fields)
 
-        if criteria.sort is not None:
-            for entry in criteria.sort:
-                cursor.sort(*entry)
+        # Each call to sort replaces the previous one, so the fields must all
+        # be passed in a single call
+        if criteria.sort:
+            cursor.sort(list(criteria.sort))
 
         if criteria.skip is not None:
             cursor.skip(criteria.skip)
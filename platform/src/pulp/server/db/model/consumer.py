@@ -13,11 +13,10 @@
 
 from copy import deepcopy
 import datetime
-import hashlib
-import json
 
 from pulp.server.db.model.base import Model
 from pulp.common import dateutils
+from pulp.common import profile as profile_utils
 
 # -- classes -----------------------------------------------------------------
 
@@ -203,10 +202,42 @@ class UnitProfile(Model):
         :return:        Hash of profile
         :rtype:         basestring
         """
-        # Don't use any whitespace in the json separators, and sort dictionary keys to be repeatable
-        serialized_profile = json.dumps(profile, separators=(',', ':'), sort_keys=True)
-        hasher = hashlib.sha256(serialized_profile)
-        return hasher.hexdigest()
+        return profile_utils.calculate_hash(profile)
+
+
+class ApplicabilityCacheEntry(Model):
+    """
+    Caches the applicability reports returned by a profiler for a consumer. Consumers with
+    identical profiles that are bound to the same repositories share an entry. The key is
+    a digest of the profile hashes, the ID and content revision of each bound repository,
+    the unit type and the criteria and configuration the reports were determined with.
+
+    :ivar  key:            Uniquely identifies the entry.
+    :itype key:            basestring
+    :ivar  profile_hashes: The hashes of the profiles the reports were determined for.
+    :itype profile_hashes: list
+    :ivar  repo_ids:       The IDs of the repositories the reports were determined for.
+    :itype repo_ids:       list
+    :ivar  repo_revisions: A '<repo_id>:<content_revision>' string for each repository.
+    :itype repo_revisions: list
+    :ivar  unit_type_id:   The unit type ID.
+    :itype unit_type_id:   str
+    :ivar  reports:        The JSON encoded list of (summary, details) of each report.
+    :itype reports:        basestring
+    """
+
+    collection_name = 'consumer_applicability_cache'
+    unique_indices = ('key',)
+    search_indices = ('profile_hashes', 'repo_ids')
+
+    def __init__(self, key, profile_hashes, repo_ids, repo_revisions, unit_type_id, reports):
+        super(ApplicabilityCacheEntry, self).__init__()
+        self.key = key
+        self.profile_hashes = profile_hashes
+        self.repo_ids = repo_ids
+        self.repo_revisions = repo_revisions
+        self.unit_type_id = unit_type_id
+        self.reports = reports
 
 
 class ConsumerHistoryEvent(Model):
@@ -45,6 +45,11 @@ class Repo(Model):
                               unit may be associated multiple times.
     @type content_unit_count: int
 
+    @ivar content_revision: incremented each time units are associated with or
+                            unassociated from the repo, or the metadata of an
+                            associated unit is updated
+    @type content_revision: int
+
     @ivar metadata: arbitrary data that describes the contents of the repo;
                     the values may change as the contents of the repo change,
                     either set by the user or by an importer or distributor
@@ -63,6 +68,7 @@ class Repo(Model):
         self.notes = notes or {}
         self.scratchpad = {} # default to dict in hopes the plugins will just add/remove from it
         self.content_unit_counts = content_unit_counts or {}
+        self.content_revision = 0
 
         # Timeline
         # TODO: figure out how to track repo modified states
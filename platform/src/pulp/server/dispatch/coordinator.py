@@ -14,7 +14,6 @@
 import copy
 import datetime
 import logging
-import time
 import types
 import uuid
 from gettext import gettext as _
@@ -28,11 +27,14 @@ from pulp.server.dispatch import factory as dispatch_factory
 from pulp.server.dispatch.call import CallRequest
 from pulp.server.dispatch.task import AsyncTask, Task
 from pulp.server.exceptions import OperationTimedOut
-from pulp.server.util import subdict, TopologicalSortError, topological_sort
+from pulp.server.util import paginate, subdict, TopologicalSortError, topological_sort
 
 
 _LOG = logging.getLogger(__name__)
 
+# maximum number of resource ids to look up in a single call resource query
+RESOURCE_LOCK_QUERY_BATCH_SIZE = 1000
+
 _VALID_SEARCH_CRITERIA = frozenset(('call_request_id', 'call_request_group_id',
                                     'call_request_id_list', 'schedule_id',
                                     'state', 'callable_name', 'args', 'kwargs',
@@ -45,7 +47,8 @@ class Coordinator(object):
     """
     Coordinator class that runs call requests in the task queue and detects and
     resolves conflicting operations on resources.
-    @ivar task_state_poll_interval: sleep interval to use while polling a "synchronous" task
+    @ivar task_state_poll_interval: maximum interval between state checks while
+                                    waiting on a "synchronous" task
     @type task_state_poll_interval: float
     """
 
@@ -73,24 +76,36 @@ class Coordinator(object):
                                     [CallRequest.deserialize(q['serialized_call_request']) for q in queued_call_list]
                                     if c is not None]
 
-        while queued_call_request_list:
-            call_request = queued_call_request_list[0]
+        # gather grouped calls in a single pass; each group is run at the
+        # position of its first queued call
+        call_request_groups = {}
+        ordered_call_requests = []
 
-            # individually call un-grouped calls
+        for call_request in queued_call_request_list:
             if call_request.group_id is None:
-                queued_call_request_list.remove(call_request)
+                ordered_call_requests.append(call_request)
+                continue
+            if call_request.group_id not in call_request_groups:
+                call_request_groups[call_request.group_id] = []
+                ordered_call_requests.append(call_request_groups[call_request.group_id])
+            call_request_groups[call_request.group_id].append(call_request)
+
+        for call_request in ordered_call_requests:
+
+            # individually call un-grouped calls
+            if not isinstance(call_request, list):
                 self.execute_call_asynchronously(call_request)
                 continue
 
             # call grouped calls at all at once
-            call_request_group = [c for c in queued_call_request_list if c.group_id == call_request.group_id]
-            map(queued_call_request_list.remove, call_request_group)
+            call_request_group = call_request
+            group_id = call_request_group[0].group_id
 
             try:
                 # NOTE (jconnor 2012-10-12) this will change the group_id, but I don't think I care
                 self.execute_multiple_calls(call_request_group)
             except TopologicalSortError, e:
-                log_msg = _('Cannot execute call request group: %(g)s' % {'g': call_request.group_id})
+                log_msg = _('Cannot execute call request group: %(g)s' % {'g': group_id})
                 _LOG.warn('\n'.join((log_msg, str(e))))
 
     # execution methods --------------------------------------------------------
@@ -218,8 +233,12 @@ class Coordinator(object):
         call_resource_list = []
 
         try:
+            # look up the queued calls' resources for the whole batch at once
+            lock_table = ResourceLockTable(self.call_resource_collection)
+            lock_table.load([task.call_request.resources for task in task_list])
+
             for task in task_list:
-                response, blocking, reasons, call_resources = self._find_conflicts(task.call_request.resources)
+                response, blocking, reasons, call_resources = self._find_conflicts(task.call_request.resources, lock_table)
                 task.call_report.response = response
                 task.call_report.reasons = reasons
 
@@ -246,8 +265,7 @@ class Coordinator(object):
                 map(lambda t: setattr(t.call_report, 'response', dispatch_constants.CALL_REJECTED_RESPONSE), task_list)
                 return
 
-            if call_resource_list:
-                self.call_resource_collection.insert(call_resource_list, safe=True)
+            lock_table.add(call_resource_list)
 
             for task in task_list:
                 task_queue.enqueue(task)
@@ -318,7 +336,7 @@ class Coordinator(object):
         sorted_task_list = [call_request_map[id] for id in sorted_call_request_ids]
         return sorted_task_list
 
-    def _find_conflicts(self, resources):
+    def _find_conflicts(self, resources, lock_table=None):
         """
         Find conflicting tasks, if any, and provide the following:
         * a task response, (accepted, postponed, rejected)
@@ -328,32 +346,31 @@ class Coordinator(object):
 
         @param resources: dictionary of resources and their proposed operations
         @type  resources: dict
+        @param lock_table: table already loaded with the queued calls' use of
+                           the resources; if None, one is loaded
+        @type  lock_table: L{ResourceLockTable} instance or None
         @return: tuple of objects described above
         @rtype:  tuple
         """
         if not resources:
             return dispatch_constants.CALL_ACCEPTED_RESPONSE, set(), [], []
 
+        if lock_table is None:
+            lock_table = ResourceLockTable(self.call_resource_collection)
+            lock_table.load([resources])
+
         # Translate to the old format of resources with resource type and resource_id as a key
         # to make operation lookups easy in the conflict detection logic
-        original_resources = resources
-        resources = {}
-        for operation, resource_dict in original_resources.items():
-            for resource_type, resource_ids in resource_dict.items():
-                for resource_id in resource_ids:
-                    resources.setdefault(resource_type, {}).update({resource_id: operation})
+        resources = flatten_resources(resources)
 
         postponing_call_requests = set()
         postponing_reasons = []
         rejecting_call_requests = set()
         rejecting_reasons = []
 
-        call_resource_collection = CallResource.get_collection()
         call_resources = resource_dict_to_call_resources(resources)
-        or_query = filter_dicts(call_resources, ('resource_type', 'resource_id'))
-        cursor = call_resource_collection.find({'$or': or_query})
 
-        for call_resource in cursor:
+        for call_resource in lock_table.find(resources):
             proposed_operation = resources[call_resource['resource_type']][call_resource['resource_id']]
             queued_operation = call_resource['operation']
 
@@ -439,7 +456,24 @@ class Coordinator(object):
         tasks = []
         task_queue = dispatch_factory._task_queue()
 
-        for task in task_queue.all_tasks():
+        # use the task queue's indexes to narrow down the candidate tasks
+        # before falling back to checking every task in the queue
+        if 'call_request_id' in criteria:
+            candidate_tasks = [task_queue.get(criteria['call_request_id'])]
+        elif 'call_request_id_list' in criteria:
+            call_request_ids = []
+            for call_request_id in criteria['call_request_id_list']:
+                if call_request_id not in call_request_ids:
+                    call_request_ids.append(call_request_id)
+            candidate_tasks = [task_queue.get(i) for i in call_request_ids]
+        elif criteria.get('tags'):
+            candidate_tasks = task_queue.find(*criteria['tags'])
+        else:
+            candidate_tasks = task_queue.all_tasks()
+
+        for task in candidate_tasks:
+            if task is None:
+                continue
             if task_matches_criteria(task, criteria):
                 tasks.append(task)
 
@@ -540,8 +574,95 @@ class Coordinator(object):
             return
         task_list[0].call_report.progress = progress
 
+# resource lock table ----------------------------------------------------------
+
+class ResourceLockTable(object):
+    """
+    In-memory mirror of the call resources held by queued calls. The table is
+    loaded with a single pass over the database for all of the resources used
+    by a batch of tasks, so that each task's conflicts can be found without
+    another query, and new call resources are written through to the database
+    in bulk.
+
+    The table is a snapshot: it is meant to be used for a single batch of
+    tasks while the task queue is locked, not kept around.
+
+    @ivar collection: call resource collection the table mirrors
+    @type collection: pymongo.collection.Collection
+    """
+
+    def __init__(self, collection=None):
+        self.collection = collection or CallResource.get_collection()
+        self.__locks = {} # (resource type, resource id): list of call resources
+
+    def load(self, resources_list):
+        """
+        Load the call resources for all of the given resources.
+        @param resources_list: list of resources dictionaries, in the call
+                               request format of {operation: {resource type: [resource ids]}}
+        @type  resources_list: list of dict
+        """
+        resource_ids_by_type = {}
+        for resources in resources_list:
+            for resource_type, operations in flatten_resources(resources or {}).items():
+                resource_ids_by_type.setdefault(resource_type, set()).update(operations)
+
+        for resource_type, resource_ids in resource_ids_by_type.items():
+            for resource_id_batch in paginate(resource_ids, RESOURCE_LOCK_QUERY_BATCH_SIZE):
+                spec = {'resource_type': resource_type, 'resource_id': {'$in': resource_id_batch}}
+                for call_resource in self.collection.find(spec):
+                    self._add(call_resource)
+
+    def find(self, resources):
+        """
+        Find the loaded call resources for the given resources.
+        @param resources: dict in the form of {resource_type: {resource_id: operation}}
+        @type  resources: dict
+        @return: list of call resources
+        @rtype:  list
+        """
+        call_resources = []
+        for resource_type, operations in resources.items():
+            for resource_id in operations:
+                call_resources.extend(self.__locks.get((resource_type, resource_id), ()))
+        return call_resources
+
+    def add(self, call_resources):
+        """
+        Add new call resources to the table and the database.
+        @param call_resources: call resources to add
+        @type  call_resources: list of L{CallResource} instances
+        """
+        if not call_resources:
+            return
+        self.collection.insert(call_resources, safe=True)
+        for call_resource in call_resources:
+            self._add(call_resource)
+
+    def _add(self, call_resource):
+        key = (call_resource['resource_type'], call_resource['resource_id'])
+        self.__locks.setdefault(key, []).append(call_resource)
+
 # conflict detection utility functions -----------------------------------------
 
+def flatten_resources(resources):
+    """
+    Translate a call request's resources from the form of
+    {operation: {resource_type: [resource_ids]}} to the form of
+    {resource_type: {resource_id: operation}}.
+    @param resources: call request resources
+    @type  resources: dict
+    @return: resources keyed by type and id
+    @rtype:  dict
+    """
+    flattened = {}
+    for operation, resource_dict in resources.items():
+        for resource_type, resource_ids in resource_dict.items():
+            for resource_id in resource_ids:
+                flattened.setdefault(resource_type, {})[resource_id] = operation
+    return flattened
+
+
 def filter_dicts(dicts, fields):
     """
     Filter an iterable a dicts, returning dicts that only have the keys and
@@ -627,9 +748,11 @@ def wait_for_task(task, states, poll_interval=0.5, timeout=None):
     @type  task: L{Task}
     @param states: set of valid states
     @type  states: list or tuple
-    @param poll_interval: time, in seconds, to wait in between polling the task
+    @param poll_interval: maximum time, in seconds, to wait before re-checking
+                          the task's state; the task wakes its waiters up as
+                          soon as its state changes
     @type  poll_interval: float or int
-    @param timeout: maximum amount of time to poll task, None means indefinitely
+    @param timeout: maximum amount of time to wait for the task, None means indefinitely
     @type  timeout: None or datetime.timedelta
     """
     assert isinstance(task, Task)
@@ -637,14 +760,11 @@ def wait_for_task(task, states, poll_interval=0.5, timeout=None):
     assert isinstance(poll_interval, (float, int))
     assert isinstance(timeout, (datetime.timedelta, types.NoneType))
 
-    start = datetime.datetime.now()
-    while task.call_report.state not in states:
-        time.sleep(poll_interval)
-        if timeout is None:
-            continue
-        now = datetime.datetime.now()
-        if now - start < timeout:
-            continue
+    timeout_seconds = None
+    if timeout is not None:
+        timeout_seconds = timeout.days * 86400 + timeout.seconds + timeout.microseconds / 1000000.0
+
+    if not task.wait_for_state(states, timeout=timeout_seconds, poll_interval=poll_interval):
         raise OperationTimedOut(timeout)
 
 # query utility functions ------------------------------------------------------
@@ -16,6 +16,7 @@ import datetime
 import logging
 import sys
 import threading
+import time
 import types
 from gettext import gettext as _
 
@@ -47,6 +48,8 @@ class Task(object):
     @type queued_call_id: str
     @ivar complete_callback: task queue callback called on completion
     @type complete_callback: callable or None
+    @ivar state_condition: condition notified whenever the task changes state
+    @type state_condition: threading.Condition
     @ivar progress_callback: call request progress callback called to report execution progress
     @type progress_callback: callable or None
     """
@@ -60,6 +63,10 @@ class Task(object):
         self.call_report = call_report or call.CallReport.from_call_request(call_request)
         self.call_report.state = dispatch_constants.CALL_WAITING_STATE
 
+        # notified on every state transition so callers can wait on the task
+        # instead of polling its call report
+        self.state_condition = threading.Condition(threading.Lock())
+
         self.call_request_exit_state = None
         self.queued_call_id = None
         self.complete_callback = None
@@ -86,6 +93,54 @@ class Task(object):
     def _clear_cancel_control_hook(self):
         self.call_request.remove_control_hook(dispatch_constants.CALL_CANCEL_CONTROL_HOOK)
 
+    # task state ---------------------------------------------------------------
+
+    def _set_state(self, state):
+        """
+        Set the state of the task's call report and wake up anyone waiting on
+        the task.
+        @param state: new call state
+        @type  state: str
+        """
+        self.state_condition.acquire()
+        try:
+            self.call_report.state = state
+            self.state_condition.notifyAll()
+        finally:
+            self.state_condition.release()
+
+    def wait_for_state(self, states, timeout=None, poll_interval=None):
+        """
+        Block until the task's call report is in one of the given states.
+        @param states: set of valid states
+        @type  states: list or tuple
+        @param timeout: maximum amount of time, in seconds, to wait; None means indefinitely
+        @type  timeout: None or float
+        @param poll_interval: if given, the state is re-checked at least this
+                              often, in seconds, even without a notification
+        @type  poll_interval: None or float
+        @return: True if the task reached one of the states, False if the timeout expired
+        @rtype:  bool
+        """
+        deadline = None
+        if timeout is not None:
+            deadline = time.time() + timeout
+
+        self.state_condition.acquire()
+        try:
+            while self.call_report.state not in states:
+                wait_time = poll_interval
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    if wait_time is None or remaining < wait_time:
+                        wait_time = remaining
+                self.state_condition.wait(wait_time)
+            return True
+        finally:
+            self.state_condition.release()
+
     # task lifecycle -----------------------------------------------------------
 
     def skip(self):
@@ -104,7 +159,7 @@ class Task(object):
 
         # NOTE using run wrapper so that state transition is protected by the
         # task queue lock and doesn't occur in another thread
-        self.call_report.state = dispatch_constants.CALL_RUNNING_STATE
+        self._set_state(dispatch_constants.CALL_RUNNING_STATE)
 
         task_thread = threading.Thread(target=self._run)
         task_thread.start()
@@ -124,7 +179,7 @@ class Task(object):
 
         # generally set in the wrapper, but not when called directly
         if self.call_report.state in dispatch_constants.CALL_READY_STATES:
-            self.call_report.state = dispatch_constants.CALL_RUNNING_STATE
+            self._set_state(dispatch_constants.CALL_RUNNING_STATE)
 
         self.call_report.start_time = datetime.datetime.now(dateutils.utc_tz())
 
@@ -194,7 +249,7 @@ class Task(object):
         self._call_complete_callback()
 
         # don't set the state to complete in the report until the task is actually complete
-        self.call_report.state = state
+        self._set_state(state)
 
         self.call_life_cycle_callbacks(dispatch_constants.CALL_COMPLETE_LIFE_CYCLE_CALLBACK)
         if not self.call_request.archive:
@@ -304,7 +359,7 @@ class AsyncTask(Task):
 
         # usually set in the wrapper, unless called directly
         if self.call_report.state in dispatch_constants.CALL_READY_STATES:
-            self.call_report.state = dispatch_constants.CALL_RUNNING_STATE
+            self._set_state(dispatch_constants.CALL_RUNNING_STATE)
 
         self.call_report.start_time = datetime.datetime.now(dateutils.utc_tz())
 
@@ -36,7 +36,9 @@ class TaskQueue(object):
 
     @ivar concurrency_threshold: measurement of total allowed concurrency
     @type concurrency_threshold: int
-    @ivar dispatch_interval: time, in seconds, between checks for ready tasks
+    @ivar dispatch_interval: no longer used; the dispatcher is woken up as
+                             soon as tasks are enqueued, unblocked or completed
+                             instead of checking for ready tasks periodically
     @type dispatch_interval: float
     @ivar completed_task_cache_life: time, in seconds, to cache completed tasks
     @type completed_task_cache_life: float
@@ -53,12 +55,23 @@ class TaskQueue(object):
 
         self.queued_call_collection = QueuedCall.get_collection()
 
-        self.__waiting_tasks = []
         self.__running_tasks = []
         self.__completed_tasks = []
 
+        # secondary indexes over the tasks in the lists above
+        self.__task_index = {} # call request id: task
+        self.__task_sequence = {} # call request id: order in which it was enqueued
+        self.__task_tags = {} # call request id: tags the task was indexed under
+        self.__tag_index = {} # tag: set of call request ids
+        self.__blocked_index = {} # call request id: set of call request ids it blocks
+        self.__waiting_task_ids = set()
+        self.__ready_task_ids = set() # waiting tasks that are not blocked
+        self.__incomplete_task_ids = set()
+        self.__sequence_counter = itertools.count()
+
         self.__running_weight = 0
         self.__exit = False
+        self.__dispatch_pending = True
 
         self.__lock = threading.RLock()
         self.__condition = threading.Condition(self.__lock)
@@ -73,7 +86,11 @@ class TaskQueue(object):
         self.__lock.acquire()
         while True:
             try:
-                self.__condition.wait(timeout=self.dispatch_interval)
+                # sleep until notified that there is work to do, or until the
+                # next cached completed task expires
+                if not self.__dispatch_pending:
+                    self.__condition.wait(timeout=self._dispatch_timeout())
+                self.__dispatch_pending = False
                 if self.__exit:
                     if self.__lock is not None:
                         self.__lock.release()
@@ -86,18 +103,51 @@ class TaskQueue(object):
                 msg = _('Exception in task queue dispatcher thread:\n%(e)s')
                 _LOG.critical(msg % {'e': traceback.format_exception(*sys.exc_info())})
 
+    def _notify_dispatcher(self):
+        """
+        Wake up the dispatcher thread to check for ready tasks
+        """
+        self.__lock.acquire()
+        try:
+            self.__dispatch_pending = True
+            self.__condition.notify()
+        finally:
+            self.__lock.release()
+
+    def _dispatch_timeout(self):
+        """
+        Determine how long the dispatcher can sleep before it has to check the
+        queue without being notified. Waiting tasks can only become ready when
+        the dispatcher is notified, so only the expiration of cached completed
+        tasks is considered.
+        @return: time, in seconds, or None if only a notification can create work
+        @rtype:  float or None
+        """
+        self.__lock.acquire()
+        try:
+            if not self.__completed_tasks:
+                return None
+            # the tasks stored in the cache are in ascending order of finish time
+            expires = self.__completed_tasks[0].call_report.finish_time + self.completed_task_cache_life
+            remaining = expires - datetime.now(dateutils.utc_tz())
+            return max(0, remaining.days * 86400 + remaining.seconds +
+                          remaining.microseconds / 1000000.0)
+        finally:
+            self.__lock.release()
+
     def _get_ready_tasks(self):
         """
         Algorithm at the heart of the task dispatcher. Gets the tasks that are
         ready to run (i.e. not blocked) within the limits of the available
         concurrency threshold and returns them. Note that this algorithm checks
-        all the tasks as some may have a weight of 0.
+        all the ready tasks as some may have a weight of 0. Blocked tasks are
+        never looked at.
         """
         self.__lock.acquire()
         try:
             tasks = []
             available_weight = self.concurrency_threshold - self.__running_weight
-            for task in self.__waiting_tasks:
+            for task in self._tasks_in_queue_order(self.__ready_task_ids):
                 if task.call_request.dependencies:
                     continue
                 if task.call_request.weight > available_weight:
@@ -114,8 +164,9 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            self.__waiting_tasks.remove(task)
             self.__running_tasks.append(task)
+            self.__waiting_task_ids.discard(task.call_request.id)
+            self.__ready_task_ids.discard(task.call_request.id)
             self.__running_weight += task.call_request.weight
             task.run()
         finally:
@@ -126,12 +177,14 @@ class TaskQueue(object):
         Purge expired tasks from the completed tasks cache.
         """
         expired_cutoff = datetime.now(dateutils.utc_tz()) - self.completed_task_cache_life
-        index = 0 # index of the first non-expired cached task
+        index = len(self.__completed_tasks) # index of the first non-expired cached task
         # the tasks stored in the cache are in ascending order of finish time
         for i, task in enumerate(self.__completed_tasks):
             if task.call_report.finish_time > expired_cutoff:
                 index = i
                 break
+        for task in self.__completed_tasks[:index]:
+            self._unindex_task(task)
         self.__completed_tasks = self.__completed_tasks[index:]
 
     # queue control methods ----------------------------------------------------
@@ -143,6 +196,7 @@ class TaskQueue(object):
         assert self.__dispatcher is None
         self.__lock.acquire()
         self.__exit = False # needed for re-start
+        self.__dispatch_pending = True # check for tasks enqueued while stopped
         try:
             self.__dispatcher = threading.Thread(target=self.__dispatch)
             self.__dispatcher.setDaemon(True)
@@ -157,7 +211,7 @@ class TaskQueue(object):
         assert self.__dispatcher is not None
         self.__lock.acquire()
         self.__exit = True
-        self.__condition.notify()
+        self._notify_dispatcher()
         self.__lock.release()
         self.__dispatcher.join()
         self.__dispatcher = None
@@ -205,9 +259,12 @@ class TaskQueue(object):
             self.queued_call_collection.save(queued_call, safe=True)
             task.complete_callback = self._complete
             self._validate_call_request_dependencies(task)
-            self.__waiting_tasks.append(task)
+            self.__waiting_task_ids.add(task.call_request.id)
+            self._index_task(task)
+            if not task.call_request.dependencies:
+                self.__ready_task_ids.add(task.call_request.id)
             task.call_life_cycle_callbacks(dispatch_constants.CALL_ENQUEUE_LIFE_CYCLE_CALLBACK)
-            self.__condition.notify()
+            self._notify_dispatcher()
         finally:
             self.__lock.release()
 
@@ -221,11 +278,8 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            valid_call_request_dependency_ids = []
-            for potential_blocking_task in itertools.chain(self.__running_tasks, self.__waiting_tasks):
-                if potential_blocking_task.call_request.id not in task.call_request.dependencies:
-                    continue
-                valid_call_request_dependency_ids.append(potential_blocking_task.call_request.id)
+            valid_call_request_dependency_ids = [i for i in task.call_request.dependencies
+                                                 if i in self.__incomplete_task_ids]
             # DANGER this ignores valid call complete states of dependencies!!
             task.call_request.dependencies = subdict(task.call_request.dependencies, valid_call_request_dependency_ids)
         finally:
@@ -239,14 +293,33 @@ class TaskQueue(object):
         @type  task: pulp.server.dispatch.task.Task
         """
         self.__lock.acquire()
+        try:
+            # completed tasks stay indexed until they are purged from the cache
+            incomplete = task.call_request.id in self.__incomplete_task_ids
+            self._dequeue(task)
+            if incomplete:
+                self._unindex_task(task)
+        finally:
+            self.__lock.release()
+
+    def _dequeue(self, task):
+        """
+        Remove a task from the waiting or running tasks, leaving it in the
+        task indexes
+        @param task: task to be removed
+        @type  task: pulp.server.dispatch.task.Task
+        """
+        self.__lock.acquire()
         try:
             task.complete_callback = None
             self.queued_call_collection.remove({'_id': task.queued_call_id}, safe=True)
             task.queued_call_id = None
-            if task in self.__waiting_tasks:
-                self.__waiting_tasks.remove(task)
-            if task in self.__running_tasks:
+            if task.call_request.id in self.__waiting_task_ids:
+                self.__waiting_task_ids.discard(task.call_request.id)
+                self.__ready_task_ids.discard(task.call_request.id)
+            elif task in self.__running_tasks:
                 self.__running_tasks.remove(task)
+            self.__incomplete_task_ids.discard(task.call_request.id)
             self._unblock_tasks(task)
             task.call_life_cycle_callbacks(dispatch_constants.CALL_DEQUEUE_LIFE_CYCLE_CALLBACK)
         finally:
@@ -260,7 +333,16 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            for potentially_blocked_task in self.__waiting_tasks[:]:
+            blocked_task_ids = self.__blocked_index.pop(task.call_request.id, set())
+            # use the order the tasks were enqueued in
+            blocked_task_ids = sorted(blocked_task_ids, key=lambda i: self.__task_sequence.get(i, -1))
+
+            for blocked_task_id in blocked_task_ids:
+
+                if blocked_task_id not in self.__waiting_task_ids:
+                    continue
+
+                potentially_blocked_task = self.__task_index[blocked_task_id]
 
                 if task.call_request.id not in potentially_blocked_task.call_request.dependencies:
                     continue
@@ -274,6 +356,9 @@ class TaskQueue(object):
                 else:
                     # remove the task from the blocking_tasks dict
                     potentially_blocked_task.call_request.dependencies.pop(task.call_request.id)
+                    if not potentially_blocked_task.call_request.dependencies:
+                        self.__ready_task_ids.add(blocked_task_id)
+                        self._notify_dispatcher()
 
         finally:
             self.__lock.release()
@@ -289,15 +374,17 @@ class TaskQueue(object):
         self.__lock.acquire()
         try:
             self.__running_weight -= task.call_request.weight
-            self.dequeue(task)
+            self._dequeue(task)
             self.__completed_tasks.append(task)
+            # the task's weight is available for other tasks to use
+            self._notify_dispatcher()
         finally:
             self.__lock.release()
 
     def skip(self, task):
         self.__lock.acquire()
         try:
-            if task not in self.__waiting_tasks:
+            if task.call_request.id not in self.__waiting_task_ids:
                 return
             return task.skip()
         finally:
@@ -315,6 +402,75 @@ class TaskQueue(object):
         finally:
             self.__lock.release()
 
+    # task index methods -------------------------------------------------------
+
+    def _index_task(self, task):
+        """
+        Add a newly enqueued task to the task indexes
+        @param task: task to index
+        @type  task: pulp.server.dispatch.task.Task
+        """
+        self.__lock.acquire()
+        try:
+            call_request_id = task.call_request.id
+            self.__task_index[call_request_id] = task
+            self.__task_sequence[call_request_id] = self.__sequence_counter.next()
+            self.__incomplete_task_ids.add(call_request_id)
+            # tags are copied so that later changes to the call request do not
+            # leave stale entries behind when the task is removed
+            self.__task_tags[call_request_id] = frozenset(task.call_request.tags)
+            for tag in self.__task_tags[call_request_id]:
+                self.__tag_index.setdefault(tag, set()).add(call_request_id)
+            for blocking_id in task.call_request.dependencies:
+                self.__blocked_index.setdefault(blocking_id, set()).add(call_request_id)
+        finally:
+            self.__lock.release()
+
+    def _unindex_task(self, task):
+        """
+        Remove a task that is leaving the queue from the task indexes
+        @param task: task to remove from the indexes
+        @type  task: pulp.server.dispatch.task.Task
+        """
+        self.__lock.acquire()
+        try:
+            call_request_id = task.call_request.id
+            if self.__task_index.get(call_request_id) is not task:
+                return
+            self.__task_index.pop(call_request_id)
+            self.__task_sequence.pop(call_request_id, None)
+            self.__incomplete_task_ids.discard(call_request_id)
+            for tag in self.__task_tags.pop(call_request_id, ()):
+                tagged_ids = self.__tag_index.get(tag)
+                if tagged_ids is None:
+                    continue
+                tagged_ids.discard(call_request_id)
+                if not tagged_ids:
+                    self.__tag_index.pop(tag)
+            for blocking_id in task.call_request.dependencies:
+                blocked_ids = self.__blocked_index.get(blocking_id)
+                if blocked_ids is None:
+                    continue
+                blocked_ids.discard(call_request_id)
+                if not blocked_ids:
+                    self.__blocked_index.pop(blocking_id)
+        finally:
+            self.__lock.release()
+
+    def _tasks_in_queue_order(self, call_request_ids):
+        """
+        Look up the given indexed tasks, sorted in the order they were enqueued
+        @param call_request_ids: ids of the tasks to look up
+        @type  call_request_ids: iterable of str
+        @rtype: list of pulp.server.dispatch.task.Task
+        """
+        self.__lock.acquire()
+        try:
+            call_request_ids = sorted(call_request_ids, key=self.__task_sequence.get)
+            return [self.__task_index[i] for i in call_request_ids]
+        finally:
+            self.__lock.release()
+
     # task query methods -------------------------------------------------------
 
     def get(self, call_request_id):
@@ -327,13 +483,7 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            for task in itertools.chain(self.__completed_tasks,
-                                        self.__running_tasks,
-                                        self.__waiting_tasks):
-                if task.call_request.id != call_request_id:
-                    continue
-                return task
-            return None
+            return self.__task_index.get(call_request_id)
         finally:
             self.__lock.release()
 
@@ -342,21 +492,19 @@ class TaskQueue(object):
         Find tasks that match the given call request tags
         @param tags: list of tags to match
         @type  tags: list of str
-        @return: (potentially empty) list of tasks with matching tags
+        @return: (potentially empty) list of tasks with matching tags, in the
+                 order they were enqueued
         @rtype:  list of pulp.server.dispatch.task.Task
         """
         self.__lock.acquire()
         try:
-            tasks = []
-            for task in itertools.chain(self.__completed_tasks,
-                                        self.__running_tasks,
-                                        self.__waiting_tasks):
-                for tag in tags:
-                    if tag not in task.call_request.tags:
-                        break
-                else:
-                    tasks.append(task)
-            return tasks
+            if not tags:
+                task_ids = self.__task_index.keys()
+            else:
+                # start from the least common tag to keep the intersection small
+                tag_sets = sorted((self.__tag_index.get(t, set()) for t in set(tags)), key=len)
+                task_ids = tag_sets[0].intersection(*tag_sets[1:])
+            return self._tasks_in_queue_order(task_ids)
         finally:
             self.__lock.release()
 
@@ -368,7 +516,7 @@ class TaskQueue(object):
         """
         self.__lock.acquire()
         try:
-            return self.__waiting_tasks[:]
+            return self._tasks_in_queue_order(self.__waiting_task_ids)
         finally:
             self.__lock.release()
 
@@ -393,7 +541,7 @@ class TaskQueue(object):
         self.__lock.acquire()
         try:
             return itertools.chain(self.__running_tasks[:],
-                                   self.__waiting_tasks[:])
+                                   self._tasks_in_queue_order(self.__waiting_task_ids))
         finally:
             self.__lock.release()
 
@@ -419,6 +567,6 @@ class TaskQueue(object):
         try:
             return itertools.chain(self.__completed_tasks[:],
                                    self.__running_tasks[:],
-                                   self.__waiting_tasks[:])
+                                   self._tasks_in_queue_order(self.__waiting_task_ids))
         finally:
             self.__lock.release()
@@ -13,6 +13,7 @@
 
 import logging
 
+from pulp.server.event import delivery
 from pulp.server.managers import factory
 
 TYPE_ID = 'amqp'
@@ -20,16 +21,35 @@ logger = logging.getLogger(__name__)
 
 def handle_event(notifier_config, event):
     """
-    Send the event out to an AMQP broker.
+    Queue the event to be sent out to an AMQP broker.
 
-    :param notifier_config: dictionary with keys 'subject', which defines the
-                            subject of each email message, and 'addresses',
-                            which is a list of strings that are email addresses
-                            that should receive this notification.
+    :param notifier_config: dictionary with optional key 'exchange', which
+                            defines the exchange the event is published to
+                            instead of the one in the server config.
     :type  notifier_config: dict
     :param event:   Event instance
     :type  event:   pulp.server.event.data.event
     :return: None
     """
+    exchange = notifier_config.get('exchange')
+    queue = delivery.get_queue()
+    endpoint = queue.get_endpoint((TYPE_ID, exchange), lambda key: AMQPEndpoint(key, exchange))
+    queue.put(endpoint, event)
 
-    factory.topic_publish_manager().publish(event, notifier_config.get('exchange'))
+
+class AMQPEndpoint(delivery.Endpoint):
+    """
+    Publishes events to an exchange.
+    """
+
+    def __init__(self, key, exchange):
+        super(AMQPEndpoint, self).__init__(key, name='%s exchange' % (exchange or 'default'))
+        self.exchange = exchange
+
+    def deliver(self, items):
+        """
+        :param items:   Event instances
+        :type  items:   list
+        """
+        for event in items:
+            factory.topic_publish_manager().publish(event, self.exchange)
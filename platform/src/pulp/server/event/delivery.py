@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Asynchronous delivery of events to remote endpoints. Events are placed on a
+bounded queue and delivered by a fixed pool of daemon threads, so firing an
+event neither blocks on nor spawns a thread for a remote endpoint.
+
+Events are queued per endpoint. An endpoint is only ever delivered to by a
+single thread at a time, so events are delivered in the order they were fired
+and an endpoint may keep state, such as a keep-alive connection, without
+locking. Each delivery sends up to the endpoint's batch size of events.
+
+Delivery is at-least-once: a delivery that fails is retried, and an endpoint
+cannot always tell whether a failed delivery reached its destination, so an
+event may be delivered more than once.
+
+Endpoints that have been idle for longer than the queue's idle timeout are
+closed and discarded, so endpoints that are no longer used, such as those of
+updated or deleted event listeners, don't hold connections open.
+"""
+
+import logging
+import threading
+import time
+from Queue import Empty, Queue
+
+from pulp.server.config import config
+
+# -- constants ----------------------------------------------------------------
+
+_LOG = logging.getLogger(__name__)
+
+# Set on first use of get_queue()
+_QUEUE = None
+_QUEUE_LOCK = threading.Lock()
+
+# -- exceptions ---------------------------------------------------------------
+
+class DeliveryFailed(Exception):
+    """
+    Raised by an endpoint when a delivery should be retried.
+    """
+    pass
+
+# -- endpoints ----------------------------------------------------------------
+
+class Endpoint(object):
+    """
+    A destination for events. Notifiers subclass this to implement the
+    actual delivery.
+
+    @ivar key: uniquely identifies the endpoint
+    @type key: hashable
+
+    @ivar name: identifies the endpoint in log messages; unlike the key, it
+                must not contain credentials
+    @type name: str
+
+    @ivar batch_size: maximum number of events passed to each deliver() call
+    @type batch_size: int
+    """
+
+    def __init__(self, key, batch_size=1, name=None):
+        self.key = key
+        self.name = name or str(key)
+        self.batch_size = max(1, batch_size)
+        self.pending = [] # list of (event data, time queued)
+        self.scheduled = False
+        self.last_used = time.time()
+
+    def deliver(self, items):
+        """
+        Deliver events to the endpoint. Any exception raised causes the
+        delivery to be retried.
+
+        @param items: events to deliver, in the order they were fired
+        @type  items: list
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """
+        Release any resources held by the endpoint.
+        """
+        pass
+
+# -- queue --------------------------------------------------------------------
+
+class DeliveryQueue(object):
+    """
+    Bounded queue of events delivered to endpoints by a pool of threads.
+
+    @ivar size: maximum number of events queued or being delivered
+    @type size: int
+
+    @ivar retries: number of times a failed delivery is retried
+    @type retries: int
+
+    @ivar retry_delay: seconds before the first retry; doubled for each retry
+    @type retry_delay: float
+
+    @ivar idle_timeout: seconds after which an endpoint with nothing to
+                        deliver is closed and discarded
+    @type idle_timeout: float
+    """
+
+    def __init__(self, threads, size, retries, retry_delay, idle_timeout=300):
+        self.size = size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.idle_timeout = idle_timeout
+        self.last_eviction = time.time()
+        self.endpoints = {}
+        self.ready = Queue()
+        self.lock = threading.RLock()
+        self.idle = threading.Condition(self.lock)
+        self.depth = 0
+        self.delivered = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retried = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.threads = []
+        for i in range(max(1, threads)):
+            thread = threading.Thread(target=self._run, name='event-delivery-%d' % i)
+            thread.setDaemon(True)
+            thread.start()
+            self.threads.append(thread)
+
+    def get_endpoint(self, key, create):
+        """
+        Returns the endpoint with the given key, creating it if it doesn't
+        already exist.
+
+        @param key: uniquely identifies the endpoint
+        @type  key: hashable
+
+        @param create: called with the key to create the endpoint
+        @type  create: callable
+
+        @rtype: Endpoint
+        """
+        self.lock.acquire()
+        try:
+            self._evict_idle()
+            endpoint = self.endpoints.get(key)
+            if endpoint is None:
+                endpoint = create(key)
+                self.endpoints[key] = endpoint
+            return endpoint
+        finally:
+            self.lock.release()
+
+    def put(self, endpoint, item):
+        """
+        Queues an event for delivery to the endpoint. The event is dropped if
+        the queue is full.
+
+        @param endpoint: endpoint returned by get_endpoint()
+        @type  endpoint: Endpoint
+
+        @param item: event data passed to the endpoint's deliver()
+
+        @return: true if the event was queued; false if it was dropped
+        @rtype:  bool
+        """
+        self.lock.acquire()
+        try:
+            if self.depth >= self.size:
+                self.dropped += 1
+                _LOG.warn('Event delivery queue is full; dropping event for [%s]' % endpoint.name)
+                return False
+            # an endpoint discarded while idle is used again rather than
+            # being left out of the endpoints to close
+            endpoint = self.endpoints.setdefault(endpoint.key, endpoint)
+            endpoint.last_used = time.time()
+            self.depth += 1
+            endpoint.pending.append((item, time.time()))
+            if not endpoint.scheduled:
+                endpoint.scheduled = True
+                self.ready.put(endpoint)
+            return True
+        finally:
+            self.lock.release()
+
+    def statistics(self):
+        """
+        @return: queue depth and delivery counts and latencies (in seconds)
+        @rtype:  dict
+        """
+        self.lock.acquire()
+        try:
+            completed = self.delivered + self.failed
+            average = 0.0
+            if completed:
+                average = self.latency_total / completed
+            return {'queue_depth': self.depth,
+                    'queue_size': self.size,
+                    'delivered': self.delivered,
+                    'failed': self.failed,
+                    'dropped': self.dropped,
+                    'retried': self.retried,
+                    'average_latency': average,
+                    'max_latency': self.latency_max}
+        finally:
+            self.lock.release()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until all queued events have been delivered or failed.
+
+        @param timeout: maximum seconds to wait; None to wait indefinitely
+        @type  timeout: float
+
+        @return: true if the queue is empty
+        @rtype:  bool
+        """
+        deadline = None
+        if timeout is not None:
+            deadline = time.time() + timeout
+        self.idle.acquire()
+        try:
+            while self.depth:
+                if deadline is None:
+                    self.idle.wait()
+                    continue
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.idle.wait(remaining)
+            return not self.depth
+        finally:
+            self.idle.release()
+
+    def shutdown(self):
+        """
+        Stops the delivery threads once they finish their current delivery.
+        Events still queued are not delivered.
+        """
+        for thread in self.threads:
+            self.ready.put(None)
+        self.lock.acquire()
+        try:
+            for endpoint in self.endpoints.values():
+                endpoint.close()
+        finally:
+            self.lock.release()
+
+    # -- private --------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            try:
+                endpoint = self.ready.get(timeout=self.idle_timeout)
+            except Empty:
+                self.lock.acquire()
+                try:
+                    self._evict_idle()
+                finally:
+                    self.lock.release()
+                continue
+            if endpoint is None:
+                return
+            self.lock.acquire()
+            try:
+                batch = endpoint.pending[:endpoint.batch_size]
+                del endpoint.pending[:endpoint.batch_size]
+            finally:
+                self.lock.release()
+
+            succeeded = self._deliver(endpoint, [item for item, queued in batch])
+
+            self.lock.acquire()
+            try:
+                now = time.time()
+                for item, queued in batch:
+                    latency = now - queued
+                    self.latency_total += latency
+                    self.latency_max = max(self.latency_max, latency)
+                if succeeded:
+                    self.delivered += len(batch)
+                else:
+                    self.failed += len(batch)
+                self.depth -= len(batch)
+                endpoint.last_used = now
+                if endpoint.pending:
+                    # requeue rather than looping so other endpoints get a turn
+                    self.ready.put(endpoint)
+                else:
+                    endpoint.scheduled = False
+                if not self.depth:
+                    self.idle.notifyAll()
+            finally:
+                self.lock.release()
+
+    def _evict_idle(self):
+        """
+        Close and discard the endpoints that have been idle for longer than
+        the idle timeout. Endpoints are checked at most once per timeout. The
+        caller must hold the lock.
+        """
+        now = time.time()
+        if now - self.last_eviction < self.idle_timeout:
+            return
+        self.last_eviction = now
+        for key, endpoint in self.endpoints.items():
+            if endpoint.scheduled or endpoint.pending:
+                continue
+            if now - endpoint.last_used < self.idle_timeout:
+                continue
+            del self.endpoints[key]
+            endpoint.close()
+
+    def _deliver(self, endpoint, items):
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.lock.acquire()
+                try:
+                    self.retried += 1
+                finally:
+                    self.lock.release()
+                time.sleep(delay)
+                delay *= 2
+            try:
+                endpoint.deliver(items)
+                return True
+            except Exception, e:
+                _LOG.warn('Event delivery to [%s] failed (attempt %d of %d): %s' %
+                          (endpoint.name, attempt + 1, self.retries + 1, e))
+        _LOG.error('Event delivery to [%s] failed; %d events discarded' % (endpoint.name, len(items)))
+        return False
+
+# -- public -------------------------------------------------------------------
+
+def get_queue():
+    """
+    Returns the delivery queue, creating it and starting its threads on
+    first use.
+
+    @rtype: DeliveryQueue
+    """
+    global _QUEUE
+    _QUEUE_LOCK.acquire()
+    try:
+        if _QUEUE is None:
+            _QUEUE = DeliveryQueue(config.getint('notifications', 'delivery_threads'),
+                                   config.getint('notifications', 'queue_size'),
+                                   config.getint('notifications', 'retries'),
+                                   config.getfloat('notifications', 'retry_delay'),
+                                   config.getfloat('notifications', 'endpoint_idle_timeout'))
+        return _QUEUE
+    finally:
+        _QUEUE_LOCK.release()
+
+def statistics():
+    """
+    @return: statistics of the delivery queue; see DeliveryQueue.statistics()
+    @rtype:  dict
+    """
+    return get_queue().statistics()
+
+def reset():
+    """
+    Shuts down the delivery queue; a new one is created on next use. This
+    should only need to be called in unit test cleanup.
+    """
+    global _QUEUE
+    _QUEUE_LOCK.acquire()
+    try:
+        if _QUEUE is not None:
+            _QUEUE.shutdown()
+        _QUEUE = None
+    finally:
+        _QUEUE_LOCK.release()
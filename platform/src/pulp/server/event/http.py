@@ -19,15 +19,26 @@ url
   Full URL to contact with the event data. A POST request will be made to this
   URL with the contents of the events in the body.
 
-Eventually this should be enhanced to support authentication credentials as well.
+username, password
+  Optional credentials sent using basic authentication.
+
+batch_size
+  Optional maximum number of events sent in each POST. When specified, the
+  body is a list of events rather than a single event.
+
+Events are delivered asynchronously through the delivery queue and each URL
+keeps a connection open between deliveries. A failed POST is retried by the
+delivery queue, so an event may be sent more than once.
 """
 
 import base64
+import hashlib
 import httplib
 import logging
-import threading
+import socket
 
 from pulp.server.compat import json
+from pulp.server.event import delivery
 
 # -- constants ----------------------------------------------------------------
 
@@ -38,27 +49,13 @@ LOG = logging.getLogger(__name__)
 # -- framework hook -----------------------------------------------------------
 
 def handle_event(notifier_config, event):
-    # fire the actual http push function off in a separate thread to keep
-    # pulp from blocking or deadlocking due to the tasking subsystem
+    # queue the actual http push to keep pulp from blocking or deadlocking
+    # due to the tasking subsystem
 
     data = event.data()
 
     LOG.info(data)
 
-    body = json.dumps(data)
-
-    thread = threading.Thread(target=_send_post, args=[notifier_config, body])
-    thread.setDaemon(True)
-    thread.start()
-
-# -- private ------------------------------------------------------------------
-
-def _send_post(notifier_config, body):
-
-    # Basic headers
-    headers = {'Accept': 'application/json',
-               'Content-Type': 'application/json'}
-
     # Parse the URL for the pieces we need
     if 'url' not in notifier_config or not notifier_config['url']:
         LOG.warn('HTTP notifier configured without a URL; cannot fire event')
@@ -72,7 +69,111 @@ def _send_post(notifier_config, body):
         LOG.warn('Improperly configured post_sync_url: %(u)s' % {'u': url})
         return
 
-    connection = _create_connection(scheme, server)
+    batch_size = notifier_config.get('batch_size')
+    if batch_size is not None:
+        try:
+            batch_size = int(batch_size)
+        except (TypeError, ValueError):
+            LOG.warn('Improperly configured batch_size: %(b)s' % {'b': batch_size})
+            batch_size = None
+
+    # Endpoints are separated by credentials, but the password itself is
+    # not kept in the key
+    password = notifier_config.get('password')
+    if password is not None:
+        if isinstance(password, unicode):
+            password = password.encode('utf-8')
+        password = hashlib.sha256(password).hexdigest()
+    key = (TYPE_ID, url, notifier_config.get('username'), password, batch_size)
+
+    def create(key):
+        return HTTPEndpoint(key, url, scheme, server, path, _headers(notifier_config), batch_size)
+
+    queue = delivery.get_queue()
+    endpoint = queue.get_endpoint(key, create)
+    queue.put(endpoint, data)
+
+# -- endpoint -----------------------------------------------------------------
+
+class HTTPEndpoint(delivery.Endpoint):
+    """
+    Delivers events to a URL, reusing the connection between deliveries when
+    the server allows it.
+
+    @ivar batch: true if events are sent as a list
+    @type batch: bool
+    """
+
+    def __init__(self, key, url, scheme, server, path, headers, batch_size=None):
+        super(HTTPEndpoint, self).__init__(key, batch_size or 1, name=url)
+        self.scheme = scheme
+        self.server = server
+        self.path = '/' + path
+        self.headers = headers
+        self.batch = batch_size is not None
+        self.connection = None
+
+    def deliver(self, items):
+        if self.batch:
+            body = json.dumps(items)
+        else:
+            body = json.dumps(items[0])
+
+        connection = self.connection
+        self.connection = None
+        if connection is not None:
+            try:
+                connection.request('POST', self.path, body=body, headers=self.headers)
+            except (httplib.HTTPException, socket.error):
+                # The server may have closed the idle connection. The request
+                # was not sent, so it is sent again on a new connection. A
+                # failure once it has been sent is left to the delivery queue
+                # to retry, as the server may have already received it.
+                connection.close()
+                connection = None
+
+        if connection is None:
+            connection = _create_connection(self.scheme, self.server)
+            try:
+                connection.request('POST', self.path, body=body, headers=self.headers)
+            except Exception:
+                connection.close()
+                raise
+
+        self._read_response(connection)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _read_response(self, connection):
+        try:
+            response = connection.getresponse()
+            response_body = response.read()
+        except Exception:
+            connection.close()
+            raise
+
+        if response.status >= httplib.INTERNAL_SERVER_ERROR:
+            connection.close()
+            raise delivery.DeliveryFailed('Error response from HTTP notifier: %(e)s' % {'e': response_body})
+
+        if response.status != httplib.OK:
+            LOG.warn('Error response from HTTP notifier: %(e)s' % {'e': response_body})
+
+        if response.will_close:
+            connection.close()
+        else:
+            self.connection = connection
+
+# -- private ------------------------------------------------------------------
+
+def _headers(notifier_config):
+
+    # Basic headers
+    headers = {'Accept': 'application/json',
+               'Content-Type': 'application/json'}
 
     # Process authentication
     if 'username' in notifier_config and 'password' in notifier_config:
@@ -80,12 +181,7 @@ def _send_post(notifier_config, body):
         encoded = base64.encodestring(raw)[:-1]
         headers['Authorization'] = 'Basic ' + encoded
 
-    connection.request('POST', '/' + path, body=body, headers=headers)
-    response = connection.getresponse()
-    if response.status != httplib.OK:
-        error_msg = response.read()
-        LOG.warn('Error response from HTTP notifier: %(e)s' % {'e': error_msg})
-    connection.close()
+    return headers
 
 def _create_connection(scheme, server):
     if scheme.startswith('https'):
@@ -16,6 +16,7 @@ import oauth2
 from pulp.server.db.model.consumer import Consumer
 from pulp.server.managers import factory
 from pulp.server.auth import ldap_connection
+from pulp.server.auth.cache import CREDENTIAL_CACHE
 from pulp.server.config import config
 from pulp.server.exceptions import PulpException
 
@@ -30,6 +31,10 @@ _LOG = logging.getLogger(__name__)
 class AuthenticationManager(object):
     """
     Manages user and consumer authentication in pulp.
+
+    Successfully verified credentials are cached (see
+    pulp.server.auth.cache.CredentialCache) so that repeated requests with the
+    same credentials don't hash the password or verify the certificate again.
     """
     
     # -- username:password authentication ------------------------------------------
@@ -109,11 +114,19 @@ class AuthenticationManager(object):
         :rtype: str or None
         :return: user login corresponding to the credentials
         """
+        key = CREDENTIAL_CACHE.digest('password', username, password)
+        login = CREDENTIAL_CACHE.get(key)
+        if login is not None:
+            return login
+
+        version = CREDENTIAL_CACHE.version
         user = self._check_username_password_local(username, password)
         if user is None and config.getboolean('ldap', 'enabled'):
             user = self._check_username_password_ldap(username, password)
         if user is not None:
-            return user['login']
+            login = user['login']
+            CREDENTIAL_CACHE.put(key, login, ('user', login), version)
+            return login
         return None
 
     # -- ssl cert authentication ---------------------------------------------------
@@ -129,6 +142,12 @@ class AuthenticationManager(object):
         :rtype: str or None
         :return: user login corresponding to the credentials
         """
+        key = CREDENTIAL_CACHE.digest('user_cert', cert_pem)
+        login = CREDENTIAL_CACHE.get(key)
+        if login is not None:
+            return login
+
+        version = CREDENTIAL_CACHE.version
         cert = factory.certificate_manager(content=cert_pem)
         subject = cert.subject()
         encoded_user = subject.get('CN', None)
@@ -147,7 +166,10 @@ class AuthenticationManager(object):
         except PulpException:
             return None
     
-        return self.check_username_password(username)
+        login = self.check_username_password(username)
+        if login is not None:
+            CREDENTIAL_CACHE.put(key, login, ('user', login), version)
+        return login
     
     def check_consumer_cert(self, cert_pem):
         """
@@ -160,6 +182,12 @@ class AuthenticationManager(object):
         :rtype: str or None
         :return: id of a consumer corresponding to the credentials
         """
+        key = CREDENTIAL_CACHE.digest('consumer_cert', cert_pem)
+        consumerid = CREDENTIAL_CACHE.get(key)
+        if consumerid is not None:
+            return consumerid
+
+        version = CREDENTIAL_CACHE.version
         cert = factory.certificate_manager(content=cert_pem)
         subject = cert.subject()
         consumerid = subject.get('CN', None)
@@ -173,6 +201,7 @@ class AuthenticationManager(object):
                        consumerid)
             return None
     
+        CREDENTIAL_CACHE.put(key, consumerid, ('consumer', consumerid), version)
         return consumerid
     
     # oauth authentication --------------------------------------------------------
@@ -226,12 +255,54 @@ class AuthenticationManager(object):
             _LOG.error('error verifying OAuth signature: %s' % e)
             return None, is_consumer
     
+        # The signature covers the individual request, so only the lookup of
+        # the user or consumer it was signed for can be cached
+        key = CREDENTIAL_CACHE.digest('oauth', username)
+        identity = CREDENTIAL_CACHE.get(key)
+        if identity is not None:
+            return identity
+
+        version = CREDENTIAL_CACHE.version
         user = self._check_username_password_local(username)
         if user is not None:
-            return user['login'], is_consumer
+            identity = (user['login'], is_consumer)
+            CREDENTIAL_CACHE.put(key, identity, ('user', user['login']), version)
+            return identity
         consumer = Consumer.get_collection().find_one({'id':username})
         if consumer is not None:
             is_consumer = True
-            return consumer['id'], is_consumer
+            identity = (consumer['id'], is_consumer)
+            CREDENTIAL_CACHE.put(key, identity, ('consumer', consumer['id']), version)
+            return identity
 
         return None, is_consumer
+
+    # -- credential cache ----------------------------------------------------------
+
+    def invalidate_user(self, login):
+        """
+        Discards the cached credentials of a user, such as when the user's
+        password is changed or the user is deleted.
+
+        :type login: str
+        :param login: the login of the user
+        """
+        CREDENTIAL_CACHE.invalidate(('user', login))
+
+    def invalidate_consumer(self, consumer_id):
+        """
+        Discards the cached certificate of a consumer, such as when the
+        consumer is unregistered.
+
+        :type consumer_id: str
+        :param consumer_id: uniquely identifies the consumer
+        """
+        CREDENTIAL_CACHE.invalidate(('consumer', consumer_id))
+
+    def credential_cache_statistics(self):
+        """
+        :rtype: dict
+        :return: statistics of this process' credential cache, including its
+                 hit rate; see pulp.server.auth.cache.CredentialCache.statistics
+        """
+        return CREDENTIAL_CACHE.statistics()
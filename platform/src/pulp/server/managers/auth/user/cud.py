@@ -155,6 +155,7 @@ class UserManager(object):
             raise InvalidValue(invalid_values)
 
         User.get_collection().save(user, safe=True)
+        factory.authentication_manager().invalidate_user(login)
 
         # Retrieve the user to return the SON object
         updated = User.get_collection().find_one({'login' : login})
@@ -192,6 +193,7 @@ class UserManager(object):
         permission_manager.revoke_all_permissions_from_user(login)
         
         User.get_collection().remove({'login' : login}, safe=True)
+        factory.authentication_manager().invalidate_user(login)
 
 
     def ensure_admin(self):
@@ -15,20 +15,31 @@
 Contains content applicability management classes
 """
 
+import hashlib
+import json
+
+from pymongo.errors import DuplicateKeyError
+
 from pulp.server.managers import factory as managers
 from pulp.server.managers.pluginwrapper import PluginWrapper
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.plugins.profiler import Profiler
-from pulp.plugins.model import Consumer as ProfiledConsumer
+from pulp.plugins.model import ApplicabilityReport, Consumer as ProfiledConsumer
 from pulp.plugins.conduits.profiler import ProfilerConduit
 from pulp.plugins.loader import api as plugin_api
 from pulp.plugins.loader import exceptions as plugin_exceptions
 from pulp.server.exceptions import PulpExecutionException
+from pulp.server.db.model.consumer import ApplicabilityCacheEntry, UnitProfile
 from pulp.server.db.model.criteria import Criteria
+from pulp.server.util import paginate
 from logging import getLogger
 
 _LOG = getLogger(__name__)
 
+# Number of consumers for which bindings and profiles are loaded and passed
+# to the profilers at a time
+CONSUMER_BATCH_SIZE = 1000
+
 
 class ApplicabilityManager(object):
 
@@ -61,7 +72,9 @@ class ApplicabilityManager(object):
         :rtype: dict
         """
         result = {}
-        conduit = ProfilerConduit()
+        if not unit_criteria:
+            return result
+
         consumer_query_manager = managers.consumer_query_manager()
         bind_manager = managers.consumer_bind_manager()
 
@@ -73,6 +86,7 @@ class ApplicabilityManager(object):
             # if repo_criteria is specified and there are no repos satisfying the criteria, return empty result
             if not repo_criteria_ids:
                 return result
+            repo_criteria_ids = set(repo_criteria_ids)
         else:
             repo_criteria_ids = None
 
@@ -84,70 +98,330 @@ class ApplicabilityManager(object):
             if repo_criteria_ids:
                 # If repo_criteria is specified, get all the consumers bound to the repos
                 # satisfied by repo_criteria
-                bind_criteria = Criteria(filters={"repo_id": {"$in": repo_criteria_ids}})
+                bind_criteria = Criteria(filters={"repo_id": {"$in": list(repo_criteria_ids)}},
+                                         fields=['consumer_id'])
                 consumer_ids = [b['consumer_id'] for b in bind_manager.find_by_criteria(bind_criteria)]
                 # Remove duplicate consumer ids
                 consumer_ids = list(set(consumer_ids))
             else:
                 # Get all consumer ids registered to the Pulp server
-                consumer_ids = [c['id'] for c in consumer_query_manager.find_all()]
-        # if there are no relevant consumers, return empty result
-        if not consumer_ids:
-            return result
-        else:
-            # Based on the consumers, get all the repos bound to the consumers in consideration
-            # and find intersection of repo_criteria_ids and consumer_repo_ids
-            bind_criteria = Criteria(filters={"consumer_id": {"$in": consumer_ids}})
-            consumer_repo_ids = [b['repo_id'] for b in bind_manager.find_by_criteria(bind_criteria)]
-            if not repo_criteria_ids:
-                repo_criteria_ids = list(set(consumer_repo_ids))
-            else:
-                repo_criteria_ids = list(set(consumer_repo_ids) & set(repo_criteria_ids))
-            if not repo_criteria_ids:
-                return result
+                consumer_criteria = Criteria(fields=['id'])
+                consumer_ids = [c['id'] for c in consumer_query_manager.find_by_criteria(consumer_criteria)]
 
-        # Create a dictionary with consumer profile and repo_ids bound to the consumer keyed by consumer id
-        consumer_profile_and_repo_ids = {}
-        all_relevant_repo_ids = set()
-        for consumer_id in consumer_ids:
-            # Find repos bound to the consumer in consideration and find an intersection of bound repos to the
-            # repos specified by repo_criteria
-            consumer_bound_repo_ids = [b['repo_id'] for b in bind_manager.find_by_consumer(consumer_id)]
-            consumer_bound_repo_ids = list(set(consumer_bound_repo_ids))
-            # If repo_criteria is not specified, use repos bound to the consumer, else take intersection 
-            # of repos specified in the criteria and repos bound to the consumer.
-            if repo_criteria_ids is None:
-                repo_ids = consumer_bound_repo_ids
-            else:
-                repo_ids = list(set(consumer_bound_repo_ids) & set(repo_criteria_ids))
-
-            if repo_ids:
-                # Save all eligible repo ids to get relevant plugin unit keys when unit_criteria is not specified
-                all_relevant_repo_ids = (all_relevant_repo_ids | set(repo_ids))
-                consumer_profile_and_repo_ids[consumer_id] = {'repo_ids': repo_ids}
-                consumer_profile_and_repo_ids[consumer_id]['profiled_consumer'] = self.__profiled_consumer(consumer_id)
-
-        if not unit_criteria:
-            return result
+        # Unit types for which the profiler has not opted in to caching or does
+        # not report by consumer
+        uncached = set()
 
-        # Call respective profiler api according to the unit type to check for applicability
-        for unit_type_id, criteria in unit_criteria.items():
-            # Find a profiler for each type id and find units applicable using that profiler.
+        # Find a profiler for each type id
+        profilers = {}
+        for unit_type_id in unit_criteria:
             profiler, cfg = self.__profiler(unit_type_id)
             call_config = PluginCallConfiguration(plugin_config=cfg, repo_plugin_config=None,
                                                   override_config=override_config)
-            try:
-                report_list = profiler.find_applicable_units(consumer_profile_and_repo_ids, unit_type_id, criteria, call_config, conduit)
-            except PulpExecutionException:
-                report_list = None
+            profilers[unit_type_id] = (profiler, call_config)
+            if not _cache_applicability(profiler):
+                uncached.add(unit_type_id)
 
-            if report_list is None:
-                _LOG.warn("Profiler for unit type [%s] is not returning applicability reports" % unit_type_id)
-            else:
-                result[unit_type_id] = report_list
+        purged_repo_ids = set()
+        # Reports by unit merged so far, indexed for merging by unit type
+        merge_indexes = dict((unit_type_id, {}) for unit_type_id in unit_criteria)
+
+        # The consumers are passed to the profilers in batches so that the bindings and
+        # profiles of every consumer do not need to be held in memory at once
+        conduit = ProfilerConduit()
+        for batch in paginate(consumer_ids, CONSUMER_BATCH_SIZE):
+            consumer_profile_and_repo_ids = self.__consumer_profile_and_repo_ids(batch, repo_criteria_ids)
+            if not consumer_profile_and_repo_ids:
+                continue
+            consumer_digests = self.__consumer_digests(consumer_profile_and_repo_ids, purged_repo_ids)
+
+            # Call respective profiler api according to the unit type to check for applicability
+            for unit_type_id, (profiler, call_config) in profilers.items():
+                criteria = unit_criteria[unit_type_id]
+                try:
+                    if unit_type_id in uncached:
+                        report_list = profiler.find_applicable_units(consumer_profile_and_repo_ids, unit_type_id,
+                                                                     criteria, call_config, conduit)
+                    else:
+                        report_list = self.__cached_applicable_units(
+                            profiler, consumer_profile_and_repo_ids, consumer_digests, unit_type_id,
+                            criteria, call_config, conduit, uncached)
+                except PulpExecutionException:
+                    report_list = None
+
+                if report_list is None:
+                    _LOG.warn("Profiler for unit type [%s] is not returning applicability reports" % unit_type_id)
+                    # Skip the type for the remaining batches so a partial report is not returned
+                    del profilers[unit_type_id]
+                    result.pop(unit_type_id, None)
+                else:
+                    result[unit_type_id] = self.__merge_reports(result.get(unit_type_id), report_list,
+                                                                merge_indexes[unit_type_id])
+
+        return result
+
+    def profile_changed(self, profile_hash):
+        """
+        Notification that a consumer profile has been changed or deleted.
+        Cached applicability determined for the profile is removed.
+
+        :param profile_hash: The hash of the profile before it was changed.
+        :type profile_hash: basestring
+        """
+        collection = ApplicabilityCacheEntry.get_collection()
+        collection.remove({'profile_hashes': profile_hash}, safe=True)
+
+    def repo_deleted(self, repo_id):
+        """
+        Notification that a repository has been deleted.
+        Cached applicability determined for the repository is removed.
+
+        :param repo_id: A repository ID.
+        :type repo_id: str
+        """
+        collection = ApplicabilityCacheEntry.get_collection()
+        collection.remove({'repo_ids': repo_id}, safe=True)
+
+    def __cached_applicable_units(self, profiler, consumer_profile_and_repo_ids, consumer_digests,
+                                  unit_type_id, criteria, call_config, conduit, uncached):
+        """
+        Determine applicability using the applicability cache. Consumers with identical
+        profiles bound to the same repositories share a cache entry and the profiler is
+        only called for a single consumer of each entry that is not yet cached. This is
+        only used for profilers that opt in with the cache_applicability metadata key
+        (see pulp.plugins.profiler.Profiler.metadata).
+        Caching requires that the profiler reports by consumer ID. When it does not, the
+        unit type is added to uncached and the reports for all consumers are returned.
+
+        :param profiler: The profiler for the unit type.
+        :type profiler: PluginWrapper
+
+        :param consumer_profile_and_repo_ids: A dictionary with consumer profile and repo ids
+                        to be considered for applicability, keyed by consumer id.
+        :type consumer_profile_and_repo_ids: dict
+
+        :param consumer_digests: Tuples of (profile_hashes, repo_revisions) keyed by consumer id.
+        :type consumer_digests: dict
+
+        :param unit_type_id: The unit type ID.
+        :type unit_type_id: str
+
+        :param criteria: The unit selection criteria.
+        :type criteria: pulp.server.db.model.criteria.Criteria
+
+        :param call_config: The profiler configuration.
+        :type call_config: pulp.plugins.config.PluginCallConfiguration
+
+        :param conduit: The profiler conduit.
+        :type conduit: pulp.plugins.conduits.profiler.ProfilerConduit
+
+        :param uncached: The unit types for which the profiler does not report by consumer.
+        :type uncached: set
+
+        :return: The applicability reports returned by the profiler.
+        :rtype: dict or list
+        """
+        if isinstance(criteria, Criteria):
+            criteria_dict = criteria.as_dict()
+        else:
+            criteria_dict = criteria
+        context = _digest([criteria_dict, call_config.plugin_config, call_config.override_config])
+        keys = {}
+        for consumer_id, (profile_hashes, repo_revisions) in consumer_digests.items():
+            keys[consumer_id] = _digest([profile_hashes, repo_revisions, unit_type_id, context])
+
+        collection = ApplicabilityCacheEntry.get_collection()
+        cached = {}
+        query = {'key': {'$in': list(set(keys.values()))}}
+        for entry in collection.find(query, fields=['key', 'reports']):
+            cached[entry['key']] = entry['reports']
 
+        # Consumers that are not cached grouped by key
+        result = {}
+        missing = {}
+        for consumer_id, key in keys.items():
+            if key not in cached:
+                missing.setdefault(key, []).append(consumer_id)
+
+        if missing:
+            consumers = {}
+            for consumer_ids in missing.values():
+                consumer_id = consumer_ids[0]
+                consumers[consumer_id] = consumer_profile_and_repo_ids[consumer_id]
+            report = profiler.find_applicable_units(consumers, unit_type_id, criteria, call_config, conduit)
+            if report is None:
+                return None
+            if not isinstance(report, dict):
+                # Reported by unit, so the reports of each consumer are not known
+                uncached.add(unit_type_id)
+                if len(consumers) == len(consumer_profile_and_repo_ids):
+                    return report
+                return profiler.find_applicable_units(consumer_profile_and_repo_ids, unit_type_id,
+                                                      criteria, call_config, conduit)
+            for key, consumer_ids in missing.items():
+                consumer_id = consumer_ids[0]
+                try:
+                    reports = _encode_reports(report.get(consumer_id))
+                except (TypeError, ValueError):
+                    _LOG.warn('Applicability reports for unit type [%s] cannot be cached' % unit_type_id)
+                    if consumer_id in report:
+                        for other_id in consumer_ids:
+                            result[other_id] = report[consumer_id]
+                    continue
+                profile_hashes, repo_revisions = consumer_digests[consumer_id]
+                repo_ids = consumer_profile_and_repo_ids[consumer_id]['repo_ids']
+                entry = ApplicabilityCacheEntry(key, [h for t, h in profile_hashes], repo_ids,
+                                                repo_revisions, unit_type_id, reports)
+                try:
+                    collection.insert(entry, safe=True)
+                except DuplicateKeyError:
+                    # cached concurrently by another request
+                    pass
+                cached[key] = reports
+
+        for consumer_id, key in keys.items():
+            if key not in cached:
+                continue
+            reports = _decode_reports(cached[key])
+            if reports is not None:
+                result[consumer_id] = reports
         return result
 
+    def __consumer_digests(self, consumer_profile_and_repo_ids, purged_repo_ids):
+        """
+        Get the profile hashes and repository content revisions that identify
+        the applicability of each consumer. Cached applicability for earlier content
+        revisions of the repositories not in purged_repo_ids is removed and the
+        repositories are added to purged_repo_ids.
+
+        :param consumer_profile_and_repo_ids: A dictionary with consumer profile and repo ids
+                        to be considered for applicability, keyed by consumer id.
+        :type consumer_profile_and_repo_ids: dict
+
+        :param purged_repo_ids: The IDs of the repositories already purged.
+        :type purged_repo_ids: set
+
+        :return: {<consumer_id> : (<profile_hashes>, <repo_revisions>)} where profile_hashes
+                 is a sorted list of (content_type, profile_hash) and repo_revisions is a
+                 sorted list of '<repo_id>:<content_revision>'.
+        :rtype: dict
+        """
+        repo_ids = set()
+        for consumer in consumer_profile_and_repo_ids.values():
+            repo_ids.update(consumer['repo_ids'])
+        repo_query_manager = managers.repo_query_manager()
+        repo_criteria = Criteria(filters={'id': {'$in': list(repo_ids)}}, fields=['id', 'content_revision'])
+        revisions = {}
+        for repo in repo_query_manager.find_by_criteria(repo_criteria):
+            revisions[repo['id']] = '%s:%s' % (repo['id'], repo.get('content_revision', 0))
+
+        stale = [{'repo_ids': r, 'repo_revisions': {'$ne': revisions[r]}}
+                 for r in repo_ids - purged_repo_ids if r in revisions]
+        if stale:
+            collection = ApplicabilityCacheEntry.get_collection()
+            collection.remove({'$or': stale}, safe=True)
+            purged_repo_ids.update(repo_ids)
+
+        profile_manager = managers.consumer_profile_manager()
+        hashes = profile_manager.find_profile_hashes(consumer_profile_and_repo_ids.keys())
+        consumer_digests = {}
+        for consumer_id, consumer in consumer_profile_and_repo_ids.items():
+            profiles = consumer['profiled_consumer'].profiles
+            profile_hashes = []
+            for content_type, profile_hash in hashes[consumer_id].items():
+                if profile_hash is None:
+                    profile_hash = UnitProfile.calculate_hash(profiles[content_type])
+                profile_hashes.append((content_type, profile_hash))
+            repo_revisions = [revisions.get(r, '%s:' % r) for r in consumer['repo_ids']]
+            consumer_digests[consumer_id] = (sorted(profile_hashes), sorted(repo_revisions))
+        return consumer_digests
+
+    def __merge_reports(self, reports, batch_reports, index):
+        """
+        Merge the reports returned by a profiler for a batch of consumers into the
+        reports for the previous batches. Reports keyed by consumer ID are simply
+        combined. Reports by unit that have a list of consumer IDs as the summary
+        and the same details are combined into a single report for the unit.
+
+        :param reports: The reports for the previous batches or None.
+        :type reports: dict or list
+
+        :param batch_reports: The reports for a batch.
+        :type batch_reports: dict or list
+
+        :param index: The reports by unit merged so far keyed by their details, as
+                      returned by _details_key; updated with the batch reports.
+        :type index: dict
+
+        :return: The merged reports.
+        :rtype: dict or list
+        """
+        if isinstance(batch_reports, dict):
+            if reports is None:
+                return batch_reports
+            reports.update(batch_reports)
+            return reports
+        merged = reports is not None
+        if not merged:
+            reports = batch_reports
+        for batch_report in batch_reports:
+            if not isinstance(batch_report.summary, list):
+                if merged:
+                    reports.append(batch_report)
+                continue
+            key = _details_key(batch_report.details)
+            report = index.get(key)
+            if report is None:
+                index[key] = batch_report
+                if merged:
+                    reports.append(batch_report)
+            elif merged:
+                report.summary.extend(batch_report.summary)
+        return reports
+
+    def __consumer_profile_and_repo_ids(self, consumer_ids, repo_criteria_ids):
+        """
+        Create a dictionary with consumer profile and repo_ids bound to the consumer
+        keyed by consumer id. The bindings and profiles for all of the consumers are each
+        loaded with a single query. Consumers not bound to any of the repos specified
+        by repo_criteria_ids are omitted.
+
+        :param consumer_ids: A list of consumer IDs.
+        :type consumer_ids: list
+
+        :param repo_criteria_ids: The repo IDs to be considered or None for all bound repos.
+        :type repo_criteria_ids: set
+
+        :return: {<consumer_id> : {'profiled_consumer' : <profiled_consumer>,
+                                   'repo_ids' : <repo_ids>}}
+        :rtype: dict
+        """
+        bind_manager = managers.consumer_bind_manager()
+        bind_criteria = Criteria(filters={'consumer_id': {'$in': consumer_ids}, 'deleted': False},
+                                 fields=['consumer_id', 'repo_id'])
+        bound_repo_ids = {}
+        for b in bind_manager.find_by_criteria(bind_criteria):
+            bound_repo_ids.setdefault(b['consumer_id'], set()).add(b['repo_id'])
+
+        # If repo_criteria is not specified, use repos bound to the consumer, else take intersection
+        # of repos specified in the criteria and repos bound to the consumer.
+        consumer_repo_ids = {}
+        for consumer_id, repo_ids in bound_repo_ids.items():
+            if repo_criteria_ids is not None:
+                repo_ids = repo_ids & repo_criteria_ids
+            if repo_ids:
+                consumer_repo_ids[consumer_id] = list(repo_ids)
+        if not consumer_repo_ids:
+            return {}
+
+        consumer_profile_and_repo_ids = {}
+        profile_manager = managers.consumer_profile_manager()
+        profiles = profile_manager.find_profiles(consumer_repo_ids.keys())
+        for consumer_id, repo_ids in consumer_repo_ids.items():
+            consumer_profile_and_repo_ids[consumer_id] = {
+                'repo_ids': repo_ids,
+                'profiled_consumer': ProfiledConsumer(consumer_id, profiles[consumer_id])}
+        return consumer_profile_and_repo_ids
 
     def __profiler(self, typeid):
         """
@@ -167,21 +441,85 @@ class ApplicabilityManager(object):
             cfg = {}
         return PluginWrapper(plugin), cfg
 
-    def __profiled_consumer(self, id):
-        """
-        Get a profiler consumer model object.
 
-        :param id: A consumer ID.
-        :type id: str
+def _cache_applicability(profiler):
+    """
+    Determine whether the profiler has opted in to having its applicability
+    reports cached.
 
-        :return: A populated profiler consumer model object.
-        :rtype: L{ProfiledConsumer}
-        """
-        profiles = {}
-        manager = managers.consumer_profile_manager()
-        for p in manager.get_profiles(id):
-            typeid = p['content_type']
-            profile = p['profile']
-            profiles[typeid] = profile
-        return ProfiledConsumer(id, profiles)
+    :param profiler: The wrapped profiler.
+    :type profiler: PluginWrapper
+
+    :return: True if the reports may be cached.
+    :rtype: bool
+    """
+    try:
+        metadata = profiler.metadata()
+    except PulpExecutionException:
+        # the base Profiler used when no profiler is found has no metadata
+        return False
+    return bool(metadata.get('cache_applicability', False))
+
+
+def _digest(value):
+    """
+    Calculate a digest of a JSON serializable value.
+
+    :param value: The value to digest.
+    :type value: object
+
+    :return: The hex digest.
+    :rtype: str
+    """
+    serialized = json.dumps(value, separators=(',', ':'), sort_keys=True, default=str)
+    return hashlib.sha256(serialized).hexdigest()
+
+
+def _details_key(details):
+    """
+    Get a hashable form of the details of an applicability report, so reports
+    with equal details have equal keys.
+
+    :param details: The report details.
+
+    :return: The key for the details.
+    :rtype: str
+    """
+    try:
+        return json.dumps(details, sort_keys=True)
+    except (TypeError, ValueError):
+        # not serializable; repr is only equal for identical values
+        return repr(details)
+
+
+def _encode_reports(reports):
+    """
+    Encode the applicability reports of a consumer to be cached.
+
+    :param reports: A list of reports or None when the profiler reported nothing for the consumer.
+    :type reports: list
+
+    :return: The JSON encoded (summary, details) of each report.
+    :rtype: str
+
+    :raise TypeError: when a report is not JSON serializable.
+    """
+    if reports is None:
+        return json.dumps(None)
+    return json.dumps([(r.summary, r.details) for r in reports])
+
+
+def _decode_reports(encoded):
+    """
+    Decode cached applicability reports.
+
+    :param encoded: The JSON encoded (summary, details) of each report.
+    :type encoded: str
 
+    :return: A list of reports or None.
+    :rtype: list
+    """
+    reports = json.loads(encoded)
+    if reports is None:
+        return None
+    return [ApplicabilityReport(summary, details) for summary, details in reports]
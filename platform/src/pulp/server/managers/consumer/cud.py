@@ -138,6 +138,9 @@ class ConsumerManager(object):
                 'consumer [%s]' % consumer_id)
             raise PulpExecutionException("database-error"), None, sys.exc_info()[2]
 
+        # Drop the consumer's certificate from the credential cache
+        factory.authentication_manager().invalidate_consumer(consumer_id)
+
         # remove the consumer from any groups it was a member of
         group_manager = factory.consumer_group_manager()
         group_manager.remove_consumer_from_groups(consumer_id)
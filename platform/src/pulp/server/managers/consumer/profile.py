@@ -15,7 +15,8 @@
 Contains profile management classes
 """
 
-from pulp.server.exceptions import MissingResource
+from pulp.common import profile as profile_utils
+from pulp.server.exceptions import InvalidValue, MissingResource
 from pulp.server.db.model.consumer import UnitProfile
 from pulp.server.managers import factory
 from logging import getLogger
@@ -53,19 +54,65 @@ class ProfileManager(object):
         @param profile: The unit profile
         @type profile: object
         """
-        manager = factory.consumer_manager()
-        manager.get_consumer(consumer_id)
-        try:
-            p = self.get_profile(consumer_id, content_type)
-            p['profile'] = profile
-            # We store the profile's hash anytime the profile gets altered
-            p['profile_hash'] = UnitProfile.calculate_hash(profile)
-        except MissingResource:
-            p = UnitProfile(consumer_id, content_type, profile)
         collection = UnitProfile.get_collection()
-        collection.save(p, safe=True)
+        profile_hash = UnitProfile.calculate_hash(profile)
+        # the stored profile is replaced, so there is no need to read it
+        p = self._find_profile(consumer_id, content_type, {'profile':0})
+        if p is None:
+            manager = factory.consumer_manager()
+            manager.get_consumer(consumer_id)
+            p = UnitProfile(consumer_id, content_type, profile, profile_hash)
+            collection.insert(p, safe=True)
+            return p
+        previous_hash = p.get('profile_hash')
+        p['profile'] = profile
+        # We store the profile's hash anytime the profile gets altered
+        p['profile_hash'] = profile_hash
+        if previous_hash == profile_hash:
+            return p
+        update = {'$set':{'profile':profile, 'profile_hash':profile_hash}}
+        collection.update({'_id':p['_id']}, update, safe=True)
+        if previous_hash:
+            factory.consumer_applicability_manager().profile_changed(previous_hash)
         return p
 
+    def update_if_changed(self, consumer_id, content_type, profile_hash, profile=None, delta=None):
+        """
+        Conditionally update a unit profile.
+        Nothing is written when the stored profile already has the
+        specified hash. Otherwise, the profile is replaced by the specified
+        profile or, when the delta was calculated from the stored profile,
+        by the stored profile with the delta applied.
+        @param consumer_id: uniquely identifies the consumer.
+        @type consumer_id: str
+        @param content_type: The profile (content) type ID.
+        @type content_type: str
+        @param profile_hash: The hash of the consumer's current profile.
+        @type profile_hash: str
+        @param profile: The unit profile; optional.
+        @type profile: object
+        @param delta: The changes to the stored profile; optional.
+            See: pulp.common.profile.delta()
+        @type delta: dict
+        @return: The hash of the stored profile. When it differs from the
+            specified hash, the full profile must be sent.
+        @rtype: str
+        @raise InvalidValue: when the profile does not match the hash.
+        """
+        if profile is not None:
+            if UnitProfile.calculate_hash(profile) != profile_hash:
+                raise InvalidValue(['profile_hash'])
+        p = self._find_profile(consumer_id, content_type, ['profile_hash'])
+        stored_hash = p and p.get('profile_hash')
+        if stored_hash == profile_hash:
+            return stored_hash
+        if profile is None and delta and stored_hash and delta.get('base_hash') == stored_hash:
+            profile = self._apply_delta(consumer_id, content_type, profile_hash, delta)
+        if profile is None:
+            return stored_hash
+        self.update(consumer_id, content_type, profile)
+        return profile_hash
+
     def delete(self, consumer_id, content_type):
         """
         Delete a profile by consumer and content type.
@@ -77,6 +124,8 @@ class ProfileManager(object):
         profile = self.get_profile(consumer_id, content_type)
         collection = UnitProfile.get_collection()
         collection.remove(profile, safe=True)
+        if profile.get('profile_hash'):
+            factory.consumer_applicability_manager().profile_changed(profile['profile_hash'])
 
     def consumer_deleted(self, id):
         """
@@ -89,6 +138,49 @@ class ProfileManager(object):
         for p in self.get_profiles(id):
             collection.remove(p, sefe=True)
 
+    def _apply_delta(self, consumer_id, content_type, profile_hash, delta):
+        """
+        Apply a delta to the stored profile.
+        @param consumer_id: uniquely identifies the consumer.
+        @type consumer_id: str
+        @param content_type: The profile (content) type ID.
+        @type content_type: str
+        @param profile_hash: The expected hash of the resulting profile.
+        @type profile_hash: str
+        @param delta: The changes to the stored profile.
+        @type delta: dict
+        @return: The resulting profile or None when the delta could not be
+            applied or did not produce the expected profile.
+        @rtype: object
+        """
+        p = self._find_profile(consumer_id, content_type, ['profile', 'profile_hash'])
+        if p is None or p.get('profile_hash') != delta['base_hash']:
+            return None
+        try:
+            profile = profile_utils.apply_delta(p['profile'], delta)
+        except ValueError, e:
+            _LOG.debug('profile delta for consumer [%s] not applied: %s' % (consumer_id, e))
+            return None
+        if UnitProfile.calculate_hash(profile) != profile_hash:
+            return None
+        return profile
+
+    def _find_profile(self, consumer_id, content_type, fields):
+        """
+        Find a profile by consumer ID and content type ID.
+        @param consumer_id: uniquely identifies the consumer.
+        @type consumer_id: str
+        @param content_type: The profile (content) type ID.
+        @type content_type: str
+        @param fields: The fields to be returned.
+        @type fields: list or dict
+        @return: The profile or None when not found.
+        @rtype: dict
+        """
+        collection = UnitProfile.get_collection()
+        profile_id = dict(consumer_id=consumer_id, content_type=content_type)
+        return collection.find_one(profile_id, fields=fields)
+
     def get_profile(self, consumer_id, content_type):
         """
         Get a profile by consumer ID and content type ID.
@@ -129,14 +221,34 @@ class ProfileManager(object):
         @type consumer_ids: list
         @return: A dict of:
             {<consumer_id>:{<content_type>:<profile>}}
-        @rtype: list
+        @rtype: dict
         """
         profiles = dict([(c, {}) for c in consumer_ids])
         collection = UnitProfile.get_collection()
-        for p in collection.find({'id':{'$in':profiles.keys()}}):
+        query = {'consumer_id':{'$in':profiles.keys()}}
+        fields = ['consumer_id', 'content_type', 'profile']
+        for p in collection.find(query, fields=fields):
             key = p['consumer_id']
             typeid = p['content_type']
             profile = p['profile']
             entry = profiles[key]
             entry[typeid] = profile
         return profiles
+
+    def find_profile_hashes(self, consumer_ids):
+        """
+        Get the hashes of all profiles associated with given consumers.
+        @param consumer_ids: A list of consumer IDs.
+        @type consumer_ids: list
+        @return: A dict of:
+            {<consumer_id>:{<content_type>:<profile_hash>}}
+        @rtype: dict
+        """
+        hashes = dict([(c, {}) for c in consumer_ids])
+        collection = UnitProfile.get_collection()
+        query = {'consumer_id':{'$in':hashes.keys()}}
+        fields = ['consumer_id', 'content_type', 'profile_hash']
+        for p in collection.find(query, fields=fields):
+            entry = hashes[p['consumer_id']]
+            entry[p['content_type']] = p.get('profile_hash')
+        return hashes
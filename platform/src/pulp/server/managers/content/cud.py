@@ -14,7 +14,9 @@
 import uuid
 
 from pulp.plugins.types import database as content_types_db
+from pulp.server.db.model.repository import RepoContentUnit
 from pulp.server.exceptions import InvalidValue
+import pulp.server.managers.factory as manager_factory
 
 class ContentManager(object):
     """
@@ -42,9 +44,35 @@ class ContentManager(object):
         collection.insert(unit_doc, safe=True)
         return unit_id
 
+    def add_content_units(self, content_type, units_metadata):
+        """
+        Add multiple content units and their metadata to the corresponding pulp
+        db collection using a single multi-document insert. A new unique id is
+        generated for each content unit.
+        @param content_type: unique id of content collection
+        @type content_type: str
+        @param units_metadata: list of content unit metadata
+        @type units_metadata: list of dict's
+        @return: list of generated unit ids, in the same order as the metadata
+        @rtype: list of str's
+        """
+        collection = content_types_db.type_units_collection(content_type)
+        unit_ids = []
+        unit_docs = []
+        for unit_metadata in units_metadata:
+            unit_id = str(uuid.uuid4())
+            unit_doc = {'_id': unit_id, '_content_type_id': content_type}
+            unit_doc.update(unit_metadata)
+            unit_ids.append(unit_id)
+            unit_docs.append(unit_doc)
+        if unit_docs:
+            collection.insert(unit_docs, safe=True)
+        return unit_ids
+
     def update_content_unit(self, content_type, unit_id, unit_metadata_delta):
         """
-        Update a content unit's stored metadata.
+        Update a content unit's stored metadata. The content revision of each
+        repository the unit is associated with is incremented.
         @param content_type: unique id of content collection
         @type content_type: str
         @param unit_id: unique id of content unit
@@ -55,6 +83,14 @@ class ContentManager(object):
         collection = content_types_db.type_units_collection(content_type)
         collection.update({'_id': unit_id}, {'$set': unit_metadata_delta}, safe=True)
 
+        # results determined from the content of the repositories, such as
+        # applicability, may depend on the unit's metadata
+        spec = {'unit_id': unit_id, 'unit_type_id': content_type}
+        associations = RepoContentUnit.get_collection().find(spec, fields=['repo_id'])
+        repo_ids = associations.distinct('repo_id')
+        if repo_ids:
+            manager_factory.repo_manager().update_content_revision(repo_ids)
+
     def remove_content_unit(self, content_type, unit_id):
         """
         Remove a content unit and its metadata from the corresponding pulp db
@@ -13,8 +13,11 @@
 
 import logging
 import os
+import Queue
 import re
 import shutil
+import threading
+import time
 from gettext import gettext as _
 
 from pulp.plugins.types import database as content_types_db
@@ -22,10 +25,18 @@ from pulp.server import config as pulp_config
 from pulp.server import exceptions as pulp_exceptions
 from pulp.server.db import connection as db_connection
 from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.dispatch import factory as dispatch_factory
+from pulp.server.util import paginate
 
 
 _LOG = logging.getLogger(__name__)
 
+# number of content units checked for associations in a single query
+ORPHAN_BATCH_SIZE = 1000
+
+# number of threads used to delete the bits of orphaned content units
+ORPHAN_DELETE_THREADS = 4
+
 
 class OrphanManager(object):
 
@@ -105,18 +116,54 @@ class OrphanManager(object):
         :rtype: generator
         """
 
+        return self._generate_orphans_by_type(content_type_id, fields)
+
+    def _generate_orphans_by_type(self, content_type_id, fields=None, content_unit_ids=None):
+        """
+        Return an generator of orphaned content units of the given content type,
+        optionally limited to the given content unit ids.
+
+        :param content_type_id: id of the content type
+        :type content_type_id: basestring
+        :param fields: list of fields to include in each content unit
+        :type fields: list or None
+        :param content_unit_ids: ids of the content units to consider; None means all of them
+        :type content_unit_ids: iterable or None
+        :return: generator of orphaned content units for the given content type
+        :rtype: generator
+        """
+
         fields = fields if fields is not None else ['_id']
         content_units_collection = content_types_db.type_units_collection(content_type_id)
         repo_content_units_collection = RepoContentUnit.get_collection()
 
-        for content_unit in content_units_collection.find({}, fields=fields):
+        if content_unit_ids is None:
+            content_units_cursor = content_units_collection.find({}, fields=fields)
+            content_units_cursor.batch_size(ORPHAN_BATCH_SIZE)
+            content_unit_batches = paginate(content_units_cursor, ORPHAN_BATCH_SIZE)
 
-            repo_content_units_cursor = repo_content_units_collection.find({'unit_id': content_unit['_id']})
+        else:
+            content_unit_batches = (list(content_units_collection.find({'_id': {'$in': id_batch}}, fields=fields))
+                                    for id_batch in paginate(content_unit_ids, ORPHAN_BATCH_SIZE))
 
-            if repo_content_units_cursor.count() > 0:
-                continue
+        # Rather than checking each unit for associations individually, the
+        # units are read in batches and the associated unit ids for the whole
+        # batch are retrieved with a single query against the unit_id index.
+        # The orphans are the set difference of the two.
+
+        for content_unit_batch in content_unit_batches:
 
-            yield content_unit
+            batch_unit_ids = [u['_id'] for u in content_unit_batch]
+            spec = {'unit_id': {'$in': batch_unit_ids}}
+            repo_content_units_cursor = repo_content_units_collection.find(spec, fields=['unit_id'])
+            associated_unit_ids = set(u['unit_id'] for u in repo_content_units_cursor)
+
+            for content_unit in content_unit_batch:
+
+                if content_unit['_id'] in associated_unit_ids:
+                    continue
+
+                yield content_unit
 
     def generate_orphans_by_type_with_unit_keys(self, content_type_id):
         """
@@ -151,14 +198,20 @@ class OrphanManager(object):
                                  given content type and unit id
         """
 
-        for content_unit in self.generate_orphans_by_type(content_type_id):
+        content_units_collection = content_types_db.type_units_collection(content_type_id)
+        repo_content_units_collection = RepoContentUnit.get_collection()
 
-            if content_unit['_id'] != content_unit_id:
-                continue
+        content_unit = content_units_collection.find_one({'_id': content_unit_id}, fields=['_id'])
+
+        if content_unit is None:
+            raise pulp_exceptions.MissingResource(content_type=content_type_id, content_unit=content_unit_id)
 
-            return content_unit
+        association = repo_content_units_collection.find_one({'unit_id': content_unit_id}, fields=['_id'])
 
-        raise pulp_exceptions.MissingResource(content_type=content_type_id, content_unit=content_unit_id)
+        if association is not None:
+            raise pulp_exceptions.MissingResource(content_type=content_type_id, content_unit=content_unit_id)
+
+        return content_unit
 
     def delete_all_orphans(self, flush=True):
         """
@@ -170,8 +223,10 @@ class OrphanManager(object):
         :type flush: bool
         """
 
+        progress = OrphanDeleteProgress()
+
         for content_type_id in content_types_db.all_type_ids():
-            self.delete_orphans_by_type(content_type_id, flush=False)
+            self._delete_orphans_by_type(content_type_id, None, progress)
 
         if flush:
             db_connection.flush_database()
@@ -197,11 +252,13 @@ class OrphanManager(object):
             if 'content_type_id' not in content_unit or 'unit_id' not in content_unit:
                 raise pulp_exceptions.InvalidValue(['content_type_id', 'unit_id'])
 
-            content_unit_id_list = content_units_by_content_type.setdefault(content_unit['content_type_id'], [])
-            content_unit_id_list.append(content_unit['unit_id'])
+            content_unit_id_set = content_units_by_content_type.setdefault(content_unit['content_type_id'], set())
+            content_unit_id_set.add(content_unit['unit_id'])
 
-        for content_type_id, content_unit_id_list in content_units_by_content_type.items():
-            self.delete_orphans_by_type(content_type_id, content_unit_id_list, flush=False)
+        progress = OrphanDeleteProgress()
+
+        for content_type_id, content_unit_id_set in content_units_by_content_type.items():
+            self._delete_orphans_by_type(content_type_id, content_unit_id_set, progress)
 
         if flush:
             db_connection.flush_database()
@@ -224,23 +281,55 @@ class OrphanManager(object):
         :type flush: bool
         """
 
+        if content_unit_ids is not None:
+            content_unit_ids = set(content_unit_ids)
+
+        self._delete_orphans_by_type(content_type_id, content_unit_ids, OrphanDeleteProgress())
+
+        # this forces the database to flush any cached changes to the disk
+        # in the background; for example: the unsafe deletes in the batches
+        if flush:
+            db_connection.flush_database()
+
+    def _delete_orphans_by_type(self, content_type_id, content_unit_ids, progress):
+        """
+        Delete the orphaned content units for the given content type, reporting
+        the progress of the deletion as it goes.
+
+        The units are removed from the database in batches, while their bits
+        are removed from disk by a pool of worker threads.
+
+        :param content_type_id: id of the content type
+        :type content_type_id: basestring
+        :param content_unit_ids: set of content unit ids to delete; None means delete them all
+        :type content_unit_ids: set or None
+        :param progress: progress report to update as units are deleted
+        :type progress: OrphanDeleteProgress
+        """
+
         content_units_collection = content_types_db.type_units_collection(content_type_id)
+        orphans = self._generate_orphans_by_type(content_type_id, ['_id', '_storage_path'], content_unit_ids)
+        file_deleter = OrphanedFileDeleter()
 
-        for content_unit in self.generate_orphans_by_type(content_type_id, fields=['_id', '_storage_path']):
+        progress.start_type(content_type_id)
 
-            if content_unit_ids is not None and content_unit['_id'] not in content_unit_ids:
-                continue
+        try:
+            for orphan_batch in paginate(orphans, ORPHAN_BATCH_SIZE):
 
-            content_units_collection.remove(content_unit['_id'], safe=False)
+                orphan_ids = [u['_id'] for u in orphan_batch]
+                content_units_collection.remove({'_id': {'$in': orphan_ids}}, safe=False)
 
-            storage_path = content_unit.get('_storage_path', None)
-            if storage_path is not None:
-                self.delete_orphaned_file(storage_path)
+                for content_unit in orphan_batch:
+                    storage_path = content_unit.get('_storage_path', None)
+                    if storage_path is not None:
+                        file_deleter.delete(storage_path)
 
-        # this forces the database to flush any cached changes to the disk
-        # in the background; for example: the unsafe deletes in the loop above
-        if flush:
-            db_connection.flush_database()
+                progress.update(content_type_id, len(orphan_batch))
+
+        finally:
+            file_deleter.finish()
+
+        progress.finish_type(content_type_id)
 
     # physical bits utility ----------------------------------------------------
 
@@ -250,34 +339,178 @@ class OrphanManager(object):
         @param path: absolute path to the file to delete
         @type  path: str
         """
-        assert os.path.isabs(path)
-
-        _LOG.debug(_('Deleting orphaned file: %(p)s') % {'p': path})
-
-        if not os.path.exists(path):
-            _LOG.warn(_('Cannot delete orphaned file: %(p)s, No such file') % {'p': path})
-            return
+        if _delete_path(path):
+            _prune_empty_directories([os.path.dirname(path)])
+
+# orphan deletion utilities ----------------------------------------------------
+
+class OrphanDeleteProgress(object):
+    """
+    Tracks the number of orphaned content units deleted, per content type, and
+    the rate at which they were deleted. The progress is reported to the
+    dispatch context every time it changes and logged once a content type has
+    been completely processed.
+    """
+
+    def __init__(self):
+        self.report = {}
+        self._start_times = {}
+
+    def start_type(self, content_type_id):
+        self._start_times[content_type_id] = time.time()
+        self.report[content_type_id] = {'state': 'running',
+                                        'deleted': 0,
+                                        'elapsed_seconds': 0.0,
+                                        'units_per_second': 0.0}
+        self._report()
+
+    def update(self, content_type_id, deleted):
+        type_report = self.report[content_type_id]
+        type_report['deleted'] += deleted
+        elapsed = time.time() - self._start_times[content_type_id]
+        type_report['elapsed_seconds'] = elapsed
+        if elapsed > 0:
+            type_report['units_per_second'] = type_report['deleted'] / elapsed
+        self._report()
+
+    def finish_type(self, content_type_id):
+        self.update(content_type_id, 0)
+        type_report = self.report[content_type_id]
+        type_report['state'] = 'finished'
+        self._report()
+
+        msg = _('Deleted %(n)d orphaned units of type %(t)s in %(s).2f seconds (%(r).2f units/second)')
+        _LOG.info(msg % {'n': type_report['deleted'], 't': content_type_id,
+                         's': type_report['elapsed_seconds'], 'r': type_report['units_per_second']})
+
+    def _report(self):
+        dispatch_factory.context().report_progress(self.report)
+
+
+class OrphanedFileDeleter(object):
+    """
+    Deletes the bits of orphaned content units using a bounded pool of worker
+    threads. Parent directories that fall empty are pruned once all of the
+    files have been deleted, so each directory is only examined once no matter
+    how many of the deleted files it contained.
+    """
+
+    def __init__(self, thread_count=None):
+        thread_count = thread_count or ORPHAN_DELETE_THREADS
+        self._queue = Queue.Queue(maxsize=thread_count * ORPHAN_BATCH_SIZE)
+        self._lock = threading.Lock()
+        self._parent_dirs = set()
+        self._threads = []
+
+        for i in range(thread_count):
+            thread = threading.Thread(target=self._run)
+            thread.setDaemon(True)
+            thread.start()
+            self._threads.append(thread)
+
+    def delete(self, path):
+        """
+        Queue the given file or directory for deletion. This call blocks if the
+        worker threads have fallen too far behind.
+        @param path: absolute path to the file to delete
+        @type  path: str
+        """
+        self._queue.put(path)
 
-        if not os.access(path, os.W_OK):
-            _LOG.warn(_('Cannot delete orphaned file: %(p)s, Insufficient permissions') % {'p': path})
-            return
+    def finish(self):
+        """
+        Wait for all queued deletions to complete, then prune any parent
+        directories that fell empty.
+        """
+        for thread in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
 
-        if os.path.isfile(path) or os.path.islink(path):
-            os.unlink(path)
-        elif os.path.isdir(path):
-            shutil.rmtree(path)
+        _prune_empty_directories(self._parent_dirs)
+        self._parent_dirs = set()
 
-        # delete parent directories on the path as long as they fall empty
-        storage_dir = pulp_config.config.get('server', 'storage_dir')
-        root_content_regex = re.compile(os.path.join(storage_dir, 'content', '[^/]+/?'))
+    def _run(self):
         while True:
-            path = os.path.dirname(path)
-            if root_content_regex.match(path):
-                break
-            contents = os.listdir(path)
-            if contents:
+            path = self._queue.get()
+            if path is None:
                 break
+            try:
+                if _delete_path(path):
+                    with self._lock:
+                        self._parent_dirs.add(os.path.dirname(path))
+            except Exception:
+                _LOG.exception(_('Error deleting orphaned file: %(p)s') % {'p': path})
+
+
+def _delete_path(path):
+    """
+    Delete the given orphaned file or directory.
+    @param path: absolute path to the file to delete
+    @type  path: str
+    @return: True if the path was deleted, False otherwise
+    @rtype:  bool
+    """
+    assert os.path.isabs(path)
+
+    _LOG.debug(_('Deleting orphaned file: %(p)s') % {'p': path})
+
+    if not os.path.exists(path):
+        _LOG.warn(_('Cannot delete orphaned file: %(p)s, No such file') % {'p': path})
+        return False
+
+    if not os.access(path, os.W_OK):
+        _LOG.warn(_('Cannot delete orphaned file: %(p)s, Insufficient permissions') % {'p': path})
+        return False
+
+    if os.path.isfile(path) or os.path.islink(path):
+        os.unlink(path)
+    elif os.path.isdir(path):
+        shutil.rmtree(path)
+
+    return True
+
+
+def _prune_empty_directories(paths):
+    """
+    Delete the given directories, and their parent directories, as long as they
+    are empty. Directories are processed deepest first so a parent is only
+    examined after all of its candidate children have been handled.
+    @param paths: absolute paths of the directories to prune
+    @type  paths: iterable of str
+    """
+    storage_dir = pulp_config.config.get('server', 'storage_dir')
+    root_content_regex = _root_content_regex(storage_dir)
+
+    paths_by_depth = {}
+    for path in paths:
+        path = os.path.normpath(path)
+        paths_by_depth.setdefault(path.count(os.sep), set()).add(path)
+
+    depth = max(paths_by_depth.keys() or [0])
+    while depth > 0:
+        for path in paths_by_depth.pop(depth, ()):
+            if root_content_regex.match(path):
+                continue
+            if not os.path.isdir(path) or os.listdir(path):
+                continue
             if not os.access(path, os.W_OK):
-                break
+                continue
             os.rmdir(path)
-
+            paths_by_depth.setdefault(depth - 1, set()).add(os.path.dirname(path))
+        depth -= 1
+
+
+_ROOT_CONTENT_REGEXES = {}
+
+def _root_content_regex(storage_dir):
+    """
+    Return the compiled regular expression matching the root content directory
+    of every content type in the given storage directory.
+    """
+    regex = _ROOT_CONTENT_REGEXES.get(storage_dir)
+    if regex is None:
+        regex = re.compile(os.path.join(storage_dir, 'content', '[^/]+/?'))
+        _ROOT_CONTENT_REGEXES[storage_dir] = regex
+    return regex
@@ -16,13 +16,15 @@ import os
 import sys
 from uuid import uuid4
 
+from pulp.common import upload as upload_utils
 from pulp.plugins.conduits.upload import UploadConduit
 from pulp.plugins.loader import api as plugin_api
 from pulp.plugins.loader import exceptions as plugin_exceptions
 from pulp.plugins.config import PluginCallConfiguration
 from pulp.server import config as pulp_config
 from pulp.server.db.model.repository import RepoContentUnit
-from pulp.server.exceptions import PulpDataException, MissingResource, PulpExecutionException, PulpException
+from pulp.server.exceptions import (PulpDataException, MissingResource, PulpExecutionException,
+                                    PulpException, InvalidValue)
 import pulp.server.managers.factory as manager_factory
 import pulp.server.managers.repo._common as repo_common_utils
 
@@ -64,13 +66,17 @@ class ContentUploadManager(object):
 
         return upload_id
 
-    def save_data(self, upload_id, offset, data):
+    def save_data(self, upload_id, offset, data, checksum=None):
         """
         Saves bits into the given upload request starting at an offset value.
         The initialize_upload method should be called prior to this method
         to retrieve the upload_id value and perform any steps necessary before
         bits can be saved.
 
+        If a checksum is specified, the data is verified against it before it
+        is written and the checksum is recorded so the whole upload can later
+        be verified without reading the file (see verify_upload).
+
         @param upload_id: upload request ID
         @type  upload_id: str
 
@@ -79,6 +85,11 @@ class ContentUploadManager(object):
 
         @param data: content to write to the file
         @type  data: str
+
+        @param checksum: SHA-256 hex digest of the data; optional
+        @type  checksum: str
+
+        @raise InvalidValue: if the data does not match the checksum
         """
 
         file_path = self._upload_file_path(upload_id)
@@ -87,11 +98,67 @@ class ContentUploadManager(object):
         if not os.path.exists(file_path):
             raise MissingResource(upload_request=upload_id)
 
+        if checksum is not None and upload_utils.segment_checksum(data) != checksum:
+            raise InvalidValue(['checksum'])
+
         f = open(file_path, 'r+')
         f.seek(offset)
         f.write(data)
         f.close()
 
+        if checksum is not None:
+            # Segments are saved concurrently, so each is recorded in a single
+            # append to the file
+            f = open(self._upload_checksums_path(upload_id), 'a')
+            f.write('%d %d %s\n' % (offset, len(data), checksum))
+            f.close()
+
+    def verify_upload(self, upload_id, checksum):
+        """
+        Verifies the uploaded file against the checksum of the whole upload,
+        calculated from the checksums recorded as each segment was saved. The
+        file itself is not read.
+
+        @param upload_id: upload request ID
+        @type  upload_id: str
+
+        @param checksum: checksum of the whole upload, as calculated by
+               pulp.common.upload.upload_checksum
+        @type  checksum: str
+
+        @raise MissingResource: if the upload request does not exist
+        @raise PulpDataException: if the file was not entirely saved with
+               checksums or does not match the checksum
+        """
+
+        file_path = self._upload_file_path(upload_id)
+        if not os.path.exists(file_path):
+            raise MissingResource(upload_request=upload_id)
+
+        # Later records for the same offset replace earlier ones, such as
+        # when a segment is sent again after a failure
+        segments = {}
+        checksums_path = self._upload_checksums_path(upload_id)
+        if os.path.exists(checksums_path):
+            f = open(checksums_path)
+            for line in f:
+                offset, length, segment_checksum = line.split()
+                segments[int(offset)] = (int(length), segment_checksum)
+            f.close()
+
+        file_size = os.path.getsize(file_path)
+        segment_checksums = []
+        offset = 0
+        while offset < file_size:
+            if offset not in segments:
+                raise PulpDataException('Upload [%s] has no verified data at offset [%d]' % (upload_id, offset))
+            length, segment_checksum = segments[offset]
+            segment_checksums.append(segment_checksum)
+            offset += length
+
+        if upload_utils.upload_checksum(segment_checksums) != checksum:
+            raise PulpDataException('Upload [%s] does not match its checksum' % upload_id)
+
     def delete_upload(self, upload_id):
         """
         Deletes all files associated with the given upload request. If the
@@ -102,9 +169,9 @@ class ContentUploadManager(object):
         @type  upload_id: str
         """
 
-        file_path = self._upload_file_path(upload_id)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        for file_path in (self._upload_file_path(upload_id), self._upload_checksums_path(upload_id)):
+            if os.path.exists(file_path):
+                os.remove(file_path)
 
     def read_upload(self, upload_id):
         """
@@ -171,7 +238,8 @@ class ContentUploadManager(object):
 
         return True
 
-    def import_uploaded_unit(self, repo_id, unit_type_id, unit_key, unit_metadata, upload_id):
+    def import_uploaded_unit(self, repo_id, unit_type_id, unit_key, unit_metadata, upload_id,
+                             upload_checksum=None):
         """
         Called to trigger the importer's handling of an uploaded unit. This
         should not be called until the bits have finished uploading. The
@@ -197,11 +265,18 @@ class ContentUploadManager(object):
 
         @param upload_id: upload being imported
         @type  upload_id: str
+
+        @param upload_checksum: checksum of the whole upload; if specified,
+               the upload is verified before it is imported
+        @type  upload_checksum: str
         """
 
         # If it doesn't raise an exception, it's good to go
         self.is_valid_upload(repo_id, unit_type_id)
 
+        if upload_checksum is not None:
+            self.verify_upload(upload_id, upload_checksum)
+
         repo_query_manager = manager_factory.repo_query_manager()
         importer_manager = manager_factory.repo_importer_manager()
 
@@ -250,6 +325,26 @@ class ContentUploadManager(object):
         path = os.path.join(upload_storage_dir, upload_id)
         return path
 
+    def _upload_checksums_path(self, upload_id):
+        """
+        Returns the full path to the file recording the checksums of the
+        segments saved for the given upload. These are kept outside of the
+        upload storage directory so they aren't listed as uploads.
+
+        @param upload_id: identifies the upload in question
+        @type  upload_id: str
+
+        @return: full path on the server's filesystem
+        @rtype:  str
+        """
+        storage_dir = pulp_config.config.get('server', 'storage_dir')
+        checksums_dir = os.path.join(storage_dir, 'upload_checksums')
+
+        if not os.path.exists(checksums_dir):
+            os.makedirs(checksums_dir)
+
+        return os.path.join(checksums_dir, upload_id)
+
     def _upload_storage_dir(self):
         """
         Calculates the location of the directory into which to store uploaded
@@ -16,13 +16,74 @@ Handles the CRUD for event listeners.
 """
 from bson.errors import InvalidId
 import sys
+import threading
+import time
 
 from pulp.server.compat import ObjectId
+from pulp.server.config import config
 from pulp.server.db.model.event import EventListener
 from pulp.server.exceptions import InvalidValue, MissingResource
 from pulp.server.event import notifiers
 from pulp.server.event.data import ALL_EVENT_TYPES
 
+# -- listener cache ----------------------------------------------------------
+
+class ListenerCache(object):
+    """
+    Caches all event listeners so that firing an event does not query the
+    database. Changes made through the EventListenerManager invalidate the
+    cache immediately; changes made by other processes are picked up when the
+    cache expires after the configured listener_cache_lifetime.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = 0
+        self.listeners = None
+        self.loaded = 0
+
+    def invalidate(self):
+        """
+        Discards the cached listeners.
+        """
+        self.lock.acquire()
+        try:
+            self.version += 1
+            self.listeners = None
+        finally:
+            self.lock.release()
+
+    def find_by_event_type(self, event_type):
+        """
+        @param event_type: event type being fired
+        @type  event_type: str
+
+        @return: listeners for the event type, including those listening to
+                 all event types ('*'); these must not be modified
+        @rtype:  list
+        """
+        listeners = self.listeners
+        lifetime = config.getfloat('notifications', 'listener_cache_lifetime')
+        if listeners is None or time.time() - self.loaded > lifetime:
+            listeners = self._load()
+        return [l for l in listeners if event_type in l['event_types'] or '*' in l['event_types']]
+
+    def _load(self):
+        version = self.version
+        listeners = list(EventListener.get_collection().find())
+        self.lock.acquire()
+        try:
+            # don't cache a load that raced with an invalidation
+            if version == self.version:
+                self.listeners = listeners
+                self.loaded = time.time()
+        finally:
+            self.lock.release()
+        return listeners
+
+
+LISTENER_CACHE = ListenerCache()
+
 # -- manager -----------------------------------------------------------------
 
 class EventListenerManager(object):
@@ -70,6 +131,7 @@ class EventListenerManager(object):
         el = EventListener(notifier_type_id, notifier_config, event_types)
         collection = EventListener.get_collection()
         created_id = collection.save(el, safe=True)
+        LISTENER_CACHE.invalidate()
         created = collection.find_one(created_id)
 
         return created
@@ -116,6 +178,7 @@ class EventListenerManager(object):
         self.get(event_listener_id) # check for MissingResource
 
         collection.remove({'_id' : ObjectId(event_listener_id)})
+        LISTENER_CACHE.invalidate()
 
     def update(self, event_listener_id, notifier_config=None, event_types=None):
         """
@@ -166,6 +229,7 @@ class EventListenerManager(object):
 
         # Update the database
         collection.save(existing, safe=True)
+        LISTENER_CACHE.invalidate()
 
         # Reload to return
         existing = collection.find_one({'_id' : ObjectId(event_listener_id)})
@@ -182,6 +246,20 @@ class EventListenerManager(object):
         listeners = list(EventListener.get_collection().find())
         return listeners
 
+    def find_by_event_type(self, event_type):
+        """
+        Returns the event listeners for the given event type. The listeners
+        are cached, so this does not query the database on each call.
+
+        @param event_type: event type being fired
+        @type  event_type: str
+
+        @return: listeners for the event type, including those listening to
+                 all event types; these must not be modified
+        @rtype:  list
+        """
+        return LISTENER_CACHE.find_by_event_type(event_type)
+
 def _validate_event_types(event_types):
     if not isinstance(event_types, (tuple, list)) or len(event_types) == 0:
         raise InvalidValue(['event_types'])
@@ -267,6 +267,9 @@ class RepoManager(object):
 
             # Remove all associations from the repo
             RepoContentUnit.get_collection().remove({'repo_id' : repo_id}, safe=True)
+
+            # Remove cached applicability for the repo
+            manager_factory.consumer_applicability_manager().repo_deleted(repo_id)
         except Exception, e:
             _LOG.exception('Error updating one or more database collections while removing repo [%s]' % repo_id)
             error_tuples.append( (_('Database Removal Error'), e.args))
@@ -333,6 +336,27 @@ class RepoManager(object):
 
         return repo
 
+    @staticmethod
+    def update_content_revision(repo_ids):
+        """
+        Increments the 'content_revision' of each of the given repos so that
+        results determined from their content can be invalidated when units
+        associated with them change in place, such as when a unit's metadata
+        is updated.
+
+        :param repo_ids: identifies the repos
+        :type  repo_ids: list
+        """
+        spec = {'id' : {'$in' : list(repo_ids)}}
+        operation = {'$inc' : {'content_revision' : 1}}
+        repo_coll = Repo.get_collection()
+
+        try:
+            repo_coll.update(spec, operation, multi=True, safe=True)
+        except pymongo.errors.OperationFailure:
+            message = 'There was a problem updating repositories %s' % ', '.join(repo_ids)
+            raise PulpExecutionException(message), None, sys.exc_info()[2]
+
     @staticmethod
     def update_unit_count(repo_id, unit_type_id, delta):
         """
@@ -343,6 +367,9 @@ class RepoManager(object):
 
         {'rpm': 12, 'srpm': 3}
 
+        The repo's 'content_revision' is incremented along with the count so
+        that results determined from the repo's content can be invalidated.
+
         :param repo_id: identifies the repo
         :type  repo_id: str
 
@@ -353,7 +380,8 @@ class RepoManager(object):
         :type  delta: int
         """
         spec = {'id' : repo_id}
-        operation = {'$inc' : {'content_unit_counts.%s' % unit_type_id: delta}}
+        operation = {'$inc' : {'content_unit_counts.%s' % unit_type_id: delta,
+                               'content_revision' : 1}}
         repo_coll = Repo.get_collection()
 
         if delta:
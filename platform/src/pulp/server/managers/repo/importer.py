@@ -81,12 +81,22 @@ class RepoImporterManager(object):
         projection = {'scratchpad' : 0}
         importers = list(RepoImporter.get_collection().find(spec, projection))
 
-        # Process any scheduled syncs and get schedule details using schedule id
+        # Process any scheduled syncs and get schedule details using schedule
+        # id; the schedules for all of the importers are retrieved at once
+        scheduled_sync_ids = []
         for importer in importers:
-            scheduled_sync_ids = importer.get('scheduled_syncs', None)
-            if scheduled_sync_ids is not None:
-                scheduled_sync_details = list(ScheduledCall.get_collection().find({"id": {"$in": scheduled_sync_ids}}))
-                importer['scheduled_syncs'] = [s["schedule"] for s in scheduled_sync_details]
+            scheduled_sync_ids.extend(importer.get('scheduled_syncs', None) or [])
+
+        schedules = {}
+        if scheduled_sync_ids:
+            spec = {'id' : {'$in' : scheduled_sync_ids}}
+            for scheduled_call in ScheduledCall.get_collection().find(spec):
+                schedules[scheduled_call['id']] = scheduled_call['schedule']
+
+        for importer in importers:
+            ids = importer.get('scheduled_syncs', None)
+            if ids is not None:
+                importer['scheduled_syncs'] = [schedules[i] for i in ids if i in schedules]
 
         return importers
 
@@ -153,6 +153,9 @@ class RepoSyncManager(object):
         try:
             sync_report = importer_instance.sync_repo(transfer_repo, conduit, call_config)
 
+            # Write out any units the importer left in the conduit's save buffer
+            conduit.flush()
+
         except Exception, e:
             sync_end_timestamp = _now_timestamp()
 
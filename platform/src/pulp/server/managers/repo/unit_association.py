@@ -30,6 +30,7 @@ from pulp.server.db.model.repository import RepoContentUnit
 import pulp.server.managers.factory as manager_factory
 import pulp.server.exceptions as exceptions
 import pulp.server.managers.repo._common as common_utils
+from pulp.server.util import paginate
 
 # -- constants ----------------------------------------------------------------
 
@@ -56,6 +57,9 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
+# Number of unit IDs handled per database operation by the bulk association calls
+ASSOCIATION_BATCH_SIZE = 1000
+
 # -- manager ------------------------------------------------------------------
 
 class RepoUnitAssociationManager(object):
@@ -133,12 +137,18 @@ class RepoUnitAssociationManager(object):
             manager = manager_factory.repo_manager()
             manager.update_unit_count(repo_id, unit_type_id, 1)
 
-    def associate_all_by_ids(self, repo_id, unit_type_id, unit_id_list, owner_type, owner_id):
+    def associate_all_by_ids(self, repo_id, unit_type_id, unit_id_list, owner_type, owner_id,
+                             batch_size=ASSOCIATION_BATCH_SIZE):
         """
         Creates multiple associations between the given repo and content units.
 
         See associate_unit_by_id for semantics.
 
+        The unit IDs are processed in batches. For each batch, the existing
+        associations are retrieved in a single query and only the missing
+        associations are written, using a single multi-document insert. The
+        unit count on the repo is updated once at the end of the call.
+
         @param repo_id: identifies the repo
         @type  repo_id: str
 
@@ -156,18 +166,42 @@ class RepoUnitAssociationManager(object):
                          the importer ID or user login
         @type  owner_id: str
 
+        @param batch_size: maximum number of unit IDs to query for and insert
+                           in a single database operation
+        @type  batch_size: int
+
         @raise InvalidType: if the given owner type is not of the valid enumeration
         """
 
-        # There may be a way to batch this in mongo which would be ideal for a
-        # bulk operation like this. But for deadline purposes, this call will
-        # simply loop and call the single method.
+        if owner_type not in _OWNER_TYPES:
+            raise exceptions.InvalidValue(['owner_type'])
+
+        collection = RepoContentUnit.get_collection()
+
+        # Duplicates in the input are dropped up front so they are neither
+        # inserted twice nor counted twice.
+        unique_unit_ids = _unique(unit_id_list)
 
         unique_count = 0
-        for unit_id in unit_id_list:
-            if not self.association_exists(repo_id, unit_id, unit_type_id):
-                unique_count += 1
-            self.associate_unit_by_id(repo_id, unit_type_id, unit_id, owner_type, owner_id, False)
+        for unit_id_batch in paginate(unique_unit_ids, batch_size):
+            spec = {'repo_id' : repo_id,
+                    'unit_type_id' : unit_type_id,
+                    'unit_id' : {'$in' : unit_id_batch}}
+            fields = ['unit_id', 'owner_type', 'owner_id']
+
+            associated_unit_ids = set()
+            owned_unit_ids = set()
+            for association in collection.find(spec, fields=fields):
+                associated_unit_ids.add(association['unit_id'])
+                if association['owner_type'] == owner_type and association['owner_id'] == owner_id:
+                    owned_unit_ids.add(association['unit_id'])
+
+            new_associations = [RepoContentUnit(repo_id, unit_id, unit_type_id, owner_type, owner_id)
+                                for unit_id in unit_id_batch if unit_id not in owned_unit_ids]
+            if new_associations:
+                collection.insert(new_associations, safe=True)
+
+            unique_count += len([u for u in unit_id_batch if u not in associated_unit_ids])
 
         # update the count of associated units on the repo object
         if unique_count:
@@ -437,6 +471,18 @@ class RepoUnitAssociationManager(object):
 
 # -- extracted for brevity above ----------------------------------------------
 
+def _unique(items):
+    """
+    Removes duplicates from the given items, preserving the original order.
+    """
+    seen = set()
+    unique_items = []
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            unique_items.append(item)
+    return unique_items
+
 def load_associated_units(source_repo_id, criteria):
     criteria.association_fields = None
 
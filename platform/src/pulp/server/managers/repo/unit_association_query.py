@@ -22,6 +22,7 @@ import pymongo
 import pulp.plugins.types.database as types_db
 from pulp.server.db.model.criteria import UnitAssociationCriteria
 from pulp.server.db.model.repository import RepoContentUnit
+from pulp.server.util import paginate
 
 # -- constants ----------------------------------------------------------------
 
@@ -41,6 +42,18 @@ SORT_DESCENDING = pymongo.DESCENDING
 
 _VALID_DIRECTIONS = (SORT_ASCENDING, SORT_DESCENDING)
 
+# Number of units whose metadata is retrieved in a single query
+UNIT_BATCH_SIZE = 1000
+
+# Upper bound on the estimated size of the IDs sent in a single $in clause;
+# the database rejects query documents larger than 16MB
+MAX_IN_QUERY_BYTES = 4 * 1024 * 1024
+
+# Largest number of associations for which a unit sorted query passes all of
+# the repository's unit IDs to the database in a single filter; above this the
+# units are scanned in sort order and joined against the associations instead
+UNIT_SORT_IN_QUERY_LIMIT = 50000
+
 # -- manager ------------------------------------------------------------------
 
 class RepoUnitAssociationQueryManager(object):
@@ -117,6 +130,38 @@ class RepoUnitAssociationQueryManager(object):
         else:
             return self.get_units_across_types(repo_id, criteria=criteria)
 
+    def iter_units(self, repo_id, criteria=None, batch_size=UNIT_BATCH_SIZE):
+        """
+        Generator variant of get_units. Delegates to the appropriate iter_units_*
+        call depending on the contents of the criteria.
+
+        Units are retrieved from the database in batches of at most batch_size
+        and yielded as each batch is assembled, which keeps memory usage
+        bounded regardless of the size of the repository.
+
+        @param repo_id: identifies the repository
+        @type  repo_id: str
+
+        @param criteria: if specified will drive the query
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: maximum number of units to retrieve in a single query
+        @type  batch_size: int
+
+        @return: generator of association dicts with the unit metadata merged
+                 in under the "metadata" key
+        @rtype:  generator
+        """
+
+        if criteria is not None and\
+           criteria.type_ids is not None and\
+           len(criteria.type_ids) == 1:
+
+            type_id = criteria.type_ids[0]
+            return self.iter_units_by_type(repo_id, type_id, criteria=criteria, batch_size=batch_size)
+        else:
+            return self.iter_units_across_types(repo_id, criteria=criteria, batch_size=batch_size)
+
     def get_units_across_types(self, repo_id, criteria=None):
         """
         Retrieves data describing units associated with the given repository
@@ -139,6 +184,36 @@ class RepoUnitAssociationQueryManager(object):
         @param criteria: if specified will drive the query
         @type  criteria: L{UnitAssociationCriteria}
         """
+        return list(self.iter_units_across_types(repo_id, criteria=criteria))
+
+    def iter_units_across_types(self, repo_id, criteria=None, batch_size=UNIT_BATCH_SIZE):
+        """
+        Generator variant of get_units_across_types. The semantics of the
+        criteria are identical, however the units are yielded as they are
+        retrieved instead of being returned in a single list.
+
+        Associations are read from the database cursor in batches of
+        batch_size. The unit metadata for each batch is retrieved with a
+        single query per unit type in the batch, so the full set of units
+        never needs to be held in memory at once.
+
+        The one exception is when the criteria requests duplicate associations
+        be removed; the association documents (but not the unit metadata) must
+        all be loaded to determine which association to keep.
+
+        @param repo_id: identifies the repository
+        @type  repo_id: str
+
+        @param criteria: if specified will drive the query
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: maximum number of units to look up in a single query
+        @type  batch_size: int
+
+        @return: generator of association dicts with the unit metadata merged
+                 in under the "metadata" key
+        @rtype:  generator
+        """
 
         # For simplicity, create a criteria if one is not provided and use its defaults
         if criteria is None:
@@ -180,26 +255,27 @@ class RepoUnitAssociationQueryManager(object):
         if criteria.skip is not None:
             cursor.skip(criteria.skip)
 
-        # Finally do the query and assemble the associations structure
-        units = list(cursor)
+        cursor.batch_size(batch_size)
 
         # -- remove multiple associations -------------------------------------
 
         if criteria.remove_duplicates:
-            units = self._remove_duplicate_associations(units)
+            units = self._remove_duplicate_associations(list(cursor))
+        else:
+            units = cursor
 
         # -- unit lookups -----------------------------------------------------
 
         # By this point, we've applied all of the filters, sorting, and limits.
         # We simply need to look up the unit metadata itself and merge it into the
-        # combined association and unit metadata dictionary.
-
-        for u in units:
-            type_collection = types_db.type_units_collection(u['unit_type_id'])
-            metadata = type_collection.find_one({'_id' : u['unit_id']})
-            u['metadata'] = metadata
+        # combined association and unit metadata dictionary. This is done a
+        # batch at a time to keep the number of queries down without needing
+        # the full result set in memory.
 
-        return units
+        for unit_batch in paginate(units, batch_size):
+            _merge_metadata_across_types(unit_batch, criteria.unit_fields)
+            for u in unit_batch:
+                yield u
 
     def get_units_by_type(self, repo_id, type_id, criteria=None):
         """
@@ -223,6 +299,40 @@ class RepoUnitAssociationQueryManager(object):
         @param criteria: if specified will drive the query
         @type  criteria: L{UnitAssociationCriteria}
         """
+        return list(self.iter_units_by_type(repo_id, type_id, criteria=criteria))
+
+    def iter_units_by_type(self, repo_id, type_id, criteria=None, batch_size=UNIT_BATCH_SIZE):
+        """
+        Generator variant of get_units_by_type. The semantics of the criteria
+        are identical, however the units are yielded as they are retrieved
+        instead of being returned in a single list.
+
+        When sorting on association fields, associations are read in batches
+        of batch_size and the unit metadata is retrieved a batch at a time.
+        When sorting on unit fields and the repository has at most
+        UNIT_SORT_IN_QUERY_LIMIT associations of the type, the (small)
+        association documents are loaded up front to be merged into the units,
+        but the unit metadata is streamed from the database in batches of
+        batch_size. Larger repositories are handled by scanning the units in
+        sort order and joining each batch against its associations, so neither
+        the associations nor the unit IDs need to be held in memory at once.
+
+        @param repo_id: identifies the repository
+        @type  repo_id: str
+
+        @param type_id: limits returned units to the given type
+        @type  type_id: str
+
+        @param criteria: if specified will drive the query
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: maximum number of units to retrieve in a single query
+        @type  batch_size: int
+
+        @return: generator of association dicts with the unit metadata merged
+                 in under the "metadata" key
+        @rtype:  generator
+        """
 
         # For simplicity, create a criteria if one is not provided and use its defaults
         if criteria is None:
@@ -261,12 +371,7 @@ class RepoUnitAssociationQueryManager(object):
             if criteria.skip is not None:
                 cursor.skip(criteria.skip)
 
-        unit_associations = list(cursor)
-
-        # -- remove multiple associations -------------------------------------
-
-        if criteria.remove_duplicates:
-            unit_associations = self._remove_duplicate_associations(unit_associations)
+        cursor.batch_size(batch_size)
 
         # -- unit lookups -----------------------------------------------------
 
@@ -285,34 +390,50 @@ class RepoUnitAssociationQueryManager(object):
             # The units are already sorted, so we have to maintain the order in
             # the units list. We also haven't applied the unit filters to the
             # list yet, so we're not guaranteed that everything in unit_associations
-            # is going to be part of the result.
-
-            # The first step is to figure out which associations actually match the
-            # unit filters. This only applies if there is unit filtering.
-            if len(unit_spec) > 0:
-                association_unit_ids = [u['unit_id'] for u in unit_associations]
-                unit_id_spec = copy.copy(unit_spec)
-                unit_id_spec['_id'] = {'$in' : association_unit_ids}
-                matching_unit_id_cursor = type_collection.find(unit_id_spec, fields=['_id'])
-                matching_unit_ids = [u['_id'] for u in matching_unit_id_cursor] # unpack mongo format
-
-                # Remove all associations didn't match the units after the filter was applied
-                unit_associations = [u for u in unit_associations if u['unit_id'] in matching_unit_ids]
-
-            # Batch look up all of the units. This seems like it'd be rough on memory, but since
-            # we have to ultimately return all of this data to the caller, it's going to end up there
-            # anyway.
-            all_unit_ids = [u['unit_id'] for u in unit_associations]
-            spec = {'_id' : {'$in' : all_unit_ids}}
-            all_metadata = type_collection.find(spec, fields=criteria.unit_fields)
-
-            # Convert to dict by unit_id for simple lookup
-            metadata_by_id = dict([(u['_id'], u) for u in all_metadata])
-            def merge_metadata(association):
-                association['metadata'] = metadata_by_id[association['unit_id']]
-            map(merge_metadata, unit_associations)
-            
-            return unit_associations
+            # is going to be part of the result. Each batch of associations is
+            # filtered and merged with its metadata before it is yielded.
+
+            if criteria.remove_duplicates:
+                unit_associations = self._remove_duplicate_associations(list(cursor))
+            else:
+                unit_associations = cursor
+
+            for association_batch in paginate(unit_associations, batch_size):
+                batch_unit_ids = list(set(u['unit_id'] for u in association_batch))
+
+                # The first step is to figure out which associations actually match the
+                # unit filters. This only applies if there is unit filtering.
+                if len(unit_spec) > 0:
+                    matching_unit_ids = set()
+                    for unit_ids in _id_batches(batch_unit_ids, batch_size):
+                        unit_id_spec = copy.copy(unit_spec)
+                        unit_id_spec['_id'] = {'$in' : unit_ids}
+                        matching_unit_id_cursor = type_collection.find(unit_id_spec, fields=['_id'])
+                        matching_unit_ids.update(u['_id'] for u in matching_unit_id_cursor)
+
+                    # Remove all associations didn't match the units after the filter was applied
+                    association_batch = [u for u in association_batch if u['unit_id'] in matching_unit_ids]
+                    batch_unit_ids = list(matching_unit_ids)
+
+                    if not association_batch:
+                        continue
+
+                # Batch look up all of the units in this batch and convert them
+                # to a dict by unit_id for simple lookup.
+                metadata_by_id = {}
+                for unit_ids in _id_batches(batch_unit_ids, batch_size):
+                    metadata_spec = {'_id' : {'$in' : unit_ids}}
+                    batch_metadata = type_collection.find(metadata_spec, fields=criteria.unit_fields)
+                    metadata_by_id.update((u['_id'], u) for u in batch_metadata)
+
+                merged = set()
+                for association in association_batch:
+                    metadata = metadata_by_id[association['unit_id']]
+                    if association['unit_id'] in merged:
+                        metadata = copy.deepcopy(metadata)
+                    merged.add(association['unit_id'])
+                    association['metadata'] = metadata
+                    yield association
 
         else:
             # Sorting will be done in the units collection. Since the type is
@@ -320,45 +441,122 @@ class RepoUnitAssociationQueryManager(object):
             # means we can transform the associations into a simple dict lookup
             # by _id when we need to merge in the association data.
 
-            # Restructure the associations by ID so we can look them up later and
-            # so we have a list of all unit IDs to pass as a filter.
-            associations_by_id = dict([(u['unit_id'], u) for u in unit_associations])
-
-            # We only want to return units with an association, so add in all of
-            # the unit IDs we found earlier.
-            unit_spec['_id'] = {'$in' : associations_by_id.keys()}
-
-            cursor = type_collection.find(unit_spec, fields=criteria.unit_fields)
-
             # Determine what our sort criteria will look like
             if criteria.unit_sort is None:
                 # Default the sort to the unit key
                 unit_key_fields = types_db.type_units_unit_key(type_id)
                 sort_spec = [(u, SORT_ASCENDING) for u in unit_key_fields]
+            else:
+                sort_spec = criteria.unit_sort
+
+            if cursor.count() <= UNIT_SORT_IN_QUERY_LIMIT:
+                # The repository's associations are few enough to be passed
+                # to the database as a single filter, letting it take care of
+                # the sort, limit and skip.
+
+                if criteria.remove_duplicates:
+                    unit_associations = self._remove_duplicate_associations(list(cursor))
+                else:
+                    unit_associations = cursor
+
+                # Restructure the associations by ID so we can look them up later and
+                # so we have a list of all unit IDs to pass as a filter.
+                associations_by_id = dict([(u['unit_id'], u) for u in unit_associations])
+
+                # We only want to return units with an association, so add in all of
+                # the unit IDs we found earlier.
+                unit_spec = copy.copy(unit_spec)
+                unit_spec['_id'] = {'$in' : associations_by_id.keys()}
+
+                cursor = type_collection.find(unit_spec, fields=criteria.unit_fields)
                 cursor.sort(sort_spec)
+
+                # Since the sorting is done here, this is the only place we can
+                # apply the limit/skip.
+                if criteria.limit is not None:
+                    cursor.limit(criteria.limit)
+
+                if criteria.skip is not None:
+                    cursor.skip(criteria.skip)
+
+                cursor.batch_size(batch_size)
+
+                # The units are filtered, limited, and sorted by the database; we
+                # just need to merge in the association data as they stream in.
+                for u in cursor:
+                    association = associations_by_id[u['_id']]
+                    association['metadata'] = u
+                    yield association
+
             else:
-                cursor.sort(criteria.unit_sort)
+                # Too many associations to send in a single query. Walk the
+                # units of the type in sort order instead, looking up the
+                # associations for a batch at a time and discarding units that
+                # are not in the repository. The skip and limit are applied as
+                # the matching units stream by, which lets the scan stop as soon
+                # as the requested page is complete.
+
+                unit_cursor = type_collection.find(unit_spec, fields=criteria.unit_fields)
+                unit_cursor.sort(sort_spec)
+                unit_cursor.batch_size(batch_size)
+
+                to_skip = criteria.skip or 0
+                to_yield = criteria.limit or None
+
+                for unit_batch in paginate(unit_cursor, batch_size):
+                    associations_by_id = self._associations_by_unit_id(
+                        spec, [u['_id'] for u in unit_batch], criteria, batch_size)
+
+                    for u in unit_batch:
+                        association = associations_by_id.get(u['_id'])
+                        if association is None:
+                            continue
+
+                        if to_skip > 0:
+                            to_skip -= 1
+                            continue
+
+                        association['metadata'] = u
+                        yield association
+
+                        if to_yield is not None:
+                            to_yield -= 1
+                            if to_yield == 0:
+                                return
+
+    def _associations_by_unit_id(self, spec, unit_ids, criteria, batch_size):
+        """
+        Retrieves the associations matching the given spec for the given units.
+        If more than one association exists for a unit, the earliest created is
+        used when the criteria requests duplicates be removed; otherwise the
+        last one returned by the database is used.
 
-            # Since the sorting is done here, this is the only place we can
-            # apply the limit/skip.
-            if criteria.limit is not None:
-                cursor.limit(criteria.limit)
+        @param spec: association query the results must match
+        @type  spec: dict
 
-            if criteria.skip is not None:
-                cursor.skip(criteria.skip)
+        @param unit_ids: IDs of the units to look up
+        @type  unit_ids: list of str
+
+        @param criteria: criteria driving the query
+        @type  criteria: L{UnitAssociationCriteria}
+
+        @param batch_size: maximum number of units to look up in a single query
+        @type  batch_size: int
 
-            # This will load all of the units and they will be filtered,
-            # limited, and sorted.
-            units = list(cursor)
+        @return: dict of unit ID to association
+        @rtype:  dict
+        """
+        associations = []
+        for id_batch in _id_batches(unit_ids, batch_size):
+            batch_spec = dict(spec)
+            batch_spec['unit_id'] = {'$in' : id_batch}
+            cursor = RepoContentUnit.get_collection().find(batch_spec, fields=criteria.association_fields)
+            associations.extend(cursor)
 
-            # Now we just need to merge in the association data
-            merged_units = []
-            for u in units:
-                association = associations_by_id[u['_id']]
-                association['metadata'] = u
-                merged_units.append(association)
+        if criteria.remove_duplicates:
+            associations = self._remove_duplicate_associations(associations)
 
-            return merged_units
+        return dict([(a['unit_id'], a) for a in associations])
 
     def _remove_duplicate_associations(self, units):
         """
@@ -418,3 +616,79 @@ class RepoUnitAssociationQueryManager(object):
         @rtype:     list
         """
         return RepoContentUnit.get_collection().query(criteria)
+
+# -- utilities ----------------------------------------------------------------
+
+def _merge_metadata_across_types(units, unit_fields=None):
+    """
+    Looks up the metadata for the given associations and merges it into each
+    association under the "metadata" key. One query is made for each unit type
+    present in the list, regardless of the number of units of that type.
+
+    If a unit cannot be found in its type collection, its metadata is set to
+    None.
+
+    @param units: list of association dicts; the dicts are updated in place
+    @type  units: list of dict
+
+    @param unit_fields: if specified, only the given fields are retrieved from
+                        the unit metadata
+    @type  unit_fields: list of str
+    """
+    unit_ids_by_type = {}
+    for u in units:
+        unit_ids_by_type.setdefault(u['unit_type_id'], []).append(u['unit_id'])
+
+    metadata_by_type = {}
+    for type_id, unit_ids in unit_ids_by_type.items():
+        type_collection = types_db.type_units_collection(type_id)
+        spec = {'_id' : {'$in' : unit_ids}}
+        cursor = type_collection.find(spec, fields=unit_fields)
+        metadata_by_type[type_id] = dict((m['_id'], m) for m in cursor)
+
+    # A unit associated more than once gets its own copy of the metadata for
+    # each association so callers can safely modify them independently.
+    merged = set()
+    for u in units:
+        metadata = metadata_by_type[u['unit_type_id']].get(u['unit_id'])
+        unit_uuid = (u['unit_type_id'], u['unit_id'])
+        if unit_uuid in merged:
+            metadata = copy.deepcopy(metadata)
+        merged.add(unit_uuid)
+        u['metadata'] = metadata
+
+
+def _id_batches(ids, batch_size, max_bytes=MAX_IN_QUERY_BYTES):
+    """
+    Splits the given IDs into lists suitable for use in a $in clause. Each list
+    holds at most batch_size IDs and, by an estimate of their encoded size, no
+    more than max_bytes, so a single query document never approaches the
+    database's size limit no matter how long the IDs are.
+
+    @param ids: IDs to split
+    @type  ids: iterable
+
+    @param batch_size: maximum number of IDs in a single list
+    @type  batch_size: int
+
+    @param max_bytes: maximum estimated encoded size of a single list
+    @type  max_bytes: int
+
+    @return: generator of lists of IDs
+    @rtype:  generator
+    """
+    batch = []
+    batch_bytes = 0
+    for i in ids:
+        # Each array element carries a type byte, its index as a key and the
+        # length prefix and terminator of the string itself
+        id_bytes = len(unicode(i)) + 16
+        if batch and (len(batch) >= batch_size or batch_bytes + id_bytes > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(i)
+        batch_bytes += id_bytes
+
+    if batch:
+        yield batch
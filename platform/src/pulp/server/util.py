@@ -180,3 +180,33 @@ class Delta(dict):
         for k,v in obj.items():
             if k in filter:
                 self[k] = v
+
+# batching ---------------------------------------------------------------------
+
+def paginate(iterable, page_size):
+    """
+    Splits an iterable into lists of at most page_size items. The iterable is
+    consumed lazily, so it is safe to use with database cursors and generators
+    that would be too large to hold in memory at once.
+
+    @param iterable: items to split up
+    @type  iterable: iterable
+
+    @param page_size: maximum number of items in each page
+    @type  page_size: int
+
+    @return: generator of lists of items
+    @rtype:  generator
+    """
+    if page_size < 1:
+        raise ValueError(_('page_size must be a positive integer'))
+
+    page = []
+    for item in iterable:
+        page.append(item)
+        if len(page) >= page_size:
+            yield page
+            page = []
+
+    if page:
+        yield page
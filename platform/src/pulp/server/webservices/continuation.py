@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Continuation token support for search results. Instead of skipping over the
+results of every previous page, each page of a search is restricted to the
+documents that sort after the last document of the previous page. The sort is
+always completed with the document's _id so the position of every document is
+unique and the pages neither overlap nor miss documents.
+
+The token returned with a page is opaque to clients; it records the sort and
+the sort values of the last document returned. A token is only valid for a
+search with the same sort.
+"""
+
+import base64
+import sys
+
+import pymongo
+
+import pulp.plugins.types.database as types_db
+from pulp.server.compat import json, json_util
+from pulp.server.db.model.criteria import Criteria, UnitAssociationCriteria
+from pulp.server.exceptions import InvalidValue
+
+# -- constants ----------------------------------------------------------------
+
+# Number of results in a page when the search doesn't specify a limit
+DEFAULT_PAGE_SIZE = 1000
+
+# Sort used by the unit association query manager when none is specified and
+# the units may be of more than one type
+DEFAULT_ASSOCIATION_SORT = [('unit_type_id', pymongo.ASCENDING),
+                            ('created', pymongo.ASCENDING)]
+
+# -- page ---------------------------------------------------------------------
+
+class Page(object):
+    """
+    A single page of search results. The search is run for one more result
+    than the page holds; if that result is found, a token is generated from
+    which the next page continues.
+
+    @ivar sort: sort, including the trailing _id, the page was searched with
+    @type sort: list of (str, int)
+
+    @ivar size: maximum number of results in the page
+    @type size: int
+
+    @ivar token: continuation token for the next page; None until the page
+                 has been iterated and if there are no further results
+    @type token: str
+    """
+
+    def __init__(self, sort, size, key_document=None):
+        """
+        @param key_document: returns the document holding the sort fields for
+                             a result; defaults to the result itself
+        @type  key_document: callable
+        """
+        self.sort = sort
+        self.size = size
+        self.token = None
+        self._key_document = key_document or (lambda d: d)
+
+    def iterate(self, results):
+        """
+        Yields the results belonging to the page and generates the token once
+        the page is complete.
+
+        @param results: results of the search restricted by this page
+        @type  results: iterable
+
+        @return: generator of results
+        """
+        count = 0
+        values = None
+        for result in results:
+            if count == self.size:
+                self.token = encode(self.sort, values)
+                return
+            # read the values before the result is handed to the caller, who
+            # may modify it
+            values = sort_values(self.sort, self._key_document(result))
+            count += 1
+            yield result
+
+# -- criteria -----------------------------------------------------------------
+
+def paginate_criteria(criteria, token=None):
+    """
+    Returns a copy of the criteria restricted to the page of results after the
+    given token, along with the page itself. The criteria's limit, if
+    specified, is used as the page size.
+
+    @param criteria: search criteria
+    @type  criteria: pulp.server.db.model.criteria.Criteria
+
+    @param token: continuation token returned with the previous page; None for
+                  the first page
+    @type  token: str
+
+    @return: tuple of the restricted criteria and the page
+    @rtype:  tuple
+    """
+    if criteria.skip:
+        raise InvalidValue(['skip'])
+
+    sort = complete_sort(criteria.sort)
+    page = Page(sort, criteria.limit or DEFAULT_PAGE_SIZE)
+    filters = restrict_filters(criteria.filters, sort, token)
+    fields = include_sort_fields(criteria.fields, sort)
+
+    return Criteria(filters, sort, page.size + 1, None, fields), page
+
+
+def paginate_unit_association_criteria(criteria, type_id=None, token=None):
+    """
+    Returns a copy of the unit association criteria restricted to the page of
+    results after the given token, along with the page itself.
+
+    Results are paged on the association sort if one is given or the units
+    may be of more than one type; otherwise they are paged on the unit sort,
+    which defaults to the unit key.
+
+    @param criteria: unit association search criteria
+    @type  criteria: pulp.server.db.model.criteria.UnitAssociationCriteria
+
+    @param type_id: type of the units searched; None if they may be of more
+                    than one type
+    @type  type_id: str
+
+    @param token: continuation token returned with the previous page; None for
+                  the first page
+    @type  token: str
+
+    @return: tuple of the restricted criteria and the page
+    @rtype:  tuple
+    """
+    if criteria.skip:
+        raise InvalidValue(['skip'])
+
+    size = criteria.limit or DEFAULT_PAGE_SIZE
+    association_filters = criteria.association_filters
+    association_sort = criteria.association_sort
+    association_fields = criteria.association_fields
+    unit_filters = criteria.unit_filters
+    unit_sort = criteria.unit_sort
+    unit_fields = criteria.unit_fields
+
+    if type_id is None or association_sort is not None:
+        # The association query is limited before units are filtered and
+        # duplicates removed, so a short page would not mean the results
+        # were exhausted.
+        if type_id is not None and unit_filters:
+            raise InvalidValue(['continuation'])
+        if criteria.remove_duplicates:
+            raise InvalidValue(['remove_duplicates'])
+
+        sort = complete_sort(association_sort or DEFAULT_ASSOCIATION_SORT)
+        association_sort = sort
+        association_filters = restrict_filters(association_filters, sort, token)
+        association_fields = include_sort_fields(association_fields, sort)
+        page = Page(sort, size)
+    else:
+        if unit_sort is None:
+            unit_sort = [(f, pymongo.ASCENDING) for f in types_db.type_units_unit_key(type_id)]
+
+        sort = complete_sort(unit_sort)
+        unit_sort = sort
+        unit_filters = restrict_filters(unit_filters, sort, token)
+        unit_fields = include_sort_fields(unit_fields, sort)
+        page = Page(sort, size, lambda u: u['metadata'])
+
+    criteria = UnitAssociationCriteria(
+        type_ids=criteria.type_ids, association_filters=association_filters,
+        unit_filters=unit_filters, association_sort=association_sort,
+        unit_sort=unit_sort, limit=size + 1, skip=None,
+        association_fields=association_fields, unit_fields=unit_fields,
+        remove_duplicates=criteria.remove_duplicates)
+    return criteria, page
+
+# -- utilities ----------------------------------------------------------------
+
+def complete_sort(sort):
+    """
+    @param sort: list of field and direction pairs; may be None
+    @type  sort: list
+
+    @return: the sort with a trailing _id, ensuring the order is total
+    @rtype:  list of (str, int)
+    """
+    sort = [(field, direction) for field, direction in (sort or [])]
+    if '_id' not in [field for field, direction in sort]:
+        sort.append(('_id', pymongo.ASCENDING))
+    return sort
+
+
+def include_sort_fields(fields, sort):
+    """
+    @return: the fields with any sort fields missing from them added; None if
+             all fields are returned
+    @rtype:  list
+    """
+    if fields is None:
+        return None
+    fields = list(fields)
+    for field, direction in sort:
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def restrict_filters(filters, sort, token):
+    """
+    @return: the filters restricted to documents that sort after those
+             preceding the token
+    @rtype:  dict
+    """
+    if not token:
+        return filters
+    after = after_spec(sort, decode(token, sort))
+    if not filters:
+        return after
+    return {'$and': [filters, after]}
+
+
+def sort_values(sort, document):
+    """
+    @return: the document's values for each field in the sort; a missing field
+             is treated as None
+    @rtype:  list
+    """
+    values = []
+    for field, direction in sort:
+        value = document
+        for key in field.split('.'):
+            if not isinstance(value, dict):
+                value = None
+                break
+            value = value.get(key)
+        values.append(value)
+    return values
+
+
+def after_spec(sort, values):
+    """
+    Builds a query matching the documents that sort after a document with the
+    given values: those equal on the first n fields and after it on the next,
+    for each n.
+
+    @param sort: list of field and direction pairs
+    @type  sort: list of (str, int)
+
+    @param values: sort values of the document, in the order of the sort
+    @type  values: list
+
+    @rtype: dict
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        value = values[i]
+        clause = dict((sort[j][0], values[j]) for j in range(i))
+        if value is None:
+            # nulls sort before every other value and, as they only compare
+            # equal to other nulls, can't be compared with $gt or $lt
+            if direction == pymongo.DESCENDING:
+                continue
+            clause[field] = {'$ne' : None}
+        elif direction == pymongo.DESCENDING:
+            clause[field] = {'$lt' : value}
+        else:
+            clause[field] = {'$gt' : value}
+        clauses.append(clause)
+
+    if len(clauses) == 1:
+        return clauses[0]
+    return {'$or' : clauses}
+
+
+def encode(sort, values):
+    """
+    @return: opaque token recording the sort and values of a document
+    @rtype:  str
+    """
+    doc = {'sort' : [[field, direction] for field, direction in sort],
+           'values' : values}
+    return base64.urlsafe_b64encode(json.dumps(doc, default=json_util.default))
+
+
+def decode(token, sort):
+    """
+    @return: values recorded in the token
+    @rtype:  list
+
+    @raise InvalidValue: if the token is malformed or was generated for a
+           different sort
+    """
+    try:
+        doc = json.loads(base64.urlsafe_b64decode(str(token)), object_hook=json_util.object_hook)
+        token_sort = [(field, direction) for field, direction in doc['sort']]
+        values = doc['values']
+    except (TypeError, ValueError, KeyError):
+        raise InvalidValue(['continuation']), None, sys.exc_info()[2]
+    if token_sort != list(sort) or len(values) != len(sort):
+        raise InvalidValue(['continuation'])
+    return values
@@ -11,6 +11,7 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import itertools
 import logging
 import sys
 from gettext import gettext as _
@@ -25,6 +26,9 @@ from pulp.server.webservices import http, serialization
 
 _log = logging.getLogger(__name__)
 
+# Approximate number of bytes of a streamed response written at a time
+STREAM_BUFFER_SIZE = 64 * 1024
+
 
 class JSONController(object):
     """
@@ -136,6 +140,49 @@ class JSONController(object):
         http.header('Content-Length', len(body))
         return body
 
+    def _output_stream(self, items, page=None):
+        """
+        JSON encode the response a single item at a time and set the
+        appropriate headers. As the length isn't known up front, no
+        Content-Length header is set.
+
+        The first item is retrieved before returning so that errors in the
+        underlying query are reported as an error response rather than as a
+        truncated body.
+        """
+        items = iter(items)
+        try:
+            first = [items.next()]
+        except StopIteration:
+            first = []
+        http.header('Content-Type', 'application/json')
+        return self._stream_chunks(itertools.chain(first, items), page)
+
+    def _stream_chunks(self, items, page):
+        """
+        Generator of the chunks of a streamed response body.
+        """
+        if page is None:
+            buffer = ['[']
+        else:
+            buffer = ['{"items": [']
+        buffered = 0
+        separator = ''
+        for item in items:
+            chunk = separator + json.dumps(item, default=json_util.default)
+            separator = ', '
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= STREAM_BUFFER_SIZE:
+                yield ''.join(buffer)
+                buffer = []
+                buffered = 0
+        buffer.append(']')
+        if page is not None:
+            # the token is only known once the page has been iterated
+            buffer.append(', "continuation": %s}' % json.dumps(page.token))
+        yield ''.join(buffer)
+
     def _error_dict(self, msg, code=None):
         """
         Standardized error returns
@@ -157,6 +204,20 @@ class JSONController(object):
         http.status_ok()
         return self._output(data)
 
+    def ok_stream(self, items, page=None):
+        """
+        Return an ok response whose body is a JSON list of the given items,
+        serialized as the body is written rather than all at once.
+        @type items: iterable
+        @param items: items to be returned in the body of the response
+        @type page: pulp.server.webservices.continuation.Page
+        @param page: if specified, the list is returned under the key "items"
+                     of an object that also holds the page's continuation token
+        @return: generator of the JSON encoded response
+        """
+        http.status_ok()
+        return self._output_stream(items, page)
+
     def created(self, location, data):
         """
         Return a created response.
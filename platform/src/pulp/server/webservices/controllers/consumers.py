@@ -582,6 +582,65 @@ class Profile(JSONController):
         return self.ok(execution.execute(call_request))
 
 
+class ProfileDigest(JSONController):
+    """
+    Conditional update of a consumer's unit profile. The consumer reports the
+    hash of its current profile, optionally along with the profile itself or
+    the changes to the profile it previously reported. The stored profile is
+    only written when its hash differs.
+    """
+
+    @auth_required(UPDATE)
+    def POST(self, consumer_id, content_type):
+        """
+        Update the profile of a consumer by content type ID unless the stored
+        profile already has the specified hash.
+        body {
+        profile_hash:<str>,
+        profile:<object> (optional),
+        delta:<dict> (optional)
+        }
+        @param consumer_id: A consumer ID.
+        @type consumer_id: str
+        @param content_type: A content unit type ID.
+        @type content_type: str
+        @return: {profile_hash:<str>, profile_required:<bool>}
+            The hash of the stored profile and whether the consumer
+            needs to send the full profile.
+        @rtype: dict
+        """
+        body = self.params()
+        profile_hash = body.get('profile_hash')
+        profile = body.get('profile')
+        delta = body.get('delta')
+
+        if not profile_hash:
+            raise MissingValue(['profile_hash'])
+        if delta is not None and not isinstance(delta, dict):
+            raise InvalidValue(['delta'])
+
+        manager = managers.consumer_profile_manager()
+        tags = [resource_tag(dispatch_constants.RESOURCE_CONSUMER_TYPE, consumer_id),
+                resource_tag(dispatch_constants.RESOURCE_CONTENT_UNIT_TYPE, content_type),
+                action_tag('profile_update')]
+
+        call_request = CallRequest(manager.update_if_changed,
+                                   [consumer_id, content_type, profile_hash],
+                                   {'profile': profile, 'delta': delta},
+                                   tags=tags,
+                                   weight=0,
+                                   kwarg_blacklist=['profile', 'delta'])
+        call_request.reads_resource(dispatch_constants.RESOURCE_CONSUMER_TYPE, consumer_id)
+
+        call_report = CallReport.from_call_request(call_request)
+        call_report.serialize_result = False
+
+        stored_hash = execution.execute_sync(call_request, call_report)
+        result = {'profile_hash': stored_hash,
+                  'profile_required': stored_hash != profile_hash}
+        return self.ok(result)
+
+
 class ContentApplicability(JSONController):
     """
     Determine content applicability.
@@ -1046,6 +1105,7 @@ urls = (
     '/([^/]+)/bindings/([^/]+)/([^/]+)/$', Binding,
     '/([^/]+)/profiles/$', Profiles,
     '/([^/]+)/profiles/([^/]+)/$', Profile,
+    '/([^/]+)/profiles/([^/]+)/digest/$', ProfileDigest,
     '/([^/]+)/schedules/content/install/', UnitInstallScheduleCollection,
     '/([^/]+)/schedules/content/install/([^/]+)/', UnitInstallScheduleResource,
     '/([^/]+)/schedules/content/update/', UnitUpdateScheduleCollection,
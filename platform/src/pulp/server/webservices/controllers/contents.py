@@ -22,10 +22,17 @@ from pulp.server.dispatch import constants as dispatch_constants
 from pulp.server.dispatch.call import CallRequest
 from pulp.server.exceptions import MissingResource, InvalidValue
 from pulp.server.managers import factory
+from pulp.server.util import paginate
 from pulp.server.webservices import execution, serialization
 from pulp.server.webservices.controllers.base import JSONController
 from pulp.server.webservices.controllers.decorators import auth_required
 
+# Number of search results processed, and looked up in repositories, at a time
+UNIT_BATCH_SIZE = 1000
+
+# Maximum number of units whose repositories are looked up in a single query
+MEMBERSHIP_BATCH_SIZE = 500
+
 # content types controller classes ---------------------------------------------
 from pulp.server.webservices.controllers.search import SearchController
 
@@ -130,18 +137,18 @@ class ContentUnitsSearch(SearchController):
         if not units:
             return units
 
-        unit_ids = [unit['_id'] for unit in units]
-        criteria = Criteria(
-            filters={'unit_id': {'$in': unit_ids}, 'unit_type_id': type_id},
-            fields=('repo_id', 'unit_id')
-        )
-        associations = factory.repo_unit_association_query_manager().find_by_criteria(criteria)
-        unit_ids = None
-        criteria = None
+        # look the associations up a chunk of units at a time so each query
+        # stays a bounded lookup on the unit_id index
         association_map = {}
-        for association in associations:
-            association_map.setdefault(association['unit_id'], set()).add(
-                association['repo_id'])
+        query_manager = factory.repo_unit_association_query_manager()
+        for unit_ids in paginate((unit['_id'] for unit in units), MEMBERSHIP_BATCH_SIZE):
+            criteria = Criteria(
+                filters={'unit_id': {'$in': unit_ids}, 'unit_type_id': type_id},
+                fields=('repo_id', 'unit_id')
+            )
+            for association in query_manager.find_by_criteria(criteria):
+                association_map.setdefault(association['unit_id'], set()).add(
+                    association['repo_id'])
 
         for unit in units:
             unit['repository_memberships'] = list(association_map.get(unit['_id'], []))
@@ -160,12 +167,9 @@ class ContentUnitsSearch(SearchController):
         @type  type_id: basestring
         """
         self._type_id = type_id
-        raw_units = self._get_query_results_from_get(ignore_fields=('include_repos',))
-        units = [ContentUnitsCollection.process_unit(unit) for unit in raw_units]
-        if web.input().get('include_repos'):
-            self._add_repo_memberships(units, type_id)
-
-        return self.ok(units)
+        raw_units, page, stream = self._get_search_from_get(ignore_fields=('include_repos',))
+        units = self._process_units(raw_units, type_id, web.input().get('include_repos'))
+        return self._search_response(units, page, stream)
 
     @auth_required(READ)
     def POST(self, type_id):
@@ -180,12 +184,30 @@ class ContentUnitsSearch(SearchController):
         @type  type_id: basestring
         """
         self._type_id = type_id
-        raw_units = self._get_query_results_from_post()
-        units = [ContentUnitsCollection.process_unit(unit) for unit in raw_units]
-        if self.params().get('include_repos'):
-            self._add_repo_memberships(units, type_id)
+        raw_units, page, stream = self._get_search_from_post()
+        units = self._process_units(raw_units, type_id, self.params().get('include_repos'))
+        return self._search_response(units, page, stream)
 
-        return self.ok(units)
+    def _process_units(self, raw_units, type_id, include_repos):
+        """
+        Processes units a batch at a time as they are read from the database,
+        so that streamed results aren't all held in memory.
+
+        :param raw_units:       unit documents returned by the search
+        :type  raw_units:       iterable of dicts
+        :param type_id:         content type id
+        :type  type_id:         str
+        :param include_repos:   if True, "repository_memberships" is added to
+                                each unit
+        :type  include_repos:   bool
+        :return:    generator of processed units
+        """
+        for batch in paginate(raw_units, UNIT_BATCH_SIZE):
+            units = [ContentUnitsCollection.process_unit(unit) for unit in batch]
+            if include_repos:
+                self._add_repo_memberships(units, type_id)
+            for unit in units:
+                yield unit
 
 
 class ContentUnitResource(JSONController):
@@ -257,9 +279,12 @@ class UploadSegmentResource(JSONController):
         except ValueError:
             raise InvalidValue(['offset'])
 
+        # Only the query string is read; the body is the raw segment data
+        checksum = web.input(_method='get').get('checksum')
+
         upload_manager = factory.content_upload_manager()
         data = self.data()
-        upload_manager.save_data(upload_id, offset, data)
+        upload_manager.save_data(upload_id, offset, data, checksum)
 
         return self.ok(None)
 
@@ -16,6 +16,7 @@ import web
 
 from pulp.common.util import decode_unicode
 from pulp.server.auth.authorization import CREATE, READ, DELETE, UPDATE
+from pulp.server.event import delivery
 from pulp.server.managers import factory as manager_factory
 from pulp.server.webservices.serialization import link
 from pulp.server.webservices.controllers.base import JSONController
@@ -107,11 +108,22 @@ class EventResource(JSONController):
 
         return self.ok(updated)
 
+
+class EventStatistics(JSONController):
+
+    # Scope:  Resource
+    # GET:    Retrieve the queue depth and delivery latency of event notifications
+
+    @auth_required(READ)
+    def GET(self):
+        return self.ok(delivery.statistics())
+
 # -- web.py application -------------------------------------------------------
 
 # These are defined under /v2/event_listeners/ (see application.py to double-check)
 URLS = (
     '/', 'EventCollection', # collection
+    '/statistics/$', 'EventStatistics', # delivery statistics
     '/([^/]+)/$', 'EventResource', # resource
 )
 
@@ -29,23 +29,32 @@ from pulp.common.tags import action_tag, resource_tag
 from pulp.common import constants
 from pulp.server import config as pulp_config
 from pulp.server.auth.authorization import CREATE, READ, DELETE, EXECUTE, UPDATE
-from pulp.server.db.model.criteria import UnitAssociationCriteria
+from pulp.server.db.model.criteria import Criteria, UnitAssociationCriteria
 from pulp.server.db.model.repository import RepoContentUnit, Repo
 from pulp.server.dispatch import constants as dispatch_constants
 from pulp.server.dispatch import factory as dispatch_factory
 from pulp.server.dispatch.call import CallRequest
 from pulp.server.itineraries.repo import (
     sync_with_auto_publish_itinerary, publish_itinerary)
+from pulp.server.util import paginate
+from pulp.server.webservices import continuation
 from pulp.server.webservices import execution
 from pulp.server.webservices import serialization
 from pulp.server.webservices.controllers.base import JSONController
 from pulp.server.webservices.controllers.decorators import auth_required
-from pulp.server.webservices.controllers.search import SearchController
+from pulp.server.webservices.controllers.search import SearchController, stream_requested
 
 # -- constants ----------------------------------------------------------------
 
 _LOG = logging.getLogger(__name__)
 
+# Number of streamed repositories processed at a time
+REPO_BATCH_SIZE = 100
+
+# Maximum number of repositories whose importers or distributors are looked up
+# in a single query
+RELATED_OBJECT_BATCH_SIZE = 500
+
 # -- functions ----------------------------------------------------------------
 
 def _merge_related_objects(name, manager, repos):
@@ -70,8 +79,6 @@ def _merge_related_objects(name, manager, repos):
             itself is not modified- only its members are modified in-place.
     @rtype  list of Repo instances
     """
-    repo_ids = tuple(repo['id'] for repo in repos)
-
     # make it cheap to access each repo by id
     repo_dict = dict((repo['id'], repo) for repo in repos)
 
@@ -79,8 +86,11 @@ def _merge_related_objects(name, manager, repos):
     for repo in repos:
         repo[name] = []
 
-    for item in manager.find_by_repo_list(repo_ids):
-        repo_dict[item['repo_id']][name].append(item)
+    # look the related objects up a chunk of repos at a time so no single
+    # query carries every repo ID
+    for repo_ids in paginate(repo_dict.keys(), RELATED_OBJECT_BATCH_SIZE):
+        for item in manager.find_by_repo_list(repo_ids):
+            repo_dict[item['repo_id']][name].append(item)
 
     return repos
 
@@ -129,6 +139,28 @@ class RepoCollection(JSONController):
 
         return repos
 
+    @staticmethod
+    def _process_results(repos, stream, importers, distributors):
+        """
+        Applies the standard repository processing to repositories read from
+        the database. Streamed repositories are processed a batch at a time
+        as they are read.
+
+        @return: processed repositories
+        @rtype:  list, or generator if streamed
+        """
+        if not stream:
+            repos = list(repos)
+            RepoCollection._process_repos(repos, importers, distributors)
+            return repos
+        return RepoCollection._process_result_batches(repos, importers, distributors)
+
+    @staticmethod
+    def _process_result_batches(repos, importers, distributors):
+        for batch in paginate(repos, REPO_BATCH_SIZE):
+            for repo in RepoCollection._process_repos(batch, importers, distributors):
+                yield repo
+
     @auth_required(READ)
     def GET(self):
         """
@@ -136,22 +168,69 @@ class RepoCollection(JSONController):
         the corresponding fields to the each repository returned. Query
         parameter 'details' is equivalent to passing both 'importers' and
         'distributors'.
+
+        Query parameter 'field', which may be given more than once, limits the
+        fields returned for each repository. Query parameters 'limit' and
+        'continuation' page through the repositories and 'stream' serializes
+        them as they are read; these behave as they do for a repository
+        search.
         """
-        query_params = web.input()
-        all_repos = list(Repo.get_collection().find(projection = {'scratchpad' : 0}))
+        query_params = web.input(field=[])
 
         if query_params.get('details', False):
             query_params['importers'] = True
             query_params['distributors'] = True
 
-        self._process_repos(
-            all_repos,
+        fields = query_params['field'] or None
+        if fields is not None and 'id' not in fields:
+            fields.append('id')
+        criteria = Criteria.from_client_input({'limit' : query_params.get('limit'),
+                                               'fields' : fields})
+
+        page = None
+        if 'continuation' in query_params:
+            criteria, page = continuation.paginate_criteria(
+                criteria, query_params['continuation'])
+
+        stream = stream_requested(query_params.get('stream'))
+        repos = self._find_repos(criteria)
+        if page is not None:
+            repos = page.iterate(repos)
+        repos = RepoCollection._process_results(
+            repos,
+            stream,
             query_params.get('importers', False),
             query_params.get('distributors', False)
         )
 
         # Return the repos or an empty list; either way it's a 200
-        return self.ok(all_repos)
+        if stream:
+            return self.ok_stream(repos, page)
+        if page is not None:
+            return self.ok({'items' : repos, 'continuation' : page.token})
+        return self.ok(repos)
+
+    @staticmethod
+    def _find_repos(criteria):
+        """
+        Returns a cursor over the repositories matching the criteria. Unless
+        specific fields are requested, each repository's scratchpad is left
+        out as it is never returned to the client.
+
+        @param criteria: criteria the repositories must match
+        @type  criteria: pulp.server.db.model.criteria.Criteria
+
+        @rtype: pymongo.cursor.Cursor
+        """
+        fields = criteria.fields
+        if fields is None:
+            fields = {'scratchpad' : 0}
+        cursor = Repo.get_collection().find(criteria.spec, fields=fields)
+        if criteria.sort:
+            cursor.sort(list(criteria.sort))
+        if criteria.limit is not None:
+            cursor.limit(criteria.limit)
+        return cursor
 
     @auth_required(CREATE)
     def POST(self):
@@ -203,15 +282,16 @@ class RepoSearch(SearchController):
         if query_params.pop('details', False):
             query_params['importers'] = True
             query_params['distributors'] = True
-        items = self._get_query_results_from_get(
+        items, page, stream = self._get_search_from_get(
             ('details', 'importers', 'distributors'))
 
-        RepoCollection._process_repos(
+        items = RepoCollection._process_results(
             items,
+            stream,
             query_params.pop('importers', False),
             query_params.pop('distributors', False)
         )
-        return self.ok(items)
+        return self._search_response(items, page, stream)
 
     @auth_required(READ)
     def POST(self):
@@ -220,15 +300,15 @@ class RepoSearch(SearchController):
         'criteria' which has a data structure that can be turned into a
         Criteria instance.
         """
-        items = self._get_query_results_from_post()
+        items, page, stream = self._get_search_from_post()
 
-        RepoCollection._process_repos(
+        items = RepoCollection._process_results(
             items,
+            stream,
             self.params().get('importers', False),
             self.params().get('distributors', False)
         )
-        return self.ok(items)
-
+        return self._search_response(items, page, stream)
 
 class RepoResource(JSONController):
 
@@ -967,6 +1047,7 @@ class RepoImportUpload(JSONController):
         unit_type_id = params['unit_type_id']
         unit_key = params['unit_key']
         unit_metadata = params.pop('unit_metadata', None)
+        upload_checksum = params.get('upload_checksum', None)
 
         # Coordinator configuration
         tags = [resource_tag(dispatch_constants.RESOURCE_REPOSITORY_TYPE, repo_id),
@@ -975,7 +1056,7 @@ class RepoImportUpload(JSONController):
         upload_manager = manager_factory.content_upload_manager()
         call_request = CallRequest(upload_manager.import_uploaded_unit,
             [repo_id, unit_type_id, unit_key, unit_metadata, upload_id],
-            tags=tags, archive=True)
+            {'upload_checksum' : upload_checksum}, tags=tags, archive=True)
         call_request.updates_resource(dispatch_constants.RESOURCE_REPOSITORY_TYPE, repo_id)
 
         execution.execute(call_request)
@@ -1041,15 +1122,39 @@ class RepoUnitAdvancedSearch(JSONController):
             _LOG.error('Error parsing association criteria [%s]' % query)
             raise exceptions.PulpDataException(), None, sys.exc_info()[2]
 
-        # Data lookup
-        manager = manager_factory.repo_unit_association_query_manager()
+        type_id = None
         if criteria.type_ids is not None and len(criteria.type_ids) == 1:
             type_id = criteria.type_ids[0]
-            units = manager.get_units_by_type(repo_id, type_id, criteria=criteria)
+
+        # Data lookup
+        manager = manager_factory.repo_unit_association_query_manager()
+        stream = stream_requested(params.get('stream'))
+        if not stream and 'continuation' not in params:
+            if type_id is not None:
+                units = manager.get_units_by_type(repo_id, type_id, criteria=criteria)
+            else:
+                units = manager.get_units_across_types(repo_id, criteria=criteria)
+            return self.ok(units)
+
+        # Streamed or paged results are read from the database as they are
+        # returned rather than loaded up front
+        page = None
+        if 'continuation' in params:
+            criteria, page = continuation.paginate_unit_association_criteria(
+                criteria, type_id, params['continuation'])
+
+        if type_id is not None:
+            units = manager.iter_units_by_type(repo_id, type_id, criteria=criteria)
         else:
-            units = manager.get_units_across_types(repo_id, criteria=criteria)
+            units = manager.iter_units_across_types(repo_id, criteria=criteria)
+
+        if page is not None:
+            units = page.iterate(units)
 
-        return self.ok(units)
+        if stream:
+            return self.ok_stream(units, page)
+        units = list(units)
+        return self.ok({'items' : units, 'continuation' : page.token})
 
 # -- web.py application -------------------------------------------------------
 
@@ -16,9 +16,34 @@ import web
 from pulp.server.auth.authorization import READ
 from pulp.server.db.model.criteria import Criteria
 import pulp.server.exceptions as exceptions
+from pulp.server.webservices import continuation
 from pulp.server.webservices.controllers.base import JSONController
 from pulp.server.webservices.controllers.decorators import auth_required
 
+# Request parameters, alongside the criteria, that control how the results of
+# a search are returned
+SEARCH_OPTIONS = ('stream', 'continuation')
+
+# Query parameter values that request a streamed response
+STREAM_TRUE_VALUES = ('true', '1', 'yes')
+
+
+def stream_requested(value):
+    """
+    Determines whether the value of a 'stream' parameter requests a streamed
+    response. Query parameters are strings, so only 'true', '1' and 'yes'
+    (in any case) request one; a posted parameter may also be a boolean.
+
+    @param value:   value of the 'stream' parameter, None if absent
+    @type  value:   str, bool or None
+
+    @return:    True if the results should be streamed
+    @rtype:     bool
+    """
+    if isinstance(value, basestring):
+        return value.strip().lower() in STREAM_TRUE_VALUES
+    return value is True or (isinstance(value, (int, long)) and value == 1)
+
 
 class SearchController(JSONController):
     def __init__(self, query_method):
@@ -38,8 +63,14 @@ class SearchController(JSONController):
         separate key-value pairs as is normal with query parameters in URLs. For
         example, '/v2/sometype/search/?field=id&field=display_name' will
         return the fields 'id' and 'display_name'.
+
+        Include query parameter 'stream' with a value of true, 1 or yes to have
+        the results serialized as they are read from the database.
+        Include query parameter 'continuation' to page through the results;
+        see _search().
         """
-        return self.ok(self._get_query_results_from_get())
+        results, page, stream = self._get_search_from_get()
+        return self._search_response(results, page, stream)
 
     @auth_required(READ)
     def POST(self):
@@ -52,11 +83,19 @@ class SearchController(JSONController):
                             an instance of the Criteria model.
         @type  criteria:    dict
 
+        @param stream:      Optional. if True, the results are serialized as
+                            they are read from the database
+        @type  stream:      bool
+
+        @param continuation: Optional. if present, a single page of results is
+                            returned; see _search()
+        @type  continuation: str
+
         @return:    list of matching items
         @rtype:     list
         """
-
-        return self.ok(self._get_query_results_from_post())
+        results, page, stream = self._get_search_from_post()
+        return self._search_response(results, page, stream)
 
     def _get_query_results_from_get(self, ignore_fields=None, is_user_search=False):
         """
@@ -78,7 +117,37 @@ class SearchController(JSONController):
                     for the collection associated with this controller
         @rtype:     list
         """
+        criteria = self._get_criteria_from_get(ignore_fields, is_user_search)
+        return list(self.query_method(criteria))
+
+    def _get_search_from_get(self, ignore_fields=None, is_user_search=False):
+        """
+        Looks for query parameters that define a Criteria and how the results
+        are to be returned, and runs the search. See
+        _get_query_results_from_get() for the parameters.
+
+        @return:    tuple of the results, the page (or None if the search is
+                    not paged) and whether the results should be streamed;
+                    see _search()
+        @rtype:     tuple
+        """
+        input = web.input()
+        paged = 'continuation' in input
+        token = input.get('continuation')
+        stream = stream_requested(input.get('stream'))
+        criteria = self._get_criteria_from_get(ignore_fields, is_user_search)
+        results, page = self._search(criteria, paged, token)
+        return results, page, stream
+
+    def _get_criteria_from_get(self, ignore_fields=None, is_user_search=False):
+        """
+        @return:    Criteria defined by the query parameters; see
+                    _get_query_results_from_get()
+        @rtype:     pulp.server.db.model.criteria.Criteria
+        """
         input = self._ensure_input_encoding(web.input(field=[]))
+        for field in SEARCH_OPTIONS:
+            input.pop(field, None)
         if ignore_fields:
             for field in ignore_fields:
                 input.pop(field, None)
@@ -93,8 +162,7 @@ class SearchController(JSONController):
                 fields.append('login')
             input['fields'] = fields
 
-        criteria = Criteria.from_client_input(input)
-        return list(self.query_method(criteria))
+        return Criteria.from_client_input(input)
 
     def _get_query_results_from_post(self, is_user_search=False):
         """
@@ -105,8 +173,36 @@ class SearchController(JSONController):
                     for the collection associated with this controller
         @rtype:     list
         """
+        criteria = self._get_criteria_from_post(self.params(), is_user_search)
+        return list(self.query_method(criteria))
+
+    def _get_search_from_post(self, is_user_search=False):
+        """
+        Looks for a Criteria passed as a POST parameter on key 'criteria' and
+        the 'stream' and 'continuation' parameters describing how the results
+        are to be returned, and runs the search.
+
+        @return:    tuple of the results, the page (or None if the search is
+                    not paged) and whether the results should be streamed;
+                    see _search()
+        @rtype:     tuple
+        """
+        params = self.params()
+        criteria = self._get_criteria_from_post(params, is_user_search)
+        results, page = self._search(criteria, 'continuation' in params,
+                                     params.get('continuation'))
+        return results, page, stream_requested(params.get('stream'))
+
+    def _get_criteria_from_post(self, params, is_user_search=False):
+        """
+        @param params:  parameters posted to the controller
+        @type  params:  dict
+
+        @return:    Criteria found in the parameters
+        @rtype:     pulp.server.db.model.criteria.Criteria
+        """
         try:
-            criteria_param = self.params()['criteria']
+            criteria_param = params['criteria']
         except KeyError:
             raise exceptions.MissingValue(['criteria'])
         criteria = Criteria.from_client_input(criteria_param)
@@ -115,4 +211,54 @@ class SearchController(JSONController):
                 criteria.fields.append('id')
             if is_user_search and 'login' not in criteria.fields and u'login' not in criteria.fields:
                 criteria.fields.append('login')
-        return list(self.query_method(criteria))
+        return criteria
+
+    def _search(self, criteria, paged=False, token=None):
+        """
+        Runs the search. If paged, the search is restricted to a single page
+        of results, the size of which is the criteria's limit, continuing
+        from where the page the token was returned with left off. Paged
+        searches may not skip results.
+
+        @param criteria:    Criteria representing a search
+        @type  criteria:    pulp.server.db.model.criteria.Criteria
+
+        @param paged:   True if a single page of results should be returned
+        @type  paged:   bool
+
+        @param token:   continuation token returned with the previous page;
+                        None or empty for the first page
+        @type  token:   str
+
+        @return:    tuple of an iterable of the results and the page, which
+                    is None if the search is not paged
+        @rtype:     tuple
+        """
+        if not paged:
+            return self.query_method(criteria), None
+        criteria, page = continuation.paginate_criteria(criteria, token)
+        return page.iterate(self.query_method(criteria)), page
+
+    def _search_response(self, results, page=None, stream=False):
+        """
+        Returns the results of a search. If the search was paged, the results
+        are returned under the key "items" along with the token from which
+        the next page continues under the key "continuation"; the token is
+        None once there are no more results.
+
+        @param results: results of the search
+        @type  results: iterable
+
+        @param page:    page returned by _search()
+        @type  page:    pulp.server.webservices.continuation.Page
+
+        @param stream:  if True, the results are serialized one at a time as
+                        the response is written instead of all at once
+        @type  stream:  bool
+        """
+        if stream:
+            return self.ok_stream(results, page)
+        results = list(results)
+        if page is None:
+            return self.ok(results)
+        return self.ok({'items' : results, 'continuation' : page.token})
@@ -12,12 +12,16 @@
 # see http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
 
 """
-Unauthenticated status API so that other can make sure we're up (to no good).
+Unauthenticated status API so that other can make sure we're up (to no good),
+along with authenticated statistics about the server process.
 """
 
 import web
 
+from pulp.server.auth.authorization import READ
+from pulp.server.managers import factory
 from pulp.server.webservices.controllers.base import JSONController
+from pulp.server.webservices.controllers.decorators import auth_required
 
 # status controller ------------------------------------------------------------
 
@@ -27,8 +31,20 @@ class StatusController(JSONController):
         status_data = {'api_version': '2'}
         return self.ok(status_data)
 
+
+class AuthenticationStatistics(JSONController):
+
+    # Scope:  Resource
+    # GET:    Retrieve the hit rate and size of the credential cache
+
+    @auth_required(READ)
+    def GET(self):
+        statistics = factory.authentication_manager().credential_cache_statistics()
+        return self.ok(statistics)
+
 # web.py application -----------------------------------------------------------
 
-URLS = ('/', StatusController)
+URLS = ('/', StatusController,
+        '/authentication/$', AuthenticationStatistics)
 
 application = web.application(URLS, globals())
@@ -25,6 +25,7 @@ sys.path.insert(0, srcdir)
 
 from pulp.common.compat import json
 from pulp.server import config
+from pulp.server.auth.cache import CREDENTIAL_CACHE
 from pulp.server.db import connection
 from pulp.server.db.model.auth import User
 from pulp.server.dispatch import constants as dispatch_constants
@@ -77,6 +78,9 @@ class PulpServerTests(unittest.TestCase):
         super(PulpServerTests, self).setUp()
         self._mocks = {}
         self.config = PulpServerTests.CONFIG # shadow for simplicity
+        # Users are removed directly from the database between tests, so
+        # credentials verified by an earlier test must not be remembered
+        CREDENTIAL_CACHE.invalidate()
         self.clean()
 
     def tearDown(self):
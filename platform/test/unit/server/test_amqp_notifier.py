@@ -14,15 +14,21 @@
 import mock
 
 import base
+from pulp.server.event import delivery
 from pulp.server.event.amqp import handle_event
 
 
 class TestAMQPNotifier(base.PulpServerTests):
+    def tearDown(self):
+        super(TestAMQPNotifier, self).tearDown()
+        delivery.reset()
+
     @mock.patch('pulp.server.managers.event.remote.TopicPublishManager.publish')
     def test_handle_event(self, mock_publish):
         event = mock.MagicMock()
 
         handle_event({}, event)
+        delivery.get_queue().wait(5) # handled by the delivery threads
 
         mock_publish.assert_called_once_with(event, None)
 
@@ -31,5 +37,6 @@ class TestAMQPNotifier(base.PulpServerTests):
         event = mock.MagicMock()
 
         handle_event({'exchange': 'pulp'}, event)
+        delivery.get_queue().wait(5)
 
         mock_publish.assert_called_once_with(event, 'pulp')
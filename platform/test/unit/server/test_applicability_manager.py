@@ -14,13 +14,15 @@
 import base
 import mock_plugins
 
-from mock import Mock
+from mock import Mock, patch
 from pulp.plugins.loader import api as plugins
 from pulp.server.db.model.criteria import Criteria
-from pulp.server.db.model.consumer import Consumer, UnitProfile
+from pulp.server.db.model.consumer import ApplicabilityCacheEntry, Bind, Consumer, UnitProfile
+from pulp.server.db.model.repository import Repo
 from pulp.plugins.conduits.profiler import ProfilerConduit
 from pulp.plugins.model import ApplicabilityReport
 from pulp.server.managers import factory as factory
+from pulp.server.managers.consumer import applicability
 from pulp.server.exceptions import PulpExecutionException
 
 # -- test cases ---------------------------------------------------------------
@@ -38,17 +40,26 @@ class ApplicabilityManagerTests(base.PulpServerTests):
         base.PulpServerTests.setUp(self)
         Consumer.get_collection().remove()
         UnitProfile.get_collection().remove()
+        Bind.get_collection().remove()
+        ApplicabilityCacheEntry.get_collection().remove()
+        Repo.get_collection().remove()
         plugins._create_manager()
         mock_plugins.install()
         profiler, cfg = plugins.get_profiler_by_type('rpm')
         profiler.find_applicable_units = \
             Mock(side_effect=lambda i,r,t,u,c,x:
                  [ApplicabilityReport('mysummary', 'mydetails')])
+        self.metadata_patch = None
 
     def tearDown(self):
         base.PulpServerTests.tearDown(self)
+        if self.metadata_patch is not None:
+            self.metadata_patch.stop()
         Consumer.get_collection().remove()
         UnitProfile.get_collection().remove()
+        Bind.get_collection().remove()
+        ApplicabilityCacheEntry.get_collection().remove()
+        Repo.get_collection().remove()
         mock_plugins.reset()
 
     def populate(self):
@@ -88,3 +99,206 @@ class ApplicabilityManagerTests(base.PulpServerTests):
         manager = factory.consumer_applicability_manager()
         result = manager.find_applicable_units(self.CONSUMER_CRITERIA, self.REPO_CRITERIA, unit_criteria)
         self.assertTrue(result == {})
+
+    def test_batched(self):
+        # Setup
+        self.populate()
+        collection = Bind.get_collection()
+        for id in self.CONSUMER_IDS:
+            collection.save(Bind(id, 'repo-1', 'dist-1', False, {}), safe=True)
+        collection.save(Bind(self.CONSUMER_IDS[0], 'repo-2', 'dist-1', False, {}), safe=True)
+        deleted = Bind(self.CONSUMER_IDS[1], 'repo-3', 'dist-1', False, {})
+        deleted['deleted'] = True
+        collection.save(deleted, safe=True)
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        profiler.find_applicable_units = Mock(return_value=[ApplicabilityReport('mysummary', 'mydetails')])
+        # Test
+        unit_criteria = {'rpm': Criteria.from_client_input({"filters": {"name": {"$in":['zsh']}}})}
+        manager = factory.consumer_applicability_manager()
+        batch_size = applicability.CONSUMER_BATCH_SIZE
+        applicability.CONSUMER_BATCH_SIZE = 1
+        try:
+            result = manager.find_applicable_units(self.CONSUMER_CRITERIA, self.REPO_CRITERIA, unit_criteria)
+        finally:
+            applicability.CONSUMER_BATCH_SIZE = batch_size
+        # Verify
+        self.assertEqual(len(result['rpm']), 2)
+        self.assertEqual(profiler.find_applicable_units.call_count, 2)
+        consumers = {}
+        for call in profiler.find_applicable_units.call_args_list:
+            batch = call[0][0]
+            self.assertEqual(len(batch), 1)
+            consumers.update(batch)
+        self.assertEqual(sorted(consumers[self.CONSUMER_IDS[0]]['repo_ids']), ['repo-1', 'repo-2'])
+        self.assertEqual(consumers[self.CONSUMER_IDS[1]]['repo_ids'], ['repo-1'])
+        for id in self.CONSUMER_IDS:
+            profiled_consumer = consumers[id]['profiled_consumer']
+            self.assertEqual(profiled_consumer.id, id)
+            self.assertEqual(profiled_consumer.profiles, {'rpm': self.PROFILE})
+
+    def test_batched_merge(self):
+        # Setup
+        self.populate()
+        collection = Bind.get_collection()
+        for id in self.CONSUMER_IDS:
+            collection.save(Bind(id, 'repo-1', 'dist-1', False, {}), safe=True)
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        def by_units(consumers, *unused):
+            return [ApplicabilityReport(consumers.keys(), {'name': 'zsh'})]
+        profiler.find_applicable_units = Mock(side_effect=by_units)
+        mock_profiler, cfg = plugins.get_profiler_by_type('mock-type')
+        def by_consumer(consumers, *unused):
+            return dict([(id, [ApplicabilityReport(id)]) for id in consumers])
+        mock_profiler.find_applicable_units = Mock(side_effect=by_consumer)
+        # Test
+        unit_criteria = {'rpm': Criteria.from_client_input({}), 'mock-type': Criteria.from_client_input({})}
+        manager = factory.consumer_applicability_manager()
+        batch_size = applicability.CONSUMER_BATCH_SIZE
+        applicability.CONSUMER_BATCH_SIZE = 1
+        try:
+            result = manager.find_applicable_units(self.CONSUMER_CRITERIA, self.REPO_CRITERIA, unit_criteria)
+        finally:
+            applicability.CONSUMER_BATCH_SIZE = batch_size
+        # Verify
+        self.assertEqual(len(result['rpm']), 1)
+        self.assertEqual(sorted(result['rpm'][0].summary), self.CONSUMER_IDS)
+        self.assertEqual(result['rpm'][0].details, {'name': 'zsh'})
+        self.assertEqual(sorted(result['mock-type'].keys()), self.CONSUMER_IDS)
+        for id in self.CONSUMER_IDS:
+            self.assertEqual(result['mock-type'][id][0].summary, id)
+
+    def test_batched_merge_by_details(self):
+        # Setup
+        self.populate()
+        collection = Bind.get_collection()
+        for id in self.CONSUMER_IDS:
+            collection.save(Bind(id, 'repo-1', 'dist-1', False, {}), safe=True)
+        profiler, cfg = plugins.get_profiler_by_type('rpm')
+        def by_units(consumers, *unused):
+            return [ApplicabilityReport(consumers.keys(), {'name': 'zsh', 'version': '2.0'}),
+                    ApplicabilityReport(consumers.keys(), {'version': '2.0', 'name': 'ksh'})]
+        profiler.find_applicable_units = Mock(side_effect=by_units)
+        # Test
+        unit_criteria = {'rpm': Criteria.from_client_input({})}
+        manager = factory.consumer_applicability_manager()
+        batch_size = applicability.CONSUMER_BATCH_SIZE
+        applicability.CONSUMER_BATCH_SIZE = 1
+        try:
+            result = manager.find_applicable_units(self.CONSUMER_CRITERIA, self.REPO_CRITERIA, unit_criteria)
+        finally:
+            applicability.CONSUMER_BATCH_SIZE = batch_size
+        # Verify
+        self.assertEqual(len(result['rpm']), 2)
+        self.assertEqual(result['rpm'][0].details['name'], 'zsh')
+        self.assertEqual(result['rpm'][1].details['name'], 'ksh')
+        for report in result['rpm']:
+            self.assertEqual(sorted(report.summary), self.CONSUMER_IDS)
+
+    def populate_cached(self, cache_applicability=True):
+        self.populate()
+        factory.repo_manager().create_repo('repo-1')
+        collection = Bind.get_collection()
+        for id in self.CONSUMER_IDS:
+            collection.save(Bind(id, 'repo-1', 'dist-1', False, {}), safe=True)
+        profiler, cfg = plugins.get_profiler_by_type('mock-type')
+        def by_consumer(consumers, *unused):
+            return dict([(id, [ApplicabilityReport('zsh', {'name': 'zsh'})]) for id in consumers])
+        profiler.find_applicable_units = Mock(side_effect=by_consumer)
+        metadata = dict(profiler.metadata(), cache_applicability=cache_applicability)
+        self.metadata_patch = patch.object(profiler, 'metadata', return_value=metadata)
+        self.metadata_patch.start()
+        return profiler
+
+    def find_cached(self):
+        unit_criteria = {'mock-type': Criteria.from_client_input({})}
+        manager = factory.consumer_applicability_manager()
+        return manager.find_applicable_units(self.CONSUMER_CRITERIA, self.REPO_CRITERIA, unit_criteria)
+
+    def test_cache_identical_profiles(self):
+        # Setup
+        profiler = self.populate_cached()
+        # Test
+        result = self.find_cached()
+        # Verify
+        self.assertEqual(profiler.find_applicable_units.call_count, 1)
+        consumers = profiler.find_applicable_units.call_args[0][0]
+        self.assertEqual(len(consumers), 1)
+        self.assertEqual(sorted(result['mock-type'].keys()), self.CONSUMER_IDS)
+        for id in self.CONSUMER_IDS:
+            self.assertEqual(result['mock-type'][id][0].summary, 'zsh')
+            self.assertEqual(result['mock-type'][id][0].details, {'name': 'zsh'})
+        self.assertEqual(ApplicabilityCacheEntry.get_collection().find().count(), 1)
+
+    def test_cache_not_opted_in(self):
+        # Setup
+        profiler = self.populate_cached(cache_applicability=False)
+        # Test
+        result = self.find_cached()
+        self.find_cached()
+        # Verify
+        self.assertEqual(profiler.find_applicable_units.call_count, 2)
+        consumers = profiler.find_applicable_units.call_args[0][0]
+        self.assertEqual(sorted(consumers.keys()), self.CONSUMER_IDS)
+        self.assertEqual(sorted(result['mock-type'].keys()), self.CONSUMER_IDS)
+        self.assertEqual(ApplicabilityCacheEntry.get_collection().find().count(), 0)
+
+    def test_cache_reports_shared(self):
+        # Setup
+        profiler = self.populate_cached()
+        def by_consumer(consumers, *unused):
+            return dict([(id, [ApplicabilityReport(id)]) for id in consumers])
+        profiler.find_applicable_units = Mock(side_effect=by_consumer)
+        # Test
+        result = self.find_cached()
+        # Verify the profiler opted in to caching, so the report determined
+        # for one consumer is returned for both
+        self.assertEqual(profiler.find_applicable_units.call_count, 1)
+        evaluated = profiler.find_applicable_units.call_args[0][0].keys()[0]
+        for id in self.CONSUMER_IDS:
+            self.assertEqual(result['mock-type'][id][0].summary, evaluated)
+
+    def test_cache_hit(self):
+        # Setup
+        profiler = self.populate_cached()
+        self.find_cached()
+        # Test
+        result = self.find_cached()
+        # Verify
+        self.assertEqual(profiler.find_applicable_units.call_count, 1)
+        self.assertEqual(sorted(result['mock-type'].keys()), self.CONSUMER_IDS)
+
+    def test_cache_profile_updated(self):
+        # Setup
+        profiler = self.populate_cached()
+        self.find_cached()
+        # Test
+        manager = factory.consumer_profile_manager()
+        manager.update(self.CONSUMER_IDS[0], 'rpm', [{'name':'zsh', 'version':'2.0'}])
+        self.assertEqual(ApplicabilityCacheEntry.get_collection().find().count(), 0)
+        self.find_cached()
+        # Verify
+        self.assertEqual(profiler.find_applicable_units.call_count, 2)
+        consumers = profiler.find_applicable_units.call_args[0][0]
+        self.assertEqual(len(consumers), 2)
+
+    def test_cache_repo_content_changed(self):
+        # Setup
+        profiler = self.populate_cached()
+        self.find_cached()
+        # Test
+        factory.repo_manager().update_unit_count('repo-1', 'mock-type', 1)
+        self.find_cached()
+        # Verify
+        self.assertEqual(profiler.find_applicable_units.call_count, 2)
+        entries = list(ApplicabilityCacheEntry.get_collection().find())
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['repo_revisions'], ['repo-1:1'])
+
+    def test_cache_repo_deleted(self):
+        # Setup
+        self.populate_cached()
+        self.find_cached()
+        # Test
+        factory.consumer_applicability_manager().repo_deleted('repo-1')
+        # Verify
+        self.assertEqual(ApplicabilityCacheEntry.get_collection().find().count(), 0)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+import mock
+
+from pulp.server.auth import cache
+from pulp.server.config import config
+
+
+class CredentialCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        super(CredentialCacheTests, self).setUp()
+        self.size = config.get('security', 'auth_cache_size')
+        self.lifetime = config.get('security', 'auth_cache_lifetime')
+        config.set('security', 'auth_cache_size', '2')
+        config.set('security', 'auth_cache_lifetime', '60')
+        self.cache = cache.CredentialCache()
+
+    def tearDown(self):
+        super(CredentialCacheTests, self).tearDown()
+        config.set('security', 'auth_cache_size', self.size)
+        config.set('security', 'auth_cache_lifetime', self.lifetime)
+
+    def test_digest(self):
+        # Test
+        key = self.cache.digest('password', 'admin', 'secret')
+
+        # Verify
+        self.assertTrue('secret' not in key)
+        self.assertEqual(key, self.cache.digest('password', 'admin', 'secret'))
+        self.assertNotEqual(key, self.cache.digest('password', 'admin', None))
+        self.assertNotEqual(key, self.cache.digest('password', 'admin', 'Secret'))
+        self.assertNotEqual(key, cache.CredentialCache().digest('password', 'admin', 'secret'))
+
+    def test_get_put(self):
+        # Setup
+        key = self.cache.digest('password', 'admin', 'secret')
+
+        # Test
+        missed = self.cache.get(key)
+        self.cache.put(key, 'admin', ('user', 'admin'), self.cache.version)
+        found = self.cache.get(key)
+
+        # Verify
+        self.assertTrue(missed is None)
+        self.assertEqual('admin', found)
+        statistics = self.cache.statistics()
+        self.assertEqual(1, statistics['hits'])
+        self.assertEqual(1, statistics['misses'])
+        self.assertEqual(0.5, statistics['hit_rate'])
+        self.assertEqual(1, statistics['size'])
+
+    @mock.patch('time.time')
+    def test_expired(self, mock_time):
+        # Setup
+        mock_time.return_value = 1000
+        self.cache.put('k', 'admin', ('user', 'admin'), self.cache.version)
+
+        # Test
+        mock_time.return_value = 1059
+        found = self.cache.get('k')
+        mock_time.return_value = 1060
+        expired = self.cache.get('k')
+
+        # Verify
+        self.assertEqual('admin', found)
+        self.assertTrue(expired is None)
+        self.assertEqual(0, self.cache.statistics()['size'])
+
+    @mock.patch('time.time')
+    def test_size_bounded(self, mock_time):
+        # Test
+        for i in range(3):
+            mock_time.return_value = 1000 + i
+            self.cache.put('k%d' % i, 'u%d' % i, ('user', 'u%d' % i), self.cache.version)
+
+        # Verify the entry closest to expiring is discarded
+        self.assertTrue(self.cache.get('k0') is None)
+        self.assertEqual('u1', self.cache.get('k1'))
+        self.assertEqual('u2', self.cache.get('k2'))
+        self.assertEqual(1, self.cache.statistics()['evictions'])
+
+    def test_invalidate_owner(self):
+        # Setup
+        self.cache.put('k1', 'admin', ('user', 'admin'), self.cache.version)
+        self.cache.put('k2', 'c1', ('consumer', 'c1'), self.cache.version)
+
+        # Test
+        self.cache.invalidate(('user', 'admin'))
+
+        # Verify
+        self.assertTrue(self.cache.get('k1') is None)
+        self.assertEqual('c1', self.cache.get('k2'))
+
+    def test_invalidate_during_verification(self):
+        # Setup
+        version = self.cache.version
+
+        # Test
+        self.cache.invalidate(('user', 'admin'))
+        self.cache.put('k', 'admin', ('user', 'admin'), version)
+
+        # Verify
+        self.assertTrue(self.cache.get('k') is None)
+
+    def test_disabled(self):
+        # Setup
+        config.set('security', 'auth_cache_lifetime', '0')
+
+        # Test
+        self.cache.put('k', 'admin', ('user', 'admin'), self.cache.version)
+
+        # Verify
+        self.assertTrue(self.cache.get('k') is None)
+        self.assertEqual(0, self.cache.statistics()['size'])
+        self.assertEqual(0, self.cache.statistics()['misses'])
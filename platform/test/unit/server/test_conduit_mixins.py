@@ -149,6 +149,45 @@ class SingleRepoUnitsMixinTests(unittest.TestCase):
         # Test
         self.assertRaises(mixins.DistributorConduitException, self.mixin.get_units)
 
+    @mock.patch('pulp.plugins.types.database.type_definition')
+    @mock.patch('pulp.server.managers.repo.unit_association_query.RepoUnitAssociationQueryManager.iter_units')
+    def test_iter_units(self, mock_query_call, mock_type_def_call):
+        # Setup
+        mock_query_call.return_value = iter([
+            {'unit_type_id' : 'type-1', 'metadata' : {'m' : 'm1', 'k1' : 'v1'}},
+            {'unit_type_id' : 'type-1', 'metadata' : {'m' : 'm1', 'k1' : 'v2'}},
+            {'unit_type_id' : 'type-2', 'metadata' : {'m' : 'm1', 'k1' : 'v3'}},
+        ])
+
+        mock_type_def_call.return_value = {
+            'id' : 'mock-type-def',
+            'unit_key' : ['k1']
+        }
+
+        fake_criteria = 'fake-criteria'
+
+        # Test
+        units = self.mixin.iter_units(criteria=fake_criteria, batch_size=2)
+
+        # Verify
+        self.assertFalse(isinstance(units, list))
+        units = list(units)
+        self.assertEqual(3, len(units))
+        self.assertEqual(['v1', 'v2', 'v3'], [u.unit_key['k1'] for u in units])
+        self.assertEqual(1, mock_query_call.call_count)
+        self.assertEqual(mock_query_call.call_args[0][0], self.repo_id)
+        self.assertEqual(mock_query_call.call_args[1]['criteria'], fake_criteria)
+        self.assertEqual(mock_query_call.call_args[1]['batch_size'], 2)
+        self.assertEqual(2, mock_type_def_call.call_count) # once per type
+
+    @mock.patch('pulp.server.managers.repo.unit_association_query.RepoUnitAssociationQueryManager.iter_units')
+    def test_iter_units_server_error(self, mock_query_call):
+        # Setup
+        mock_query_call.side_effect = Exception()
+
+        # Test
+        self.assertRaises(mixins.DistributorConduitException, list, self.mixin.iter_units())
+
 
 class MultipleRepoUnitsMixinTests(unittest.TestCase):
 
@@ -191,6 +230,29 @@ class MultipleRepoUnitsMixinTests(unittest.TestCase):
         # Test
         self.assertRaises(mixins.ImporterConduitException, self.mixin.get_units, 'foo')
 
+    @mock.patch('pulp.plugins.types.database.type_definition')
+    @mock.patch('pulp.server.managers.repo.unit_association_query.RepoUnitAssociationQueryManager.iter_units')
+    def test_iter_units(self, mock_query_call, mock_type_def_call):
+        # Setup
+        mock_query_call.return_value = iter([
+            {'unit_type_id' : 'type-1', 'metadata' : {'m' : 'm1', 'k1' : 'v1'}},
+            {'unit_type_id' : 'type-2', 'metadata' : {'m' : 'm1', 'k1' : 'v2'}},
+        ])
+
+        mock_type_def_call.return_value = {
+            'id' : 'mock-type-def',
+            'unit_key' : ['k1']
+        }
+
+        # Test
+        repo_id = 'mr-repo'
+        units = list(self.mixin.iter_units(repo_id))
+
+        # Verify
+        self.assertEqual(2, len(units))
+        self.assertEqual(1, mock_query_call.call_count)
+        self.assertEqual(mock_query_call.call_args[0][0], repo_id)
+
 
 class SearchUnitsMixinTests(unittest.TestCase):
 
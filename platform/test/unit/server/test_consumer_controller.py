@@ -907,6 +907,58 @@ class TestProfiles(base.PulpWebserviceTests):
         status, body = self.delete(path)
         self.assertEqual(status, 404)
 
+    def test_post_digest_unchanged(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        manager.create(self.CONSUMER_ID, self.TYPE_1, self.PROFILE_1)
+        profile_hash = UnitProfile.calculate_hash(self.PROFILE_1)
+        # Test
+        path = '/v2/consumers/%s/profiles/%s/digest/' % (self.CONSUMER_ID, self.TYPE_1)
+        status, body = self.post(path, dict(profile_hash=profile_hash))
+        # Verify
+        self.assertEqual(status, 200)
+        self.assertEqual(body['profile_hash'], profile_hash)
+        self.assertFalse(body['profile_required'])
+
+    def test_post_digest_required(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        manager.create(self.CONSUMER_ID, self.TYPE_1, self.PROFILE_1)
+        profile_hash = UnitProfile.calculate_hash(self.PROFILE_2)
+        # Test
+        path = '/v2/consumers/%s/profiles/%s/digest/' % (self.CONSUMER_ID, self.TYPE_1)
+        status, body = self.post(path, dict(profile_hash=profile_hash))
+        # Verify
+        self.assertEqual(status, 200)
+        self.assertEqual(body['profile_hash'], UnitProfile.calculate_hash(self.PROFILE_1))
+        self.assertTrue(body['profile_required'])
+
+    def test_post_digest_with_profile(self):
+        # Setup
+        self.populate()
+        profile_hash = UnitProfile.calculate_hash(self.PROFILE_2)
+        # Test
+        path = '/v2/consumers/%s/profiles/%s/digest/' % (self.CONSUMER_ID, self.TYPE_1)
+        body = dict(profile_hash=profile_hash, profile=self.PROFILE_2)
+        status, body = self.post(path, body)
+        # Verify
+        self.assertEqual(status, 200)
+        self.assertFalse(body['profile_required'])
+        manager = factory.consumer_profile_manager()
+        profile = manager.get_profile(self.CONSUMER_ID, self.TYPE_1)
+        self.assertEqual(profile['profile'], self.PROFILE_2)
+
+    def test_post_digest_missing_hash(self):
+        # Setup
+        self.populate()
+        # Test
+        path = '/v2/consumers/%s/profiles/%s/digest/' % (self.CONSUMER_ID, self.TYPE_1)
+        status, body = self.post(path, dict(profile=self.PROFILE_1))
+        # Verify
+        self.assertEqual(status, 400)
+
 
 class TestApplicability(base.PulpWebserviceTests):
 
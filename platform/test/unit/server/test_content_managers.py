@@ -18,6 +18,7 @@ import base
 from pulp.plugins.types import database, model
 from pulp.server.db.connection import PulpCollection
 from pulp.server.db.model.criteria import Criteria
+from pulp.server.db.model.repository import Repo, RepoContentUnit
 from pulp.server.managers.content.cud import ContentManager
 from pulp.server.managers.content.query import ContentQueryManager
 
@@ -73,6 +74,21 @@ class PulpContentCUDTests(PulpContentTests):
         units = self.query_manager.list_content_units(TYPE_1_DEF.id)
         self.assertEqual(len(units), 1)
 
+    def test_add_content_units(self):
+        unit_ids = self.cud_manager.add_content_units(TYPE_1_DEF.id, TYPE_1_UNITS)
+        self.assertEqual(len(unit_ids), len(TYPE_1_UNITS))
+        self.assertEqual(len(set(unit_ids)), len(TYPE_1_UNITS))
+        for unit_id, metadata in zip(unit_ids, TYPE_1_UNITS):
+            unit = self.query_manager.get_content_unit_by_id(TYPE_1_DEF.id, unit_id)
+            self.assertEqual(unit['key-1'], metadata['key-1'])
+            self.assertEqual(unit['_content_type_id'], TYPE_1_DEF.id)
+
+    def test_add_content_units_empty(self):
+        unit_ids = self.cud_manager.add_content_units(TYPE_1_DEF.id, [])
+        self.assertEqual(unit_ids, [])
+        units = self.query_manager.list_content_units(TYPE_1_DEF.id)
+        self.assertEqual(len(units), 0)
+
     def test_update_content_unit(self):
         unit_id = self.cud_manager.add_content_unit(TYPE_1_DEF.id, None, TYPE_1_UNITS[0])
         unit = self.query_manager.get_content_unit_by_id(TYPE_1_DEF.id, unit_id)
@@ -81,6 +97,25 @@ class PulpContentCUDTests(PulpContentTests):
         unit = self.query_manager.get_content_unit_by_id(TYPE_1_DEF.id, unit_id)
         self.assertTrue(unit['search-1'] == 'two')
 
+    def test_update_content_unit_revision(self):
+        Repo.get_collection().remove()
+        RepoContentUnit.get_collection().remove()
+        for repo_id in ('repo-1', 'repo-2'):
+            Repo.get_collection().save(Repo(repo_id, repo_id), safe=True)
+        unit_id = self.cud_manager.add_content_unit(TYPE_1_DEF.id, None, TYPE_1_UNITS[0])
+        association = RepoContentUnit('repo-1', unit_id, TYPE_1_DEF.id,
+                                      RepoContentUnit.OWNER_TYPE_USER, 'admin')
+        RepoContentUnit.get_collection().save(association, safe=True)
+        try:
+            self.cud_manager.update_content_unit(TYPE_1_DEF.id, unit_id, {'search-1': 'two'})
+            repo_1 = Repo.get_collection().find_one({'id': 'repo-1'})
+            repo_2 = Repo.get_collection().find_one({'id': 'repo-2'})
+            self.assertEqual(repo_1['content_revision'], 1)
+            self.assertEqual(repo_2['content_revision'], 0)
+        finally:
+            Repo.get_collection().remove()
+            RepoContentUnit.get_collection().remove()
+
     def test_delete_content_unit(self):
         unit_id = self.cud_manager.add_content_unit(TYPE_1_DEF.id, None, TYPE_1_UNITS[0])
         units = self.query_manager.list_content_units(TYPE_1_DEF.id)
@@ -19,6 +19,7 @@ import traceback
 from pprint import pformat
 
 import base
+import mock
 
 from pulp.server import exceptions as pulp_exceptions
 from pulp.plugins.types import database as content_type_db
@@ -183,6 +184,35 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
                           self.orphan_manager.get_orphan,
                           PHONY_TYPE_1.id, 'non-existent')
 
+    def test_get_associated_orphan_using_generators(self):
+        unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        associate_content_unit_with_repo(unit)
+
+        self.assertRaises(pulp_exceptions.MissingResource,
+                          self.orphan_manager.get_orphan,
+                          PHONY_TYPE_1.id, unit['_id'])
+
+    @mock.patch('pulp.server.managers.content.orphan.ORPHAN_BATCH_SIZE', 2)
+    def test_list_orphans_across_batches_using_generators(self):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(5)]
+        associate_content_unit_with_repo(units[1])
+        associate_content_unit_with_repo(units[4])
+
+        orphans = list(self.orphan_manager.generate_orphans_by_type(PHONY_TYPE_1.id))
+
+        expected_ids = set([units[0]['_id'], units[2]['_id'], units[3]['_id']])
+        self.assertEqual(expected_ids, set(o['_id'] for o in orphans))
+
+    def test_orphans_summary(self):
+        unit_1 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        unit_2 = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        unit_3 = gen_content_unit(PHONY_TYPE_2.id, self.content_root)
+        associate_content_unit_with_repo(unit_3)
+
+        summary = self.orphan_manager.orphans_summary()
+        self.assertEqual(summary[PHONY_TYPE_1.id], 2)
+        self.assertEqual(summary[PHONY_TYPE_2.id], 0)
+
     def test_associated_units_using_generators(self):
         unit = gen_content_unit(PHONY_TYPE_1.id, self.content_root)
         associate_content_unit_with_repo(unit)
@@ -262,3 +292,43 @@ class OrphanManagerGeneratorTests(OrphanManagerTests):
         self.assertEqual(self.number_of_files_in_content_root(), 0)
 
 
+    @mock.patch('pulp.server.managers.content.orphan.ORPHAN_BATCH_SIZE', 2)
+    def test_delete_by_id_across_batches_using_generators(self):
+        units = [gen_content_unit(PHONY_TYPE_1.id, self.content_root) for i in range(5)]
+        associate_content_unit_with_repo(units[0])
+
+        json_objs = [{'content_type_id': u['_content_type_id'], 'unit_id': u['_id']} for u in units[:4]]
+        self.orphan_manager.delete_orphans_by_id(json_objs)
+
+        # the associated unit is not an orphan and the last one was not requested
+        remaining = list(self.orphan_manager.generate_all_orphans())
+        self.assertEqual([units[4]['_id']], [o['_id'] for o in remaining])
+        self.assertTrue(os.path.exists(units[0]['_storage_path']))
+        self.assertTrue(os.path.exists(units[4]['_storage_path']))
+        self.assertEqual(self.number_of_files_in_content_root(), 2)
+
+    def test_delete_prunes_nested_directories_using_generators(self):
+        nested_dir = os.path.join(self.content_root, 'a', 'b')
+        os.makedirs(nested_dir)
+        unit_1 = gen_content_unit(PHONY_TYPE_1.id, nested_dir)
+        unit_2 = gen_content_unit(PHONY_TYPE_1.id, os.path.join(self.content_root, 'a'))
+        gen_content_unit(PHONY_TYPE_2.id, self.content_root)
+
+        self.orphan_manager.delete_orphans_by_type(PHONY_TYPE_1.id)
+
+        self.assertFalse(os.path.exists(os.path.join(self.content_root, 'a')))
+        self.assertEqual(self.number_of_files_in_content_root(), 1)
+
+    @mock.patch('pulp.server.dispatch.factory.context')
+    def test_delete_reports_progress_using_generators(self, mock_context):
+        mock_report = mock_context.return_value.report_progress
+        gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+        gen_content_unit(PHONY_TYPE_1.id, self.content_root)
+
+        self.orphan_manager.delete_orphans_by_type(PHONY_TYPE_1.id)
+
+        self.assertTrue(mock_report.call_count > 0)
+        report = mock_report.call_args[0][0]
+        self.assertEqual(report[PHONY_TYPE_1.id]['state'], 'finished')
+        self.assertEqual(report[PHONY_TYPE_1.id]['deleted'], 2)
+        self.assertTrue('units_per_second' in report[PHONY_TYPE_1.id])
@@ -18,6 +18,7 @@ import shutil
 import base
 import mock_plugins
 
+from   pulp.common import upload as upload_utils
 from   pulp.plugins.conduits.upload import UploadConduit
 from   pulp.plugins.model import Repository
 from   pulp.server.db.model.auth import User
@@ -43,6 +44,9 @@ class ContentUploadManagerTests(base.PulpServerTests):
         upload_storage_dir = self.upload_manager._upload_storage_dir()
         shutil.rmtree(upload_storage_dir)
 
+        checksums_dir = os.path.dirname(self.upload_manager._upload_checksums_path('x'))
+        shutil.rmtree(checksums_dir)
+
     def clean(self):
         base.PulpServerTests.clean(self)
         Repo.get_collection().remove()
@@ -108,6 +112,59 @@ class ContentUploadManagerTests(base.PulpServerTests):
         except MissingResource, e:
             self.assertEqual(e.resources['upload_request'], 'foo')
 
+    def test_save_data_checksum(self):
+
+        # Setup
+        upload_id = self.upload_manager.initialize_upload()
+
+        # Test
+        self.upload_manager.save_data(upload_id, 0, 'abc', upload_utils.segment_checksum('abc'))
+
+        # Verify
+        self.assertEqual('abc', self.upload_manager.read_upload(upload_id))
+
+    def test_save_data_checksum_mismatch(self):
+
+        # Setup
+        upload_id = self.upload_manager.initialize_upload()
+
+        # Test
+        self.assertRaises(InvalidValue, self.upload_manager.save_data, upload_id, 0, 'abc',
+                          upload_utils.segment_checksum('abd'))
+
+        # Verify
+        self.assertEqual('', self.upload_manager.read_upload(upload_id))
+
+    def test_verify_upload(self):
+
+        # Setup
+        upload_id = self.upload_manager.initialize_upload()
+
+        # Saved out of order, with one segment sent twice
+        segments = [(3, 'de'), (0, 'abc'), (5, 'f'), (3, 'de')]
+        for offset, data in segments:
+            self.upload_manager.save_data(upload_id, offset, data, upload_utils.segment_checksum(data))
+
+        checksum = upload_utils.upload_checksum([upload_utils.segment_checksum(d) for d in ('abc', 'de', 'f')])
+
+        # Test
+        self.upload_manager.verify_upload(upload_id, checksum)
+
+        # Verify
+        self.assertRaises(PulpDataException, self.upload_manager.verify_upload, upload_id, 'wrong')
+
+    def test_verify_upload_unverified_segment(self):
+
+        # Setup
+        upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'abc', upload_utils.segment_checksum('abc'))
+        self.upload_manager.save_data(upload_id, 3, 'de')
+
+        checksum = upload_utils.upload_checksum([upload_utils.segment_checksum(d) for d in ('abc', 'de')])
+
+        # Test
+        self.assertRaises(PulpDataException, self.upload_manager.verify_upload, upload_id, checksum)
+
     def test_delete_upload(self):
 
         # Setup
@@ -205,6 +262,21 @@ class ContentUploadManagerTests(base.PulpServerTests):
         mock_plugins.MOCK_IMPORTER.upload_unit.return_value = None
         manager_factory.principal_manager().set_principal(principal=None)
 
+    def test_import_uploaded_unit_checksum_mismatch(self):
+        # Setup
+        self.repo_manager.create_repo('repo-u')
+        self.importer_manager.set_importer('repo-u', 'mock-importer', {})
+
+        upload_id = self.upload_manager.initialize_upload()
+        self.upload_manager.save_data(upload_id, 0, 'abc', upload_utils.segment_checksum('abc'))
+
+        # Test
+        self.assertRaises(PulpDataException, self.upload_manager.import_uploaded_unit, 'repo-u', 'mock-type',
+                          {}, {}, upload_id, upload_checksum='wrong')
+
+        # Verify
+        self.assertEqual(0, mock_plugins.MOCK_IMPORTER.upload_unit.call_count)
+
     def test_import_uploaded_unit_missing_repo(self):
         # Test
         self.assertRaises(MissingResource, self.upload_manager.import_uploaded_unit, 'fake', 'mock-type', {}, {}, 'irrelevant')
@@ -242,6 +314,9 @@ class ContentUploadManagerTests(base.PulpServerTests):
         upload_storage_dir = self.upload_manager._upload_storage_dir()
         shutil.rmtree(upload_storage_dir)
 
+        checksums_dir = os.path.dirname(self.upload_manager._upload_checksums_path('x'))
+        shutil.rmtree(checksums_dir)
+
         # Test
         upload_storage_dir = self.upload_manager._upload_storage_dir()
 
@@ -18,6 +18,7 @@ import mock
 
 import base
 import dummy_plugins
+from pulp.common import upload as upload_utils
 from pulp.server.db.model.repository import Repo, RepoImporter
 import pulp.server.managers.factory as manager_factory
 from pulp.server.webservices.controllers.contents import ContentUnitsCollection, ContentUnitsSearch
@@ -127,6 +128,31 @@ class TestContentUnitsSearch(base.PulpWebserviceTests):
         self.assertEqual(body[0].get('repository_memberships'), ['repo1'])
 
 
+    @mock.patch(
+        'pulp.server.managers.content.query.ContentQueryManager.find_by_criteria',
+        return_value=iter([{'_id':'foo'}, {'_id':'bar'}]))
+    @mock.patch('pulp.server.managers.repo.unit_association_query.RepoUnitAssociationQueryManager.find_by_criteria')
+    def test_stream_repo_memberships(self, mock_find_assoc, mock_find_unit):
+        mock_find_assoc.return_value = [{'unit_id':'foo', 'repo_id':'repo1'}]
+        post_body = {'criteria': {}, 'include_repos':True, 'stream':True}
+        status, body = self.post('/v2/content/units/rpm/search/', post_body)
+        self.assertEqual(status, 200)
+        self.assertEqual(mock_find_assoc.call_count, 1)
+        self.assertEqual([['repo1'], []], [u['repository_memberships'] for u in body])
+
+    @mock.patch(
+        'pulp.server.managers.content.query.ContentQueryManager.find_by_criteria',
+        return_value=[{'_id':'foo'}])
+    def test_get_continuation(self, mock_find_unit):
+        status, body = self.get('/v2/content/units/rpm/search/?limit=5&continuation=')
+        self.assertEqual(status, 200)
+        self.assertEqual(1, len(body['items']))
+        self.assertTrue(body['continuation'] is None)
+        criteria = mock_find_unit.call_args[0][1]
+        self.assertEqual(6, criteria.limit)
+        self.assertEqual([('_id', 1)], criteria.sort)
+
+
 class TestContentUnitsSearchNonWeb(base.PulpServerTests):
     def setUp(self):
         super(TestContentUnitsSearchNonWeb, self).setUp()
@@ -139,6 +165,19 @@ class TestContentUnitsSearchNonWeb(base.PulpServerTests):
         self.controller._add_repo_memberships([], 'rpm')
         self.assertEqual(mock_find.call_count, 0)
 
+    @mock.patch('pulp.server.webservices.controllers.contents.MEMBERSHIP_BATCH_SIZE', 2)
+    @mock.patch('pulp.server.managers.repo.unit_association_query.RepoUnitAssociationQueryManager.find_by_criteria')
+    def test_add_repo_memberships_chunked(self, mock_find):
+        mock_find.return_value = [{'repo_id':'repo1', 'unit_id':'unit1'}]
+
+        units = [{'_id': 'unit%d' % i} for i in range(3)]
+        self.controller._add_repo_memberships(units, 'rpm')
+
+        self.assertEqual(mock_find.call_count, 2)
+        self.assertEqual(mock_find.call_args_list[0][0][0].filters['unit_id'], {'$in': ['unit0', 'unit1']})
+        self.assertEqual(mock_find.call_args_list[1][0][0].filters['unit_id'], {'$in': ['unit2']})
+        self.assertEqual([[], ['repo1'], []], [u['repository_memberships'] for u in units])
+
     @mock.patch('pulp.server.managers.repo.unit_association_query.RepoUnitAssociationQueryManager.find_by_criteria')
     def test_add_repo_memberships_(self, mock_find):
         mock_find.return_value = [{'repo_id':'repo1', 'unit_id':'unit1'}]
@@ -265,6 +304,34 @@ class UploadSegmentResourceTests(BaseUploadTest):
 
         self.assertEqual(expected_size, found_size)
 
+    def test_put_checksum(self):
+
+        # Setup
+        upload_id = self.upload_manager.initialize_upload()
+        checksum = upload_utils.segment_checksum('string data')
+
+        # Test
+        url = '/v2/content/uploads/%s/0/?checksum=%s' % (upload_id, checksum)
+        status, body = self.put(url, 'string data', serialize_json=False)
+
+        # Verify
+        self.assertEqual(200, status)
+        self.upload_manager.verify_upload(upload_id, upload_utils.upload_checksum([checksum]))
+
+    def test_put_checksum_mismatch(self):
+
+        # Setup
+        upload_id = self.upload_manager.initialize_upload()
+        checksum = upload_utils.segment_checksum('other data')
+
+        # Test
+        url = '/v2/content/uploads/%s/0/?checksum=%s' % (upload_id, checksum)
+        status, body = self.put(url, 'string data', serialize_json=False)
+
+        # Verify
+        self.assertEqual(400, status)
+        self.assertEqual('', self.upload_manager.read_upload(upload_id))
+
     def test_put_invalid_offset(self):
 
         # Test
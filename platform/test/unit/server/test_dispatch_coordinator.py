@@ -324,6 +324,76 @@ class CoordinatorCollisionDetectionTests(CoordinatorTests):
         self.assertTrue(task_id in blockers)
         self.assertTrue(reasons)
 
+    def test_process_tasks_batch(self):
+        existing_task_id = 'existing_task'
+        repo_id = 'my_repo'
+        existing_resources = {
+            dispatch_constants.RESOURCE_REPOSITORY_TYPE: {
+                repo_id: dispatch_constants.RESOURCE_UPDATE_OPERATION
+            }
+        }
+        existing_call_resources = coordinator.resource_dict_to_call_resources(existing_resources)
+        coordinator.set_call_request_id_on_call_resources(existing_task_id, existing_call_resources)
+        self.collection.insert(existing_call_resources, safe=True)
+
+        # updates of the repository are postponed by the queued update
+        task_list = []
+        for i in range(3):
+            resources = {
+                dispatch_constants.RESOURCE_UPDATE_OPERATION: {
+                    dispatch_constants.RESOURCE_REPOSITORY_TYPE: [repo_id],
+                },
+                dispatch_constants.RESOURCE_READ_OPERATION: {
+                    dispatch_constants.RESOURCE_CONSUMER_TYPE: ['consumer-%d' % i],
+                }
+            }
+            task_list.append(Task(call.CallRequest(dummy_call, resources=resources)))
+
+        with mock.patch.object(coordinator.ResourceLockTable, 'load', autospec=True,
+                               side_effect=coordinator.ResourceLockTable.load) as mock_load:
+            self.coordinator._process_tasks(task_list)
+
+        self.assertEqual(mock_load.call_count, 1)
+        for task in task_list:
+            self.assertTrue(task.call_report.response is dispatch_constants.CALL_POSTPONED_RESPONSE)
+            self.assertEqual(task.call_request.dependencies.keys(), [existing_task_id])
+        self.assertEqual(self.collection.find().count(), 1 + 2 * len(task_list))
+
+    def test_resource_lock_table(self):
+        resources = {
+            dispatch_constants.RESOURCE_REPOSITORY_TYPE: {
+                'repo-1': dispatch_constants.RESOURCE_UPDATE_OPERATION,
+                'repo-2': dispatch_constants.RESOURCE_READ_OPERATION,
+            },
+            dispatch_constants.RESOURCE_CONSUMER_TYPE: {
+                'consumer-1': dispatch_constants.RESOURCE_READ_OPERATION,
+            }
+        }
+        call_resources = coordinator.resource_dict_to_call_resources(resources)
+        coordinator.set_call_request_id_on_call_resources('existing_task', call_resources)
+        self.collection.insert(call_resources, safe=True)
+
+        lock_table = coordinator.ResourceLockTable(self.collection)
+        lock_table.load([{dispatch_constants.RESOURCE_DELETE_OPERATION: {
+            dispatch_constants.RESOURCE_REPOSITORY_TYPE: ['repo-1', 'repo-3'],
+            dispatch_constants.RESOURCE_CONSUMER_TYPE: ['consumer-1']}}])
+
+        found = lock_table.find({dispatch_constants.RESOURCE_REPOSITORY_TYPE: {'repo-1': None, 'repo-3': None},
+                                 dispatch_constants.RESOURCE_CONSUMER_TYPE: {'consumer-1': None}})
+        self.assertEqual(sorted(c['resource_id'] for c in found), ['consumer-1', 'repo-1'])
+
+        # repo-2 was not loaded
+        self.assertEqual(lock_table.find({dispatch_constants.RESOURCE_REPOSITORY_TYPE: {'repo-2': None}}), [])
+
+        new_resources = coordinator.resource_dict_to_call_resources({
+            dispatch_constants.RESOURCE_REPOSITORY_TYPE: {'repo-3': dispatch_constants.RESOURCE_READ_OPERATION}})
+        coordinator.set_call_request_id_on_call_resources('new_task', new_resources)
+        lock_table.add(new_resources)
+
+        found = lock_table.find({dispatch_constants.RESOURCE_REPOSITORY_TYPE: {'repo-3': None}})
+        self.assertEqual([c['call_request_id'] for c in found], ['new_task'])
+        self.assertEqual(self.collection.find({'call_request_id': 'new_task'}).count(), 1)
+
 # call execution tests ---------------------------------------------------------
 
 def dummy_call(progress, success, failure):
@@ -529,6 +599,10 @@ class CoordinatorFindCallReportsTests(CoordinatorTests):
     def set_task_queue(self, task_list):
         mocked_task_queue = mock.Mock()
         mocked_task_queue.all_tasks = mock.Mock(return_value=task_list)
+        tasks_by_id = dict((t.call_request.id, t) for t in task_list)
+        mocked_task_queue.get = mock.Mock(side_effect=tasks_by_id.get)
+        mocked_task_queue.find = mock.Mock(side_effect=lambda *tags:
+            [t for t in task_list if set(tags).issubset(t.call_request.tags)])
         # this gets cleaned up by the base class tearDown method
         dispatch_factory._task_queue = mock.Mock(return_value=mocked_task_queue)
 
@@ -553,6 +627,27 @@ class CoordinatorFindCallReportsTests(CoordinatorTests):
         self.assertEqual(len(call_report_list), 1)
         self.assertEqual(call_report_list[0].call_request_id, call_request.id)
 
+    def test_find_by_call_request_id(self):
+        call_request = call.CallRequest(find_dummy_call)
+        task = Task(call_request)
+        self.set_task_queue([task])
+
+        call_report_list = self.coordinator.find_call_reports(call_request_id=call_request.id)
+        self.assertEqual(len(call_report_list), 1)
+        self.assertEqual(call_report_list[0].call_request_id, call_request.id)
+
+        call_report_list = self.coordinator.find_call_reports(call_request_id='not-there')
+        self.assertEqual(len(call_report_list), 0)
+
+    def test_find_by_tags(self):
+        call_request_1 = call.CallRequest(find_dummy_call, tags=['a', 'b'])
+        call_request_2 = call.CallRequest(find_dummy_call, tags=['b'])
+        self.set_task_queue([Task(call_request_1), Task(call_request_2)])
+
+        call_report_list = self.coordinator.find_call_reports(tags=['a', 'b'])
+        self.assertEqual(len(call_report_list), 1)
+        self.assertEqual(call_report_list[0].call_request_id, call_request_1.id)
+
 # coordinator start tests ------------------------------------------------------
 
 class CoordinatorStartTests(CoordinatorTests):
@@ -607,4 +702,18 @@ class CoordinatorStartTests(CoordinatorTests):
         self.assertEqual(self.coordinator.execute_call_asynchronously.call_count, 0)
         self.assertEqual(self.coordinator.execute_multiple_calls.call_count, 1)
 
+    def test_start_interleaved_queued_call_groups(self):
+        requests = [call.CallRequest(dummy_call) for i in range(5)]
+        requests[0].group_id = requests[2].group_id = 'group-1'
+        requests[3].group_id = 'group-2'
+
+        for r in requests:
+            self.queued_call_collection.insert(QueuedCall(r))
+
+        self.coordinator.start()
 
+        self.assertEqual(self.coordinator.execute_call_asynchronously.call_count, 2)
+        self.assertEqual(self.coordinator.execute_multiple_calls.call_count, 2)
+        groups = [c[0][0] for c in self.coordinator.execute_multiple_calls.call_args_list]
+        self.assertEqual([[requests[0].id, requests[2].id], [requests[3].id]],
+                         [[r.id for r in g] for g in groups])
@@ -12,6 +12,7 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import datetime
+import threading
 import traceback
 import types
 
@@ -152,6 +153,24 @@ class TaskTests(base.PulpServerTests):
         for h in hooks:
             self.assertTrue(h.call_count == 1)
 
+    def test_wait_for_state_reached(self):
+        self.task._run()
+        self.assertTrue(self.task.wait_for_state(dispatch_constants.CALL_COMPLETE_STATES, timeout=0))
+
+    def test_wait_for_state_timeout(self):
+        self.assertFalse(self.task.wait_for_state(dispatch_constants.CALL_COMPLETE_STATES, timeout=0.1))
+
+    def test_wait_for_state_notified(self):
+        timer = threading.Timer(0.1, self.task._run)
+        timer.start()
+        try:
+            # no poll interval, so only the state change can wake this up
+            reached = self.task.wait_for_state(dispatch_constants.CALL_COMPLETE_STATES, timeout=5.0)
+        finally:
+            timer.join()
+        self.assertTrue(reached)
+        self.assertTrue(self.call_report.state is dispatch_constants.CALL_FINISHED_STATE)
+
 # run failure testing ----------------------------------------------------------
 
 class FailTests(base.PulpServerTests):
@@ -17,6 +17,7 @@ import sys
 import threading
 import time
 import traceback
+from datetime import timedelta
 
 import base
 
@@ -222,6 +223,43 @@ class TaskQueueControlFlowTests(TaskQueueTests):
         self.assertTrue(task_1 in task_list)
         self.assertFalse(task_2 in task_list)
 
+    def test_get_ready_tasks_unblocked(self):
+        task_1 = self.gen_task()
+        task_2 = self.gen_task()
+        task_2.call_request.dependencies[task_1.call_request.id] = dispatch_constants.CALL_COMPLETE_STATES
+        self.queue.enqueue(task_1)
+        self.queue.enqueue(task_2)
+        task_1.call_request_exit_state = dispatch_constants.CALL_FINISHED_STATE
+        self.queue.dequeue(task_1)
+        task_list = self.queue._get_ready_tasks()
+        self.assertEqual([task_2.call_request.id], [t.call_request.id for t in task_list])
+
+    def test_dispatch_timeout(self):
+        self.assertTrue(self.queue._dispatch_timeout() is None)
+        # waiting tasks, blocked or not, are never polled for
+        task_1 = self.gen_task()
+        task_2 = self.gen_task()
+        task_2.call_request.dependencies[task_1.call_request.id] = dispatch_constants.CALL_COMPLETE_STATES
+        self.queue.enqueue(task_1)
+        self.queue.enqueue(task_2)
+        self.assertTrue(self.queue._dispatch_timeout() is None)
+
+    def test_dispatcher_notified(self):
+        # the dispatch interval is long enough that only a notification can
+        # get the tasks run within the timeout
+        self.queue = TaskQueue(2, dispatch_interval=60)
+        self.queue.start()
+        try:
+            task_1 = self.gen_task()
+            task_2 = self.gen_task()
+            task_2.call_request.dependencies[task_1.call_request.id] = dispatch_constants.CALL_COMPLETE_STATES
+            self.queue.enqueue(task_1)
+            self.queue.enqueue(task_2)
+            self.assertTrue(task_2.wait_for_state(dispatch_constants.CALL_COMPLETE_STATES, timeout=5.0))
+            self.assertEqual(task_1.call_report.state, dispatch_constants.CALL_FINISHED_STATE)
+        finally:
+            self.queue.stop()
+
     def test_run_ready_task(self):
         task = self.gen_async_task()
         self.queue.enqueue(task)
@@ -353,3 +391,57 @@ class TaskQueueQueryTests(TaskQueueTests):
         self.assertTrue(task_2 in task_list, str(task_2.call_request.tags))
         self.assertFalse(task_3 in task_list)
 
+    def test_get_missing(self):
+        task = self.gen_task()
+        self.queue.enqueue(task)
+        self.queue.dequeue(task)
+        self.assertTrue(self.queue.get(task.call_request.id) is None)
+
+    def test_get_completed(self):
+        task = self.gen_task()
+        self.queue.enqueue(task)
+        self.queue._run_ready_task(task)
+        self.wait_for_task_to_complete(task)
+        self.assertTrue(self.queue.get(task.call_request.id) is task)
+        self.assertTrue(task in self.queue.completed_tasks())
+
+    def test_find_no_tags(self):
+        tasks = [self.gen_task() for i in range(3)]
+        for t in tasks:
+            self.queue.enqueue(t)
+        task_list = self.queue.find()
+        self.assertEqual([t.call_request.id for t in tasks],
+                         [t.call_request.id for t in task_list])
+
+    def test_find_dequeued(self):
+        task = self.gen_task()
+        task.call_request.tags.append('TAG')
+        self.queue.enqueue(task)
+        self.queue.dequeue(task)
+        self.assertEqual(self.queue.find('TAG'), [])
+
+    def test_purge_completed_task_cache(self):
+        self.queue.completed_task_cache_life = timedelta(seconds=0)
+        task = self.gen_task()
+        task.call_request.tags.append('TAG')
+        self.queue.enqueue(task)
+        self.queue._run_ready_task(task)
+        self.wait_for_task_to_complete(task)
+        self.queue._purge_completed_task_cache()
+        self.assertTrue(self.queue.get(task.call_request.id) is None)
+        self.assertEqual(self.queue.find('TAG'), [])
+        self.assertEqual(self.queue.completed_tasks(), [])
+
+    def test_unblock_dependent_tasks(self):
+        task_1 = self.gen_task()
+        task_2 = self.gen_task()
+        task_3 = self.gen_task()
+        task_2.call_request.dependencies[task_1.call_request.id] = dispatch_constants.CALL_COMPLETE_STATES
+        task_3.call_request.dependencies[task_2.call_request.id] = dispatch_constants.CALL_COMPLETE_STATES
+        for t in (task_1, task_2, task_3):
+            self.queue.enqueue(t)
+        # dependencies are only removed for tasks that completed
+        task_1.call_request_exit_state = dispatch_constants.CALL_FINISHED_STATE
+        self.queue.dequeue(task_1)
+        self.assertEqual(task_2.call_request.dependencies, {})
+        self.assertTrue(task_2.call_request.id in task_3.call_request.dependencies)
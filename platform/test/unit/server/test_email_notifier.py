@@ -26,6 +26,7 @@ from pulp.server.compat import json
 from pulp.server.config import config
 from pulp.server.event import data, mail
 from pulp.server.managers import factory
+from pulp.server.managers.event import crud
 
 
 class TestSendEmail(unittest.TestCase):
@@ -136,6 +137,7 @@ class TestSystem(unittest.TestCase):
         mock_get_collection.return_value.find.return_value = [self.event_doc]
         event = data.Event(data.TYPE_REPO_SYNC_FINISHED, 'stuff')
         factory.initialize()
+        crud.LISTENER_CACHE.invalidate()
         factory.event_fire_manager()._do_fire(event)
 
         # verify that the mail event handler was called and processed something
@@ -15,6 +15,7 @@ import base
 from pulp.server.compat import ObjectId
 
 from pulp.server.event import data as event_data
+from pulp.server.event import delivery
 from pulp.server.event import http
 from pulp.server.db.model.event import EventListener
 from pulp.server.managers import factory as manager_factory
@@ -157,4 +158,21 @@ class EventResourceControllerTests(base.PulpWebserviceTests):
         self.assertEqual(200, status)
 
         updated = EventListener.get_collection().find_one({'_id' : ObjectId(created['_id'])})
-        self.assertEqual(updated['event_types'], new_event_types)
\ No newline at end of file
+        self.assertEqual(updated['event_types'], new_event_types)
+
+
+class EventStatisticsControllerTests(base.PulpWebserviceTests):
+
+    def tearDown(self):
+        super(EventStatisticsControllerTests, self).tearDown()
+        delivery.reset()
+
+    def test_get(self):
+        # Test
+        status, body = self.get('/v2/events/statistics/')
+
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual(body['queue_depth'], 0)
+        self.assertTrue('average_latency' in body)
+        self.assertTrue('max_latency' in body)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import threading
+import unittest
+
+import mock
+
+from pulp.server.event import delivery
+
+
+class RecordingEndpoint(delivery.Endpoint):
+
+    def __init__(self, key, batch_size=1, failures=0):
+        super(RecordingEndpoint, self).__init__(key, batch_size)
+        self.failures = failures
+        self.closed = False
+        self.deliveries = []
+        self.started = threading.Event()
+        self.blocked = threading.Event()
+        self.blocked.set()
+
+    def deliver(self, items):
+        self.started.set()
+        self.blocked.wait()
+        if self.failures:
+            self.failures -= 1
+            raise delivery.DeliveryFailed('failed')
+        self.deliveries.append(list(items))
+
+    def close(self):
+        self.closed = True
+
+
+class DeliveryQueueTests(unittest.TestCase):
+
+    def setUp(self):
+        super(DeliveryQueueTests, self).setUp()
+        self.queue = delivery.DeliveryQueue(2, 10, 2, 0)
+
+    def tearDown(self):
+        super(DeliveryQueueTests, self).tearDown()
+        self.queue.shutdown()
+
+    def test_get_endpoint(self):
+        # Test
+        endpoint_1 = self.queue.get_endpoint('a', RecordingEndpoint)
+        endpoint_2 = self.queue.get_endpoint('a', RecordingEndpoint)
+        endpoint_3 = self.queue.get_endpoint('b', RecordingEndpoint)
+
+        # Verify
+        self.assertTrue(endpoint_1 is endpoint_2)
+        self.assertTrue(endpoint_1 is not endpoint_3)
+        self.assertEqual('b', endpoint_3.key)
+        self.assertEqual('b', endpoint_3.name)
+
+    def test_deliver_in_order(self):
+        # Setup
+        endpoint = self.queue.get_endpoint('a', RecordingEndpoint)
+
+        # Test
+        for i in range(5):
+            self.assertTrue(self.queue.put(endpoint, i))
+        self.assertTrue(self.queue.wait(5))
+
+        # Verify
+        delivered = [item for items in endpoint.deliveries for item in items]
+        self.assertEqual(range(5), delivered)
+        statistics = self.queue.statistics()
+        self.assertEqual(0, statistics['queue_depth'])
+        self.assertEqual(5, statistics['delivered'])
+        self.assertEqual(0, statistics['failed'])
+
+    def test_deliver_batch(self):
+        # Setup
+        endpoint = self.queue.get_endpoint('a', lambda key: RecordingEndpoint(key, batch_size=3))
+        endpoint.blocked.clear()
+        self.queue.put(endpoint, 0)
+        endpoint.started.wait(5)
+
+        # Test
+        for i in range(1, 5):
+            self.queue.put(endpoint, i)
+        endpoint.blocked.set()
+        self.assertTrue(self.queue.wait(5))
+
+        # Verify
+        self.assertEqual([[0], [1, 2, 3], [4]], endpoint.deliveries)
+
+    def test_retry(self):
+        # Setup
+        endpoint = self.queue.get_endpoint('a', lambda key: RecordingEndpoint(key, failures=2))
+
+        # Test
+        self.queue.put(endpoint, 0)
+        self.assertTrue(self.queue.wait(5))
+
+        # Verify
+        self.assertEqual([[0]], endpoint.deliveries)
+        statistics = self.queue.statistics()
+        self.assertEqual(2, statistics['retried'])
+        self.assertEqual(1, statistics['delivered'])
+
+    def test_retries_exhausted(self):
+        # Setup
+        endpoint = self.queue.get_endpoint('a', lambda key: RecordingEndpoint(key, failures=3))
+
+        # Test
+        self.queue.put(endpoint, 0)
+        self.assertTrue(self.queue.wait(5))
+
+        # Verify
+        self.assertEqual([], endpoint.deliveries)
+        statistics = self.queue.statistics()
+        self.assertEqual(1, statistics['failed'])
+        self.assertEqual(0, statistics['delivered'])
+
+    def test_full(self):
+        # Setup
+        endpoint = self.queue.get_endpoint('a', RecordingEndpoint)
+        endpoint.blocked.clear()
+
+        # Test
+        queued = [self.queue.put(endpoint, i) for i in range(12)]
+        statistics = self.queue.statistics()
+        endpoint.blocked.set()
+        self.assertTrue(self.queue.wait(5))
+
+        # Verify
+        self.assertEqual([True] * 10 + [False] * 2, queued)
+        self.assertEqual(10, statistics['queue_depth'])
+        self.assertEqual(2, statistics['dropped'])
+        self.assertEqual(10, self.queue.statistics()['delivered'])
+
+    def test_wait_timeout(self):
+        # Setup
+        endpoint = self.queue.get_endpoint('a', RecordingEndpoint)
+        endpoint.blocked.clear()
+        self.queue.put(endpoint, 0)
+
+        # Test
+        empty = self.queue.wait(0.1)
+        endpoint.blocked.set()
+
+        # Verify
+        self.assertFalse(empty)
+        self.assertTrue(self.queue.wait(5))
+
+    @mock.patch('time.time')
+    def test_evict_idle(self, mock_time):
+        # Setup
+        mock_time.return_value = 1000
+        self.queue.shutdown()
+        self.queue = delivery.DeliveryQueue(2, 10, 2, 0, idle_timeout=60)
+        idle = self.queue.get_endpoint('a', RecordingEndpoint)
+        busy = self.queue.get_endpoint('b', RecordingEndpoint)
+        busy.blocked.clear()
+        self.queue.put(busy, 0)
+
+        # Test
+        mock_time.return_value = 1060
+        self.queue.get_endpoint('c', RecordingEndpoint)
+
+        # Verify
+        self.assertTrue(idle.closed)
+        self.assertFalse(busy.closed)
+        self.assertEqual(['b', 'c'], sorted(self.queue.endpoints.keys()))
+        busy.blocked.set()
+
+    @mock.patch('time.time')
+    def test_put_evicted(self, mock_time):
+        # Setup
+        mock_time.return_value = 1000
+        self.queue.shutdown()
+        self.queue = delivery.DeliveryQueue(2, 10, 2, 0, idle_timeout=60)
+        endpoint = self.queue.get_endpoint('a', RecordingEndpoint)
+        mock_time.return_value = 1060
+        self.queue.get_endpoint('b', RecordingEndpoint)
+
+        # Test
+        self.queue.put(endpoint, 0)
+        self.assertTrue(self.queue.wait(5))
+
+        # Verify
+        self.assertTrue(self.queue.endpoints['a'] is endpoint)
+        self.assertEqual([[0]], endpoint.deliveries)
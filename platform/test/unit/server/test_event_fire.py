@@ -18,6 +18,7 @@ from pulp.server.db.model.event import EventListener
 from pulp.server.event import notifiers
 from pulp.server.event import data as event_data
 from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.event import crud
 
 
 class EventFireManagerTests(base.PulpAsyncServerTests):
@@ -32,6 +33,7 @@ class EventFireManagerTests(base.PulpAsyncServerTests):
         super(EventFireManagerTests, self).tearDown()
 
         EventListener.get_collection().remove()
+        crud.LISTENER_CACHE.invalidate()
         notifiers.reset()
 
     # -- plumbing tests -------------------------------------------------------
@@ -117,6 +119,32 @@ class EventFireManagerTests(base.PulpAsyncServerTests):
         self.assertEqual({'2' : '2'}, notifier_2.fire.call_args[0][0])
         self.assertEqual(event, notifier_2.fire.call_args[0][1])
 
+    def test_do_fire_cached_listeners(self):
+        # Setup
+        notifiers.NOTIFIER_FUNCTIONS.clear()
+
+        notifier_1 = mock.Mock()
+        notifier_2 = mock.Mock()
+
+        notifiers.NOTIFIER_FUNCTIONS['notifier_1'] = notifier_1.fire
+        notifiers.NOTIFIER_FUNCTIONS['notifier_2'] = notifier_2.fire
+
+        self.event_manager.create('notifier_1', {}, [event_data.TYPE_REPO_SYNC_STARTED])
+        event = event_data.Event(event_data.TYPE_REPO_SYNC_STARTED, 'payload')
+        self.manager._do_fire(event)
+
+        # Test
+        with mock.patch.object(EventListener, 'get_collection') as mock_get_collection:
+            self.manager._do_fire(event)
+            self.assertEqual(0, mock_get_collection.call_count)
+
+        self.event_manager.create('notifier_2', {}, [event_data.TYPE_REPO_SYNC_STARTED])
+        self.manager._do_fire(event)
+
+        # Verify
+        self.assertEqual(3, notifier_1.fire.call_count)
+        self.assertEqual(1, notifier_2.fire.call_count)
+
     # -- event format tests ---------------------------------------------------
 
     def test_fire_repo_sync_started(self):
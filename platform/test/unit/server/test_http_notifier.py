@@ -13,10 +13,11 @@
 
 import httplib
 import mock
+import socket
 import time
 from pulp.server.compat import json
 
-from pulp.server.event import http
+from pulp.server.event import delivery, http
 from pulp.server.event.data import Event
 
 import base
@@ -24,6 +25,10 @@ import base
 
 class TestHTTPNotifierTests(base.PulpAsyncServerTests):
 
+    def tearDown(self):
+        super(TestHTTPNotifierTests, self).tearDown()
+        delivery.reset()
+
     @mock.patch('pulp.server.event.http._create_connection')
     def test_handle_event(self, mock_create):
         # Setup
@@ -105,6 +110,28 @@ class TestHTTPNotifierTests(base.PulpAsyncServerTests):
         # Verify
         self.assertEqual(0, mock_create.call_count)
 
+    @mock.patch('pulp.server.event.delivery.get_queue')
+    def test_handle_event_hides_password(self, mock_get_queue):
+        # Setup
+        notifier_config = {
+            'url' : 'https://localhost/api/',
+            'username' : 'admin',
+            'password' : 'secret',
+        }
+
+        # Test
+        http.handle_event(notifier_config, Event('type-1', {}))
+
+        # Verify
+        key, create = mock_get_queue.return_value.get_endpoint.call_args[0]
+        self.assertTrue('secret' not in str(key))
+        self.assertEqual('https://localhost/api/', create(key).name)
+
+        other_config = dict(notifier_config, password='other')
+        http.handle_event(other_config, Event('type-1', {}))
+        other_key = mock_get_queue.return_value.get_endpoint.call_args[0][0]
+        self.assertNotEqual(key, other_key)
+
     def test_create_configuration(self):
         # Test HTTPS
         conn = http._create_connection('https', 'foo')
@@ -113,3 +140,105 @@ class TestHTTPNotifierTests(base.PulpAsyncServerTests):
         # Test HTTP
         conn = http._create_connection('http', 'foo')
         self.assertTrue(isinstance(conn, httplib.HTTPConnection))
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_endpoint_keep_alive(self, mock_create):
+        # Setup
+        mock_connection = mock.Mock()
+        mock_response = mock.Mock()
+        mock_response.status = httplib.OK
+        mock_response.will_close = False
+        mock_connection.getresponse.return_value = mock_response
+        mock_create.return_value = mock_connection
+
+        endpoint = http.HTTPEndpoint('key', 'https://localhost/api/', 'https:', 'localhost', 'api/', {})
+
+        # Test
+        endpoint.deliver([{'a' : 1}])
+        endpoint.deliver([{'b' : 2}])
+
+        # Verify
+        self.assertEqual(1, mock_create.call_count)
+        self.assertEqual(2, mock_connection.request.call_count)
+        self.assertEqual(0, mock_connection.close.call_count)
+        body = json.loads(mock_connection.request.call_args[1]['body'])
+        self.assertEqual(body, {'b' : 2})
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_endpoint_stale_connection(self, mock_create):
+        # Setup
+        stale_connection = mock.Mock()
+        stale_connection.request.side_effect = httplib.BadStatusLine('')
+        mock_connection = mock.Mock()
+        mock_response = mock.Mock()
+        mock_response.status = httplib.OK
+        mock_response.will_close = True
+        mock_connection.getresponse.return_value = mock_response
+        mock_create.return_value = mock_connection
+
+        endpoint = http.HTTPEndpoint('key', 'https://localhost/api/', 'https:', 'localhost', 'api/', {})
+        endpoint.connection = stale_connection
+
+        # Test
+        endpoint.deliver([{'a' : 1}])
+
+        # Verify
+        self.assertEqual(1, stale_connection.close.call_count)
+        self.assertEqual(1, mock_connection.request.call_count)
+        self.assertEqual(1, mock_connection.close.call_count)
+        self.assertTrue(endpoint.connection is None)
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_endpoint_sent_not_resent(self, mock_create):
+        # Setup
+        sent_connection = mock.Mock()
+        sent_connection.getresponse.side_effect = socket.timeout()
+
+        endpoint = http.HTTPEndpoint('key', 'https://localhost/api/', 'https:', 'localhost', 'api/', {})
+        endpoint.connection = sent_connection
+
+        # Test
+        self.assertRaises(socket.timeout, endpoint.deliver, [{'a' : 1}])
+
+        # Verify the POST was not sent again, as the server may have received it
+        self.assertEqual(1, sent_connection.request.call_count)
+        self.assertEqual(1, sent_connection.close.call_count)
+        self.assertEqual(0, mock_create.call_count)
+        self.assertTrue(endpoint.connection is None)
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_endpoint_batch(self, mock_create):
+        # Setup
+        mock_connection = mock.Mock()
+        mock_response = mock.Mock()
+        mock_response.status = httplib.OK
+        mock_connection.getresponse.return_value = mock_response
+        mock_create.return_value = mock_connection
+
+        endpoint = http.HTTPEndpoint('key', 'https://localhost/api/', 'https:', 'localhost', 'api/', {}, batch_size=10)
+
+        # Test
+        endpoint.deliver([{'a' : 1}, {'b' : 2}])
+
+        # Verify
+        self.assertEqual(10, endpoint.batch_size)
+        body = json.loads(mock_connection.request.call_args[1]['body'])
+        self.assertEqual(body, [{'a' : 1}, {'b' : 2}])
+
+    @mock.patch('pulp.server.event.http._create_connection')
+    def test_endpoint_server_error(self, mock_create):
+        # Setup
+        mock_connection = mock.Mock()
+        mock_response = mock.Mock()
+        mock_response.status = httplib.SERVICE_UNAVAILABLE
+        mock_connection.getresponse.return_value = mock_response
+        mock_create.return_value = mock_connection
+
+        endpoint = http.HTTPEndpoint('key', 'https://localhost/api/', 'https:', 'localhost', 'api/', {})
+
+        # Test
+        self.assertRaises(delivery.DeliveryFailed, endpoint.deliver, [{'a' : 1}])
+
+        # Verify
+        self.assertEqual(1, mock_connection.close.call_count)
+        self.assertTrue(endpoint.connection is None)
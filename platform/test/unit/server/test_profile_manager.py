@@ -13,10 +13,12 @@
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
 import base
+import mock
 import pymongo
 
+from pulp.common import profile as profile_utils
 from pulp.server.db.model.consumer import Consumer, UnitProfile
-from pulp.server.exceptions import MissingResource
+from pulp.server.exceptions import InvalidValue, MissingResource
 from pulp.server.managers import factory
 
 # -- test cases ---------------------------------------------------------------
@@ -83,6 +85,24 @@ class ProfileManagerTests(base.PulpAsyncServerTests):
         expected_hash = UnitProfile.calculate_hash(self.PROFILE_2)
         self.assertEqual(profiles[1]['profile_hash'], expected_hash)
 
+    def test_find_profiles(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_manager()
+        manager.register('other-consumer')
+        # Test
+        manager = factory.consumer_profile_manager()
+        manager.create(self.CONSUMER_ID, self.TYPE_1, self.PROFILE_1)
+        manager.create(self.CONSUMER_ID, self.TYPE_2, self.PROFILE_2)
+        manager.create('other-consumer', self.TYPE_1, self.PROFILE_2)
+        profiles = manager.find_profiles([self.CONSUMER_ID, 'not-there'])
+        # Verify
+        self.assertEquals(len(profiles), 2)
+        self.assertEquals(profiles['not-there'], {})
+        profiles = profiles[self.CONSUMER_ID]
+        self.assertEquals(profiles[self.TYPE_1], self.PROFILE_1)
+        self.assertEquals(profiles[self.TYPE_2], self.PROFILE_2)
+
     def test_get_profiles_none(self):
         # Setup
         self.populate()
@@ -133,6 +153,101 @@ class ProfileManagerTests(base.PulpAsyncServerTests):
         expected_hash = UnitProfile.calculate_hash(self.PROFILE_2)
         self.assertEqual(profiles[0]['profile_hash'], expected_hash)
 
+    @mock.patch('pulp.server.managers.consumer.applicability.ApplicabilityManager.profile_changed')
+    def test_update_unchanged(self, mock_profile_changed):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        created = manager.update(self.CONSUMER_ID, self.TYPE_1, self.PROFILE_1)
+        # Test
+        updated = manager.update(self.CONSUMER_ID, self.TYPE_1, dict(self.PROFILE_1))
+        # Verify
+        self.assertEqual(updated['_id'], created['_id'])
+        self.assertEqual(updated['profile'], self.PROFILE_1)
+        self.assertFalse(mock_profile_changed.called)
+
+    def test_update_if_changed_unchanged(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        manager.update(self.CONSUMER_ID, self.TYPE_1, self.PROFILE_1)
+        profile_hash = UnitProfile.calculate_hash(self.PROFILE_1)
+        # Test
+        with mock.patch.object(manager, 'update') as mock_update:
+            stored_hash = manager.update_if_changed(self.CONSUMER_ID, self.TYPE_1, profile_hash)
+        # Verify
+        self.assertEqual(stored_hash, profile_hash)
+        self.assertFalse(mock_update.called)
+
+    def test_update_if_changed_required(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        manager.update(self.CONSUMER_ID, self.TYPE_1, self.PROFILE_1)
+        profile_hash = UnitProfile.calculate_hash(self.PROFILE_2)
+        # Test
+        stored_hash = manager.update_if_changed(self.CONSUMER_ID, self.TYPE_1, profile_hash)
+        # Verify
+        self.assertEqual(stored_hash, UnitProfile.calculate_hash(self.PROFILE_1))
+        profile = manager.get_profile(self.CONSUMER_ID, self.TYPE_1)
+        self.assertEqual(profile['profile'], self.PROFILE_1)
+
+    def test_update_if_changed_profile(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        profile_hash = UnitProfile.calculate_hash(self.PROFILE_2)
+        # Test
+        stored_hash = manager.update_if_changed(
+            self.CONSUMER_ID, self.TYPE_1, profile_hash, profile=self.PROFILE_2)
+        # Verify
+        self.assertEqual(stored_hash, profile_hash)
+        profile = manager.get_profile(self.CONSUMER_ID, self.TYPE_1)
+        self.assertEqual(profile['profile'], self.PROFILE_2)
+
+    def test_update_if_changed_wrong_hash(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        profile_hash = UnitProfile.calculate_hash(self.PROFILE_1)
+        # Test
+        self.assertRaises(InvalidValue, manager.update_if_changed,
+                          self.CONSUMER_ID, self.TYPE_1, profile_hash, profile=self.PROFILE_2)
+
+    def test_update_if_changed_delta(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        previous = [self.PROFILE_1, self.PROFILE_3]
+        current = [self.PROFILE_2, self.PROFILE_3]
+        manager.update(self.CONSUMER_ID, self.TYPE_1, previous)
+        profile_hash = UnitProfile.calculate_hash(current)
+        # Test
+        delta = profile_utils.delta(previous, current)
+        stored_hash = manager.update_if_changed(
+            self.CONSUMER_ID, self.TYPE_1, profile_hash, delta=delta)
+        # Verify
+        self.assertEqual(stored_hash, profile_hash)
+        profile = manager.get_profile(self.CONSUMER_ID, self.TYPE_1)
+        self.assertEqual(profile['profile'], current)
+        self.assertEqual(profile['profile_hash'], profile_hash)
+
+    def test_update_if_changed_delta_wrong_base(self):
+        # Setup
+        self.populate()
+        manager = factory.consumer_profile_manager()
+        manager.update(self.CONSUMER_ID, self.TYPE_1, [self.PROFILE_3])
+        current = [self.PROFILE_2, self.PROFILE_3]
+        profile_hash = UnitProfile.calculate_hash(current)
+        # Test
+        delta = profile_utils.delta([self.PROFILE_1, self.PROFILE_3], current)
+        stored_hash = manager.update_if_changed(
+            self.CONSUMER_ID, self.TYPE_1, profile_hash, delta=delta)
+        # Verify
+        self.assertEqual(stored_hash, UnitProfile.calculate_hash([self.PROFILE_3]))
+        profile = manager.get_profile(self.CONSUMER_ID, self.TYPE_1)
+        self.assertEqual(profile['profile'], [self.PROFILE_3])
+
     def test_multiple_types(self):
         # Setup
         self.populate()
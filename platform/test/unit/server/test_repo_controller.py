@@ -156,6 +156,43 @@ class RepoSearchTests(RepoControllersTests):
         self.assertTrue('missing_property_names' in value)
         self.assertEqual(value['missing_property_names'], [u'criteria'])
 
+    def test_post_continuation(self):
+        """
+        Make sure pages of results can be walked through with the continuation
+        token returned with each page.
+        """
+        for i in range(5):
+            self.repo_manager.create_repo('repo-%d' % i)
+
+        found = []
+        params = {'criteria' : {'sort' : [['id', 'descending']], 'limit' : 2},
+                  'continuation' : None}
+        for i in range(3):
+            status, body = self.post('/v2/repositories/search/', params)
+            self.assertEqual(200, status)
+            found.extend(r['id'] for r in body['items'])
+            params['continuation'] = body['continuation']
+
+        self.assertEqual(['repo-4', 'repo-3', 'repo-2', 'repo-1', 'repo-0'], found)
+        self.assertTrue(params['continuation'] is None)
+
+    def test_post_continuation_skip(self):
+        params = {'criteria' : {'skip' : 2}, 'continuation' : None}
+        status, body = self.post('/v2/repositories/search/', params)
+        self.assertEqual(400, status)
+
+    def test_get_stream(self):
+        self.repo_manager.create_repo('repo-1')
+        self.repo_manager.create_repo('repo-2')
+
+        status, body = self.get('/v2/repositories/search/?stream=1&importers=1')
+
+        self.assertEqual(200, status)
+        self.assertEqual(['repo-1', 'repo-2'], sorted(r['id'] for r in body))
+        for repo in body:
+            self.assertEqual([], repo['importers'])
+            self.assertTrue('_href' in repo)
+
     @mock.patch.object(PulpCollection, 'query')
     def test_get(self, mock_query):
         """
@@ -209,6 +246,68 @@ class RepoCollectionTests(RepoControllersTests):
         self.assertEqual(200, status)
         self.assertEqual(0, len(body))
 
+    def test_get_paged_details(self):
+        """
+        Tests paging through repositories with their importers and distributors.
+        """
+
+        # Setup
+        for i in range(3):
+            self.repo_manager.create_repo('dummy-%d' % i)
+
+        # Test
+        status, body = self.get('/v2/repositories/?details=1&limit=2&continuation=')
+
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual(2, len(body['items']))
+        for repo in body['items']:
+            self.assertEqual([], repo['importers'])
+            self.assertEqual([], repo['distributors'])
+            self.assertTrue('scratchpad' not in repo)
+
+        # Test the next page
+        status, body = self.get('/v2/repositories/?details=1&limit=2&continuation=%s' % body['continuation'])
+
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual(1, len(body['items']))
+        self.assertTrue(body['continuation'] is None)
+
+    def test_get_fields(self):
+        """
+        Tests limiting the fields returned for each repository.
+        """
+
+        # Setup
+        self.repo_manager.create_repo('dummy-1', display_name='Dummy')
+
+        # Test
+        status, body = self.get('/v2/repositories/?field=display_name&stream=1')
+
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual(1, len(body))
+        self.assertEqual('dummy-1', body[0]['id'])
+        self.assertEqual('Dummy', body[0]['display_name'])
+        self.assertTrue('notes' not in body[0])
+
+    def test_get_bad_limit(self):
+        status, body = self.get('/v2/repositories/?limit=0')
+        self.assertEqual(400, status)
+
+    @mock.patch.object(repositories, 'RELATED_OBJECT_BATCH_SIZE', 1)
+    def test_merge_related_objects_chunked(self):
+        REPOS = [{'id' : 'dummy-1'}, {'id' : 'dummy-2'}]
+        mock_manager = mock.MagicMock()
+        mock_manager.find_by_repo_list.side_effect = lambda ids: [{'repo_id' : ids[0], 'id' : 'd'}]
+
+        ret = repositories._merge_related_objects('distributors', mock_manager, REPOS)
+
+        self.assertEqual(2, mock_manager.find_by_repo_list.call_count)
+        for repo in ret:
+            self.assertEqual([{'repo_id' : repo['id'], 'id' : 'd'}], repo['distributors'])
+
     def test_merge_related_objects(self):
         REPOS = [{'id' : 'dummy-1', 'display_name' : 'dummy'}]
         IMPORTERS = [{'repo_id' : 'dummy-1', 'id' : 'importer-1', 'importer_type_id' : 1}]
@@ -1289,6 +1388,61 @@ class RepoUnitAssociationQueryTests(RepoControllersTests):
         self.assertEqual(1, self.association_query_mock.get_units_across_types.call_count)
         self.assertTrue(isinstance(self.association_query_mock.get_units_across_types.call_args[1]['criteria'], UnitAssociationCriteria))
 
+    def test_post_continuation(self):
+        """
+        Passes in a continuation token to ensure the association query is paged.
+        """
+
+        # Setup
+        units = [{'_id' : 'a%d' % i, 'unit_type_id' : 'rpm', 'created' : 'c'} for i in range(3)]
+        self.association_query_mock.iter_units_across_types.return_value = iter(units)
+
+        params = {'criteria' : {'limit' : 2}, 'continuation' : None}
+        status, body = self.post('/v2/repositories/repo-1/search/units/', params=params)
+
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual(0, self.association_query_mock.get_units_across_types.call_count)
+        self.assertEqual(units[:2], body['items'])
+        self.assertTrue(body['continuation'] is not None)
+
+        criteria = self.association_query_mock.iter_units_across_types.call_args[1]['criteria']
+        self.assertEqual(3, criteria.limit)
+        self.assertEqual([('unit_type_id', UnitAssociationCriteria.SORT_ASCENDING),
+                          ('created', UnitAssociationCriteria.SORT_ASCENDING),
+                          ('_id', UnitAssociationCriteria.SORT_ASCENDING)], criteria.association_sort)
+
+        # Test the next page
+        self.association_query_mock.iter_units_across_types.return_value = iter(units[2:])
+        params['continuation'] = body['continuation']
+        status, body = self.post('/v2/repositories/repo-1/search/units/', params=params)
+
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual(units[2:], body['items'])
+        self.assertTrue(body['continuation'] is None)
+
+        criteria = self.association_query_mock.iter_units_across_types.call_args[1]['criteria']
+        self.assertTrue('$or' in criteria.association_filters)
+
+    def test_post_stream(self):
+        """
+        Requests a streamed response to ensure the units are iterated rather than loaded.
+        """
+
+        # Setup
+        units = [{'_id' : 'a1', 'unit_type_id' : 'rpm', 'metadata' : {}}]
+        self.association_query_mock.iter_units_by_type.return_value = iter(units)
+
+        params = {'criteria' : {'type_ids' : ['rpm']}, 'stream' : True}
+        status, body = self.post('/v2/repositories/repo-1/search/units/', params=params)
+
+        # Verify
+        self.assertEqual(200, status)
+        self.assertEqual(units, body)
+        self.assertEqual(0, self.association_query_mock.get_units_by_type.call_count)
+        self.assertEqual(1, self.association_query_mock.iter_units_by_type.call_count)
+
     def test_post_missing_query(self):
         # Test
         status, body = self.post('/v2/repositories/repo-1/search/units/')
@@ -48,6 +48,7 @@ class RepoManagerTests(base.PulpServerTests):
 
         Repo.get_collection().remove()
         RepoImporter.get_collection().remove()
+        ScheduledCall.get_collection().remove()
 
     # -- set ------------------------------------------------------------------
 
@@ -623,6 +624,24 @@ class RepoManagerTests(base.PulpServerTests):
         self.importer_manager.find_by_repo_list(['repo-1'])
         self.assertFalse(mock_get_collection.return_value.find.called)
 
+    def test_find_by_repo_list_multiple_scheduled_syncs(self):
+        # Setup
+        for repo_id, schedule in (('repo-1', 'PT1H'), ('repo-2', 'PT2H')):
+            self.repo_manager.create_repo(repo_id)
+            self.importer_manager.set_importer(repo_id, 'mock-importer', {})
+            schedule_id = repo_id + '-sync'
+            ScheduledCall.get_collection().insert({'id' : schedule_id, 'schedule' : schedule}, safe=True)
+            self.importer_manager.add_sync_schedule(repo_id, schedule_id)
+
+        # Test
+        with mock.patch.object(ScheduledCall, 'get_collection', wraps=ScheduledCall.get_collection) as mock_get_collection:
+            importers = self.importer_manager.find_by_repo_list(['repo-1', 'repo-2'])
+
+        # Verify
+        self.assertEqual(1, mock_get_collection.call_count)
+        schedules = dict((i['repo_id'], i['scheduled_syncs']) for i in importers)
+        self.assertEqual({'repo-1' : ['PT1H'], 'repo-2' : ['PT2H']}, schedules)
+
     @mock.patch.object(ScheduledCall, 'get_collection')
     def test_find_by_repo_list_with_scheduled_sync(self, mock_get_collection):
         repo_id = 'scheduled_repo'
@@ -570,6 +570,18 @@ class RepoManagerTests(base.PulpAsyncServerTests):
         self.assertRaises(exceptions.MissingResource, self.manager.update_repo_scratchpad, 'foo', {})
 
 
+    def test_update_content_revision(self):
+        # Setup
+        for repo_id in ('repo-1', 'repo-2', 'repo-3'):
+            self.manager.create_repo(repo_id)
+
+        # Test
+        self.manager.update_content_revision(['repo-1', 'repo-2'])
+
+        # Verify
+        revisions = dict((r['id'], r['content_revision']) for r in Repo.get_collection().find())
+        self.assertEqual(revisions, {'repo-1': 1, 'repo-2': 1, 'repo-3': 0})
+
     def test_update_unit_count_missing_repo(self):
         self.assertRaises(exceptions.PulpExecutionException,
             self.manager.update_unit_count, 'foo','rpm', '2')
@@ -582,7 +594,8 @@ class RepoManagerTests(base.PulpAsyncServerTests):
         ARGS = ('repo-123', 'rpm', 7)
 
         self.manager.update_unit_count(*ARGS)
-        mock_update.assert_called_once_with({'id': 'repo-123'}, {'$inc': {'content_unit_counts.rpm': 7}}, safe=True)
+        mock_update.assert_called_once_with({'id': 'repo-123'},
+            {'$inc': {'content_unit_counts.rpm': 7, 'content_revision': 1}}, safe=True)
 
     def test_update_unit_count_with_db(self):
         """
@@ -600,6 +613,7 @@ class RepoManagerTests(base.PulpAsyncServerTests):
         self.manager.update_unit_count(REPO_ID, 'rpm', 3)
         repo = Repo.get_collection().find_one({'id' : REPO_ID})
         self.assertEqual(repo['content_unit_counts']['rpm'], 3)
+        self.assertEqual(repo['content_revision'], 1)
 
 
 class UtilityMethodsTests(unittest.TestCase):
@@ -155,3 +155,77 @@ class RepoSyncConduitTests(base.PulpServerTests):
 
         # Test
         self.assertRaises(ImporterConduitException, self.conduit.remove_unit, None)
+
+    def test_save_units(self):
+        # Setup
+        existing = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_0'}, {}, '/foo/bar')
+        self.conduit.save_unit(existing)
+
+        units = [self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_%d' % i}, {'m' : i}, '/foo/bar')
+                 for i in range(0, 5)]
+        units.append(self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_1'}, {'m' : 'again'}, '/foo/bar'))
+        units.append(self.conduit.init_unit(TYPE_2_DEF.id, {'key-2a' : 'a', 'key-2b' : 'b'}, {}, '/foo/bar'))
+
+        # Test
+        saved = self.conduit.save_units(units)
+
+        # Verify
+        self.assertEqual(units, saved)
+        for u in units:
+            self.assertTrue(u.id is not None)
+        self.assertEqual(existing.id, units[0].id)
+        self.assertEqual(units[1].id, units[5].id)
+
+        db_unit = self.query_manager.get_content_unit_by_id(TYPE_1_DEF.id, units[1].id)
+        self.assertEqual('again', db_unit['m'])
+
+        self.assertEqual(5, len(self.query_manager.list_content_units(TYPE_1_DEF.id)))
+        associated_units = list(RepoContentUnit.get_collection().find({'repo_id' : 'repo-1'}))
+        self.assertEqual(6, len(associated_units))
+
+        report = self.conduit.build_success_report('summary', 'details')
+        self.assertEqual(6, report.added_count) # 1 from save_unit, 4 type_1 and 1 type_2 from save_units
+        self.assertEqual(2, report.updated_count)
+
+    @mock.patch('pulp.server.managers.content.query.ContentQueryManager.get_multiple_units_by_keys_dicts')
+    def test_save_units_with_error(self, mock_call):
+        # Setup
+        mock_call.side_effect = Exception()
+        unit = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_1'}, {}, '/foo/bar')
+
+        # Test
+        self.assertRaises(ImporterConduitException, self.conduit.save_units, [unit])
+
+    def test_save_buffer(self):
+        # Setup
+        self.conduit.enable_save_buffer(buffer_size=3)
+
+        # Test
+        units = []
+        for i in range(0, 4):
+            unit = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_%d' % i}, {}, '/foo/bar')
+            units.append(self.conduit.save_unit(unit))
+
+        # Verify - the first three were flushed when the buffer filled
+        for u in units[:3]:
+            self.assertTrue(u.id is not None)
+        self.assertTrue(units[3].id is None)
+        self.assertEqual(3, len(self.query_manager.list_content_units(TYPE_1_DEF.id)))
+
+        # Verify - reading the units flushes the rest
+        self.assertEqual(4, len(self.conduit.get_units()))
+        self.assertTrue(units[3].id is not None)
+
+    def test_save_buffer_flushed_by_reports(self):
+        # Setup
+        self.conduit.enable_save_buffer()
+        unit = self.conduit.init_unit(TYPE_1_DEF.id, {'key-1' : 'unit_1'}, {}, '/foo/bar')
+        self.conduit.save_unit(unit)
+        self.assertEqual(0, len(self.query_manager.list_content_units(TYPE_1_DEF.id)))
+
+        # Test
+        report = self.conduit.build_success_report('summary', 'details')
+
+        # Verify
+        self.assertEqual(1, report.added_count)
+        self.assertEqual(1, len(self.query_manager.list_content_units(TYPE_1_DEF.id)))
@@ -448,6 +448,48 @@ class RepoUnitAssociationManagerTests(base.PulpServerTests):
 
         mock_call.assert_called_once_with(self.repo_id, 'type-1', 2)
 
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_associate_all_batched(self, mock_call):
+        """
+        Makes sure associations are created correctly when the IDs span
+        several batches and some of them are already associated.
+        """
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'unit-1', OWNER_TYPE_USER, 'admin')
+        self.manager.associate_unit_by_id(self.repo_id, 'type-1', 'unit-2', OWNER_TYPE_USER, 'admin2')
+        mock_call.reset_mock()
+
+        # Test
+        ids = ['unit-%d' % i for i in range(1, 8)]
+        self.manager.associate_all_by_ids(self.repo_id, 'type-1', ids, OWNER_TYPE_USER, 'admin',
+                                          batch_size=3)
+
+        # Verify
+        unit_coll = RepoContentUnit.get_collection()
+        owned = list(unit_coll.find({'repo_id' : self.repo_id, 'owner_id' : 'admin'}))
+        self.assertEqual(len(ids), len(owned))
+        self.assertEqual(sorted(ids), sorted(u['unit_id'] for u in owned))
+        self.assertEqual(len(ids) + 1, unit_coll.find({'repo_id' : self.repo_id}).count())
+
+        # unit-1 and unit-2 were already associated, so only the rest count
+        mock_call.assert_called_once_with(self.repo_id, 'type-1', len(ids) - 2)
+
+    @mock.patch('pulp.server.managers.repo.cud.RepoManager.update_unit_count')
+    def test_associate_all_already_associated(self, mock_call):
+        ids = ['foo', 'bar']
+        self.manager.associate_all_by_ids(self.repo_id, 'type-1', ids, OWNER_TYPE_USER, 'admin')
+        mock_call.reset_mock()
+
+        # Test
+        self.manager.associate_all_by_ids(self.repo_id, 'type-1', ids, OWNER_TYPE_USER, 'admin')
+
+        # Verify
+        self.assertEqual(2, RepoContentUnit.get_collection().find({'repo_id' : self.repo_id}).count())
+        self.assertFalse(mock_call.called)
+
+    def test_associate_all_invalid_owner_type(self):
+        self.assertRaises(exceptions.InvalidValue, self.manager.associate_all_by_ids, self.repo_id,
+                          'type-1', ['unit-1'], 'bad-owner', 'irrelevant')
+
     def test_unassociate_all(self):
         """
         Tests unassociating multiple units in a single call.
@@ -399,6 +399,66 @@ class UnitAssociationQueryTests(base.PulpServerTests):
             self.assertFalse('created' in u)
             self.assertFalse('updated' in u)
 
+    def test_get_units_with_unit_fields(self):
+        # Test
+        criteria = UnitAssociationCriteria(unit_fields=['md_1'])
+        units = self.manager.get_units_across_types('repo-1', criteria)
+
+        # Verify
+        self.assertEqual(self.repo_1_count, len(units))
+        for u in units:
+            self.assertTrue('md_1' in u['metadata'])
+            self.assertFalse('md_2' in u['metadata'])
+            self.assertEqual(u['unit_id'], u['metadata']['_id'])
+
+    @mock.patch('pulp.plugins.types.database.type_units_collection')
+    def test_get_units_one_query_per_type(self, mock_collection):
+        # Setup
+        mock_collection.return_value.find.return_value = []
+
+        # Test
+        units = self.manager.get_units_across_types('repo-1')
+
+        # Verify
+        self.assertEqual(self.repo_1_count, len(units))
+        self.assertEqual(3, mock_collection.return_value.find.call_count) # alpha, beta, gamma
+        self.assertEqual(0, mock_collection.return_value.find_one.call_count)
+        for u in units:
+            self.assertTrue(u['metadata'] is None)
+
+    def test_iter_units_across_types(self):
+        # Test
+        all_units = self.manager.get_units_across_types('repo-1')
+        iter_units = self.manager.iter_units_across_types('repo-1', batch_size=2)
+
+        # Verify
+        self.assertFalse(isinstance(iter_units, list))
+        iter_units = list(iter_units)
+        self.assertEqual(self.repo_1_count, len(iter_units))
+        for iu, au in zip(iter_units, all_units):
+            self._assert_unit_integrity(iu)
+            self.assertEqual(iu, au)
+        self._assert_default_sort(iter_units)
+
+    def test_iter_units_across_types_duplicate_metadata(self):
+        # Test
+        units = list(self.manager.iter_units_across_types('repo-1',
+                     UnitAssociationCriteria(type_ids=['gamma'])))
+
+        # Verify
+        self.assertEqual(2 * len(self.units['gamma']), len(units))
+        garden = [u for u in units if u['unit_id'] == 'garden']
+        self.assertEqual(garden[0]['metadata'], garden[1]['metadata'])
+        self.assertFalse(garden[0]['metadata'] is garden[1]['metadata'])
+
+    def test_iter_units_across_types_remove_duplicates(self):
+        # Test
+        criteria = UnitAssociationCriteria(remove_duplicates=True)
+        units = list(self.manager.iter_units_across_types('repo-1', criteria, batch_size=1))
+
+        # Verify
+        self.assertEqual(self.repo_1_count_no_dupes, len(units))
+
     # -- get_units_by_type tests ----------------------------------------------
 
     def test_get_units_by_type_no_criteria(self):
@@ -620,6 +680,81 @@ class UnitAssociationQueryTests(base.PulpServerTests):
         for u in units:
             self.assertTrue(u['metadata']['key_1'] != 'aardvark')
 
+    def test_iter_units_by_type_association_sort(self):
+        # Test
+        criteria = UnitAssociationCriteria(association_sort=[('created', association_manager.SORT_DESCENDING)],
+                                           unit_filters={'md_2' : 0})
+        units = self.manager.iter_units_by_type('repo-1', 'beta', criteria, batch_size=1)
+
+        # Verify
+        self.assertFalse(isinstance(units, list))
+        units = list(units)
+        self.assertEqual(2, len(units))
+        for u in units:
+            self._assert_unit_integrity(u)
+            self.assertEqual(0, u['metadata']['md_2'])
+        self.assertTrue(units[0]['created'] >= units[1]['created'])
+
+    def test_iter_units_by_type_unit_sort(self):
+        # Test
+        criteria = UnitAssociationCriteria(unit_sort=[('key_1', association_manager.SORT_DESCENDING)])
+        units = list(self.manager.iter_units_by_type('repo-1', 'beta', criteria, batch_size=1))
+
+        # Verify
+        self.assertEqual(len(self.units['beta']), len(units))
+        self.assertEqual(sorted(self.units['beta'], reverse=True), [u['unit_id'] for u in units])
+
+    def test_iter_units_by_type_unit_sort_scan(self):
+        # Setup
+        criteria = UnitAssociationCriteria(unit_sort=[('md_2', association_manager.SORT_DESCENDING),
+                                                      ('key_1', association_manager.SORT_ASCENDING)],
+                                           skip=1, limit=2)
+        expected = self.manager.get_units_by_type('repo-1', 'alpha', criteria)
+
+        # Test
+        with mock.patch.object(association_query_manager, 'UNIT_SORT_IN_QUERY_LIMIT', 0):
+            units = list(self.manager.iter_units_by_type('repo-1', 'alpha', criteria, batch_size=1))
+
+        # Verify
+        self.assertEqual(2, len(units))
+        self.assertEqual([u['unit_id'] for u in expected], [u['unit_id'] for u in units])
+        for u in units:
+            self._assert_unit_integrity(u)
+
+    def test_iter_units_by_type_unit_sort_scan_filters(self):
+        # Setup
+        criteria = UnitAssociationCriteria(unit_filters={'md_2' : 0}, remove_duplicates=True)
+        expected = self.manager.get_units_by_type('repo-1', 'gamma', criteria)
+
+        # Test
+        with mock.patch.object(association_query_manager, 'UNIT_SORT_IN_QUERY_LIMIT', 0):
+            units = list(self.manager.iter_units_by_type('repo-1', 'gamma', criteria, batch_size=2))
+
+        # Verify
+        self.assertTrue(len(units) > 0)
+        self.assertEqual([(u['unit_id'], u['owner_id']) for u in expected],
+                         [(u['unit_id'], u['owner_id']) for u in units])
+        for u in units:
+            self.assertEqual(0, u['metadata']['md_2'])
+
+    def test_id_batches(self):
+        # Test
+        by_count = list(association_query_manager._id_batches(['a', 'b', 'c'], 2))
+        by_size = list(association_query_manager._id_batches(['a' * 10, 'b' * 10, 'c'], 10, max_bytes=30))
+
+        # Verify
+        self.assertEqual([['a', 'b'], ['c']], by_count)
+        self.assertEqual([['a' * 10], ['b' * 10], ['c']], by_size)
+
+    def test_iter_units_delegates(self):
+        # Test
+        single = list(self.manager.iter_units('repo-1', UnitAssociationCriteria(type_ids=['alpha'])))
+        multiple = list(self.manager.iter_units('repo-1'))
+
+        # Verify
+        self.assertEqual(len(self.units['alpha']), len(single))
+        self.assertEqual(self.repo_1_count, len(multiple))
+
     def test_remove_duplicates(self):
         # Setup
         def unit(unit_type_id, unit_id, created):
@@ -15,9 +15,10 @@ import unittest
 
 import mock
 
+from pulp.server.compat import json
 from pulp.server.db.model.criteria import Criteria
 import pulp.server.exceptions as exceptions
-from pulp.server.webservices.controllers.search import SearchController
+from pulp.server.webservices.controllers.search import SearchController, stream_requested
 
 class TestGetQueryResultsFromPost(unittest.TestCase):
     PARAMS = {'criteria' : {}}
@@ -68,3 +69,127 @@ class TestGetQueryResultsFromGet(unittest.TestCase):
         self.controller._get_query_results_from_get()
         self.assertTrue('id' in self.mock_query_method.call_args[0][0].fields)
 
+
+
+class TestGetSearchFromGet(unittest.TestCase):
+    def setUp(self):
+        self.mock_query_method = mock.MagicMock(return_value=[{'_id' : 1}, {'_id' : 2}])
+        self.controller = SearchController(self.mock_query_method)
+
+    @mock.patch('web.input', return_value={'field':[], 'limit':'1', 'stream':'1', 'continuation':''})
+    def test_options_not_in_criteria(self, mock_input):
+        results, page, stream = self.controller._get_search_from_get()
+        self.assertEqual([{'_id' : 1}], list(results))
+        self.assertTrue(stream)
+        self.assertTrue(page.token is not None)
+        criteria = self.mock_query_method.call_args[0][0]
+        self.assertEqual(2, criteria.limit)
+        self.assertEqual([('_id', 1)], criteria.sort)
+
+    @mock.patch('web.input', return_value={'field':[]})
+    def test_not_paged(self, mock_input):
+        results, page, stream = self.controller._get_search_from_get()
+        self.assertTrue(results is self.mock_query_method.return_value)
+        self.assertTrue(page is None)
+        self.assertFalse(stream)
+
+
+    @mock.patch('web.input', return_value={'field':[], 'stream':'false'})
+    def test_stream_false(self, mock_input):
+        results, page, stream = self.controller._get_search_from_get()
+        self.assertFalse(stream)
+
+
+class TestStreamRequested(unittest.TestCase):
+    def test_true(self):
+        for value in ('true', 'True', '1', 'yes', 'YES', True, 1):
+            self.assertTrue(stream_requested(value), value)
+
+    def test_false(self):
+        for value in ('false', 'False', '0', 'no', '', 'anything', None, False, 0):
+            self.assertFalse(stream_requested(value), value)
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        self.mock_query_method = mock.MagicMock()
+        self.controller = SearchController(self.mock_query_method)
+
+    def test_pages(self):
+        # Setup
+        documents = [{'_id' : i, 'name' : 'n%d' % (i % 2)} for i in range(5)]
+        def query(criteria):
+            matching = [d for d in sorted(documents, key=lambda d: (d['name'], d['_id']))
+                        if criteria.filters is None or _after(d, criteria.filters)]
+            return matching[:criteria.limit]
+        self.mock_query_method.side_effect = query
+
+        # Test
+        found = []
+        token = None
+        for i in range(3):
+            criteria = Criteria(sort=[('name', 1)], limit=2)
+            results, page = self.controller._search(criteria, True, token)
+            found.extend(d['_id'] for d in results)
+            token = page.token
+
+        # Verify
+        self.assertEqual([0, 2, 4, 1, 3], found)
+        self.assertTrue(token is None)
+
+    def test_paged_skip(self):
+        criteria = Criteria(skip=5)
+        self.assertRaises(exceptions.InvalidValue, self.controller._search, criteria, True)
+
+
+class TestSearchResponse(unittest.TestCase):
+    def setUp(self):
+        self.controller = SearchController(mock.MagicMock())
+
+    @mock.patch('pulp.server.webservices.http.header')
+    @mock.patch('pulp.server.webservices.http.status_ok')
+    def test_stream(self, mock_status, mock_header):
+        body = self.controller._search_response(iter([{'a' : 1}, {'b' : 2}]), None, True)
+        self.assertEqual([{'a' : 1}, {'b' : 2}], json.loads(''.join(body)))
+        mock_header.assert_called_once_with('Content-Type', 'application/json')
+
+    @mock.patch('pulp.server.webservices.http.header')
+    @mock.patch('pulp.server.webservices.http.status_ok')
+    def test_stream_page(self, mock_status, mock_header):
+        page = mock.MagicMock(token='abc')
+        body = self.controller._search_response([], page, True)
+        self.assertEqual({'items' : [], 'continuation' : 'abc'}, json.loads(''.join(body)))
+
+    @mock.patch('pulp.server.webservices.http.header')
+    @mock.patch('pulp.server.webservices.http.status_ok')
+    def test_stream_query_error(self, mock_status, mock_header):
+        # errors before the first result are raised before the response starts
+        def results():
+            raise exceptions.InvalidValue(['continuation'])
+            yield
+        self.assertRaises(exceptions.InvalidValue, self.controller._search_response,
+                          results(), None, True)
+
+    @mock.patch('pulp.server.webservices.http.header')
+    @mock.patch('pulp.server.webservices.http.status_ok')
+    def test_page(self, mock_status, mock_header):
+        page = mock.MagicMock(token=None)
+        body = self.controller._search_response(iter([{'a' : 1}]), page)
+        self.assertEqual({'items' : [{'a' : 1}], 'continuation' : None}, json.loads(body))
+
+
+def _after(document, spec):
+    """
+    Evaluates the subset of mongo queries generated for continuation tokens.
+    """
+    if '$or' in spec:
+        return any(_after(document, clause) for clause in spec['$or'])
+    for field, value in spec.items():
+        if isinstance(value, dict):
+            if '$gt' in value and not document[field] > value['$gt']:
+                return False
+            if '$lt' in value and not document[field] < value['$lt']:
+                return False
+        elif document[field] != value:
+            return False
+    return True
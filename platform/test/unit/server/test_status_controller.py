@@ -22,3 +22,11 @@ class StatusControllerTests(base.PulpWebserviceTests):
 
         self.assertEqual(status, 200)
         self.assertTrue('api_version' in body)
+
+    def test_get_authentication_statistics(self):
+
+        status, body = self.get('/v2/status/authentication/')
+
+        self.assertEqual(status, 200)
+        self.assertTrue('hit_rate' in body)
+        self.assertTrue('size' in body)
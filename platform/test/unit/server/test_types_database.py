@@ -12,6 +12,8 @@
 # have received a copy of GPLv2 along with this software; if not, see
 # http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
 
+import mock
+
 import base
 
 import pulp.plugins.types.database as types_db
@@ -260,6 +262,127 @@ class TypesDatabaseTests(base.PulpServerTests):
         # Verify
         self.assertTrue(indexes is None)
 
+    def test_type_definition_cached(self):
+        """
+        Tests that repeated lookups are served from the cache without querying the database.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1, DEF_3])
+        types_db.type_definition(DEF_1.id)
+
+        # Test
+        with mock.patch.object(ContentType, 'get_collection') as get_collection:
+            type_def = types_db.type_definition(DEF_1.id)
+            unit_key = types_db.type_units_unit_key(DEF_3.id)
+            type_ids = types_db.all_type_ids()
+
+        # Verify
+        self.assertEqual(0, get_collection.call_count)
+        self.assertEqual(DEF_1.id, type_def['id'])
+        self.assertEqual(DEF_3.unit_key, unit_key)
+        self.assertEqual(sorted([DEF_1.id, DEF_3.id]), sorted(type_ids))
+
+    def test_type_definition_copy(self):
+        """
+        Tests that modifying a returned definition does not affect the cache.
+        """
+
+        # Setup
+        types_db.update_database([DEF_3])
+
+        # Test
+        type_def = types_db.type_definition(DEF_3.id)
+        type_def['display_name'] = 'Modified'
+        type_def['unit_key'].append('extra')
+        unit_key = types_db.type_units_unit_key(DEF_3.id)
+        unit_key.append('extra')
+
+        # Verify
+        type_def = types_db.type_definition(DEF_3.id)
+        self.assertEqual(DEF_3.display_name, type_def['display_name'])
+        self.assertEqual(DEF_3.unit_key, type_def['unit_key'])
+        self.assertEqual(DEF_3.unit_key, types_db.type_units_unit_key(DEF_3.id))
+
+    def test_cache_invalidated(self):
+        """
+        Tests that updating and cleaning the types database invalidates the cache.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+        self.assertEqual([DEF_1.id], types_db.all_type_ids())
+
+        # Test
+        types_db.update_database([DEF_1, DEF_2])
+        updated_ids = types_db.all_type_ids()
+        types_db.clean()
+        cleaned_ids = types_db.all_type_ids()
+
+        # Verify
+        self.assertEqual(sorted([DEF_1.id, DEF_2.id]), sorted(updated_ids))
+        self.assertEqual([], cleaned_ids)
+        self.assertTrue(types_db.type_definition(DEF_1.id) is None)
+
+    def test_cache_miss_reloads(self):
+        """
+        Tests that a type added outside of this process is found on lookup.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+        types_db.all_type_ids()
+        content_type = ContentType(DEF_2.id, DEF_2.display_name, DEF_2.description,
+                                   DEF_2.unit_key, DEF_2.search_indexes, DEF_2.referenced_types)
+        ContentType.get_collection().save(content_type, safe=True)
+
+        # Test
+        type_def = types_db.type_definition(DEF_2.id)
+
+        # Verify
+        self.assertEqual(DEF_2.id, type_def['id'])
+
+    def test_cache_miss_single_query(self):
+        """
+        Tests that a lookup of an unknown type queries only for that type
+        rather than reloading every definition.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+        types_db.all_type_ids()
+
+        # Test
+        with mock.patch.object(ContentType, 'get_collection') as get_collection:
+            get_collection.return_value.find_one.return_value = None
+            type_def = types_db.type_definition('not_there')
+
+        # Verify
+        self.assertTrue(type_def is None)
+        collection = get_collection.return_value
+        self.assertEqual(0, collection.find.call_count)
+        collection.find_one.assert_called_once_with({'id': 'not_there'})
+
+    def test_cold_cache_single_query(self):
+        """
+        Tests that a lookup on a cold cache loads the definitions only once.
+        """
+
+        # Setup
+        types_db.update_database([DEF_1])
+        types_db._CACHE.invalidate()
+        collection = ContentType.get_collection()
+
+        # Test
+        with mock.patch.object(ContentType, 'get_collection') as get_collection:
+            get_collection.return_value = mock.Mock(wraps=collection)
+            type_def = types_db.type_definition('not_there')
+
+        # Verify
+        self.assertTrue(type_def is None)
+        self.assertEqual(1, get_collection.return_value.find.call_count)
+        self.assertEqual(0, get_collection.return_value.find_one.call_count)
+
     # -- utility method tests ------------------------------------------------
 
     def test_create_or_update_type_collection(self):
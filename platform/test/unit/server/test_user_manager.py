@@ -163,6 +163,33 @@ class UserManagerTests(base.PulpServerTests):
         self.assertTrue(user['password'] is not None)
         self.assertNotEqual(changed_password, user['password'])
 
+    def test_update_password_invalidates_cached_credentials(self):
+        # Setup
+        login = 'login-test'
+        self.user_manager.create_user(login, 'some password')
+        authentication_manager = manager_factory.authentication_manager()
+        self.assertEqual(login, authentication_manager.check_username_password(login, 'some password'))
+
+        # Test
+        self.user_manager.update_user(login, delta=dict(password='some other password'))
+
+        # Verify
+        self.assertTrue(authentication_manager.check_username_password(login, 'some password') is None)
+        self.assertEqual(login, authentication_manager.check_username_password(login, 'some other password'))
+
+    def test_delete_invalidates_cached_credentials(self):
+        # Setup
+        login = 'login-test'
+        self.user_manager.create_user(login, 'some password')
+        authentication_manager = manager_factory.authentication_manager()
+        self.assertEqual(login, authentication_manager.check_username_password(login, 'some password'))
+
+        # Test
+        self.user_manager.delete_user(login)
+
+        # Verify
+        self.assertTrue(authentication_manager.check_username_password(login, 'some password') is None)
+
     @mock.patch('pulp.server.db.connection.PulpCollection.query')
     def test_find_by_criteria(self, mock_query):
         criteria = Criteria()
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+import mock
+import pymongo
+
+from pulp.server.compat import ObjectId
+from pulp.server.db.model.criteria import Criteria, UnitAssociationCriteria
+from pulp.server.exceptions import InvalidValue
+from pulp.server.webservices import continuation
+
+
+ASC = pymongo.ASCENDING
+DESC = pymongo.DESCENDING
+
+
+class PageTests(unittest.TestCase):
+
+    def test_iterate_more(self):
+        # Setup
+        page = continuation.Page([('name', ASC), ('_id', ASC)], 2)
+        results = [{'_id' : i, 'name' : 'n%d' % i} for i in range(3)]
+
+        # Test
+        items = list(page.iterate(results))
+
+        # Verify
+        self.assertEqual(results[:2], items)
+        self.assertEqual(['n1', 1], continuation.decode(page.token, page.sort))
+
+    def test_iterate_last_page(self):
+        # Setup
+        page = continuation.Page([('_id', ASC)], 2)
+
+        # Test
+        items = list(page.iterate([{'_id' : 1}, {'_id' : 2}]))
+
+        # Verify
+        self.assertEqual(2, len(items))
+        self.assertTrue(page.token is None)
+
+    def test_iterate_modified_results(self):
+        # Setup
+        page = continuation.Page([('_id', ASC)], 1)
+        results = [{'_id' : 1}, {'_id' : 2}]
+
+        # Test
+        for item in page.iterate(results):
+            item.pop('_id')
+
+        # Verify
+        self.assertEqual([1], continuation.decode(page.token, page.sort))
+
+    def test_iterate_key_document(self):
+        # Setup
+        page = continuation.Page([('_id', ASC)], 1, lambda u: u['metadata'])
+        results = [{'_id' : 'a1', 'metadata' : {'_id' : 'u1'}},
+                   {'_id' : 'a2', 'metadata' : {'_id' : 'u2'}}]
+
+        # Test
+        list(page.iterate(results))
+
+        # Verify
+        self.assertEqual(['u1'], continuation.decode(page.token, page.sort))
+
+
+class TokenTests(unittest.TestCase):
+
+    def test_round_trip(self):
+        # Setup
+        sort = [('name', DESC), ('_id', ASC)]
+        values = [u'zsh', ObjectId()]
+
+        # Test
+        token = continuation.encode(sort, values)
+
+        # Verify
+        self.assertEqual(values, continuation.decode(token, sort))
+
+    def test_different_sort(self):
+        token = continuation.encode([('_id', ASC)], [1])
+        self.assertRaises(InvalidValue, continuation.decode, token, [('_id', DESC)])
+
+    def test_malformed(self):
+        self.assertRaises(InvalidValue, continuation.decode, 'not a token', [('_id', ASC)])
+        self.assertRaises(InvalidValue, continuation.decode, u'☃', [('_id', ASC)])
+
+
+class AfterSpecTests(unittest.TestCase):
+
+    def test_single_field(self):
+        spec = continuation.after_spec([('_id', ASC)], [5])
+        self.assertEqual({'_id' : {'$gt' : 5}}, spec)
+
+    def test_multiple_fields(self):
+        # Test
+        spec = continuation.after_spec([('name', ASC), ('version', DESC), ('_id', ASC)],
+                                       ['zsh', '1.0', 5])
+
+        # Verify
+        expected = {'$or' : [
+            {'name' : {'$gt' : 'zsh'}},
+            {'name' : 'zsh', 'version' : {'$lt' : '1.0'}},
+            {'name' : 'zsh', 'version' : '1.0', '_id' : {'$gt' : 5}},
+        ]}
+        self.assertEqual(expected, spec)
+
+    def test_null_values(self):
+        # Test
+        spec = continuation.after_spec([('name', ASC), ('version', DESC), ('_id', ASC)],
+                                       [None, None, 5])
+
+        # Verify
+        expected = {'$or' : [
+            {'name' : {'$ne' : None}},
+            {'name' : None, 'version' : None, '_id' : {'$gt' : 5}},
+        ]}
+        self.assertEqual(expected, spec)
+
+
+class PaginateCriteriaTests(unittest.TestCase):
+
+    def test_first_page(self):
+        # Setup
+        criteria = Criteria(filters={'a' : 1}, sort=[('name', ASC)], limit=10, fields=['id'])
+
+        # Test
+        paged, page = continuation.paginate_criteria(criteria)
+
+        # Verify
+        self.assertEqual({'a' : 1}, paged.filters)
+        self.assertEqual([('name', ASC), ('_id', ASC)], paged.sort)
+        self.assertEqual(11, paged.limit)
+        self.assertEqual(['id', 'name', '_id'], paged.fields)
+        self.assertEqual(10, page.size)
+        self.assertEqual(['id'], criteria.fields)
+
+    def test_next_page(self):
+        # Setup
+        criteria = Criteria(filters={'a' : 1})
+        token = continuation.encode([('_id', ASC)], ['x'])
+
+        # Test
+        paged, page = continuation.paginate_criteria(criteria, token)
+
+        # Verify
+        self.assertEqual({'$and' : [{'a' : 1}, {'_id' : {'$gt' : 'x'}}]}, paged.filters)
+        self.assertEqual(continuation.DEFAULT_PAGE_SIZE + 1, paged.limit)
+        self.assertTrue(paged.fields is None)
+
+    def test_skip(self):
+        criteria = Criteria(skip=10)
+        self.assertRaises(InvalidValue, continuation.paginate_criteria, criteria)
+
+
+class PaginateUnitAssociationCriteriaTests(unittest.TestCase):
+
+    def test_across_types(self):
+        # Setup
+        criteria = UnitAssociationCriteria(limit=5)
+        token = continuation.encode(continuation.DEFAULT_ASSOCIATION_SORT + [('_id', ASC)],
+                                    ['rpm', 'c', 'x'])
+
+        # Test
+        paged, page = continuation.paginate_unit_association_criteria(criteria, None, token)
+
+        # Verify
+        self.assertEqual(6, paged.limit)
+        self.assertEqual(continuation.DEFAULT_ASSOCIATION_SORT + [('_id', ASC)], paged.association_sort)
+        self.assertTrue('$or' in paged.association_filters)
+        self.assertEqual({}, paged.unit_filters)
+        self.assertEqual(5, criteria.limit)
+
+    @mock.patch('pulp.plugins.types.database.type_units_unit_key', return_value=['name', 'version'])
+    def test_by_type_unit_key(self, mock_unit_key):
+        # Setup
+        criteria = UnitAssociationCriteria(type_ids=['rpm'], unit_fields=['name'], limit=1)
+        results = [{'_id' : 'a%d' % i, 'metadata' : {'_id' : 'u%d' % i, 'name' : 'n', 'version' : 'v'}}
+                   for i in range(2)]
+
+        # Test
+        paged, page = continuation.paginate_unit_association_criteria(criteria, 'rpm')
+        list(page.iterate(results))
+
+        # Verify
+        mock_unit_key.assert_called_once_with('rpm')
+        self.assertEqual([('name', ASC), ('version', ASC), ('_id', ASC)], paged.unit_sort)
+        self.assertEqual(['name', 'version', '_id'], paged.unit_fields)
+        self.assertTrue(paged.association_sort is None)
+        self.assertEqual(['n', 'v', 'u0'], continuation.decode(page.token, paged.unit_sort))
+
+    def test_association_sort_unit_filters(self):
+        criteria = UnitAssociationCriteria(type_ids=['rpm'], unit_filters={'name' : 'zsh'},
+                                           association_sort=[('created', ASC)])
+        self.assertRaises(InvalidValue, continuation.paginate_unit_association_criteria,
+                          criteria, 'rpm')
+
+    def test_skip(self):
+        criteria = UnitAssociationCriteria(skip=1)
+        self.assertRaises(InvalidValue, continuation.paginate_unit_association_criteria, criteria)
@@ -109,3 +109,59 @@ class TestConduit(unittest.TestCase):
         cancelled = conduit.cancelled()
         self.assertFalse(cancelled)
         self.assertEqual(1, mock_cancelled.call_count)
+
+
+class TestProfile(unittest.TestCase):
+
+    COMMON = [{'name': 'bash', 'version': '4.2'},
+              {'name': 'sed', 'version': '4.2'},
+              {'name': 'vim', 'version': '7.3'}]
+    PROFILE_1 = [{'name': 'zsh', 'version': '1.0'}] + COMMON
+    PROFILE_2 = [{'name': 'zsh', 'version': '2.0'}] + COMMON
+
+    def bindings(self, profile_required):
+        bindings = mock.Mock()
+        response = bindings.profile.send_digest.return_value
+        response.response_body = {'profile_required': profile_required}
+        return bindings
+
+    @mock.patch('pulp.agent.lib.dispatcher.Dispatcher')
+    @mock.patch('gofer.agent.plugin.Plugin.find', return_value=MockPlugin())
+    @mock.patch('gofer.agent.logutil.getLogger', return_value=root)
+    def test_report_unchanged(self, *unused):
+        from pulp.agent.gofer.pulpplugin import Profile
+        from pulp.common.profile import calculate_hash
+        bindings = self.bindings(False)
+        Profile().report(bindings, 'test-unchanged', 'rpm', self.PROFILE_1)
+        bindings.profile.send_digest.assert_called_once_with(
+            'test-unchanged', 'rpm', calculate_hash(self.PROFILE_1), delta=None)
+        self.assertFalse(bindings.profile.send.called)
+
+    @mock.patch('pulp.agent.lib.dispatcher.Dispatcher')
+    @mock.patch('gofer.agent.plugin.Plugin.find', return_value=MockPlugin())
+    @mock.patch('gofer.agent.logutil.getLogger', return_value=root)
+    def test_report_delta_then_full(self, *unused):
+        from pulp.agent.gofer.pulpplugin import Profile
+        # first report has no previous profile and the server requires it
+        bindings = self.bindings(True)
+        Profile().report(bindings, 'test-delta', 'rpm', self.PROFILE_1)
+        bindings.profile.send.assert_called_once_with('test-delta', 'rpm', self.PROFILE_1)
+        # second report sends the changes to the first
+        bindings = self.bindings(False)
+        Profile().report(bindings, 'test-delta', 'rpm', self.PROFILE_2)
+        delta = bindings.profile.send_digest.call_args[1]['delta']
+        self.assertEqual([0], delta['removed'])
+        self.assertEqual([[0, self.PROFILE_2[0]]], delta['added'])
+        self.assertFalse(bindings.profile.send.called)
+
+    @mock.patch('pulp.agent.lib.dispatcher.Dispatcher')
+    @mock.patch('gofer.agent.plugin.Plugin.find', return_value=MockPlugin())
+    @mock.patch('gofer.agent.logutil.getLogger', return_value=root)
+    def test_report_digest_not_found(self, *unused):
+        from pulp.agent.gofer.pulpplugin import Profile
+        from pulp.bindings.exceptions import NotFoundException
+        # servers without the digest API respond with a non-Pulp 404
+        bindings = self.bindings(False)
+        bindings.profile.send_digest.side_effect = NotFoundException('not found')
+        Profile().report(bindings, 'test-not-found', 'rpm', self.PROFILE_1)
+        bindings.profile.send.assert_called_once_with('test-not-found', 'rpm', self.PROFILE_1)
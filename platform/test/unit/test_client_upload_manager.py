@@ -20,6 +20,7 @@ import unittest
 from   pulp.bindings.exceptions import NotFoundException
 from   pulp.bindings.responses import Response
 import pulp.client.upload.manager as upload_util
+from   pulp.common import upload as upload_checksums
 
 # -- constants ----------------------------------------------------------------
 
@@ -232,6 +233,132 @@ class UploadManagerTests(unittest.TestCase):
         tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
         self.assertEqual(rpm_size, tracker.offset)
 
+    def test_upload_concurrently(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.concurrency = 4
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1', {'k' : 'v'}, 'm-1')
+
+        mock_callback = mock.Mock()
+
+        # Test
+        self.upload_manager.upload(upload_id, mock_callback.update_status)
+
+        # Verify
+        f = open(TEST_RPM_FILENAME, 'rb')
+        contents = f.read()
+        f.close()
+        offsets = range(0, len(contents), 100)
+
+        # Each segment sent once with its checksum, in any order
+        sent = {}
+        for single_call_args in self.mock_upload_bindings.upload_segment.call_args_list:
+            offset, data = single_call_args[0][1:3]
+            self.assertEqual(contents[offset:offset + 100], data)
+            self.assertEqual(upload_checksums.segment_checksum(data), single_call_args[1]['checksum'])
+            sent[offset] = data
+        self.assertEqual(offsets, sorted(sent))
+        self.assertEqual(len(offsets), self.mock_upload_bindings.upload_segment.call_count)
+
+        # Progress reported in bytes uploaded
+        self.assertEqual(len(offsets), mock_callback.update_status.call_count)
+        self.assertEqual((len(contents), len(contents)), mock_callback.update_status.call_args[0])
+
+        # Verify the state of the tracker file on disk
+        tf_filename = self.upload_manager._tracker_filename(upload_id)
+        tracker = upload_util.UploadTracker.load(tf_filename)
+        self.assertEqual(len(contents), tracker.offset)
+        self.assertTrue(tracker.is_finished_uploading)
+        expected = upload_checksums.upload_checksum([upload_checksums.segment_checksum(sent[o]) for o in offsets])
+        self.assertEqual(expected, tracker.upload_checksum)
+
+        # The upload checksum is sent on import
+        self.upload_manager.import_upload(upload_id)
+        self.assertEqual(expected, self.mock_upload_bindings.import_upload.call_args[1]['upload_checksum'])
+
+    def test_upload_concurrently_resume_after_failure(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.concurrency = 3
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1', {'k' : 'v'}, 'm-1')
+
+        def fail_once(upload_id, offset, data, checksum=None):
+            if offset == 500:
+                raise NotFoundException({})
+            return Response(200, {})
+        self.mock_upload_bindings.upload_segment.side_effect = fail_once
+
+        # Test
+        self.assertRaises(NotFoundException, self.upload_manager.upload, upload_id)
+
+        # Verify
+        tf_filename = self.upload_manager._tracker_filename(upload_id)
+        tracker = upload_util.UploadTracker.load(tf_filename)
+        self.assertFalse(tracker.is_finished_uploading)
+        self.assertFalse(tracker.is_running)
+        self.assertEqual(500, tracker.offset)
+        self.assertTrue(500 not in tracker.segment_checksums)
+
+        # Test - Resume
+        uploaded = set(tracker.segment_checksums)
+        self.mock_upload_bindings.upload_segment.reset_mock()
+        self.mock_upload_bindings.upload_segment.side_effect = None
+        self.upload_manager.upload(upload_id)
+
+        # Verify only the segments that weren't uploaded are sent again
+        rpm_size = os.path.getsize(TEST_RPM_FILENAME)
+        resent = set(c[0][1] for c in self.mock_upload_bindings.upload_segment.call_args_list)
+        self.assertEqual(set(range(0, rpm_size, 100)), uploaded | resent)
+        self.assertEqual(set(), uploaded & resent)
+
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        self.assertTrue(tracker.is_finished_uploading)
+        self.assertTrue(tracker.upload_checksum is not None)
+
+    @mock.patch('pulp.client.upload.manager.UploadTracker.save')
+    def test_upload_batched_tracker_saves(self, mock_save):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1', {'k' : 'v'}, 'm-1')
+        mock_save.reset_mock()
+
+        # Test
+        self.upload_manager.upload(upload_id)
+
+        # Verify
+        rpm_size = os.path.getsize(TEST_RPM_FILENAME)
+        num_upload_calls = int(math.ceil(float(rpm_size) / 100))
+        # Once when started, once per batch, once when finished
+        expected = 2 + num_upload_calls / upload_util.TRACKER_SAVE_SEGMENTS
+        self.assertEqual(expected, mock_save.call_count)
+
+    def test_upload_resume_legacy_tracker(self):
+        # Setup
+        self.upload_manager.chunk_size = 100
+        self.upload_manager.initialize()
+        upload_id = self.upload_manager.initialize_upload(TEST_RPM_FILENAME, 'repo-1', 'type-1', {'k' : 'v'}, 'm-1')
+
+        # Simulate a tracker saved by an earlier version partway through
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        for name in ('chunk_size', 'segment_checksums', 'upload_checksum'):
+            delattr(tracker, name)
+        tracker.offset = 200
+        tracker.save()
+        self.upload_manager.tracker_files = {}
+        self.upload_manager.initialize()
+
+        # Test
+        self.upload_manager.upload(upload_id)
+
+        # Verify
+        self.assertEqual(200, self.mock_upload_bindings.upload_segment.call_args_list[0][0][1])
+        tracker = self.upload_manager._get_tracker_file_by_id(upload_id)
+        self.assertTrue(tracker.is_finished_uploading)
+        self.assertTrue(tracker.upload_checksum is None)
+
     def test_upload_concurrent_upload(self):
         # Setup
         self.upload_manager.initialize()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import mock
+
+import base
+from pulp.client.commands.repo import upload
+
+
+class PerformUploadTests(base.PulpClientTests):
+
+    def setUp(self):
+        super(PerformUploadTests, self).setUp()
+        self.upload_manager = mock.Mock()
+        self.upload_manager.concurrency = 2
+
+    def test_configured_concurrency(self):
+        # Setup
+        self.config['server']['upload_concurrency'] = '4'
+
+        # Test
+        upload.perform_upload(self.context, self.upload_manager, [])
+
+        # Verify
+        self.assertEqual(4, self.upload_manager.concurrency)
+
+    def test_default_concurrency(self):
+        # Test
+        upload.perform_upload(self.context, self.upload_manager, [])
+
+        # Verify the manager's own concurrency is kept
+        self.assertEqual(2, self.upload_manager.concurrency)
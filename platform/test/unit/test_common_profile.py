@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import unittest
+
+from pulp.common import profile
+
+
+ZSH_1 = {'name': 'zsh', 'version': '1.0'}
+ZSH_2 = {'name': 'zsh', 'version': '2.0'}
+VIM = {'name': 'vim', 'version': '7.3'}
+BASH = {'name': 'bash', 'version': '4.2'}
+
+
+class TestCalculateHash(unittest.TestCase):
+
+    def test_key_order(self):
+        self.assertEqual(profile.calculate_hash({'a': 1, 'b': 2}),
+                         profile.calculate_hash({'b': 2, 'a': 1}))
+
+    def test_list_order(self):
+        self.assertNotEqual(profile.calculate_hash([ZSH_1, VIM]),
+                            profile.calculate_hash([VIM, ZSH_1]))
+
+
+class TestDelta(unittest.TestCase):
+
+    def test_round_trip(self):
+        # Setup
+        previous = [BASH, VIM, ZSH_1]
+        current = [VIM, ZSH_2, BASH]
+
+        # Test
+        delta = profile.delta(previous, current)
+
+        # Verify
+        self.assertEqual(profile.calculate_hash(previous), delta['base_hash'])
+        self.assertEqual(current, profile.apply_delta(previous, delta))
+
+    def test_unchanged(self):
+        delta = profile.delta([BASH, VIM], [BASH, VIM])
+        self.assertEqual([], delta['removed'])
+        self.assertEqual([], delta['added'])
+
+    def test_not_list(self):
+        self.assertTrue(profile.delta({'a': 1}, {'a': 2}) is None)
+
+    def test_apply_out_of_range(self):
+        delta = {'removed': [3], 'added': []}
+        self.assertRaises(ValueError, profile.apply_delta, [BASH], delta)
+        delta = {'removed': [], 'added': [[2, VIM]]}
+        self.assertRaises(ValueError, profile.apply_delta, [BASH], delta)
+
+    def test_apply_malformed(self):
+        self.assertRaises(ValueError, profile.apply_delta, [BASH], {'removed': []})
+        self.assertRaises(ValueError, profile.apply_delta, {'a': 1}, {'removed': [], 'added': []})
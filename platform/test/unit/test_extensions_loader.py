@@ -13,7 +13,9 @@
 
 # Python
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 
 import mock
@@ -208,3 +210,100 @@ class ExtensionLoaderTests(unittest.TestCase):
             pass
         self.assertEqual(getattr(foo, loader.PRIORITY_VAR), loader.DEFAULT_PRIORITY)
 
+
+
+class ExtensionIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        super(ExtensionIndexTests, self).setUp()
+        self.working_dir = tempfile.mkdtemp(prefix='extensions-index-')
+        self.index_filename = os.path.join(self.working_dir, 'index', 'extensions.json')
+
+    def tearDown(self):
+        super(ExtensionIndexTests, self).tearDown()
+        shutil.rmtree(self.working_dir)
+
+    def load(self, args):
+        prompt = PulpPrompt()
+        cli = PulpCli(prompt)
+        context = ClientContext(None, None, None, prompt, None, cli=cli)
+        loader.load_extensions(VALID_SET, context, 'admin', args=args,
+                               index_filename=self.index_filename)
+        return sorted(cli.root_section.subsections.keys())
+
+    @mock.patch('pkg_resources.iter_entry_points', return_value=())
+    def test_build_index(self, mock_entry):
+        # Test
+        sections = self.load(['section-2', 'list'])
+
+        # Verify
+        self.assertEqual(['section-1', 'section-2', 'section-3'], sections)
+        index = loader._read_index(self.index_filename, loader._fingerprint(VALID_SET, 'admin'))
+        expected = [['module:ext3', ['section-3']],
+                    ['module:ext1', ['section-1']],
+                    ['module:ext4', []],
+                    ['module:ext2', ['section-2']]]
+        self.assertEqual(expected, index['packs'])
+
+    @mock.patch('pkg_resources.iter_entry_points', return_value=())
+    def test_load_indexed(self, mock_entry):
+        # Setup
+        self.load(['section-2'])
+
+        # Test
+        with mock.patch('pulp.client.extensions.loader._load_all') as mock_load_all:
+            sections = self.load(['section-2', 'list'])
+
+        # Verify
+        self.assertEqual(['section-2'], sections)
+        self.assertFalse(mock_load_all.called)
+
+    @mock.patch('pkg_resources.iter_entry_points', return_value=())
+    def test_load_unknown_name(self, mock_entry):
+        # Setup
+        self.load(['section-2'])
+
+        # Test
+        sections = self.load(['unknown'])
+
+        # Verify
+        self.assertEqual(['section-1', 'section-2', 'section-3'], sections)
+
+    @mock.patch('pkg_resources.iter_entry_points', return_value=())
+    def test_stale_index(self, mock_entry):
+        # Setup
+        fingerprint = loader._fingerprint(VALID_SET, 'admin')
+        fingerprint['packs']['ext1'] = 'changed'
+        loader._write_index(self.index_filename, fingerprint, [['module:ext1', ['section-2']]])
+
+        # Test
+        sections = self.load(['section-2'])
+
+        # Verify
+        self.assertEqual(['section-1', 'section-2', 'section-3'], sections)
+        index = loader._read_index(self.index_filename, loader._fingerprint(VALID_SET, 'admin'))
+        self.assertEqual(4, len(index['packs']))
+
+    @mock.patch('pkg_resources.iter_entry_points', return_value=())
+    def test_no_index_for_options(self, mock_entry):
+        # Test
+        sections = self.load(['--help'])
+
+        # Verify
+        self.assertEqual(['section-1', 'section-2', 'section-3'], sections)
+        self.assertFalse(os.path.exists(self.index_filename))
+
+    def test_required_packs(self):
+        # Setup
+        index = {'packs' : [['module:a', ['repo']],
+                            ['module:b', []],
+                            ['module:c', ['rpm', 'repo']],
+                            ['module:d', ['rpm', 'node']],
+                            ['module:e', ['puppet']]]}
+
+        # Test
+        required = loader._required_packs(index, 'repo')
+
+        # Verify
+        self.assertEqual(['module:a', 'module:b', 'module:c', 'module:d'], required)
+        self.assertTrue(loader._required_packs(index, 'unknown') is None)
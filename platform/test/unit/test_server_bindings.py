@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+import httplib
+import socket
+import unittest
+
+import mock
+
+from pulp.bindings import exceptions
+from pulp.bindings.server import PulpConnection, HTTPSServerWrapper, PooledHTTPSServerWrapper
+
+
+def mock_connection(status=200, body='{}', will_close=False):
+    connection = mock.Mock()
+    response = connection.getresponse.return_value
+    response.status = status
+    response.read.return_value = body
+    response.will_close = will_close
+    return connection
+
+
+class TestPulpConnection(unittest.TestCase):
+
+    def test_default_wrapper(self):
+        conn = PulpConnection('localhost')
+        self.assertEqual(type(conn.server_wrapper), HTTPSServerWrapper)
+
+    def test_persistent_wrapper(self):
+        conn = PulpConnection('localhost', persistent=True, pool_size=2)
+        self.assertTrue(isinstance(conn.server_wrapper, PooledHTTPSServerWrapper))
+        self.assertEqual(2, conn.server_wrapper.pool_size)
+
+    def test_close(self):
+        wrapper = mock.Mock()
+        conn = PulpConnection('localhost', server_wrapper=wrapper)
+        conn.close()
+        wrapper.close.assert_called_once_with()
+
+    def test_not_found_unformatted(self):
+        # Setup
+        wrapper = mock.Mock()
+        wrapper.request.return_value = (404, 'not found')
+        conn = PulpConnection('localhost', server_wrapper=wrapper)
+
+        # Test
+        try:
+            conn.GET('/v2/unknown/')
+            self.fail('NotFoundException not raised')
+        except exceptions.NotFoundException, e:
+            pass
+
+        # Verify
+        self.assertEqual('not found', e.error_message)
+        self.assertEqual({}, e.extra_data)
+
+
+@mock.patch('pulp.bindings.server.SSL.Context')
+@mock.patch('pulp.bindings.server.httpslib.HTTPSConnection')
+class TestPooledHTTPSServerWrapper(unittest.TestCase):
+
+    def setUp(self):
+        super(TestPooledHTTPSServerWrapper, self).setUp()
+        self.conn = PulpConnection('localhost', cert_filename='/tmp/cert.pem', persistent=True, pool_size=1)
+        self.wrapper = self.conn.server_wrapper
+
+    def test_reuse(self, mock_https, mock_context):
+        # Setup
+        connection = mock_connection()
+        mock_https.return_value = connection
+
+        # Test
+        for i in range(3):
+            status, body = self.wrapper.request('GET', '/pulp/api/v2/status/', None)
+
+        # Verify
+        self.assertEqual((200, {}), (status, body))
+        self.assertEqual(1, mock_https.call_count)
+        self.assertEqual(1, mock_context.call_count)
+        self.assertEqual(3, connection.request.call_count)
+        self.assertFalse(connection.close.called)
+
+    def test_resume_session(self, mock_https, mock_context):
+        # Setup
+        connections = [mock_connection(will_close=True), mock_connection()]
+        mock_https.side_effect = connections
+
+        # Test
+        self.wrapper.request('GET', '/pulp/api/v2/status/', None)
+        self.wrapper.request('GET', '/pulp/api/v2/status/', None)
+
+        # Verify
+        self.assertTrue(connections[0].close.called)
+        session = connections[0].get_session.return_value
+        connections[1].set_session.assert_called_once_with(session)
+        self.assertEqual(1, mock_context.call_count)
+
+    def test_reconnect(self, mock_https, mock_context):
+        # Setup
+        stale = mock_connection()
+        fresh = mock_connection(body='{"a": 1}')
+        mock_https.side_effect = [stale, fresh]
+        self.wrapper.request('GET', '/pulp/api/v2/status/', None)
+        stale.getresponse.side_effect = httplib.BadStatusLine('')
+
+        # Test
+        status, body = self.wrapper.request('GET', '/pulp/api/v2/status/', None)
+
+        # Verify
+        self.assertEqual((200, {'a': 1}), (status, body))
+        self.assertTrue(stale.close.called)
+        self.assertEqual(2, mock_https.call_count)
+
+    def test_reconnect_before_sent(self, mock_https, mock_context):
+        # Setup
+        stale = mock_connection()
+        fresh = mock_connection()
+        mock_https.side_effect = [stale, fresh]
+        self.wrapper.request('GET', '/pulp/api/v2/status/', None)
+        stale.request.side_effect = socket.error('broken pipe')
+
+        # Test
+        self.wrapper.request('POST', '/pulp/api/v2/repositories/', '{}')
+
+        # Verify
+        self.assertTrue(stale.close.called)
+        self.assertEqual(1, fresh.request.call_count)
+        self.assertEqual(2, mock_https.call_count)
+
+    def test_no_retry_after_sent(self, mock_https, mock_context):
+        # Setup
+        stale = mock_connection()
+        mock_https.side_effect = [stale, mock_connection()]
+        self.wrapper.request('GET', '/pulp/api/v2/status/', None)
+        stale.getresponse.side_effect = httplib.BadStatusLine('')
+
+        # Test
+        self.assertRaises(exceptions.ConnectionException, self.wrapper.request,
+                          'POST', '/pulp/api/v2/repositories/', '{}')
+
+        # Verify the POST was not sent again, as the server may have acted on it
+        self.assertEqual(2, stale.request.call_count)
+        self.assertTrue(stale.close.called)
+        self.assertEqual(1, mock_https.call_count)
+
+    def test_no_retry_new_connection(self, mock_https, mock_context):
+        # Setup
+        connection = mock_connection()
+        connection.request.side_effect = socket.error('refused')
+        mock_https.return_value = connection
+
+        # Test
+        self.assertRaises(exceptions.ConnectionException, self.wrapper.request,
+                          'GET', '/pulp/api/v2/status/', None)
+
+        # Verify
+        self.assertEqual(1, mock_https.call_count)
+        self.assertTrue(connection.close.called)
+
+    def test_pool_size(self, mock_https, mock_context):
+        # Setup
+        connections = [mock_connection(), mock_connection()]
+        mock_https.side_effect = connections
+        first = self.wrapper._checkout()[0]
+        second = self.wrapper._checkout()[0]
+
+        # Test
+        self.wrapper._checkin(first, 0)
+        self.wrapper._checkin(second, 0)
+
+        # Verify
+        self.assertFalse(first.close.called)
+        self.assertTrue(second.close.called)
+
+    def test_close(self, mock_https, mock_context):
+        # Setup
+        connection = mock_connection()
+        mock_https.return_value = connection
+        self.wrapper.request('GET', '/pulp/api/v2/status/', None)
+
+        # Test
+        self.wrapper.close()
+
+        # Verify
+        self.assertTrue(connection.close.called)
+
+    def test_close_in_use(self, mock_https, mock_context):
+        # Setup
+        connections = [mock_connection(), mock_connection()]
+        mock_https.side_effect = connections
+        in_use = self.wrapper._checkout()[0]
+
+        # Test
+        self.wrapper.close()
+        self.wrapper._checkin(in_use, 0)
+        self.wrapper.request('GET', '/pulp/api/v2/status/', None)
+
+        # Verify the wrapper still pools connections opened after closing
+        self.assertTrue(in_use.close.called)
+        self.assertFalse(connections[1].close.called)
+        self.assertEqual([connections[1]], self.wrapper._idle)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Measures the number of API calls per second the client bindings can make
+against a running Pulp server, comparing a connection per call (the default)
+with a persistent, pooled PulpConnection.
+
+Calls are made to the status API by default, which does no work on the server,
+so the results are dominated by the cost of the connection and SSL handshake.
+Use --path to measure a different (GET) call.
+"""
+
+import sys
+import threading
+import time
+from optparse import OptionParser
+
+from pulp.bindings.server import PulpConnection, DEFAULT_POOL_SIZE
+
+STATUS_PATH = '/v2/status/'
+
+
+def measure(label, options, persistent):
+    conn = PulpConnection(options.host, options.port, username=options.username,
+                          password=options.password, cert_filename=options.cert,
+                          persistent=persistent, pool_size=options.pool_size)
+    calls_per_thread = options.calls / options.threads
+
+    def run():
+        for i in range(calls_per_thread):
+            conn.GET(options.path)
+
+    threads = [threading.Thread(target=run) for i in range(options.threads)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    conn.close()
+
+    calls = calls_per_thread * options.threads
+    print '%-12s calls: %-8d threads: %-4d seconds: %-8.2f calls/second: %.1f' % \
+          (label, calls, options.threads, elapsed, calls / elapsed)
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--host', default='localhost',
+                      help='Pulp server host [default: %default]')
+    parser.add_option('--port', type='int', default=443,
+                      help='Pulp server port [default: %default]')
+    parser.add_option('-u', '--username', default=None,
+                      help='username; the certificate is used if not specified')
+    parser.add_option('-p', '--password', default=None,
+                      help='password')
+    parser.add_option('--cert', default=None,
+                      help='client certificate, such as ~/.pulp/user-cert.pem')
+    parser.add_option('--path', default=STATUS_PATH,
+                      help='API path to GET [default: %default]')
+    parser.add_option('--calls', type='int', default=500,
+                      help='number of calls made in each mode [default: %default]')
+    parser.add_option('--threads', type='int', default=1,
+                      help='number of threads making calls [default: %default]')
+    parser.add_option('--pool-size', type='int', default=DEFAULT_POOL_SIZE,
+                      help='idle connections kept by the persistent connection [default: %default]')
+    parser.add_option('--skip-per-call', action='store_true', default=False,
+                      help='only measure the persistent connection')
+    options, args = parser.parse_args()
+    options.threads = max(1, options.threads)
+
+    if not options.skip_per_call:
+        measure('per-call', options, False)
+    measure('persistent', options, True)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Measures the time the client takes to start up and load its extensions,
+comparing loading every extension with loading only those the extensions
+index says are needed by the command being run.
+
+Modules stay imported for the life of a process, so each run is made in a new
+python process and its wall clock time, including interpreter startup, is
+measured. No calls are made to the server.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from optparse import OptionParser
+
+DEFAULT_CONFIG = '/etc/pulp/admin/admin.conf'
+
+
+def load(config_filename, index_filename, args):
+    """
+    Run in the child process; loads the extensions as the launcher would.
+    """
+    from pulp.bindings.bindings import Bindings
+    from pulp.bindings.server import PulpConnection
+    from pulp.client.extensions import loader
+    from pulp.client.extensions.core import ClientContext, PulpCli, PulpPrompt
+    from pulp.common.config import Config
+
+    config = Config(config_filename)
+    prompt = PulpPrompt()
+    server = Bindings(PulpConnection(config['server']['host']))
+    context = ClientContext(server, config, None, prompt, None)
+    context.cli = PulpCli(context)
+
+    extensions_dir = os.path.expanduser(config['filesystem']['extensions_dir'])
+    loader.load_extensions(extensions_dir, context, config['client']['role'], args=args,
+                           index_filename=index_filename or None)
+
+
+def child_command(options, index_filename, args):
+    return [sys.executable, __file__, '--child', '--config', options.config,
+            '--index', index_filename or '', '--'] + args
+
+
+def measure(label, options, index_filename, args):
+    command = child_command(options, index_filename, args)
+    times = []
+    for i in range(options.runs):
+        start = time.time()
+        subprocess.check_call(command)
+        times.append(time.time() - start)
+    print '%-10s runs: %-4d mean seconds: %-8.3f min seconds: %.3f' % \
+          (label, options.runs, sum(times) / len(times), min(times))
+
+
+def main():
+    parser = OptionParser(usage='%prog [options] [command ...]')
+    parser.add_option('--config', default=DEFAULT_CONFIG,
+                      help='client configuration [default: %default]')
+    parser.add_option('--runs', type='int', default=10,
+                      help='number of times the client is started in each mode [default: %default]')
+    parser.add_option('--child', action='store_true', default=False,
+                      help='internal; load the extensions once')
+    parser.add_option('--index', default='',
+                      help='internal; extensions index used by the child')
+    options, args = parser.parse_args()
+
+    if options.child:
+        load(options.config, options.index, args)
+        return 0
+
+    args = args or ['repo', 'list']
+    print 'command: %s' % ' '.join(args)
+
+    working_dir = tempfile.mkdtemp(prefix='cli-startup-')
+    try:
+        index_filename = os.path.join(working_dir, 'extensions_index.json')
+        measure('all', options, None, args)
+        # build the index before measuring
+        subprocess.check_call(child_command(options, index_filename, args))
+        measure('indexed', options, index_filename, args)
+    finally:
+        shutil.rmtree(working_dir)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
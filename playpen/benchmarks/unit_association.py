@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2013 Red Hat, Inc.
+#
+# This software is licensed to you under the GNU General Public
+# License as published by the Free Software Foundation; either version
+# 2 of the License (GPLv2) or (at your option) any later version.
+# There is NO WARRANTY for this software, express or implied,
+# including the implied warranties of MERCHANTABILITY,
+# NON-INFRINGEMENT, or FITNESS FOR A PARTICULAR PURPOSE. You should
+# have received a copy of GPLv2 along with this software; if not, see
+# http://www.gnu.org/licenses/old-licenses/gpl-2.0.txt.
+
+"""
+Measures the number of database round trips and the wall clock time needed to
+associate a large number of units with a repository. The per-unit path
+(associate_unit_by_id called in a loop, which is how associate_all_by_ids used
+to behave) is compared to the bulk associate_all_by_ids call.
+
+Round trips are taken from the MongoDB server's opcounters, so they include
+every query, insert, update, getmore and command the server saw while the
+association was running.
+"""
+
+import sys
+import time
+from optparse import OptionParser
+
+from pulp.server.db import connection
+from pulp.server.db.model.repository import Repo, RepoContentUnit
+from pulp.server.managers import factory as manager_factory
+from pulp.server.managers.repo.unit_association import OWNER_TYPE_USER, ASSOCIATION_BATCH_SIZE
+
+DB_NAME = 'pulp_benchmark'
+REPO_ID = 'benchmark-repo'
+TYPE_ID = 'benchmark-type'
+
+
+def round_trips():
+    status = connection.get_database().command('serverStatus')
+    return sum(status['opcounters'].values())
+
+
+def reset():
+    RepoContentUnit.get_collection().remove(safe=True)
+    Repo.get_collection().remove(safe=True)
+    manager_factory.repo_manager().create_repo(REPO_ID)
+
+
+def measure(label, unit_count, run):
+    reset()
+    unit_ids = ['unit-%d' % i for i in range(unit_count)]
+
+    before = round_trips()
+    start = time.time()
+    run(unit_ids)
+    elapsed = time.time() - start
+    trips = round_trips() - before
+
+    per_10k = float(trips) * 10000 / unit_count
+    print '%-12s units: %-8d round trips: %-8d (%.0f per 10k units)  seconds: %.2f' % \
+          (label, unit_count, trips, per_10k, elapsed)
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--units', type='int', default=10000,
+                      help='number of units to associate [default: %default]')
+    parser.add_option('--batch-size', type='int', default=ASSOCIATION_BATCH_SIZE,
+                      help='batch size used by the bulk association [default: %default]')
+    parser.add_option('--skip-per-unit', action='store_true', default=False,
+                      help='only run the bulk association')
+    options, args = parser.parse_args()
+
+    connection.initialize(name=DB_NAME)
+    manager_factory.initialize()
+    manager = manager_factory.repo_unit_association_manager()
+
+    def per_unit(unit_ids):
+        for unit_id in unit_ids:
+            manager.associate_unit_by_id(REPO_ID, TYPE_ID, unit_id, OWNER_TYPE_USER, 'admin')
+
+    def bulk(unit_ids):
+        manager.associate_all_by_ids(REPO_ID, TYPE_ID, unit_ids, OWNER_TYPE_USER, 'admin',
+                                     batch_size=options.batch_size)
+
+    try:
+        if not options.skip_per_unit:
+            measure('per-unit', options.units, per_unit)
+        measure('bulk', options.units, bulk)
+    finally:
+        connection.get_connection().drop_database(DB_NAME)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())